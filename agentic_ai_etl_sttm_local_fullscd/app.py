@@ -1,11 +1,18 @@
 import os, json, tempfile, time
 import streamlit as st
+import numpy as np
 import pandas as pd
 from utils.config import load_config
 from agents.sttm_reader import read_sttm_excel, REQUIRED_COLUMNS
 from etl.io_local import read_source_csv, read_source_sqlite, write_target_csv, read_target_sqlite, write_target_sqlite, read_target_csv
+from etl.io_local import read_source_csv_incremental, read_source_sqlite_incremental
+from etl.cdc import CDC_MODES, source_id, make_watermark, get_watermark
 from etl.transformer import apply_rules
-from etl.scd_handler import scd_type_1, scd_type_2, scd_type_3, deduplicate_source
+from etl.scd_handler import scd_type_1, scd_type_3, scd_type_2_event_time, deduplicate_source, write_duplicate_audit
+from etl.backends import scd_type_2, available as available_backends, AUTO_ROWS
+from etl.key_codes import KeyDictionary, shared_codes
+from etl.surrogate_keys import service_for, sequence_name
+from etl.scd_store import SCD2Store
 
 st.set_page_config(page_title="Agentic AI ETL — STTM (Local, v4.1 - Incremental Safe)", layout="wide")
 cfg = load_config()
@@ -14,6 +21,12 @@ if "sttm_df" not in st.session_state: st.session_state.sttm_df=None
 if "rules_df" not in st.session_state: st.session_state.rules_df=None
 if "src_df" not in st.session_state: st.session_state.src_df=None
 if "src_path" not in st.session_state: st.session_state.src_path=None
+if "pending_watermark" not in st.session_state: st.session_state.pending_watermark=None
+
+def scd2_store(opts):
+    return SCD2Store(st.session_state.get("target_db","data/target.db"), st.session_state.get("target_table","dim_customer"),
+                     opts.get("business_key"), opts.get("eff_start","effective_start"), opts.get("eff_end","effective_end"),
+                     opts.get("current_flag","is_current"))
 
 tab1, tab2, tab3, tab4, tab5 = st.tabs(["Source & Target", "SCD & Processing", "Transformation Rules", "LLM Config", "Run ETL"])
 
@@ -42,6 +55,7 @@ with tab1:
                 try:
                     st.session_state.src_df = read_source_csv(src_csv_path)
                     st.session_state.src_path = src_csv_path
+                    st.session_state.pending_watermark = None
                     st.dataframe(st.session_state.src_df.head(50))
                 except Exception as e:
                     st.error(f"Read CSV failed: {e}")
@@ -52,6 +66,7 @@ with tab1:
             try:
                 st.session_state.src_df = read_source_sqlite(src_db, src_table)
                 st.session_state.src_path = f"sqlite://{src_db}::{src_table}"
+                st.session_state.pending_watermark = None
                 st.dataframe(st.session_state.src_df.head(50))
             except Exception as e:
                 st.error(f"Read SQLite failed: {e}")
@@ -77,6 +92,30 @@ with tab1:
         st.session_state.target_db = st.text_input("Target SQLite path", "data/target.db")
         st.session_state.target_table = st.text_input("Target table name", "dim_customer")
 
+    with st.expander("Incremental extraction (CDC)", expanded=False):
+        st.caption("Pull only rows newer than the watermark stored with the target; the watermark advances in the same write as the target.")
+        if src_type=="SQLite" or input_mode=="Enter path":
+            cdc_mode = st.selectbox("Watermark type", CDC_MODES if src_type=="CSV" else ["column"])
+            cdc_col = st.text_input("Watermark column (updated_at or increasing id)", "last_updated") if cdc_mode=="column" else None
+            sid = source_id("CSV", src_csv_path) if src_type=="CSV" else source_id("SQLite", src_db, src_table)
+            tgt_loc = st.session_state.target_db if target_type=="SQLite" else st.session_state.target_csv
+            wm = get_watermark(target_type, tgt_loc, sid)
+            since = wm["value"] if wm and wm.get("mode")==cdc_mode and wm.get("column")==cdc_col else None
+            st.write("Current watermark:", since if since is not None else "none (first pull reads everything)")
+            if st.button("Pull delta"):
+                try:
+                    if src_type=="CSV": df, new_wm = read_source_csv_incremental(src_csv_path, cdc_mode, cdc_col, since)
+                    else: df, new_wm = read_source_sqlite_incremental(src_db, src_table, cdc_col, since)
+                    st.session_state.src_df = df
+                    st.session_state.src_path = sid
+                    st.session_state.pending_watermark = make_watermark(sid, cdc_mode, new_wm, cdc_col)
+                    st.success(f"Pulled {len(df)} new rows (watermark {since} → {new_wm}). Runs in Incremental mode.")
+                    st.dataframe(df.head(50))
+                except Exception as e:
+                    st.error(f"Incremental read failed: {e}")
+        else:
+            st.caption("CDC needs a CSV path or a SQLite source.")
+
 with tab2:
     st.header("SCD & Processing")
     st.subheader("Load Mode")
@@ -103,6 +142,10 @@ with tab2:
         version_col = st.text_input("version column", "version")
         surrogate_key_col = st.text_input("surrogate key column (optional)", "")
         soft_delete = st.checkbox("Soft delete missing keys (Snapshot mode only)", True)
+        event_time_col = st.text_input("Event-time column (optional)", "",
+                                       help="Versions start at this source timestamp; late or out-of-order rows are placed into history and only their keys' versions are rebuilt")
+        backend = st.selectbox("Execution backend", ["auto"] + available_backends(), index=0,
+                               help=f"auto: pandas below {AUTO_ROWS:,} rows, else DuckDB/Polars when installed")
     preview_before_load = st.checkbox("Preview before load", True)
     enable_rule_preview = st.checkbox("Enable rule preview before execution", True)
     dry_run = st.checkbox("Dry run (no write)", False)
@@ -112,7 +155,8 @@ with tab2:
         dedup_strategy=dedup_strategy, dedup_ts_col=dedup_ts_col, write_dup_audit=write_dup_audit,
         scd_type=scd_type, business_key=business_key, auto_tracked=auto_tracked, tracked_cols_text=tracked_cols_text,
         eff_start=eff_start, eff_end=eff_end, current_flag=current_flag,
-        version_col=version_col, surrogate_key_col=surrogate_key_col or None, soft_delete=soft_delete,
+        version_col=version_col, surrogate_key_col=surrogate_key_col or None, soft_delete=soft_delete, backend=backend,
+        event_time_col=event_time_col.strip() or None,
         preview=preview_before_load, rule_preview=enable_rule_preview, dry_run=dry_run,
         target_type=target_type
     )
@@ -148,13 +192,13 @@ with tab5:
         # Expiration preview
         if opts.get("scd_type") == "SCD2":
             if opts["target_type"] == "SQLite":
-                existing = read_target_sqlite(st.session_state.get("target_db","data/target.db"), st.session_state.get("target_table","dim_customer"))
+                existing = scd2_store(opts).read_current()
             else:
                 existing = read_target_csv(st.session_state.get("target_csv","output/dim_customer.csv"))
             if existing is not None and len(existing)>0 and opts.get("business_key") in out_preview.columns and "is_current" in existing.columns:
-                src_keys = set(pd.Series(out_preview[opts["business_key"]]).dropna().tolist())
-                cur = existing[existing["is_current"]==True]
-                would_expire = cur[~cur[opts["business_key"]].isin(src_keys)]
+                tgt_codes, src_codes = shared_codes(existing, out_preview, opts["business_key"])
+                cur_mask = (existing["is_current"]==True).to_numpy()
+                would_expire = existing[cur_mask & ~np.isin(tgt_codes, src_codes)]
                 if opts.get("load_mode")=="Snapshot" and opts.get("soft_delete", True):
                     st.warning(f"Snapshot mode: {len(would_expire)} current rows would be expired.")
                 else:
@@ -173,30 +217,41 @@ with tab5:
 
             scd_type = opts.get("scd_type")
             load_mode = opts.get("load_mode")
+            watermark = st.session_state.pending_watermark
+            if watermark: load_mode = "Incremental"  # a CDC delta is never a full image
 
             if scd_type == "SCD1":
-                final_df = scd_type_1(out_df, None, audit_cols={"batch_id":"local_demo","loaded_at":pd.Timestamp.utcnow()})
+                existing, keys = None, None
+                if watermark:  # a CDC delta is upserted into the target, never written over it
+                    keys = [opts.get("business_key")] if opts.get("business_key") in out_df.columns else None
+                    if not keys: st.error("SCD1 with CDC needs the business key in the output to upsert the delta."); st.stop()
+                    existing = (read_target_sqlite(st.session_state.get("target_db","data/target.db"), st.session_state.get("target_table","dim_customer"))
+                                if opts["target_type"] == "SQLite" else read_target_csv(st.session_state.get("target_csv","output/dim_customer.csv")))
+                final_df = scd_type_1(out_df, existing, audit_cols={"batch_id":"local_demo","loaded_at":pd.Timestamp.utcnow()}, keys=keys)
             else:
                 bk = opts.get("business_key")
 
                 # Optional duplicate audit
                 if bk and opts.get("write_dup_audit", False) and bk in out_df.columns:
-                    dmask = out_df.duplicated(subset=[bk], keep=False)
-                    if int(dmask.sum())>0:
-                        os.makedirs("output", exist_ok=True)
-                        ts = pd.Timestamp.utcnow().strftime("%Y%m%d_%H%M%S")
-                        audit_path = f"output/duplicate_audit_{bk}_{ts}.csv"
-                        out_df[dmask].to_csv(audit_path, index=False)
+                    ts = pd.Timestamp.utcnow().strftime("%Y%m%d_%H%M%S")
+                    audit_path = f"output/duplicate_audit_{bk}_{ts}.csv"
+                    if write_duplicate_audit(out_df, bk, audit_path) > 0:
                         st.info(f"Wrote duplicate audit CSV: {audit_path}")
 
-                # Dedup
+                # Dedup (on event time several changes per key are history, not duplicates)
+                event_col = opts.get("event_time_col") if scd_type == "SCD2" else None
                 try:
-                    out_df = deduplicate_source(out_df, bk, opts.get("dedup_strategy","keep_last"), opts.get("dedup_ts_col"))
+                    if not event_col:
+                        out_df = deduplicate_source(out_df, bk, opts.get("dedup_strategy","keep_last"), opts.get("dedup_ts_col"))
                 except Exception as e:
                     st.error(f"Deduplication failed: {e}"); st.stop()
 
                 # Existing
-                if opts["target_type"] == "SQLite":
+                store = scd2_store(opts) if scd_type == "SCD2" and opts["target_type"] == "SQLite" else None
+                event_keys = out_df[bk].dropna().unique() if event_col else None
+                if store:
+                    existing = store.read_versions(event_keys) if event_col else store.read_current()  # history stays in SQLite
+                elif opts["target_type"] == "SQLite":
                     existing = read_target_sqlite(st.session_state.get("target_db","data/target.db"), st.session_state.get("target_table","dim_customer"))
                 else:
                     existing = read_target_csv(st.session_state.get("target_csv","output/dim_customer.csv"))
@@ -210,12 +265,35 @@ with tab5:
                     tracked = [c.strip() for c in opts.get("tracked_cols_text","").split(",") if c.strip()]
 
                 if scd_type == "SCD2":
-                    final_df = scd_type_2(out_df, existing, business_key=bk, tracked_cols=tracked,
-                                          eff_start=opts["eff_start"], eff_end=opts["eff_end"], current_flag=opts["current_flag"],
-                                          version_col=opts["version_col"], surrogate_key_col=opts.get("surrogate_key_col"),
-                                          soft_delete=opts.get("soft_delete", True),
-                                          load_mode=load_mode,
-                                          audit_cols={"batch_id":"local_demo","loaded_at":pd.Timestamp.utcnow()})
+                    key_dict = KeyDictionary(bk, path=f"output/key_dict_{bk}.json")
+                    sk_col = opts.get("surrogate_key_col"); sk = {}
+                    if sk_col and not opts.get("dry_run"):
+                        target = (f"{st.session_state.get('target_db','data/target.db')}::{st.session_state.get('target_table','dim_customer')}"
+                                  if opts["target_type"] == "SQLite" else st.session_state.get("target_csv","output/dim_customer.csv"))
+                        sk = dict(sk_service=service_for("output/surrogate_keys.db"), sk_sequence=sequence_name(target, sk_col))
+                        if store:
+                            sk["sk_service"].reserve(sk["sk_sequence"], 0, seed=lambda: int(store.max_value(sk_col) or 0) + 1)
+                    if event_col:
+                        try:
+                            final_df = scd_type_2_event_time(out_df, existing, bk, tracked, event_col,
+                                                             eff_start=opts["eff_start"], eff_end=opts["eff_end"], current_flag=opts["current_flag"],
+                                                             version_col=opts["version_col"], surrogate_key_col=sk_col,
+                                                             audit_cols={"batch_id":"local_demo","loaded_at":pd.Timestamp.utcnow()},
+                                                             key_dict=key_dict, **sk)
+                        except (KeyError, ValueError) as e:
+                            st.error(f"Event-time SCD2 failed: {e}"); st.stop()
+                    else:
+                        final_df = scd_type_2(out_df, existing, business_key=bk, tracked_cols=tracked,
+                                              eff_start=opts["eff_start"], eff_end=opts["eff_end"], current_flag=opts["current_flag"],
+                                              version_col=opts["version_col"], surrogate_key_col=opts.get("surrogate_key_col"),
+                                              soft_delete=opts.get("soft_delete", True),
+                                              load_mode=load_mode,
+                                              audit_cols={"batch_id":"local_demo","loaded_at":pd.Timestamp.utcnow()},
+                                              key_dict=key_dict, backend=opts.get("backend", "auto"), **sk)
+                    mem = key_dict.memory_report(final_df, key_dict.encode(final_df, grow=False))
+                    st.caption(f"Key codes: {mem['dictionary_size']} distinct keys, {mem['raw_key_bytes']:,} B raw keys vs {mem['code_bytes']:,} B int64 codes")
+                    if not opts.get("dry_run"):
+                        key_dict.save()
                 else:
                     final_df = scd_type_3(out_df, existing, keys=[bk], tracked_cols=tracked,
                                           audit_cols={"batch_id":"local_demo","loaded_at":pd.Timestamp.utcnow()})
@@ -225,10 +303,13 @@ with tab5:
 
             if not opts.get("dry_run"):
                 if opts["target_type"] == "CSV":
-                    write_target_csv(final_df, st.session_state.get("target_csv","output/dim_customer.csv"))
+                    write_target_csv(final_df, st.session_state.get("target_csv","output/dim_customer.csv"), watermark=watermark)
                     st.success(f"Wrote {len(final_df)} rows to CSV: {st.session_state.get('target_csv','output/dim_customer.csv')}")
                 else:
-                    write_target_sqlite(final_df, st.session_state.get("target_db","data/target.db"), st.session_state.get("target_table","dim_customer"))
+                    if scd_type == "SCD2" and event_col: store.replace_keys(final_df, event_keys, watermark=watermark)
+                    elif scd_type == "SCD2": store.load(final_df, watermark=watermark)
+                    else: write_target_sqlite(final_df, st.session_state.get("target_db","data/target.db"), st.session_state.get("target_table","dim_customer"), watermark=watermark)
                     st.success(f"Wrote {len(final_df)} rows to SQLite: {st.session_state.get('target_db','data/target.db')}::{st.session_state.get('target_table','dim_customer')}")
+                st.session_state.pending_watermark = None
             else:
                 st.info("Dry run enabled — no data written.")
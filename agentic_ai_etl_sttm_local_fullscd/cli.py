@@ -0,0 +1,105 @@
+"""Headless runner for the STTM ETL pipeline (no Streamlit), for cron/Airflow.
+
+    python cli.py jobs.example.yaml                         # run every job in the file, in order
+    python cli.py nightly.yaml weekly.yaml --jobs 4         # jobs in parallel processes
+    python cli.py jobs.example.yaml --only customers_delta --dry-run
+    python cli.py jobs.example.yaml --profile output/profile --json output/run.json
+
+Job configs are YAML (see jobs.example.yaml). Relative paths inside them resolve against this
+directory, like in app.py. Jobs that write the same target always run one after another, in file
+order, in one worker; a failed job skips the later jobs on its target. Exit code 1 if any job failed.
+"""
+import os, sys, json, time, argparse, traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def _target_key(job: dict) -> str:
+    tgt = job.get("target") or {}
+    loc = tgt.get("path") or f"{tgt.get('db')}::{tgt.get('table')}"
+    return os.path.normpath(os.path.join(HERE, str(loc)))
+
+def _profiled(job: dict, dry_run: bool, profile_dir: str):
+    import cProfile, pstats, io
+    from etl.pipeline import run_job
+    prof = cProfile.Profile()
+    res = prof.runcall(run_job, job, dry_run)
+    os.makedirs(profile_dir, exist_ok=True)
+    base = os.path.join(profile_dir, job["name"])
+    prof.dump_stats(base + ".prof")
+    buf = io.StringIO()
+    pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(25)
+    with open(base + ".txt", "w", encoding="utf-8") as f: f.write(buf.getvalue())
+    res["profile"] = base + ".prof"
+    return res
+
+def run_group(jobs: list, dry_run: bool = False, profile_dir: str | None = None) -> list:
+    """Jobs sharing one target, in order. Runs in a worker process with --jobs > 1."""
+    os.chdir(HERE)
+    if HERE not in sys.path: sys.path.insert(0, HERE)
+    from etl.pipeline import run_job
+    out, failed = [], None
+    for job in jobs:
+        if failed:
+            out.append({"job": job["name"], "status": "skipped", "error": f"earlier job '{failed}' on the same target failed"}); continue
+        try:
+            res = _profiled(job, dry_run, profile_dir) if profile_dir else run_job(job, dry_run)
+            out.append({**res, "status": "ok"})
+        except Exception as e:
+            failed = job["name"]
+            out.append({"job": job["name"], "status": "failed", "error": f"{type(e).__name__}: {e}",
+                        "traceback": traceback.format_exc(limit=5)})
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("configs", nargs="+", help="job config YAML file(s)")
+    ap.add_argument("--jobs", "-j", type=int, default=1, help="worker processes (targets run in parallel)")
+    ap.add_argument("--only", default=None, help="comma list of job names to run")
+    ap.add_argument("--dry-run", action="store_true", help="transform and apply SCD, write nothing")
+    ap.add_argument("--profile", nargs="?", const="output/profile", default=None,
+                    help="cProfile each job; writes <dir>/<job>.prof and a top-25 .txt (default dir output/profile)")
+    ap.add_argument("--json", default=None, help="write the run summary to this path")
+    a = ap.parse_args(argv)
+
+    configs = [os.path.abspath(p) for p in a.configs]
+    json_out = os.path.abspath(a.json) if a.json else None
+    os.chdir(HERE)
+    sys.path.insert(0, HERE)
+    from utils.config import load_config, load_jobs
+    load_config()  # .env for the LLM helpers, same as the app
+
+    jobs = [j for p in configs for j in load_jobs(p)]
+    if a.only:
+        wanted = {x.strip() for x in a.only.split(",") if x.strip()}
+        jobs = [j for j in jobs if j["name"] in wanted]
+        if wanted - {j["name"] for j in jobs}: ap.error(f"unknown job(s): {sorted(wanted - {j['name'] for j in jobs})}")
+    names = [j["name"] for j in jobs]
+    if len(set(names)) != len(names): ap.error("job names must be unique across configs")
+    groups: dict = {}
+    for j in jobs: groups.setdefault(_target_key(j), []).append(j)
+
+    t0 = time.perf_counter(); results = []
+    def report(rs):
+        for r in rs:
+            results.append(r)
+            if r["status"] == "ok":
+                print(f"ok      {r['job']:28} {r['source_rows']:>9,} -> {r['target_rows']:>9,} rows  {r['elapsed_s']:8.3f}s  {r['target']}"
+                      + ("  (dry run)" if r["dry_run"] else ""))
+            else:
+                print(f"{r['status']:7} {r['job']:28} {r['error']}")
+    if a.jobs <= 1 or len(groups) <= 1:
+        for g in groups.values(): report(run_group(g, a.dry_run, a.profile))
+    else:
+        with ProcessPoolExecutor(max_workers=min(a.jobs, len(groups))) as pool:
+            futs = [pool.submit(run_group, g, a.dry_run, a.profile) for g in groups.values()]
+            for f in as_completed(futs): report(f.result())
+    results.sort(key=lambda r: names.index(r["job"]))
+    failed = [r for r in results if r["status"] != "ok"]
+    print(f"{len(results) - len(failed)}/{len(results)} jobs ok in {time.perf_counter() - t0:.2f}s")
+    if json_out:
+        with open(json_out, "w", encoding="utf-8") as f: json.dump({"results": results}, f, indent=2, default=str)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
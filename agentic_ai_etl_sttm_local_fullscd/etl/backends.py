@@ -0,0 +1,120 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+from etl.key_codes import KeyDictionary
+from etl.scd_handler import scd_type_2 as pandas_scd_type_2, _infer_tracked_if_empty, _scd2_prepare_target, _scd2_apply
+from etl.scd_handler import UNCHANGED, INSERT, NEW_VERSION, _comparable as _comparable_pair
+
+# Execution backends for SCD2. pandas (etl.scd_handler) is the reference and the fallback; DuckDB and
+# Polars run the heavy part -- the key join and the tracked-column change detection -- multi-threaded,
+# and the result is assembled by the same scd_handler._scd2_apply, so every backend returns the same frame.
+BACKENDS = ("pandas", "duckdb", "polars")
+AUTO_ROWS = int(os.environ.get("ETL_BACKEND_AUTO_ROWS", 250_000))  # src + target rows before "auto" leaves pandas
+
+def available() -> List[str]:
+    out = ["pandas"]
+    for name in BACKENDS[1:]:
+        try: __import__(name); out.append(name)
+        except ImportError: pass
+    return out
+
+def choose_backend(rows: int, backend: str = "auto", threshold: Optional[int] = None) -> str:
+    """'auto' -> pandas below the threshold, else the first installed engine (duckdb, then polars)."""
+    backend = (backend or "auto").lower()
+    if backend == "auto":
+        backend = os.environ.get("ETL_BACKEND", "auto").lower()
+    if backend != "auto":
+        if backend not in BACKENDS: raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS} or 'auto'.")
+        if backend not in available(): raise ImportError(f"Backend '{backend}' is not installed (pip install {backend}).")
+        return backend
+    if rows < (AUTO_ROWS if threshold is None else threshold): return "pandas"
+    engines = [b for b in available() if b != "pandas"]
+    return engines[0] if engines else "pandas"
+
+def _comparable(tgt: pd.DataFrame, src: pd.DataFrame, cols: List[str]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Tracked columns as c0..cN for the engines, normalised by scd_handler._comparable like the pandas match."""
+    t, s = {}, {}
+    for i, c in enumerate(cols):
+        a, b = _comparable_pair(tgt[c], src[c])
+        t[f"c{i}"], s[f"c{i}"] = pd.Series(a, dtype=a.dtype), pd.Series(b, dtype=b.dtype)  # text stays object, None stays None
+    return pd.DataFrame(t), pd.DataFrame(s)
+
+def _match_duckdb(t: pd.DataFrame, s: pd.DataFrame, ncols: int, threads: Optional[int] = None):
+    import duckdb
+    con = duckdb.connect()
+    try:
+        if threads: con.execute(f"SET threads = {int(threads)}")
+        con.register("t", t); con.register("s", s)
+        diff = " OR ".join(f"s.c{i} IS DISTINCT FROM t.c{i}" for i in range(ncols)) or "FALSE"
+        m = con.execute(f"""
+            WITH cur AS (SELECT _code, max(_pos) AS _tpos FROM t WHERE _cur AND _code >= 0 GROUP BY _code)
+            SELECT s._pos AS spos, coalesce(cur._tpos, -1) AS tpos,
+                   CASE WHEN cur._tpos IS NULL THEN {INSERT} WHEN {diff} THEN {NEW_VERSION} ELSE {UNCHANGED} END AS action
+            FROM s LEFT JOIN cur ON s._code = cur._code LEFT JOIN t ON t._pos = cur._tpos
+            ORDER BY s._pos""").fetchnumpy()
+        gone = con.execute("SELECT _pos FROM t WHERE _cur AND NOT EXISTS (SELECT 1 FROM s WHERE s._code = t._code) "
+                           "ORDER BY _pos").fetchnumpy()["_pos"]
+    finally:
+        con.close()
+    return np.asarray(m["action"], dtype=np.int8), np.asarray(m["tpos"], dtype=np.int64), np.asarray(gone, dtype=np.int64)
+
+def _match_polars(t: pd.DataFrame, s: pd.DataFrame, ncols: int, threads: Optional[int] = None):
+    import polars as pl
+    # built column by column so text columns don't need pyarrow; NaN -> null like pandas' isna()
+    frame = lambda df: pl.DataFrame({c: (df[c].to_numpy() if df[c].dtype.kind in "biuf" else df[c].tolist())
+                                     for c in df.columns}, nan_to_null=True).lazy()
+    lt, ls = frame(t), frame(s)
+    cur = lt.filter(pl.col("_cur") & (pl.col("_code") >= 0)).group_by("_code").agg(pl.col("_pos").max().alias("_tpos"))
+    rhs = lt.select([pl.col("_pos").alias("_tpos")] + [pl.col(f"c{i}").alias(f"c{i}_t") for i in range(ncols)])
+    diff = pl.any_horizontal([pl.col(f"c{i}").ne_missing(pl.col(f"c{i}_t")) for i in range(ncols)]) if ncols else pl.lit(False)
+    m = (ls.join(cur, on="_code", how="left").join(rhs, on="_tpos", how="left")
+         .select("_pos", pl.col("_tpos").fill_null(-1),
+                 pl.when(pl.col("_tpos").is_null()).then(INSERT).when(diff).then(NEW_VERSION).otherwise(UNCHANGED).alias("action"))
+         .sort("_pos").collect())
+    gone = lt.filter(pl.col("_cur")).join(ls.select("_code").unique(), on="_code", how="anti").sort("_pos").collect()["_pos"]
+    return m["action"].to_numpy().astype(np.int8), m["_tpos"].to_numpy().astype(np.int64), gone.to_numpy().astype(np.int64)
+
+MATCHERS = {"duckdb": _match_duckdb, "polars": _match_polars}
+
+def scd_type_2(src_out: pd.DataFrame,
+               tgt_existing: Optional[pd.DataFrame],
+               business_key: str,
+               tracked_cols: List[str] | None,
+               eff_start: str='effective_start',
+               eff_end: str='effective_end',
+               current_flag: str='is_current',
+               version_col: str='version',
+               surrogate_key_col: Optional[str]=None,
+               as_of: Optional[pd.Timestamp]=None,
+               soft_delete: bool=True,
+               load_mode: str='Snapshot',
+               audit_cols: Optional[dict]=None,
+               key_dict: Optional[KeyDictionary]=None,
+               backend: str='auto',
+               threads: Optional[int]=None,
+               sk_service=None,
+               sk_sequence: Optional[str]=None) -> pd.DataFrame:
+    """etl.scd_handler.scd_type_2 with a choice of engine; see choose_backend for 'auto'."""
+    rows = len(src_out) + (0 if tgt_existing is None else len(tgt_existing))
+    name = choose_backend(rows, backend)
+    if name == "pandas" or tgt_existing is None or tgt_existing.empty:
+        return pandas_scd_type_2(src_out, tgt_existing, business_key, tracked_cols, eff_start, eff_end, current_flag,
+                                 version_col, surrogate_key_col, as_of, soft_delete, load_mode, audit_cols, key_dict,
+                                 sk_service, sk_sequence)
+
+    now = as_of or pd.Timestamp.utcnow()
+    src = src_out.reset_index(drop=True)
+    tracked = _infer_tracked_if_empty(tracked_cols or [], list(src.columns), business_key)
+    tgt = _scd2_prepare_target(tgt_existing, now, eff_start, eff_end, current_flag, version_col, surrogate_key_col).reset_index(drop=True)
+    kd = key_dict or KeyDictionary(business_key)
+    tgt_codes, src_codes = kd.encode(tgt), kd.encode(src)
+    cols = [c for c in tracked if c in src.columns and c in tgt.columns]
+    t, s = _comparable(tgt, src, cols)
+    t.insert(0, "_pos", np.arange(len(tgt), dtype=np.int64)); t.insert(1, "_code", tgt_codes)
+    t.insert(2, "_cur", tgt[current_flag].to_numpy(dtype=bool))
+    s.insert(0, "_pos", np.arange(len(src), dtype=np.int64)); s.insert(1, "_code", src_codes)
+    action, tpos, gone = MATCHERS[name](t, s, len(cols), threads)
+
+    return _scd2_apply(tgt, src, action, tpos, gone, now, eff_start, eff_end, current_flag, version_col, surrogate_key_col,
+                       soft_delete, load_mode, audit_cols, sk_service, sk_sequence)
@@ -0,0 +1,103 @@
+import os, json, datetime
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Union
+
+def _key_list(keys: Union[str, List[str]]) -> List[str]:
+    return [keys] if isinstance(keys, str) else list(keys)
+
+def _key_values(df: pd.DataFrame, keys: List[str]):
+    """Business key per row as a scalar (single key) or tuple (composite); returns (values, null_mask)."""
+    missing = [k for k in keys if k not in df.columns]
+    if missing: raise KeyError(f"Business key column(s) not present: {missing}")
+    null_mask = df[keys].isna().any(axis=1).to_numpy()
+    if len(keys) == 1:
+        return df[keys[0]].to_numpy(dtype=object), null_mask
+    vals = np.empty(len(df), dtype=object)
+    vals[:] = list(df[keys].itertuples(index=False, name=None))
+    return vals, null_mask
+
+def _json_scalar(o):
+    """Key values JSON can't hold, tagged so _typed restores them: a Timestamp key stays a Timestamp after a
+    reload instead of coming back as text (and getting a new code)."""
+    if isinstance(o, np.generic): return o.item()
+    if isinstance(o, datetime.datetime): return {"$ts": pd.Timestamp(o).isoformat()}
+    if isinstance(o, datetime.date): return {"$date": o.isoformat()}
+    if isinstance(o, (datetime.timedelta, np.timedelta64)): return {"$td": int(pd.Timedelta(o).value)}
+    return str(o)
+
+def _typed(d: dict):
+    if d.keys() == {"$ts"}: return pd.Timestamp(d["$ts"])
+    if d.keys() == {"$date"}: return datetime.date.fromisoformat(d["$date"])
+    if d.keys() == {"$td"}: return pd.Timedelta(d["$td"])
+    return d
+
+def _as_index(values) -> pd.Index:
+    return pd.Index(values, dtype=object, tupleize_cols=False)
+
+def encode_keys(df: pd.DataFrame, keys: Union[str, List[str]]) -> np.ndarray:
+    """One-off int64 codes for a single batch (no dictionary kept). Null keys get -1."""
+    keys = _key_list(keys)
+    if len(keys) == 1:
+        codes, _ = pd.factorize(df[keys[0]], use_na_sentinel=True)
+        return codes.astype(np.int64)
+    return df.groupby(keys, sort=False, dropna=True).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+
+class KeyDictionary:
+    """Stable business key -> int64 code mapping, shareable across frames and runs.
+
+    Codes are dense positions in the dictionary; keys seen for the first time are
+    appended, so codes handed out in earlier batches never change.
+    """
+    def __init__(self, keys: Union[str, List[str]], path: Optional[str] = None):
+        self.keys = _key_list(keys)
+        self.path = path
+        self._index = _as_index([])
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f, object_hook=_typed)
+            if data.get("keys") != self.keys:
+                raise ValueError(f"Key dictionary at {path} was built for {data.get('keys')}, not {self.keys}")
+            vals = data.get("values", [])
+            self._index = _as_index([tuple(v) for v in vals] if len(self.keys) > 1 else vals)
+
+    def __len__(self): return len(self._index)
+
+    def encode(self, df: pd.DataFrame, grow: bool = True) -> np.ndarray:
+        vals, nulls = _key_values(df, self.keys)
+        codes = self._index.get_indexer(vals).astype(np.int64)
+        unseen = (codes < 0) & ~nulls
+        if grow and unseen.any():
+            fresh = pd.unique(vals[unseen])
+            self._index = self._index.append(_as_index(fresh))
+            codes[unseen] = self._index.get_indexer(vals[unseen])
+        codes[nulls] = -1
+        return codes
+
+    def decode(self, codes: np.ndarray) -> list:
+        out = []
+        for c in np.asarray(codes):
+            out.append(self._index[c] if c >= 0 else None)
+        return out
+
+    def save(self, path: Optional[str] = None) -> str:
+        path = path or self.path
+        if not path: raise ValueError("No path given for key dictionary.")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"keys": self.keys, "values": self._index.tolist()}, f, default=_json_scalar)
+        os.replace(tmp, path)
+        return path
+
+    def memory_report(self, df: pd.DataFrame, codes: Optional[np.ndarray] = None) -> dict:
+        raw = int(df[self.keys].memory_usage(index=False, deep=True).sum())
+        coded = int((codes if codes is not None else np.empty(len(df), dtype=np.int64)).nbytes)
+        return {"rows": len(df), "keys": self.keys, "raw_key_bytes": raw, "code_bytes": coded,
+                "saved_bytes": raw - coded, "dictionary_size": len(self._index)}
+
+def shared_codes(left: pd.DataFrame, right: pd.DataFrame, keys: Union[str, List[str]],
+                 key_dict: Optional[KeyDictionary] = None):
+    """Encode two frames against the same dictionary so their codes are comparable."""
+    kd = key_dict or KeyDictionary(keys)
+    return kd.encode(left), kd.encode(right)
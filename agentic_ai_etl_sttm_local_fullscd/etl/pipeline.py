@@ -0,0 +1,163 @@
+import os, time
+import pandas as pd
+from typing import Optional
+from agents.sttm_reader import read_sttm_excel
+from etl.io_local import read_source_csv, read_source_sqlite, read_target_csv, read_target_sqlite, write_target_csv, write_target_sqlite
+from etl.io_local import read_source_csv_incremental, read_source_sqlite_incremental, read_source_csv_chunks
+from etl.cdc import source_id, make_watermark, get_watermark, plain_value
+from etl.transformer import apply_rules
+from etl.scd_handler import scd_type_1, scd_type_3, scd_type_2_event_time, deduplicate_source, deduplicate_chunks, write_duplicate_audit
+from etl.backends import scd_type_2, choose_backend
+from etl.key_codes import KeyDictionary
+from etl.surrogate_keys import service_for, sequence_name
+from etl.scd_store import SCD2Store
+
+# Same steps as the "Run ETL" tab of app.py, driven by a job dict instead of widgets (see jobs.example.yaml).
+SCD_TYPES = ("SCD1", "SCD2", "SCD3")
+TECH_COLS = {'effective_start','effective_end','is_current','version','batch_id','loaded_at'}
+
+def _kind(block: dict) -> str:
+    kind = str(block.get("type", "csv")).lower()
+    if kind not in ("csv", "sqlite"): raise ValueError(f"Unsupported type '{block.get('type')}' (csv or sqlite).")
+    return "CSV" if kind == "csv" else "SQLite"
+
+def _target_loc(tgt: dict) -> str:
+    return tgt["path"] if _kind(tgt) == "CSV" else tgt["db"]
+
+def read_source(src: dict, tgt: dict):
+    """(df, pending watermark). With a `cdc` block only rows past the watermark stored with the target are read."""
+    kind, cdc = _kind(src), src.get("cdc")
+    if not cdc:
+        df = read_source_csv(src["path"]) if kind == "CSV" else read_source_sqlite(src["db"], src["table"])
+        return df, None
+    mode = cdc.get("mode", "column") if kind == "CSV" else "column"
+    col = cdc.get("column")
+    sid = source_id(kind, src["path"]) if kind == "CSV" else source_id(kind, src["db"], src["table"])
+    wm = get_watermark(_kind(tgt), _target_loc(tgt), sid)
+    since = wm["value"] if wm and wm.get("mode") == mode and wm.get("column") == col else None
+    if kind == "CSV": df, new_wm = read_source_csv_incremental(src["path"], mode, col, since)
+    else: df, new_wm = read_source_sqlite_incremental(src["db"], src["table"], col, since)
+    return df, make_watermark(sid, mode, new_wm, col)
+
+def read_target(tgt: dict) -> Optional[pd.DataFrame]:
+    if _kind(tgt) == "CSV": return read_target_csv(tgt["path"])
+    return read_target_sqlite(tgt["db"], tgt["table"]) if os.path.exists(tgt["db"]) else None
+
+def tracked_columns(job: dict, rules_df: pd.DataFrame, bk: str) -> list:
+    tracked = job.get("tracked_cols", "auto")
+    if tracked in (None, "auto"):
+        mapped = [str(x).strip() for x in rules_df["Target Column"].tolist() if str(x).strip()]
+        return [c for c in mapped if c not in TECH_COLS | {bk}]
+    return [c.strip() for c in tracked.split(",") if c.strip()] if isinstance(tracked, str) else list(tracked)
+
+def run_job(job: dict, dry_run: bool = False) -> dict:
+    """Run one configured load end to end; returns a summary (rows in/out, timings, target)."""
+    t0 = time.perf_counter(); timings = {}
+    def lap(step, t):
+        timings[step] = round(time.perf_counter() - t, 4); return time.perf_counter()
+    name = job.get("name", "job")
+    src, tgt = job["source"], job["target"]
+    scd_type = str(job.get("scd_type", "SCD2")).upper()
+    if scd_type not in SCD_TYPES: raise ValueError(f"{name}: scd_type must be one of {SCD_TYPES}")
+    bk = job.get("business_key")
+    if scd_type != "SCD1" and not bk: raise ValueError(f"{name}: business_key is required for {scd_type}")
+    dry_run = dry_run or bool(job.get("dry_run", False))
+    load_mode = job.get("load_mode", "Incremental")
+    batch_id = job.get("batch_id") or f"{name}_{pd.Timestamp.utcnow().strftime('%Y%m%d_%H%M%S')}"
+    audit_cols = {"batch_id": batch_id, "loaded_at": pd.Timestamp.utcnow()}
+    out_dir = job.get("output_dir", "output")
+
+    t = time.perf_counter()
+    rules_df = read_sttm_excel(job["sttm"])
+    t = lap("read_sttm", t)
+    event_col = job.get("event_time_col") if scd_type == "SCD2" else None
+    chunksize = src.get("chunksize") if _kind(src) == "CSV" and not src.get("cdc") else None
+    dedup = job.get("dedup") or {}
+    summary = {"job": name, "scd_type": scd_type, "load_mode": load_mode,
+               "target": f"{_target_loc(tgt)}" + (f"::{tgt['table']}" if _kind(tgt) == "SQLite" else ""), "dry_run": dry_run}
+    chunks = None
+    if chunksize:  # read and transform chunk by chunk; dedup below keeps only the winner per key
+        watermark, rows = None, [0]
+        def transformed():
+            for c in read_source_csv_chunks(src["path"], int(chunksize)):
+                rows[0] += len(c); yield apply_rules(c, rules_df)
+        chunks = transformed()
+        if scd_type == "SCD1" or event_col:
+            out_df = pd.concat(list(chunks), ignore_index=True); chunks = None
+        t = lap("read_transform", t)
+    else:
+        src_df, watermark = read_source(src, tgt)
+        if watermark: load_mode = "Incremental"  # a CDC delta is never a full image
+        t = lap("read_source", t)
+        out_df = apply_rules(src_df, rules_df)
+        t = lap("transform", t)
+    summary["load_mode"] = load_mode
+
+    if scd_type == "SCD1":
+        existing = None
+        if watermark:  # a CDC delta is upserted into the target; replacing would drop every row not in it
+            if not bk: raise ValueError(f"{name}: business_key is required for SCD1 with cdc")
+            existing = read_target(tgt)
+            t = lap("read_target", t)
+        final_df = scd_type_1(out_df, existing, audit_cols=audit_cols, keys=[bk] if watermark else None)
+    else:
+        audit_path = (os.path.join(out_dir, f"duplicate_audit_{name}_{bk}_{pd.Timestamp.utcnow().strftime('%Y%m%d_%H%M%S')}.csv")
+                      if dedup.get("audit", False) else None)
+        if chunks is not None:
+            out_df = deduplicate_chunks(chunks, bk, dedup.get("strategy", "keep_last"), dedup.get("timestamp_col"),
+                                        audit_path=audit_path, partitions=int(dedup.get("partitions", 0)))
+            if out_df.attrs.get("audit_rows"): summary["duplicate_audit"] = {"path": audit_path, "rows": out_df.attrs["audit_rows"]}
+            summary["deduplicated"] = rows[0] - len(out_df)
+        else:
+            if audit_path and bk in out_df.columns:
+                n = write_duplicate_audit(out_df, bk, audit_path)
+                if n: summary["duplicate_audit"] = {"path": audit_path, "rows": n}
+            before = len(out_df)
+            if not event_col:  # on event time several changes per key are history, not duplicates
+                out_df = deduplicate_source(out_df, bk, dedup.get("strategy", "keep_last"), dedup.get("timestamp_col"))
+            summary["deduplicated"] = before - len(out_df)
+        t = lap("dedup", t)
+        # SCD2 into SQLite: current/history tables (etl.scd_store), so only current rows are read back
+        store = (SCD2Store(tgt["db"], tgt["table"], bk, job.get("eff_start", "effective_start"), job.get("eff_end", "effective_end"),
+                           job.get("current_flag", "is_current")) if scd_type == "SCD2" and _kind(tgt) == "SQLite" else None)
+        event_keys = out_df[bk].dropna().unique() if event_col else None
+        if store: existing = store.read_versions(event_keys) if event_col else store.read_current()
+        else: existing = read_target(tgt)
+        t = lap("read_target", t)
+        tracked = tracked_columns(job, rules_df, bk)
+        if scd_type == "SCD2":
+            key_dict = KeyDictionary(bk, path=os.path.join(out_dir, f"key_dict_{bk}.json"))
+            backend = choose_backend(len(out_df) + (0 if existing is None else len(existing)), job.get("backend", "auto"))
+            summary["backend"] = backend
+            sk_col = job.get("surrogate_key_col") or None
+            sk = {}
+            if sk_col and not dry_run:  # a dry run doesn't reserve keys; it previews max+1 numbering
+                sk = dict(sk_service=service_for(job.get("sk_db") or os.path.join(out_dir, "surrogate_keys.db"), job.get("sk_block_size", 1000)),
+                          sk_sequence=sequence_name(summary["target"], sk_col))
+                if store:  # the current rows alone don't know the highest key ever handed out
+                    sk["sk_service"].reserve(sk["sk_sequence"], 0, seed=lambda: int(store.max_value(sk_col) or 0) + 1)
+            if event_col:  # late/out-of-order changes: only the chains of the keys in the batch are rebuilt
+                final_df = scd_type_2_event_time(out_df, existing, bk, tracked, event_col,
+                                                 eff_start=job.get("eff_start", "effective_start"), eff_end=job.get("eff_end", "effective_end"),
+                                                 current_flag=job.get("current_flag", "is_current"), version_col=job.get("version_col", "version"),
+                                                 surrogate_key_col=sk_col, audit_cols=audit_cols, key_dict=key_dict, **sk)
+            else:
+                final_df = scd_type_2(out_df, existing, business_key=bk, tracked_cols=tracked,
+                                      eff_start=job.get("eff_start", "effective_start"), eff_end=job.get("eff_end", "effective_end"),
+                                      current_flag=job.get("current_flag", "is_current"), version_col=job.get("version_col", "version"),
+                                      surrogate_key_col=sk_col, soft_delete=job.get("soft_delete", True),
+                                      load_mode=load_mode, audit_cols=audit_cols, key_dict=key_dict, backend=backend, **sk)
+            if not dry_run: key_dict.save()
+        else:
+            final_df = scd_type_3(out_df, existing, keys=[bk], tracked_cols=tracked, audit_cols=audit_cols)
+    t = lap("scd", t)
+
+    if not dry_run:
+        if _kind(tgt) == "CSV": write_target_csv(final_df, tgt["path"], watermark=watermark)
+        elif store and event_col: store.replace_keys(final_df, event_keys, watermark=watermark)
+        elif store: store.load(final_df, watermark=watermark)
+        else: write_target_sqlite(final_df, tgt["db"], tgt["table"], watermark=watermark)
+        t = lap("write_target", t)
+    summary.update(source_rows=rows[0] if chunksize else len(src_df), target_rows=len(final_df), watermark=plain_value(watermark["value"]) if watermark else None,
+                   timings=timings, elapsed_s=round(time.perf_counter() - t0, 4))
+    return summary
@@ -1,5 +1,8 @@
+import os, glob, shutil, tempfile
+import numpy as np
 import pandas as pd
-from typing import List, Optional
+from typing import Iterable, List, Optional, Tuple
+from etl.key_codes import KeyDictionary, encode_keys, shared_codes, _key_values
 
 def deduplicate_source(src_out: pd.DataFrame,
                        business_key: str,
@@ -7,25 +10,153 @@ def deduplicate_source(src_out: pd.DataFrame,
                        timestamp_col: str | None = None) -> pd.DataFrame:
     if business_key not in src_out.columns:
         raise KeyError(f"Business key '{business_key}' not present in transformed output.")
-    dup_mask = src_out.duplicated(subset=[business_key], keep=False)
+    codes = pd.Series(encode_keys(src_out, business_key))
+    dup_mask = codes.duplicated(keep=False).to_numpy()
     if not dup_mask.any():
         return src_out
     if strategy == "fail":
-        dups = src_out[dup_mask].copy()
-        raise ValueError(f"Duplicate business keys found for '{business_key}'. Count={len(dups)}. Sample keys: {list(dups[business_key].dropna().unique()[:10])}")
+        sample = pd.Series(src_out[business_key].to_numpy()[dup_mask]).dropna().unique()[:10].tolist()
+        raise ValueError(f"Duplicate business keys found for '{business_key}'. Count={int(dup_mask.sum())}. Sample keys: {sample}")
     if strategy == "keep_first":
-        return src_out.drop_duplicates(subset=[business_key], keep="first").reset_index(drop=True)
+        return src_out[~codes.duplicated(keep="first").to_numpy()].reset_index(drop=True)
     if strategy == "keep_last":
-        return src_out.drop_duplicates(subset=[business_key], keep="last").reset_index(drop=True)
+        return src_out[~codes.duplicated(keep="last").to_numpy()].reset_index(drop=True)
     if strategy == "by_timestamp":
         if not timestamp_col or timestamp_col not in src_out.columns:
             raise ValueError("Timestamp column not found for 'by_timestamp' strategy.")
-        ts = pd.to_datetime(src_out[timestamp_col], errors="coerce")
-        ordered = src_out.assign(__ts=ts).sort_values(["__ts"])
-        deduped = ordered.drop_duplicates(subset=[business_key], keep="last").drop(columns=["__ts"])
-        return deduped.reset_index(drop=True)
+        keep = _latest_per_key(codes.to_numpy(), _ts_ns(src_out[timestamp_col]))
+        return src_out.iloc[keep].reset_index(drop=True)
     raise ValueError(f"Unknown deduplication strategy: {strategy}")
 
+def _ts_ns(s: pd.Series) -> np.ndarray:
+    # NaT maps to int64 min, so rows without a timestamp lose to any dated row
+    ts = pd.to_datetime(s, errors="coerce", utc=True)
+    return ts.to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+def _latest_per_key(codes: np.ndarray, ts: np.ndarray) -> np.ndarray:
+    """Row positions holding the max timestamp per key (ties: later row wins), in input order."""
+    if len(codes) == 0: return np.empty(0, dtype=np.int64)
+    order = np.lexsort((np.arange(len(codes)), ts, codes))
+    sc = codes[order]
+    last = np.r_[sc[1:] != sc[:-1], True]
+    return np.sort(order[last])
+
+def write_duplicate_audit(df: pd.DataFrame, business_key: str, path: str, chunksize: int = 50_000) -> int:
+    """Stream rows whose business key occurs more than once to CSV; returns rows written."""
+    dup_pos = np.flatnonzero(pd.Series(encode_keys(df, business_key)).duplicated(keep=False).to_numpy())
+    if len(dup_pos) == 0: return 0
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        for start in range(0, len(dup_pos), chunksize):
+            df.iloc[dup_pos[start:start+chunksize]].to_csv(f, index=False, header=(start == 0))
+    return int(len(dup_pos))
+
+def _partition_of(chunk: pd.DataFrame, business_key: str, partitions: int) -> np.ndarray:
+    return (pd.util.hash_pandas_object(chunk[business_key], index=False).to_numpy() % np.uint64(partitions)).astype(np.int64)
+
+def _dedup_stream(chunks: Iterable[pd.DataFrame], business_key: str, strategy: str, timestamp_col: str | None) -> pd.DataFrame:
+    """In-memory deduplicate_chunks: each chunk is checked against the keys seen so far (a dict key -> slot,
+    with the winner per slot in arrays), never re-deduplicating what was already kept. Superseded rows are
+    dropped once they outnumber the winners, so memory stays O(distinct keys) and the work O(rows)."""
+    seen: dict = {}
+    win_ord = np.empty(0, dtype=np.int64); win_ts = np.empty(0, dtype=np.int64)  # slot 0: the null key
+    parts, held, offset = [], 0, 0
+    for chunk in chunks:
+        if len(chunk) == 0: continue
+        if business_key not in chunk.columns:
+            raise KeyError(f"Business key '{business_key}' not present in transformed output.")
+        vals, nulls = _key_values(chunk, [business_key])
+        slot = np.fromiter((seen.setdefault(v, len(seen) + 1) for v in vals.tolist()), dtype=np.int64, count=len(vals))
+        slot[nulls] = 0
+        if len(seen) + 1 > len(win_ord):
+            grow = max(len(seen) + 1, 2 * len(win_ord)) - len(win_ord)
+            win_ord = np.r_[win_ord, np.full(grow, -1, dtype=np.int64)]
+            win_ts = np.r_[win_ts, np.full(grow, np.iinfo(np.int64).min, dtype=np.int64)]
+        ords = offset + np.arange(len(chunk), dtype=np.int64); offset += len(chunk)
+        if strategy == "keep_first":
+            cand = np.flatnonzero(~pd.Series(slot).duplicated(keep="first").to_numpy())
+            cand = cand[win_ord[slot[cand]] < 0]
+        elif strategy == "keep_last":
+            cand = np.flatnonzero(~pd.Series(slot).duplicated(keep="last").to_numpy())
+        else:
+            if not timestamp_col or timestamp_col not in chunk.columns:
+                raise ValueError("Timestamp column not found for 'by_timestamp' strategy.")
+            ts = _ts_ns(chunk[timestamp_col])
+            cand = _latest_per_key(slot, ts)
+            cand = cand[ts[cand] >= win_ts[slot[cand]]]  # ties: the later row wins
+            win_ts[slot[cand]] = ts[cand]
+        win_ord[slot[cand]] = ords[cand]
+        parts.append((chunk.iloc[cand], slot[cand], ords[cand])); held += len(cand)
+        if held > 2 * int((win_ord >= 0).sum()):
+            parts = [_live(parts, win_ord)]; held = len(parts[0][0])
+    if not parts: return pd.DataFrame()
+    return _live(parts, win_ord)[0].reset_index(drop=True)
+
+def _live(parts, win_ord):
+    """The held rows that are still their key's winner, in input order."""
+    df = pd.concat([p[0] for p in parts]); slot = np.concatenate([p[1] for p in parts]); ords = np.concatenate([p[2] for p in parts])
+    keep = win_ord[slot] == ords
+    return df[keep], slot[keep], ords[keep]
+
+_ORD = "__dedup_ord"
+
+def deduplicate_chunks(chunks: Iterable[pd.DataFrame],
+                       business_key: str,
+                       strategy: str = "fail",
+                       timestamp_col: str | None = None,
+                       audit_path: str | None = None,
+                       spill_dir: str | None = None,
+                       partitions: int = 0) -> pd.DataFrame:
+    """Deduplicate a stream of source chunks without holding the whole input.
+
+    In memory only the current winner per key is kept (a hash aggregate over the
+    chunks). With partitions > 0 (or an audit_path) rows are first spilled to disk
+    hash-partitioned on the key, so every key lands in exactly one partition and
+    each partition is deduplicated on its own. Either way the rows come back in
+    input order, as deduplicate_source returns them.
+    """
+    if strategy not in ("fail", "keep_first", "keep_last", "by_timestamp"):
+        raise ValueError(f"Unknown deduplication strategy: {strategy}")
+    if audit_path and partitions <= 0: partitions = 1
+    if partitions <= 0:
+        if strategy == "fail":  # nothing may be dropped, so the result is the whole input anyway
+            chunks = [c for c in chunks if len(c)]
+            return deduplicate_source(pd.concat(chunks, ignore_index=True), business_key, strategy) if chunks else pd.DataFrame()
+        return _dedup_stream(chunks, business_key, strategy, timestamp_col)
+
+    own_dir = spill_dir is None
+    spill_dir = tempfile.mkdtemp(prefix="dedup_") if own_dir else spill_dir
+    os.makedirs(spill_dir, exist_ok=True)
+    try:
+        offset = 0
+        for n, chunk in enumerate(chunks):
+            if len(chunk) == 0: continue
+            if business_key not in chunk.columns:
+                raise KeyError(f"Business key '{business_key}' not present in transformed output.")
+            part = _partition_of(chunk, business_key, partitions)
+            chunk = chunk.assign(**{_ORD: np.arange(offset, offset + len(chunk), dtype=np.int64)}); offset += len(chunk)
+            for p in np.unique(part):
+                chunk[part == p].to_pickle(os.path.join(spill_dir, f"part{p:04d}_{n:08d}.pkl"))
+        out, audited = [], 0
+        if audit_path and os.path.exists(audit_path): os.remove(audit_path)
+        for p in range(partitions):
+            files = sorted(glob.glob(os.path.join(spill_dir, f"part{p:04d}_*.pkl")))
+            if not files: continue
+            df = pd.concat([pd.read_pickle(f) for f in files], ignore_index=True)
+            if audit_path:
+                dmask = pd.Series(encode_keys(df, business_key)).duplicated(keep=False).to_numpy()
+                if dmask.any():
+                    os.makedirs(os.path.dirname(audit_path) or ".", exist_ok=True)
+                    df[dmask].drop(columns=_ORD).to_csv(audit_path, mode="a", index=False, header=(audited == 0))
+                    audited += int(dmask.sum())
+            out.append(deduplicate_source(df, business_key, strategy, timestamp_col))
+        res = pd.concat(out, ignore_index=True) if out else pd.DataFrame(columns=[_ORD])
+        res = res.iloc[np.argsort(res[_ORD].to_numpy(), kind="stable")].drop(columns=_ORD).reset_index(drop=True)  # back to input order
+        res.attrs["audit_rows"] = audited
+        return res
+    finally:
+        if own_dir: shutil.rmtree(spill_dir, ignore_errors=True)
+
 def _ensure_cols(df: pd.DataFrame, cols: List[str], default=None):
     for c in cols:
         if c not in df.columns:
@@ -34,18 +165,152 @@ def _ensure_cols(df: pd.DataFrame, cols: List[str], default=None):
 
 def scd_type_1(src_out: pd.DataFrame,
                tgt_existing: Optional[pd.DataFrame],
-               audit_cols: Optional[dict] = None) -> pd.DataFrame:
+               audit_cols: Optional[dict] = None,
+               keys: Optional[List[str]] = None) -> pd.DataFrame:
+    """Overwrite. Without keys the batch replaces the target (a full image); with keys it is upserted:
+    target rows whose key is in the batch are replaced, the rest are kept (a CDC delta)."""
     df = src_out.copy()
     if audit_cols:
         for k,v in (audit_cols or {}).items():
             df[k] = v
-    return df
+    if not keys or tgt_existing is None or tgt_existing.empty:
+        return df
+    tgt_codes, src_codes = shared_codes(tgt_existing, df, keys)
+    keep = ~np.isin(tgt_codes, src_codes[src_codes >= 0])
+    return pd.concat([tgt_existing[keep], df], ignore_index=True)
 
 def _infer_tracked_if_empty(tracked_cols: List[str], out_cols: List[str], business_key: str) -> List[str]:
     if tracked_cols: return tracked_cols
     tech = {business_key, 'effective_start','effective_end','is_current','version','batch_id','loaded_at'}
     return [c for c in out_cols if c not in tech]
 
+UNCHANGED, INSERT, NEW_VERSION = 0, 1, 2
+
+def _surrogates(result: pd.DataFrame, surrogate_key_col: str, n: int, sk_service=None, sk_sequence: Optional[str]=None) -> np.ndarray:
+    """n new keys: a block from the SurrogateKeyService when given (seeded once from the target's max),
+    else max(existing)+1 onwards."""
+    if sk_service is not None:
+        return sk_service.next_keys(sk_sequence or surrogate_key_col, n, seed=lambda: _next_surrogate(result, surrogate_key_col))
+    start = _next_surrogate(result, surrogate_key_col)
+    return np.arange(start, start + n, dtype=np.int64)
+
+def _scd2_initial(src: pd.DataFrame, now, eff_start: str, eff_end: str, current_flag: str, version_col: str,
+                  surrogate_key_col: Optional[str], audit_cols: Optional[dict], sk_service=None, sk_sequence: Optional[str]=None) -> pd.DataFrame:
+    base = src.copy()
+    base[eff_start] = now
+    base[eff_end] = pd.NaT
+    base[current_flag] = True
+    base[version_col] = 1
+    if surrogate_key_col:
+        base[surrogate_key_col] = _surrogates(base.iloc[0:0], surrogate_key_col, len(base), sk_service, sk_sequence)
+    if audit_cols:
+        for k,v in (audit_cols or {}).items(): base[k] = v
+    return base
+
+def _scd2_prepare_target(tgt_existing: pd.DataFrame, now, eff_start: str, eff_end: str, current_flag: str,
+                         version_col: str, surrogate_key_col: Optional[str]) -> pd.DataFrame:
+    tgt = tgt_existing.copy()
+    _ensure_cols(tgt, [eff_start, eff_end, current_flag, version_col], default=pd.NaT)
+    tgt[current_flag] = tgt[current_flag].fillna(False).astype(bool)
+    for c in (eff_start, eff_end):  # text (or all-NaN floats) when read back from CSV/SQLite
+        if not pd.api.types.is_datetime64_any_dtype(tgt[c]):
+            tgt[c] = pd.to_datetime(tgt[c], errors="coerce", utc=now.tzinfo is not None, format="mixed").dt.as_unit("ns")
+        elif (tgt[c].dt.tz is None) != (now.tzinfo is None):  # e.g. an all-NaT eff_end from the initial load
+            tgt[c] = tgt[c].dt.tz_localize("UTC") if tgt[c].dt.tz is None else tgt[c].dt.tz_convert(None)
+    if surrogate_key_col and surrogate_key_col not in tgt.columns:
+        tgt[surrogate_key_col] = pd.NA
+    return tgt
+
+def _next_surrogate(result: pd.DataFrame, surrogate_key_col: Optional[str]) -> int:
+    if surrogate_key_col and surrogate_key_col in result.columns:
+        try:
+            return int(pd.to_numeric(result[surrogate_key_col], errors='coerce').max()) + 1
+        except Exception:
+            return 1
+    return 1
+
+def _missing(a: np.ndarray) -> np.ndarray:
+    """Null, NaN or '': a blank written to CSV reads back as NaN, so '' and NaN must compare equal."""
+    na = pd.isna(a)
+    if a.dtype == object: na[~na] = a[~na] == ""  # pd.NA == '' is NA, so only non-nulls are compared
+    return na
+
+def _same(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Elementwise a == b on object arrays: null -> null is no change, value <-> null is. Only non-null
+    pairs reach ==, so pd.NA never has to be coerced to bool."""
+    na_a, na_b = _missing(a), _missing(b)
+    same = na_a & na_b; both = ~(na_a | na_b)
+    same[both] = (a[both] == b[both]).astype(bool)
+    return same
+
+def _as_text(x: pd.Series) -> np.ndarray:
+    """Values as text, integral floats without the '.0' (what an int column reads back as after a NaN),
+    and missing values as None."""
+    a = x.to_numpy(dtype=object)
+    out = np.array([str(int(v)) if isinstance(v, float) and v.is_integer() else str(v) for v in a], dtype=object)
+    out[_missing(a)] = None
+    return out
+
+def _comparable(a: pd.Series, b: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """A tracked column of the target (a) and the source (b) in the form every backend compares: numerics
+    or bools on both sides as they are, anything else (str vs int, object columns) as text on both sides,
+    so source '0' against target 0 is no change whichever engine runs the match."""
+    num = lambda x: pd.api.types.is_numeric_dtype(x.dtype) and not pd.api.types.is_bool_dtype(x.dtype)
+    if (num(a) and num(b)) or (pd.api.types.is_bool_dtype(a.dtype) and pd.api.types.is_bool_dtype(b.dtype)):
+        return a.to_numpy(), b.to_numpy()
+    return _as_text(a), _as_text(b)
+
+def _scd2_match(tgt: pd.DataFrame, src: pd.DataFrame, tgt_codes: np.ndarray, src_codes: np.ndarray,
+                current_flag: str, cols: List[str]):
+    """Per source row: action (UNCHANGED/INSERT/NEW_VERSION) and the position of the current target row
+    for its key (-1 if none); plus positions of current target rows whose key isn't in the batch."""
+    cur = tgt[current_flag].to_numpy(dtype=bool) & (tgt_codes >= 0)
+    cur_pos = np.flatnonzero(cur)
+    last = ~pd.Index(tgt_codes[cur_pos]).duplicated(keep="last")  # several current rows: the last one wins
+    tpos = np.full(len(src), -1, dtype=np.int64)
+    hit_at = pd.Index(tgt_codes[cur_pos][last]).get_indexer(src_codes)
+    tpos[hit_at >= 0] = cur_pos[last][hit_at[hit_at >= 0]]
+    hit = tpos >= 0
+    changed = np.zeros(int(hit.sum()), dtype=bool)
+    for c in cols:
+        a, b = _comparable(tgt[c], src[c])
+        a, b = a.astype(object)[tpos[hit]], b.astype(object)[hit]
+        changed |= ~_same(a, b)
+    action = np.where(hit, UNCHANGED, INSERT).astype(np.int8)
+    action[np.flatnonzero(hit)[changed]] = NEW_VERSION
+    gone = np.flatnonzero(cur & ~np.isin(tgt_codes, src_codes))
+    return action, tpos, gone
+
+def _scd2_apply(tgt: pd.DataFrame, src: pd.DataFrame, action: np.ndarray, tpos: np.ndarray, gone: np.ndarray, now,
+                eff_start: str, eff_end: str, current_flag: str, version_col: str, surrogate_key_col: Optional[str],
+                soft_delete: bool, load_mode: str, audit_cols: Optional[dict], sk_service=None, sk_sequence: Optional[str]=None) -> pd.DataFrame:
+    """Expire changed (and, for snapshots, vanished) current rows and append new versions/inserts in
+    source order, with surrogate keys assigned for the whole batch at once. Shared by every backend."""
+    result = tgt
+    changed = action == NEW_VERSION
+    expire = tpos[changed]
+    if load_mode == 'Snapshot' and soft_delete: expire = np.union1d(expire, gone)
+    if len(expire):
+        result.loc[expire, current_flag] = False
+        result.loc[expire, eff_end] = now
+
+    new = src[action != UNCHANGED].copy()
+    if len(new):
+        prev = pd.to_numeric(tgt[version_col], errors="coerce").to_numpy()
+        matched = tpos[action != UNCHANGED]
+        base_ver = np.where(matched >= 0, prev[np.maximum(matched, 0)], np.nan)
+        new[eff_start] = now; new[current_flag] = True
+        # open-ended in the target's dtype: a naive NaT next to tz-aware ends would make the column object
+        new[eff_end] = pd.Series(pd.NaT, index=new.index, dtype=result[eff_end].dtype if pd.api.types.is_datetime64_any_dtype(result[eff_end]) else "datetime64[ns]")
+        new[version_col] = np.where(action[action != UNCHANGED] == NEW_VERSION,
+                                    np.nan_to_num(base_ver, nan=1).astype(np.int64) + 1, 1)
+        if surrogate_key_col:
+            new[surrogate_key_col] = _surrogates(result, surrogate_key_col, len(new), sk_service, sk_sequence)
+        if audit_cols:
+            for k,v in (audit_cols or {}).items(): new[k] = v
+        result = pd.concat([result, new], ignore_index=True)
+    return result
+
 def scd_type_2(src_out: pd.DataFrame,
                tgt_existing: Optional[pd.DataFrame],
                business_key: str,
@@ -58,78 +323,143 @@ def scd_type_2(src_out: pd.DataFrame,
                as_of: Optional[pd.Timestamp]=None,
                soft_delete: bool=True,
                load_mode: str='Snapshot',  # 'Snapshot' or 'Incremental'
-               audit_cols: Optional[dict]=None) -> pd.DataFrame:
+               audit_cols: Optional[dict]=None,
+               key_dict: Optional[KeyDictionary]=None,
+               sk_service=None,
+               sk_sequence: Optional[str]=None) -> pd.DataFrame:
+    """sk_service (etl.surrogate_keys.SurrogateKeyService) hands out surrogate keys from the sequence
+    sk_sequence (default: the column name) instead of scanning the target for its max."""
     now = as_of or pd.Timestamp.utcnow()
-    src = src_out.copy()
+    src = src_out.reset_index(drop=True)
     tracked_cols = _infer_tracked_if_empty(tracked_cols or [], list(src.columns), business_key)
 
     if tgt_existing is None or tgt_existing.empty:
-        base = src.copy()
-        base[eff_start] = now
-        base[eff_end] = pd.NaT
-        base[current_flag] = True
-        base[version_col] = 1
-        if surrogate_key_col:
-            base[surrogate_key_col] = range(1, len(base)+1)
-        if audit_cols:
-            for k,v in (audit_cols or {}).items(): base[k] = v
-        return base
+        return _scd2_initial(src, now, eff_start, eff_end, current_flag, version_col, surrogate_key_col, audit_cols, sk_service, sk_sequence)
 
-    tgt = tgt_existing.copy()
-    _ensure_cols(tgt, [eff_start, eff_end, current_flag, version_col], default=pd.NaT)
-    tgt[current_flag] = tgt[current_flag].fillna(False).astype(bool)
-    if surrogate_key_col and surrogate_key_col not in tgt.columns:
-        tgt[surrogate_key_col] = pd.NA
+    tgt = _scd2_prepare_target(tgt_existing, now, eff_start, eff_end, current_flag, version_col, surrogate_key_col).reset_index(drop=True)
+    # Business keys are matched on int64 codes from one shared dictionary
+    kd = key_dict or KeyDictionary(business_key)
+    tgt_codes = kd.encode(tgt)
+    src_codes = kd.encode(src)
+    cols = [c for c in tracked_cols if c in src.columns and c in tgt.columns]
+    action, tpos, gone = _scd2_match(tgt, src, tgt_codes, src_codes, current_flag, cols)
+    return _scd2_apply(tgt, src, action, tpos, gone, now, eff_start, eff_end, current_flag, version_col, surrogate_key_col,
+                       soft_delete, load_mode, audit_cols, sk_service, sk_sequence)
 
-    result = tgt.copy()
-    current_df = result[result[current_flag] == True].copy()
-    current_map = { r[business_key]: (i, r) for i, r in current_df.iterrows() }
+EXISTING, TOMBSTONE, EVENT = 0, 1, 2  # point kinds in an event-time chain rebuild
+_CLOSED = object()  # tracked "value" of a tombstone: differs from every real value, equal to itself
 
-    next_sk = 1
-    if surrogate_key_col and surrogate_key_col in result.columns:
-        try:
-            next_sk = int(pd.to_numeric(result[surrogate_key_col], errors='coerce').max()) + 1
-        except Exception:
-            next_sk = 1
-
-    src_keys = set(src[business_key].tolist())
-
-    for _, newr in src.iterrows():
-        bk = newr[business_key]
-        if bk not in current_map:
-            ins = newr.copy()
-            ins[eff_start] = now; ins[eff_end] = pd.NaT; ins[current_flag] = True; ins[version_col] = 1
-            if surrogate_key_col: ins[surrogate_key_col] = next_sk; next_sk += 1
-            if audit_cols:
-                for k,v in (audit_cols or {}).items(): ins[k] = v
-            result = pd.concat([result, pd.DataFrame([ins])], ignore_index=True)
-        else:
-            idx, cur = current_map[bk]
-            changed = False
-            for c in tracked_cols:
-                if c in newr.index and c in cur.index:
-                    if pd.isna(cur[c]) and pd.isna(newr[c]): continue
-                    if (cur[c] != newr[c]): changed = True; break
-            if changed:
-                result.loc[idx, current_flag] = False
-                result.loc[idx, eff_end] = now
-                new_ins = newr.copy()
-                prev_ver = int(result.loc[idx, version_col]) if pd.notna(result.loc[idx, version_col]) else 1
-                new_ins[version_col] = prev_ver + 1
-                new_ins[eff_start] = now; new_ins[eff_end] = pd.NaT; new_ins[current_flag] = True
-                if surrogate_key_col: new_ins[surrogate_key_col] = next_sk; next_sk += 1
-                if audit_cols:
-                    for k,v in (audit_cols or {}).items(): new_ins[k] = v
-                result = pd.concat([result, pd.DataFrame([new_ins])], ignore_index=True)
-
-    if load_mode == 'Snapshot' and soft_delete:
-        cur_rows = result[result[current_flag] == True]
-        to_expire_idx = cur_rows[~cur_rows[business_key].isin(src_keys)].index
-        if len(to_expire_idx) > 0:
-            result.loc[to_expire_idx, current_flag] = False
-            result.loc[to_expire_idx, eff_end] = now
+def _utc_ns(values) -> np.ndarray:
+    return pd.to_datetime(pd.Series(values), errors="coerce", utc=True, format="mixed").dt.tz_convert(None).dt.as_unit("ns").to_numpy()
 
-    return result
+def _same_as_prev(vals: pd.DataFrame, first: np.ndarray) -> np.ndarray:
+    """Row i has the same tracked values as row i-1 (null == null), and isn't the first of its key."""
+    same = ~first
+    for c in vals.columns:
+        a = vals[c].to_numpy(dtype=object); b = np.roll(a, 1)
+        same &= _same(a, b)
+    return same
+
+def scd_type_2_event_time(src_out: pd.DataFrame,
+                          tgt_existing: Optional[pd.DataFrame],
+                          business_key: str,
+                          tracked_cols: List[str] | None,
+                          event_time_col: str,
+                          eff_start: str='effective_start',
+                          eff_end: str='effective_end',
+                          current_flag: str='is_current',
+                          version_col: str='version',
+                          surrogate_key_col: Optional[str]=None,
+                          audit_cols: Optional[dict]=None,
+                          key_dict: Optional[KeyDictionary]=None,
+                          sk_service=None,
+                          sk_sequence: Optional[str]=None) -> pd.DataFrame:
+    """SCD2 on event time: each source row is a change that took effect at its event_time_col, and may
+    arrive late or out of order (several rows per key are fine, e.g. a replayed backlog). The version
+    chains of the keys in the batch are rebuilt: versions are placed by time, neighbouring intervals
+    are split or re-closed, and events that change nothing are skipped. Rows of other keys are returned untouched, so tgt_existing may be just the affected
+    keys' versions (SCD2Store.read_versions). A closed chain (soft-deleted key) stays closed at its
+    end unless a later event reopens it. Source rows are never expired by absence (Incremental)."""
+    src = src_out.reset_index(drop=True)
+    if event_time_col not in src.columns: raise KeyError(f"Event time column '{event_time_col}' not present in transformed output.")
+    at = _utc_ns(src[event_time_col])
+    if pd.isna(at).any():
+        raise ValueError(f"{int(pd.isna(at).sum())} source rows have no usable '{event_time_col}'.")
+    if not len(src): return tgt_existing
+    tracked = [c for c in _infer_tracked_if_empty(tracked_cols or [], list(src.columns), business_key) if c != event_time_col]
+    tgt = src.iloc[0:0] if tgt_existing is None else tgt_existing
+    tgt = _scd2_prepare_target(tgt, pd.Timestamp.now("UTC"), eff_start, eff_end, current_flag,
+                               version_col, surrogate_key_col).reset_index(drop=True)
+    kd = key_dict or KeyDictionary(business_key)
+    tgt_codes = kd.encode(tgt); src_codes = kd.encode(src)
+    hit = np.isin(tgt_codes, src_codes) & (tgt_codes >= 0)
+    keep, chains, codes = tgt[~hit], tgt[hit].reset_index(drop=True), tgt_codes[hit]
+
+    # one point per existing version, per closed chain end (tombstone) and per event, sorted by key and time;
+    # at the same instant an event replaces the existing version
+    cstart, cend = _utc_ns(chains[eff_start]), _utc_ns(chains[eff_end])
+    by_key = np.lexsort((cstart, codes))
+    last = np.zeros(len(chains), dtype=bool)  # latest version of each affected key
+    if len(chains): last[by_key[np.r_[codes[by_key][1:] != codes[by_key][:-1], True]]] = True
+    closed = np.flatnonzero(last & ~chains[current_flag].to_numpy(dtype=bool) & ~pd.isna(cend))
+    pts = pd.DataFrame({"code": np.concatenate([codes, codes[closed], src_codes]),
+                        "t": np.concatenate([cstart, cend[closed], at]),
+                        "kind": np.concatenate([np.full(len(chains), EXISTING), np.full(len(closed), TOMBSTONE), np.full(len(src), EVENT)]),
+                        "row": np.concatenate([np.arange(len(chains)), closed, np.arange(len(src))])})
+    pts = pts.sort_values(["code", "t", "kind", "row"], kind="stable").reset_index(drop=True)
+    vals = pd.DataFrame(index=pts.index)
+    kind, row = pts["kind"].to_numpy(), pts["row"].to_numpy()
+    for c in tracked:
+        v = np.empty(len(pts), dtype=object)
+        v[kind == EXISTING] = chains[c].to_numpy(dtype=object)[row[kind == EXISTING]] if c in chains.columns else None
+        v[kind == EVENT] = src[c].to_numpy(dtype=object)[row[kind == EVENT]] if c in src.columns else None
+        v[kind == TOMBSTONE] = _CLOSED
+        vals[c] = v
+    if not tracked: vals["_closed"] = np.where(kind == TOMBSTONE, _CLOSED, None)
+    # at one instant: a replayed event identical to the version already there is dropped, otherwise the
+    # latest arrival wins (a correction)
+    code, t = pts["code"].to_numpy(), pts["t"].to_numpy()
+    first = np.r_[True, code[1:] != code[:-1]]
+    same_t = ~first & np.r_[False, t[1:] == t[:-1]]
+    pts = pts[~(_same_as_prev(vals, first) & same_t)]
+    pts = pts[~pts.duplicated(["code", "t"], keep="last").to_numpy()]
+    # an event that changes nothing is no new version; stored versions stay even when a late event now
+    # precedes one with equal values (merging them would lose the change if another late event lands in
+    # between later); a chain can't start closed
+    code, kind = pts["code"].to_numpy(), pts["kind"].to_numpy()
+    first = np.r_[True, code[1:] != code[:-1]]
+    drop = (_same_as_prev(vals.loc[pts.index], first) & (kind == EVENT)) | (first & (kind == TOMBSTONE))
+    pts = pts[~drop].reset_index(drop=True)
+
+    # intervals: each point runs until the next point of its key; tombstones only close their predecessor
+    code = pts["code"].to_numpy()
+    nxt = np.r_[code[1:] == code[:-1], False]
+    t = pts["t"].to_numpy()
+    end = np.where(nxt, np.append(t[1:], np.datetime64("NaT", "ns")), np.datetime64("NaT", "ns"))
+    pts = pts.assign(end=end, current=~nxt)[(pts["kind"] != TOMBSTONE).to_numpy()].reset_index(drop=True)
+    ex, ev = (pts["kind"] == EXISTING).to_numpy(), (pts["kind"] == EVENT).to_numpy()
+
+    old = chains.iloc[pts["row"].to_numpy()[ex]]
+    new = src.iloc[pts["row"].to_numpy()[ev]].copy()
+    if audit_cols:
+        for k, v in audit_cols.items(): new[k] = v
+    if surrogate_key_col:
+        new[surrogate_key_col] = _surrogates(tgt, surrogate_key_col, len(new), sk_service, sk_sequence)
+    order = np.concatenate([np.flatnonzero(ex), np.flatnonzero(ev)])
+    rebuilt = pd.concat([old, new], ignore_index=True).iloc[np.argsort(order, kind="stable")].reset_index(drop=True)
+    rebuilt[eff_start] = pd.to_datetime(pts["t"].to_numpy()).tz_localize("UTC")
+    rebuilt[eff_end] = pd.to_datetime(pts["end"].to_numpy()).tz_localize("UTC")
+    rebuilt[current_flag] = pts["current"].to_numpy(dtype=bool)
+    rebuilt[version_col] = pd.Series(pts["code"].to_numpy()).groupby(pts["code"].to_numpy()).cumcount().to_numpy() + 1
+    if not len(keep): return rebuilt
+    return pd.concat([keep, rebuilt], ignore_index=True)
+
+def _set(df: pd.DataFrame, rows, col: str, vals: np.ndarray):
+    try:
+        df.loc[rows, col] = vals
+    except TypeError:  # e.g. text into a float column
+        df[col] = df[col].astype(object)
+        df.loc[rows, col] = vals
 
 def scd_type_3(src_out: pd.DataFrame,
                tgt_existing: Optional[pd.DataFrame],
@@ -147,27 +477,31 @@ def scd_type_3(src_out: pd.DataFrame,
             for k,v in (audit_cols or {}).items(): df[k]=v
         return df
     tgt = tgt_existing.copy()
-    if isinstance(keys, list):
-        idx_map = {tuple(tgt.loc[i, keys]): i for i in tgt.index}
-    else:
-        idx_map = {tgt.loc[i, keys]: i for i in tgt.index}
-    for _, r in src_out.iterrows():
-        k = tuple(r[keys]) if isinstance(keys, list) else r[keys]
-        if k in idx_map:
-            i = idx_map[k]
-            for c in tracked_cols:
-                prev = f"{prev_prefix}{c}"
-                cur_val = tgt.at[i, c] if c in tgt.columns else pd.NA
-                new_val = r.get(c, pd.NA)
-                if (pd.isna(cur_val) and pd.isna(new_val)) or (cur_val == new_val): continue
-                if prev not in tgt.columns: tgt[prev] = pd.NA
-                tgt.at[i, prev] = cur_val; tgt.at[i, c] = new_val
-        else:
-            newr = r.copy()
-            for c in tracked_cols:
-                prev = f"{prev_prefix}{c}"
-                if prev not in newr.index: newr[prev] = pd.NA
-            tgt = pd.concat([tgt, pd.DataFrame([newr])], ignore_index=True)
+    src = src_out.reset_index(drop=True)
+    kd = KeyDictionary(keys)
+    tgt_codes = kd.encode(tgt); src_codes = kd.encode(src)
+    # position of the (last) target row per key for each source row, -1 for new keys
+    last = np.flatnonzero(~pd.Index(tgt_codes).duplicated(keep="last") & (tgt_codes >= 0))
+    at = pd.Index(tgt_codes[last]).get_indexer(src_codes)
+    tpos = np.where(at >= 0, last[np.maximum(at, 0)], -1)
+    upd = np.flatnonzero((tpos >= 0) & ~pd.Series(tpos).duplicated(keep="last").to_numpy())  # a key repeated in the batch: its last row wins
+    for c in tracked_cols:
+        prev = f"{prev_prefix}{c}"
+        missing = np.full(len(upd), pd.NA, dtype=object)
+        cur_val = tgt[c].to_numpy(dtype=object)[tpos[upd]] if c in tgt.columns else missing
+        new_val = src[c].to_numpy(dtype=object)[upd] if c in src.columns else missing
+        ch = ~_same(cur_val, new_val)
+        if not ch.any(): continue
+        rows = tgt.index[tpos[upd][ch]]
+        if prev not in tgt.columns: tgt[prev] = pd.NA
+        if c not in tgt.columns: tgt[c] = pd.NA
+        _set(tgt, rows, prev, cur_val[ch]); _set(tgt, rows, c, new_val[ch])
+    new = src[tpos < 0].copy()
+    if len(new):
+        for c in tracked_cols:
+            prev = f"{prev_prefix}{c}"
+            if prev not in new.columns: new[prev] = pd.NA
+        tgt = pd.concat([tgt, new], ignore_index=True)
     if audit_cols:
         for k,v in (audit_cols or {}).items():
             tgt[k] = v
@@ -0,0 +1,193 @@
+import os, json, sqlite3
+import pandas as pd
+from typing import Iterable, List, Optional
+from etl.cdc import upsert_watermark
+from etl.io_local import sqlite_ready
+
+# SQLite layout for SCD2 targets. <table>_current holds the current version of every business key,
+# <table>_history the expired versions, and the view <table> is their union, so readers of the old
+# single table keep working. A load reads only _current (its cost doesn't grow with history depth),
+# appends the versions it expired to _history and swaps in the new _current, in one transaction.
+# History is indexed on (key, eff_start) and (eff_start, eff_end) for point-in-time lookups.
+
+def _q(name: str) -> str: return '"' + name.replace('"', '""') + '"'
+
+def _ts_param(ts) -> str:
+    """A timestamp in the text form to_sql stores ('YYYY-MM-DD HH:MM:SS[.ffffff][+00:00]'), so SQLite
+    compares it against eff_start/eff_end as text in index order."""
+    ts = pd.Timestamp(ts)
+    return str(ts.tz_convert("UTC") if ts.tzinfo is not None else ts)
+
+class SCD2Store:
+    def __init__(self, db_path: str, table: str, business_key: str, eff_start: str = "effective_start",
+                 eff_end: str = "effective_end", current_flag: str = "is_current"):
+        self.db_path, self.table, self.bk = db_path, table, business_key
+        self.eff_start, self.eff_end, self.current_flag = eff_start, eff_end, current_flag
+        self.current, self.history = f"{table}_current", f"{table}_history"
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    @staticmethod
+    def _kind(con, name: str) -> Optional[str]:
+        row = con.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _columns(con, name: str) -> List[str]:
+        return [r[1] for r in con.execute(f"PRAGMA table_info({_q(name)})")]
+
+    def exists(self) -> bool:
+        if not os.path.exists(self.db_path): return False
+        con = self._connect()
+        try: return self._kind(con, self.table) is not None
+        finally: con.close()
+
+    # ---- layout ----
+    def _index(self, con):
+        t, k, s, e = self.table, _q(self.bk), _q(self.eff_start), _q(self.eff_end)
+        con.execute(f"CREATE INDEX IF NOT EXISTS {_q(f'ix_{t}_current_bk')} ON {_q(self.current)} ({k})")
+        con.execute(f"CREATE INDEX IF NOT EXISTS {_q(f'ix_{t}_history_bk')} ON {_q(self.history)} ({k}, {s})")
+        con.execute(f"CREATE INDEX IF NOT EXISTS {_q(f'ix_{t}_history_eff')} ON {_q(self.history)} ({s}, {e})")
+
+    def _select(self, con, name: str, cols: List[str]) -> str:
+        have = set(self._columns(con, name))
+        return ", ".join(_q(c) if c in have else f"NULL AS {_q(c)}" for c in cols)
+
+    def _view(self, con):
+        cur, hist = self._columns(con, self.current), self._columns(con, self.history)
+        cols = cur + [c for c in hist if c not in cur]
+        con.execute(f"DROP VIEW IF EXISTS {_q(self.table)}")
+        con.execute(f"CREATE VIEW {_q(self.table)} AS SELECT {self._select(con, self.history, cols)} FROM {_q(self.history)} "
+                    f"UNION ALL SELECT {self._select(con, self.current, cols)} FROM {_q(self.current)}")
+
+    def _migrate(self, con):
+        """A target written as one plain table (write_target_sqlite) is split in place."""
+        if self._kind(con, self.table) != "table": return
+        t, f = _q(self.table), _q(self.current_flag)
+        con.execute(f"CREATE TABLE {_q(self.current)} AS SELECT * FROM {t} WHERE {f} = 1")
+        con.execute(f"CREATE TABLE {_q(self.history)} AS SELECT * FROM {t} WHERE {f} IS NOT 1")
+        con.execute(f"DROP TABLE {t}")
+        self._index(con); self._view(con)
+
+    # ---- writes ----
+    def load(self, df: pd.DataFrame, watermark: Optional[dict] = None, replace: bool = False):
+        """Store an scd_type_2 result computed from read_current(): its expired rows are appended to
+        history and its current rows become the new current table. replace=True takes df as the full
+        history instead (rebuild)."""
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        df = sqlite_ready(df)
+        flag = df[self.current_flag].fillna(False).astype(bool) if self.current_flag in df.columns else pd.Series(True, index=df.index)
+        cur_stage, hist_stage = f"{self.table}__stage_cur", f"{self.table}__stage_hist"
+        con = self._connect()
+        try:
+            # to_sql commits on its own, so stage both parts and swap them in together with the watermark
+            df[flag.to_numpy()].to_sql(cur_stage, con, if_exists="replace", index=False)
+            df[~flag.to_numpy()].to_sql(hist_stage, con, if_exists="replace", index=False)
+            con.isolation_level = None
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                self._migrate(con)
+                con.execute(f"DROP VIEW IF EXISTS {_q(self.table)}")
+                if replace or self._kind(con, self.history) is None:
+                    con.execute(f"DROP TABLE IF EXISTS {_q(self.history)}")
+                    con.execute(f"ALTER TABLE {_q(hist_stage)} RENAME TO {_q(self.history)}")
+                else:
+                    have = self._columns(con, self.history)
+                    for c in self._columns(con, hist_stage):  # new target columns: history grows them, old rows NULL
+                        if c not in have: con.execute(f"ALTER TABLE {_q(self.history)} ADD COLUMN {_q(c)}")
+                    cols = ", ".join(_q(c) for c in self._columns(con, hist_stage))
+                    con.execute(f"INSERT INTO {_q(self.history)} ({cols}) SELECT {cols} FROM {_q(hist_stage)}")
+                    con.execute(f"DROP TABLE {_q(hist_stage)}")
+                con.execute(f"DROP TABLE IF EXISTS {_q(self.current)}")
+                con.execute(f"ALTER TABLE {_q(cur_stage)} RENAME TO {_q(self.current)}")
+                self._index(con); self._view(con)
+                if watermark: upsert_watermark(con, watermark)
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK"); raise
+        finally: con.close()
+
+    def replace_keys(self, df: pd.DataFrame, keys: Iterable, watermark: Optional[dict] = None):
+        """Swap the whole version chains of `keys` (current and history) for the rows in df, e.g. an
+        scd_type_2_event_time result computed from read_versions(keys). Other keys aren't touched."""
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        df = sqlite_ready(df)
+        where, params = self._keys(keys)
+        stage = f"{self.table}__stage_keys"
+        con = self._connect()
+        try:
+            df.to_sql(stage, con, if_exists="replace", index=False)
+            con.isolation_level = None
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                self._migrate(con)
+                if self._kind(con, self.current) is None:  # first load: create both tables from the stage's shape
+                    con.execute(f"CREATE TABLE {_q(self.current)} AS SELECT * FROM {_q(stage)} WHERE 0")
+                    con.execute(f"CREATE TABLE {_q(self.history)} AS SELECT * FROM {_q(stage)} WHERE 0")
+                con.execute(f"DROP VIEW IF EXISTS {_q(self.table)}")
+                f = _q(self.current_flag)
+                for name, cond in ((self.current, f"{f} = 1"), (self.history, f"{f} IS NOT 1")):
+                    con.execute(f"DELETE FROM {_q(name)} WHERE 1=1{where}", params)
+                    have = self._columns(con, name)
+                    for c in self._columns(con, stage):
+                        if c not in have: con.execute(f"ALTER TABLE {_q(name)} ADD COLUMN {_q(c)}")
+                    cols = ", ".join(_q(c) for c in self._columns(con, stage))
+                    con.execute(f"INSERT INTO {_q(name)} ({cols}) SELECT {cols} FROM {_q(stage)} WHERE {cond}")
+                con.execute(f"DROP TABLE {_q(stage)}")
+                self._index(con); self._view(con)
+                if watermark: upsert_watermark(con, watermark)
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK"); raise
+        finally: con.close()
+
+    # ---- reads ----
+    def _read(self, sql: str, params=()) -> Optional[pd.DataFrame]:
+        if not os.path.exists(self.db_path): return None
+        con = self._connect()
+        try: return pd.read_sql_query(sql, con, params=params)
+        except Exception: return None
+        finally: con.close()
+
+    def _keys(self, keys: Optional[Iterable]):
+        if keys is None: return "", ()
+        return f" AND {_q(self.bk)} IN (SELECT value FROM json_each(?))", (json.dumps([k.item() if hasattr(k, "item") else k for k in keys]),)
+
+    def _legacy(self) -> bool:
+        if not os.path.exists(self.db_path): return False
+        con = self._connect()
+        try: return self._kind(con, self.table) == "table"
+        finally: con.close()
+
+    def read_current(self, keys: Optional[Iterable] = None) -> Optional[pd.DataFrame]:
+        """Current rows only (optionally for some business keys); None if the target doesn't exist."""
+        where, params = self._keys(keys)
+        if self._legacy():
+            return self._read(f"SELECT * FROM {_q(self.table)} WHERE {_q(self.current_flag)} = 1{where}", params)
+        return self._read(f"SELECT * FROM {_q(self.current)} WHERE 1=1{where}", params)
+
+    def read_versions(self, keys: Iterable) -> Optional[pd.DataFrame]:
+        """Every version (current and history) of the given business keys, via the key indexes."""
+        where, params = self._keys(keys)
+        return self._read(f"SELECT * FROM {_q(self.table)} WHERE 1=1{where}", params)
+
+    def read_all(self) -> Optional[pd.DataFrame]:
+        return self._read(f"SELECT * FROM {_q(self.table)}")
+
+    def as_of(self, ts, keys: Optional[Iterable] = None) -> Optional[pd.DataFrame]:
+        """The version of each business key that was in effect at ts: eff_start <= ts < eff_end (or still open)."""
+        where, kp = self._keys(keys)
+        s, e, at = _q(self.eff_start), _q(self.eff_end), _ts_param(ts)
+        # on the view SQLite pushes the filter into both halves, so history is searched by its eff index
+        return self._read(f"SELECT * FROM {_q(self.table)} WHERE {s} <= ? AND ({e} IS NULL OR {e} > ?){where}", (at, at) + kp)
+
+    def history_of(self, key) -> Optional[pd.DataFrame]:
+        """Every version of one business key, oldest first."""
+        return self._read(f"SELECT * FROM {_q(self.table)} WHERE {_q(self.bk)} = ? ORDER BY {_q(self.eff_start)}",
+                          (key.item() if hasattr(key, "item") else key,))
+
+    def max_value(self, col: str):
+        """max(col) over current and history, e.g. to seed a surrogate key sequence."""
+        df = self._read(f"SELECT MAX({_q(col)}) AS m FROM {_q(self.table)}")
+        return None if df is None or df.empty or pd.isna(df["m"].iloc[0]) else df["m"].iloc[0]
@@ -0,0 +1,79 @@
+import os, sqlite3, threading
+import numpy as np
+from typing import Callable, Dict, Optional, Tuple, Union
+
+# Surrogate keys for SCD2 dimensions come from a named sequence in SQLite instead of max(sk)+1 over
+# the target. A writer reserves a block of keys in one short IMMEDIATE transaction, so parallel loads
+# into the same dimension get disjoint ranges; unused keys in a block are simply skipped (gaps are fine).
+SEQ_TABLE = "sk_sequences"
+
+class SurrogateKeyService:
+    def __init__(self, db_path: str, block_size: int = 1000, timeout: float = 30.0):
+        self.db_path, self.block_size, self.timeout = db_path, max(1, int(block_size)), timeout
+        self._blocks: Dict[str, Tuple[int, int]] = {}  # name -> [next, end) reserved by this process
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        con = self._connect()
+        try: con.execute(f"CREATE TABLE IF NOT EXISTS {SEQ_TABLE} (name TEXT PRIMARY KEY, next_value INTEGER NOT NULL)")
+        finally: con.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def reserve(self, name: str, n: int, seed: Union[int, Callable[[], int], None] = None) -> int:
+        """Atomically take n keys from sequence `name`; returns the first. `seed` (a value or a callable,
+        e.g. max existing key + 1) is only used when the sequence doesn't exist yet."""
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")  # takes the write lock now; other writers wait (timeout)
+            row = con.execute(f"SELECT next_value FROM {SEQ_TABLE} WHERE name = ?", (name,)).fetchone()
+            start = row[0] if row else int((seed() if callable(seed) else seed) or 1)
+            con.execute(f"INSERT INTO {SEQ_TABLE} (name, next_value) VALUES (?, ?) "
+                        f"ON CONFLICT(name) DO UPDATE SET next_value = excluded.next_value", (name, start + n))
+            con.execute("COMMIT")
+            return start
+        except Exception:
+            if con.in_transaction: con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+
+    def next_keys(self, name: str, n: int, seed: Union[int, Callable[[], int], None] = None) -> np.ndarray:
+        """n increasing keys as an int64 array, served from this process's current block; a batch that
+        doesn't fit gets a fresh block of max(n, block_size) in one reservation."""
+        if n <= 0: return np.empty(0, dtype=np.int64)
+        with self._lock:
+            lo, hi = self._blocks.get(name, (0, 0))
+            if hi - lo < n:
+                lo = self.reserve(name, max(n, self.block_size), seed); hi = lo + max(n, self.block_size)
+            self._blocks[name] = (lo + n, hi)
+        return np.arange(lo, lo + n, dtype=np.int64)
+
+    def peek(self, name: str) -> Optional[int]:
+        con = self._connect()
+        try: row = con.execute(f"SELECT next_value FROM {SEQ_TABLE} WHERE name = ?", (name,)).fetchone()
+        finally: con.close()
+        return row[0] if row else None
+
+    def reset(self, name: str, next_value: int):
+        with self._lock:
+            self._blocks.pop(name, None)
+            con = self._connect()
+            try:
+                con.execute(f"INSERT INTO {SEQ_TABLE} (name, next_value) VALUES (?, ?) "
+                            f"ON CONFLICT(name) DO UPDATE SET next_value = excluded.next_value", (name, int(next_value)))
+            finally:
+                con.close()
+
+_services: Dict[str, SurrogateKeyService] = {}
+
+def service_for(db_path: str, block_size: int = 1000) -> SurrogateKeyService:
+    """One service per sequence db in this process, so its reserved blocks carry over between loads."""
+    key = os.path.abspath(db_path)
+    if key not in _services: _services[key] = SurrogateKeyService(db_path, block_size)
+    return _services[key]
+
+def sequence_name(target: str, surrogate_key_col: str) -> str:
+    return f"{target}:{surrogate_key_col}"
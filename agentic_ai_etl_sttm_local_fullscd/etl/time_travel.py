@@ -0,0 +1,106 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+from typing import Iterable, List, Optional, Union
+
+# Read side of SCD2 dimensions: which version of each business key was in effect at a time, and which
+# versions overlapped a window. Versions are sorted by (key, start) once; as_of is then one binary search
+# per key and between only touches the versions that start inside the window plus those in effect at its
+# start, instead of filtering every version of every key.
+EFF_COLUMNS = [("effective_start", "effective_end"), ("effective_from", "effective_to")]
+OPEN = np.iinfo(np.int64).max  # effective end of a current version
+
+def _ns(values) -> np.ndarray:
+    """int64 UTC nanoseconds; naive times count as UTC, unparseable/missing ones come back as NaT (int64 min)."""
+    t = pd.to_datetime(pd.Series(values), errors="coerce", utc=True, format="mixed")
+    return t.dt.tz_convert(None).to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+def _ts(ts) -> int:
+    return int(_ns([ts])[0])
+
+def _columns(df: pd.DataFrame, eff_start: Optional[str], eff_end: Optional[str]):
+    if eff_start and eff_end: return eff_start, eff_end
+    for s, e in EFF_COLUMNS:
+        if s in df.columns and e in df.columns: return s, e
+    raise KeyError(f"No effective date columns found (tried {EFF_COLUMNS}); pass eff_start/eff_end.")
+
+class SCD2Index:
+    """Point-in-time lookups over an SCD2 frame (CSV/SQLite output of scd_type_2). Build once, query many."""
+    def __init__(self, df: pd.DataFrame, business_key: Union[str, List[str]], eff_start: Optional[str] = None,
+                 eff_end: Optional[str] = None):
+        self.df = df
+        self.keys = [business_key] if isinstance(business_key, str) else list(business_key)
+        self.eff_start, self.eff_end = _columns(df, eff_start, eff_end)
+        if len(self.keys) == 1:
+            codes, uniques = pd.factorize(df[self.keys[0]], use_na_sentinel=True)
+            self.key_index = pd.Index(uniques)
+        else:
+            mi = pd.MultiIndex.from_frame(df[self.keys])
+            codes, uniques = mi.factorize()
+            codes = np.where(df[self.keys].isna().any(axis=1).to_numpy(), -1, codes)
+            self.key_index = uniques
+        start, end = _ns(df[self.eff_start]), _ns(df[self.eff_end])
+        end = np.where(end == np.iinfo(np.int64).min, OPEN, end)
+        keep = np.flatnonzero(codes >= 0)  # rows without a business key can't be looked up
+        self.order = keep[np.lexsort((start[keep], codes[keep]))]
+        self.codes, self.start, self.end = codes[self.order].astype(np.int64), start[self.order], end[self.order]
+        self.versions = df.iloc[self.order]  # rows in (key, start) order, so results are gathered in order
+        # (key, start) packed into one sortable int64: key code * (#distinct starts + 1) + rank of start
+        self.starts = np.unique(self.start)
+        self.stride = len(self.starts) + 1
+        self.packed = self.codes * self.stride + np.searchsorted(self.starts, self.start)
+        self.by_start = np.argsort(self.start, kind="stable")  # positions in sorted order, by start only
+        self.start_sorted = self.start[self.by_start]
+        self.lo = np.searchsorted(self.codes, np.arange(len(self.key_index)), "left")
+        self.hi = np.searchsorted(self.codes, np.arange(len(self.key_index)), "right")
+
+    @classmethod
+    def from_csv(cls, path: str, business_key, eff_start: Optional[str] = None, eff_end: Optional[str] = None, **read_kw):
+        return cls(pd.read_csv(path, **read_kw), business_key, eff_start, eff_end)
+
+    @classmethod
+    def from_sqlite(cls, db_path: str, table: str, business_key, eff_start: Optional[str] = None, eff_end: Optional[str] = None):
+        con = sqlite3.connect(db_path)
+        try: df = pd.read_sql_query(f'SELECT * FROM "{table}"', con)
+        finally: con.close()
+        return cls(df, business_key, eff_start, eff_end)
+
+    def _codes(self, keys: Optional[Iterable]) -> np.ndarray:
+        if keys is None: return np.arange(len(self.key_index), dtype=np.int64)
+        keys = list(keys)
+        if len(self.keys) > 1: keys = pd.MultiIndex.from_tuples(keys)
+        c = self.key_index.get_indexer(keys)
+        return np.unique(c[c >= 0]).astype(np.int64)
+
+    def _as_of_pos(self, at: int, codes: np.ndarray) -> np.ndarray:
+        """Sorted positions of the versions in effect at `at` (start <= at < end) for key codes `codes`."""
+        r = np.searchsorted(self.starts, at, "right")  # rank of the last distinct start <= at, plus one
+        if r == 0 or not len(codes): return np.empty(0, dtype=np.int64)
+        pos = np.searchsorted(self.packed, codes * self.stride + (r - 1), "right") - 1
+        ok = pos >= self.lo[codes]
+        pos = pos[ok]
+        return pos[self.end[pos] > at]
+
+    def _rows(self, pos: np.ndarray) -> pd.DataFrame:
+        return self.versions.iloc[pos]
+
+    def as_of(self, ts, keys: Optional[Iterable] = None) -> pd.DataFrame:
+        """One row per business key (of `keys`, default all) for the version in effect at ts."""
+        return self._rows(self._as_of_pos(_ts(ts), self._codes(keys)))
+
+    def between(self, t1, t2, keys: Optional[Iterable] = None) -> pd.DataFrame:
+        """Every version in effect at some point of [t1, t2): the ones in effect at t1 plus the ones that
+        start after t1 and before t2, ordered by key and start."""
+        a, b = _ts(t1), _ts(t2)
+        codes = self._codes(keys)
+        first = self._as_of_pos(a, codes)
+        s = self.start_sorted
+        later = self.by_start[np.searchsorted(s, a, "right"):np.searchsorted(s, b, "left")]
+        later = later[self.end[later] > self.start[later]]  # versions closed in the batch that opened them
+        if keys is not None: later = later[np.isin(self.codes[later], codes)]
+        return self._rows(np.sort(np.concatenate([first, later])))  # disjoint: starts <= t1 vs > t1
+
+    def history(self, key) -> pd.DataFrame:
+        """All versions of one business key, oldest first."""
+        c = self._codes([key])
+        return self._rows(np.arange(self.lo[c[0]], self.hi[c[0]]) if len(c) else np.empty(0, dtype=np.int64))
@@ -48,7 +48,7 @@ def apply_rules(df_src:pd.DataFrame, rules_df:pd.DataFrame)->pd.DataFrame:
         src_cols=[c.strip() for c in str(r['Source Column']).split(',')]
         tgt=str(r['Target Column']).strip(); transform=str(r.get('Transformation','')).strip()
         if not tgt: continue
-        if transform and transform.lower()!='none':
+        if transform and transform.lower() not in ('none','nan'):  # blank Excel cells arrive as 'nan'
             try: out[tgt]=_eval_expr(transform, df_src)
             except Exception as ex: out[tgt]=f'ERR:{ex}'
         else:
@@ -0,0 +1,23 @@
+import os, sys
+import pandas as pd
+
+APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP)
+from etl.pipeline import run_job
+
+def test_scd1_cdc_second_run_keeps_target_rows(tmp_path):
+    src = pd.read_csv(os.path.join(APP, "data", "sample_initial.csv"))
+    path = tmp_path / "src.csv"; src.to_csv(path, index=False)
+    job = {"name": "scd1_cdc", "sttm": os.path.join(APP, "docs", "STTM_sample.xlsx"), "scd_type": "SCD1",
+           "business_key": "customer_key", "output_dir": str(tmp_path),
+           "source": {"type": "csv", "path": str(path), "cdc": {"mode": "offset"}},
+           "target": {"type": "csv", "path": str(tmp_path / "dim.csv")}}
+    run_job(job)
+    first = pd.read_csv(tmp_path / "dim.csv")
+    changed = src.iloc[[0]].assign(city="Bergen")
+    new = src.iloc[[1]].assign(customer_id=src["customer_id"].max() + 1)
+    pd.concat([changed, new]).to_csv(path, mode="a", header=False, index=False)  # append-only source
+    summary = run_job(job)
+    after = pd.read_csv(tmp_path / "dim.csv")
+    assert summary["source_rows"] == 2 and len(after) == len(first) + 1
+    assert after["customer_key"].is_unique
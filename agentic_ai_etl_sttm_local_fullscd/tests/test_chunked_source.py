@@ -0,0 +1,42 @@
+import os, sys
+import numpy as np
+import pandas as pd
+import pytest
+
+APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP)
+from etl.pipeline import run_job
+from etl.scd_handler import deduplicate_source, deduplicate_chunks
+
+def _job(tmp_path, name, **source):
+    src = pd.read_csv(os.path.join(APP, "data", "sample_initial.csv"))
+    path = tmp_path / "src.csv"
+    pd.concat([src, src.iloc[:5]]).to_csv(path, index=False)  # a few keys arrive twice
+    return {"name": name, "sttm": os.path.join(APP, "docs", "STTM_sample.xlsx"), "scd_type": "SCD2", "business_key": "customer_key",
+            "load_mode": "Snapshot", "dedup": {"strategy": "keep_last", "audit": True}, "output_dir": str(tmp_path / name),
+            "source": {"type": "csv", "path": str(path), **source}, "target": {"type": "csv", "path": str(tmp_path / name / "dim.csv")}}
+
+def _norm(path):
+    return pd.read_csv(path).drop(columns=["effective_start", "loaded_at", "batch_id"]).sort_values("customer_key").reset_index(drop=True)
+
+def test_chunked_source_matches_whole_frame(tmp_path):
+    whole = run_job(_job(tmp_path, "whole"))
+    for partitions in (0, 3):
+        job = _job(tmp_path, f"chunked{partitions}", chunksize=7)
+        job["dedup"]["partitions"] = partitions
+        res = run_job(job)
+        assert (res["source_rows"], res["deduplicated"], res["target_rows"]) == (whole["source_rows"], whole["deduplicated"], whole["target_rows"])
+        assert res["duplicate_audit"]["rows"] == whole["duplicate_audit"]["rows"]
+        assert _norm(job["target"]["path"]).equals(_norm(tmp_path / "whole" / "dim.csv"))
+
+@pytest.mark.parametrize("partitions", [0, 3])
+@pytest.mark.parametrize("strategy", ["keep_first", "keep_last", "by_timestamp"])
+def test_dedup_chunks_equals_dedup_source_in_order(strategy, partitions):
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({"k": rng.integers(0, 40, 300).astype(float), "v": np.arange(300),
+                       "ts": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 5, 300), unit="D")})
+    df.loc[::23, "k"] = np.nan                                  # null keys dedupe as one key
+    df.loc[::31, "ts"] = pd.NaT
+    want = deduplicate_source(df, "k", strategy, "ts").reset_index(drop=True)
+    got = deduplicate_chunks((df.iloc[i:i + 17] for i in range(0, len(df), 17)), "k", strategy, "ts", partitions=partitions)
+    pd.testing.assert_frame_equal(got, want)
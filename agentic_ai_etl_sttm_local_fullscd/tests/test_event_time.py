@@ -0,0 +1,52 @@
+import os, sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from etl.scd_handler import scd_type_2_event_time
+from etl.scd_store import SCD2Store
+
+COLS = ["k", "v", "effective_start", "effective_end", "is_current", "version"]
+
+def _events(keys=40, n=400, seed=5):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"k": rng.integers(0, keys, n), "v": [f"v{i}" for i in range(n)],  # every event a real change
+                         "ts": (pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.choice(10**5, n, replace=False), unit="min")).astype(str)})
+
+def _chains(df):
+    df = df[COLS].copy()
+    for c in ("effective_start", "effective_end"): df[c] = pd.to_datetime(df[c], utc=True, format="mixed").dt.as_unit("ns")
+    return df.astype({"is_current": bool, "v": str}).sort_values(["k", "effective_start"]).reset_index(drop=True)
+
+def test_out_of_order_batches_give_the_in_order_history(tmp_path):
+    ev = _events()
+    expected = scd_type_2_event_time(ev, None, "k", ["v"], "ts")
+    assert _chains(expected).groupby("k")["is_current"].sum().eq(1).all()
+    store = SCD2Store(str(tmp_path / "t.db"), "dim", "k")
+    got = None
+    shuffled = ev.sample(frac=1, random_state=1)  # late and early arrivals
+    for part in (shuffled.iloc[i:i + 60] for i in range(0, len(shuffled), 60)):
+        got = scd_type_2_event_time(part, got, "k", ["v"], "ts")
+        keys = part["k"].unique()
+        store.replace_keys(scd_type_2_event_time(part, store.read_versions(keys), "k", ["v"], "ts"), keys)
+    assert _chains(got).equals(_chains(expected))
+    assert _chains(store.read_all()).equals(_chains(expected))
+
+def test_in_order_batches_skip_unchanged_events():
+    ev = _events().assign(v=lambda d: np.where(np.arange(len(d)) % 3, "same", d["v"])).sort_values("ts")
+    expected = scd_type_2_event_time(ev, None, "k", ["v"], "ts")
+    got = None
+    for i in range(0, len(ev), 50): got = scd_type_2_event_time(ev.iloc[i:i + 50], got, "k", ["v"], "ts")
+    assert _chains(got).equals(_chains(expected)) and len(expected) < len(ev)
+
+def test_late_change_splits_interval_and_replay_is_a_no_op():
+    first = scd_type_2_event_time(pd.DataFrame({"k": [1, 1, 2], "v": ["a", "c", "x"], "ts": ["2024-01-01", "2024-03-01", "2024-01-05"]}),
+                                  None, "k", ["v"], "ts", surrogate_key_col="sk")
+    late = scd_type_2_event_time(pd.DataFrame({"k": [1], "v": ["b"], "ts": ["2024-02-01"]}), first, "k", ["v"], "ts", surrogate_key_col="sk")
+    one = late[late["k"] == 1].sort_values("effective_start")
+    assert one["v"].tolist() == ["a", "b", "c"] and one["version"].tolist() == [1, 2, 3]
+    assert one["effective_end"].iloc[0] == pd.Timestamp("2024-02-01", tz="UTC") and one["is_current"].tolist() == [False, False, True]
+    assert late.loc[late["k"] == 2, "sk"].tolist() == first.loc[first["k"] == 2, "sk"].tolist()  # other keys untouched
+    replay = scd_type_2_event_time(pd.DataFrame({"k": [1, 1], "v": ["b", "c"], "ts": ["2024-02-01", "2024-03-01"]}), late,
+                                   "k", ["v"], "ts", surrogate_key_col="sk")
+    assert replay.sort_values(["k", "effective_start"])["sk"].tolist() == late.sort_values(["k", "effective_start"])["sk"].tolist()
@@ -0,0 +1,23 @@
+import os, sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from etl.key_codes import encode_keys, KeyDictionary
+
+def test_null_key_parts_get_minus_one():
+    df = pd.DataFrame({"a": [1, 1, None, 2, 1], "b": ["x", None, "y", "z", "x"]})
+    codes = encode_keys(df, ["a", "b"])
+    assert codes.dtype == np.int64 and codes.tolist() == [0, -1, -1, 1, 0]
+    assert encode_keys(df, "b").tolist() == [0, -1, 1, 2, 0]
+    assert KeyDictionary(["a", "b"]).encode(df).tolist() == [0, -1, -1, 1, 0]
+
+def test_dictionary_reload_keeps_key_types(tmp_path):
+    df = pd.DataFrame({"d": pd.to_datetime(["2024-01-01", "2024-01-02"], utc=True), "n": [1, 2],
+                       "day": [pd.Timestamp("2024-01-01").date(), pd.Timestamp("2024-01-02").date()]})
+    for keys in ("d", ["d", "n"], "day"):
+        kd = KeyDictionary(keys, path=str(tmp_path / "kd.json"))
+        codes = kd.encode(df); kd.save()
+        again = KeyDictionary(keys, path=str(tmp_path / "kd.json"))
+        assert again.encode(df, grow=False).tolist() == codes.tolist() and len(again) == 2
+        os.remove(tmp_path / "kd.json")
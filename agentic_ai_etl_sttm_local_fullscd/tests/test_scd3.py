@@ -0,0 +1,14 @@
+import os, sys
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from etl.scd_handler import scd_type_3
+
+def test_scd3_nullable_and_blank_values():
+    tgt = scd_type_3(pd.DataFrame({"id": [1, 2, 3], "tier": pd.array([1, pd.NA, 3], dtype="Int64"), "email": ["a", None, ""]}),
+                     None, ["id"], ["tier", "email"])
+    out = scd_type_3(pd.DataFrame({"id": [1, 2, 4], "tier": pd.array([5, pd.NA, pd.NA], dtype="Int64"), "email": ["b", "", None]}),
+                     tgt, ["id"], ["tier", "email"])
+    assert out["id"].tolist() == [1, 2, 3, 4]
+    assert out.loc[0, ["tier", "prev_tier", "email", "prev_email"]].tolist() == [5, 1, "b", "a"]
+    assert out.loc[1, ["prev_tier", "prev_email"]].isna().all()  # null -> null and None -> '' are no change
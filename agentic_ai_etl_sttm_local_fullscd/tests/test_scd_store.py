@@ -0,0 +1,53 @@
+import os, sys, sqlite3
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from etl.scd_store import SCD2Store
+from etl.scd_handler import scd_type_2
+from etl.io_local import write_target_sqlite, read_target_sqlite
+
+T0 = pd.Timestamp("2024-01-01", tz="UTC")
+BATCHES = [pd.DataFrame({"k": [1, 2, 3], "v": ["a", "b", "c"]}),
+           pd.DataFrame({"k": [2, 4], "v": ["B", "d"]}),
+           pd.DataFrame({"k": [2, 3], "v": ["BB", "C"]})]
+
+def _load(store, legacy_db=None):
+    full = None
+    for i, src in enumerate(BATCHES):
+        kw = dict(surrogate_key_col="sk", as_of=T0 + pd.Timedelta(days=i), load_mode="Incremental")
+        full = scd_type_2(src, full, "k", ["v"], **kw)
+        store.load(scd_type_2(src, store.read_current(), "k", ["v"], **kw))
+    return full
+
+def _norm(df):
+    return df.sort_values(["k", "version"]).reset_index(drop=True)[["k", "v", "version", "is_current"]].astype({"is_current": bool})
+
+def test_current_history_layout_matches_full_table(tmp_path):
+    store = SCD2Store(str(tmp_path / "t.db"), "dim", "k")
+    full = _load(store)
+    assert _norm(store.read_all()).equals(_norm(full))
+    cur = store.read_current()
+    assert sorted(cur["k"]) == [1, 2, 3, 4] and cur["is_current"].eq(1).all()
+    assert store.history_of(2)["v"].tolist() == ["b", "B", "BB"]
+    with sqlite3.connect(store.db_path) as con:
+        names = {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        plan = " ".join(str(r) for r in con.execute("EXPLAIN QUERY PLAN SELECT * FROM dim_history WHERE k = 2"))
+    assert {"ix_dim_current_bk", "ix_dim_history_bk", "ix_dim_history_eff"} <= names and "ix_dim_history_bk" in plan
+
+def test_as_of_returns_the_version_in_effect(tmp_path):
+    store = SCD2Store(str(tmp_path / "t.db"), "dim", "k")
+    _load(store)
+    day1 = store.as_of(T0 + pd.Timedelta(hours=36))
+    assert dict(zip(day1["k"], day1["v"])) == {1: "a", 2: "B", 3: "c", 4: "d"}
+    assert store.as_of(T0 - pd.Timedelta(days=1)).empty
+    assert store.as_of(T0 + pd.Timedelta(days=5), keys=[2, 3])["v"].tolist() == ["BB", "C"]
+
+def test_plain_table_target_is_migrated(tmp_path):
+    db = str(tmp_path / "t.db")
+    first = scd_type_2(BATCHES[0], None, "k", ["v"], as_of=T0)
+    second = scd_type_2(BATCHES[1], first, "k", ["v"], as_of=T0 + pd.Timedelta(days=1), load_mode="Incremental")
+    write_target_sqlite(second, db, "dim")
+    store = SCD2Store(db, "dim", "k")
+    assert len(store.read_current()) == 4
+    store.load(scd_type_2(BATCHES[2], store.read_current(), "k", ["v"], as_of=T0 + pd.Timedelta(days=2), load_mode="Incremental"))
+    assert len(read_target_sqlite(db, "dim")) == 7 and len(store.read_current()) == 4
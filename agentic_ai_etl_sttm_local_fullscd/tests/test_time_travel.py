@@ -0,0 +1,33 @@
+import os, sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from etl.time_travel import SCD2Index
+
+def _history(keys=50, versions=20, seed=3):
+    rng = np.random.default_rng(seed)
+    k = np.repeat(np.arange(keys), versions)
+    start = pd.Timestamp("2020-01-01", tz="UTC") + pd.to_timedelta(np.sort(rng.integers(0, 10**6, (keys, versions)), axis=1).ravel(), unit="min")
+    df = pd.DataFrame({"k": k, "v": rng.integers(0, 9, len(k)), "effective_start": start})
+    df["effective_end"] = df.groupby("k")["effective_start"].shift(-1)
+    df["is_current"] = df["effective_end"].isna()
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+def test_as_of_and_between_match_a_full_scan():
+    df = _history(); ix = SCD2Index(df, "k")
+    s, e = df["effective_start"], df["effective_end"]
+    for ts in pd.to_datetime(["2019-12-31", "2020-06-01", "2021-01-01", "2022-01-01"], utc=True):
+        scan = df[(s <= ts) & (e.isna() | (e > ts))]
+        assert sorted(ix.as_of(ts).index) == sorted(scan.index)
+        t2 = ts + pd.Timedelta(days=30)
+        scan = df[(s < t2) & (e.isna() | (e > ts))]
+        assert sorted(ix.between(ts, t2).index) == sorted(scan.index)
+    assert ix.as_of("2030-01-01", keys=[3, 99])["k"].tolist() == [3]
+    assert ix.history(7)["effective_start"].is_monotonic_increasing and len(ix.history(7)) == 20
+
+def test_text_dates_and_from_to_columns(tmp_path):
+    df = _history(5, 4).rename(columns={"effective_start": "effective_from", "effective_end": "effective_to"})
+    df.to_csv(tmp_path / "dim.csv", index=False)
+    ix = SCD2Index.from_csv(str(tmp_path / "dim.csv"), ["k"])
+    assert ix.eff_start == "effective_from" and len(ix.as_of("2030-01-01")) == 5 and ix.as_of("2030-01-01")["is_current"].all()
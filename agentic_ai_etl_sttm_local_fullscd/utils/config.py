@@ -1,9 +1,27 @@
-import os, yaml
+import os, copy, yaml
 from dotenv import load_dotenv
-def load_config():
+def load_config(path='config.yaml'):
     if os.path.exists('.env'): load_dotenv('.env')
     cfg = {}
-    if os.path.exists('config.yaml'):
-        with open('config.yaml','r',encoding='utf-8') as f:
+    if os.path.exists(path):
+        with open(path,'r',encoding='utf-8') as f:
             cfg = yaml.safe_load(f) or {}
     return cfg or {}
+def _merge(base, over):
+    out = copy.deepcopy(base)
+    for k,v in (over or {}).items():
+        out[k] = _merge(out[k], v) if isinstance(v, dict) and isinstance(out.get(k), dict) else v
+    return out
+def load_jobs(path):
+    """Batch config for the headless CLI: `defaults:` deep-merged into every entry of `jobs:`.
+    A file with a single job may skip the `jobs:` list and hold the job at the top level."""
+    if not os.path.exists(path): raise FileNotFoundError(path)
+    cfg = load_config(path)
+    defaults = cfg.get('defaults') or {}
+    jobs = cfg.get('jobs') if 'jobs' in cfg else [{k:v for k,v in cfg.items() if k!='defaults'}]
+    out = []
+    for i, job in enumerate(jobs or []):
+        job = _merge(defaults, job)
+        job.setdefault('name', f"{os.path.splitext(os.path.basename(path))[0]}_{i+1}")
+        out.append(job)
+    return out
@@ -1,16 +1,24 @@
-import os, json
+import os, io, json
 import streamlit as st
 import pandas as pd
 from utils.config import load_config
 from agents.sttm_reader import read_sttm_excel, REQUIRED_COLUMNS
 from etl.io_local import read_source_csv, read_source_sqlite, write_target_csv, read_target_sqlite, write_target_sqlite, read_target_csv
-from etl.io_cloud import test_connection, read_sql_table, write_sql_table
+from etl.io_cloud import test_connection, read_sql_table, write_sql_table, read_sql_table_incremental, get_watermark_sql
+from etl.io_local import read_source_csv_incremental, read_source_sqlite_incremental
+from etl.cdc import CDC_MODES, source_id, make_watermark, get_watermark
 from etl.transformer import apply_rules
-from etl.scd_handler import scd_type_1, scd_type_2, scd_type_3, deduplicate_source
+from etl.scd_handler import scd_type_1, scd_type_2, scd_type_3, deduplicate_source, write_duplicate_audit
+from etl.key_codes import KeyDictionary
+from etl.cache import ReadCache
 from etl.llm_agent import extract_rules_from_sttm, generate_validations_from_sttm, validate_dataframe_summary
 
 st.set_page_config(page_title="Agentic AI ETL — STTM (v4.5 full)", layout="wide")
 cfg = load_config()
+# per-session read cache: reruns (any widget click) reuse frames until the file or upload changes
+if "read_cache" not in st.session_state:
+    st.session_state.read_cache = ReadCache(int((cfg.get("cache") or {}).get("max_mb", 512)) * 2**20)
+cache = st.session_state.read_cache
 
 # Sidebar Connection Manager
 if "connections" not in st.session_state:
@@ -81,6 +89,9 @@ with st.sidebar:
             except Exception as e:
                 st.error(f"{kind} connection failed: {e}")
     st.divider(); st.caption("Tip: DEFAULT_SOURCE_CONN / DEFAULT_TARGET_CONN in .env")
+    cs = cache.stats()
+    st.caption(f"Read cache: {cs['entries']} entries, {cs['bytes']/2**20:.1f}/{cs['max_bytes']/2**20:.0f} MB, {cs['hits']} hits / {cs['misses']} misses")
+    if st.button("Clear read cache"): cache.clear()
 
 def pick_connection(name_key: str, label: str):
     conns = st.session_state.connections
@@ -94,6 +105,7 @@ if "sttm_df" not in st.session_state: st.session_state.sttm_df=None
 if "rules_df" not in st.session_state: st.session_state.rules_df=None
 if "src_df" not in st.session_state: st.session_state.src_df=None
 if "validations" not in st.session_state: st.session_state.validations=[]
+if "pending_watermark" not in st.session_state: st.session_state.pending_watermark=None
 
 tab1, tab2, tab3, tab4, tab5 = st.tabs(["Source & Target", "SCD & Processing", "Transformation Rules", "LLM Assist & Validation", "Run ETL"])
 
@@ -109,7 +121,8 @@ with tab1:
             up_src = st.file_uploader("Upload Source CSV", type=["csv"])
             if up_src is not None:
                 try:
-                    df = pd.read_csv(up_src)
+                    data = up_src.getvalue()
+                    df = cache.read("upload_csv", pd.read_csv, io.BytesIO(data), content=data, key=up_src.name)
                     st.session_state.src_df = df
                     st.success("Loaded source from upload.")
                     st.dataframe(df.head(50), use_container_width=True)
@@ -119,7 +132,7 @@ with tab1:
             src_csv_path = st.text_input("Path", conns[source_conn_name]["params"].get("sample_path","data/sample_initial.csv"))
             if st.button("Preview CSV Source"):
                 try:
-                    st.session_state.src_df = read_source_csv(src_csv_path)
+                    st.session_state.src_df = cache.read("source_csv", read_source_csv, src_csv_path, paths=[src_csv_path]); st.session_state.pending_watermark = None
                     st.dataframe(st.session_state.src_df.head(50))
                 except Exception as e:
                     st.error(f"Read CSV failed: {e}")
@@ -128,7 +141,7 @@ with tab1:
         table = st.text_input("Source table", "source_customers")
         if st.button("Preview SQLite Source"):
             try:
-                st.session_state.src_df = read_source_sqlite(db_path, table)
+                st.session_state.src_df = cache.read("source_sqlite", read_source_sqlite, db_path, table, paths=[db_path]); st.session_state.pending_watermark = None
                 st.dataframe(st.session_state.src_df.head(50))
             except Exception as e:
                 st.error(f"Read SQLite failed: {e}")
@@ -138,7 +151,7 @@ with tab1:
         if st.button(f"Preview {src_kind} Source"):
             try:
                 df = read_sql_table(src_kind, conns[source_conn_name]["params"], table=table, query=query)
-                st.session_state.src_df = df
+                st.session_state.src_df = df; st.session_state.pending_watermark = None
                 st.success(f"Loaded {len(df)} rows from {src_kind}.")
                 st.dataframe(df.head(50), use_container_width=True)
             except Exception as e:
@@ -147,7 +160,7 @@ with tab1:
     up = st.file_uploader("Upload STTM Excel (.xlsx)", type=["xlsx"])
     if up:
         try:
-            st.session_state.sttm_df = read_sttm_excel(up)
+            st.session_state.sttm_df = cache.read("sttm", read_sttm_excel, up, content=up.getvalue(), key=up.name)
             st.success("Loaded STTM from upload.")
             st.dataframe(st.session_state.sttm_df, use_container_width=True)
         except Exception as e:
@@ -165,6 +178,35 @@ with tab1:
     else:
         st.session_state.target_table_cloud = st.text_input(f"Target table ({tgt_kind})", "dim_customer")
         st.session_state.target_write_mode = st.selectbox("Write mode", ["replace","append"], index=0)
+    with st.expander("Incremental extraction (CDC)", expanded=False):
+        st.caption("Pull only rows newer than the watermark stored with the target; the watermark advances in the same write as the target.")
+        if (src_kind=="CSV" and mode!="Upload file") or src_kind=="SQLite" or (src_kind not in ("CSV","SQLite") and table):
+            cdc_mode = st.selectbox("Watermark type", CDC_MODES if src_kind=="CSV" else ["column"])
+            cdc_col = st.text_input("Watermark column (updated_at or increasing id)", "last_updated") if cdc_mode=="column" else None
+            if src_kind=="CSV": sid = source_id("CSV", src_csv_path)
+            elif src_kind=="SQLite": sid = source_id("SQLite", db_path, table)
+            else: sid = source_id(src_kind, source_conn_name, table)
+            try:
+                if tgt_kind=="CSV": wm = get_watermark("CSV", st.session_state.target_csv, sid)
+                elif tgt_kind=="SQLite": wm = get_watermark("SQLite", st.session_state.target_db, sid)
+                else: wm = get_watermark_sql(tgt_kind, conns[target_conn_name]["params"], sid)
+            except Exception as e:
+                wm = None; st.warning(f"Could not read watermark: {e}")
+            since = wm["value"] if wm and wm.get("mode")==cdc_mode and wm.get("column")==cdc_col else None
+            st.write("Current watermark:", since if since is not None else "none (first pull reads everything)")
+            if st.button("Pull delta"):
+                try:
+                    if src_kind=="CSV": df, new_wm = read_source_csv_incremental(src_csv_path, cdc_mode, cdc_col, since)
+                    elif src_kind=="SQLite": df, new_wm = read_source_sqlite_incremental(db_path, table, cdc_col, since)
+                    else: df, new_wm = read_sql_table_incremental(src_kind, conns[source_conn_name]["params"], table, cdc_col, since)
+                    st.session_state.src_df = df
+                    st.session_state.pending_watermark = make_watermark(sid, cdc_mode, new_wm, cdc_col)
+                    st.success(f"Pulled {len(df)} new rows (watermark {since} → {new_wm}). Runs in Incremental mode.")
+                    st.dataframe(df.head(50))
+                except Exception as e:
+                    st.error(f"Incremental read failed: {e}")
+        else:
+            st.caption("CDC needs a CSV path, a SQLite table or a warehouse table (not a custom query).")
 
 with tab2:
     st.header("SCD & Processing")
@@ -269,23 +311,32 @@ with tab5:
         st.write("Source rows:", len(st.session_state.src_df))
         st.write("Rules:", len(st.session_state.rules_df))
         opts = st.session_state.run_opts
-        out_preview = apply_rules(st.session_state.src_df, st.session_state.rules_df)
+        out_preview = cache.derive("apply_rules", apply_rules, st.session_state.src_df, st.session_state.rules_df)
         run = st.button("Execute ETL Now", type="primary")
         if run:
             src_df = st.session_state.src_df.copy()
-            out_df = apply_rules(src_df, st.session_state.rules_df)
+            out_df = cache.derive("apply_rules", apply_rules, src_df, st.session_state.rules_df)
             scd_type = opts.get("scd_type")
             load_mode = opts.get("load_mode")
+            watermark = st.session_state.pending_watermark
+            if watermark: load_mode = "Incremental"  # a CDC delta is never a full image
             if scd_type == "SCD1":
-                final_df = scd_type_1(out_df, None, audit_cols={"batch_id":"local_demo","loaded_at":pd.Timestamp.utcnow()})
+                existing, keys = None, None
+                if watermark:  # a CDC delta is upserted into the target, never written over it
+                    keys = [opts.get("business_key")] if opts.get("business_key") in out_df.columns else None
+                    if not keys: st.error("SCD1 with CDC needs the business key in the output to upsert the delta."); st.stop()
+                    if opts.get("target_kind")=="CSV":
+                        existing = read_target_csv(st.session_state.get("target_csv","output/dim_customer.csv"))
+                    elif opts.get("target_kind")=="SQLite":
+                        existing = read_target_sqlite(st.session_state.get("target_db","data/target.db"), st.session_state.get("target_table","dim_customer"))
+                    else:
+                        st.error(f"SCD1 with CDC isn't supported for {opts.get('target_kind')} targets: the delta would replace the table."); st.stop()
+                final_df = scd_type_1(out_df, existing, audit_cols={"batch_id":"local_demo","loaded_at":pd.Timestamp.utcnow()}, keys=keys)
             else:
                 bk = opts.get("business_key")
                 if bk and opts.get("write_dup_audit", True) and bk in out_df.columns:
-                    dmask = out_df.duplicated(subset=[bk], keep=False)
-                    if int(dmask.sum())>0:
-                        os.makedirs("output", exist_ok=True)
-                        ts = pd.Timestamp.utcnow().strftime("%Y%m%d_%H%M%S")
-                        out_df[dmask].to_csv(f"output/duplicate_audit_{bk}_{ts}.csv", index=False)
+                    ts = pd.Timestamp.utcnow().strftime("%Y%m%d_%H%M%S")
+                    if write_duplicate_audit(out_df, bk, f"output/duplicate_audit_{bk}_{ts}.csv") > 0:
                         st.info("Duplicate audit CSV written in ./output")
                 try:
                     out_df = deduplicate_source(out_df, bk, opts.get("dedup_strategy","keep_last"), opts.get("dedup_ts_col"))
@@ -293,9 +344,12 @@ with tab5:
                     st.error(f"Dedup failed: {e}"); st.stop()
                 existing=None
                 if opts.get("target_kind")=="CSV":
-                    existing = read_target_csv(st.session_state.get("target_csv","output/dim_customer.csv"))
+                    tgt_csv = st.session_state.get("target_csv","output/dim_customer.csv")
+                    existing = cache.read("target_csv", read_target_csv, tgt_csv, paths=[tgt_csv] if os.path.exists(tgt_csv) else [])
                 elif opts.get("target_kind")=="SQLite":
-                    existing = read_target_sqlite(st.session_state.get("target_db","data/target.db"), st.session_state.get("target_table","dim_customer"))
+                    tgt_db = st.session_state.get("target_db","data/target.db")
+                    existing = cache.read("target_sqlite", read_target_sqlite, tgt_db, st.session_state.get("target_table","dim_customer"),
+                                          paths=[tgt_db] if os.path.exists(tgt_db) else [])
                 if opts.get("auto_tracked", True) and st.session_state.rules_df is not None:
                     mapped = [str(x).strip() for x in st.session_state.rules_df["Target Column"].tolist() if str(x).strip()]
                     tech = {bk, 'effective_start','effective_end','is_current','version','batch_id','loaded_at'}
@@ -303,12 +357,17 @@ with tab5:
                 else:
                     tracked = [c.strip() for c in opts.get("tracked_cols_text","").split(",") if c.strip()]
                 if scd_type == "SCD2":
+                    key_dict = KeyDictionary(bk, path=f"output/key_dict_{bk}.json")
                     final_df = scd_type_2(out_df, existing, business_key=bk, tracked_cols=tracked,
                                           eff_start=opts["eff_start"], eff_end=opts["eff_end"], current_flag=opts["current_flag"],
                                           version_col=opts["version_col"], surrogate_key_col=opts.get("surrogate_key_col"),
                                           soft_delete=opts.get("soft_delete", True),
                                           load_mode=load_mode,
-                                          audit_cols={"batch_id":"local_demo","loaded_at":pd.Timestamp.utcnow()})
+                                          audit_cols={"batch_id":"local_demo","loaded_at":pd.Timestamp.utcnow()},
+                                          key_dict=key_dict)
+                    mem = key_dict.memory_report(final_df, key_dict.encode(final_df, grow=False))
+                    st.caption(f"Key codes: {mem['dictionary_size']} distinct keys, {mem['raw_key_bytes']:,} B raw keys vs {mem['code_bytes']:,} B int64 codes")
+                    if not opts.get("dry_run"): key_dict.save()
                 else:
                     final_df = scd_type_3(out_df, existing, keys=[bk], tracked_cols=tracked,
                                           audit_cols={"batch_id":"local_demo","loaded_at":pd.Timestamp.utcnow()})
@@ -324,17 +383,17 @@ with tab5:
             if not opts.get("dry_run"):
                 tgt_kind = st.session_state.run_opts.get("target_kind")
                 if tgt_kind=="CSV":
-                    write_target_csv(final_df, st.session_state.get("target_csv","output/dim_customer.csv"))
-                    st.success("Wrote CSV.")
+                    write_target_csv(final_df, st.session_state.get("target_csv","output/dim_customer.csv"), watermark=watermark)
+                    st.success("Wrote CSV."); st.session_state.pending_watermark = None
                 elif tgt_kind=="SQLite":
-                    write_target_sqlite(final_df, st.session_state.get("target_db","data/target.db"), st.session_state.get("target_table","dim_customer"))
-                    st.success("Wrote SQLite.")
+                    write_target_sqlite(final_df, st.session_state.get("target_db","data/target.db"), st.session_state.get("target_table","dim_customer"), watermark=watermark)
+                    st.success("Wrote SQLite."); st.session_state.pending_watermark = None
                 else:
                     tname = st.session_state.get("target_table_cloud","dim_customer")
                     mode = st.session_state.get("target_write_mode","replace")
                     try:
-                        write_sql_table(tgt_kind, st.session_state.connections[opts.get("target_conn")]["params"], table=tname, df=final_df, if_exists=mode)
-                        st.success(f"Wrote to {tgt_kind}: {tname}")
+                        write_sql_table(tgt_kind, st.session_state.connections[opts.get("target_conn")]["params"], table=tname, df=final_df, if_exists=mode, watermark=watermark)
+                        st.success(f"Wrote to {tgt_kind}: {tname}"); st.session_state.pending_watermark = None
                     except Exception as e:
                         st.error(f"Write to {tgt_kind} failed: {e}")
             else:
@@ -0,0 +1,90 @@
+import os, io, json, sqlite3
+import pandas as pd
+from typing import Optional, Tuple
+
+WATERMARK_TABLE = "_etl_watermarks"
+CDC_MODES = ["column", "offset", "mtime"]  # column: updated_at / increasing id; offset: append-only CSV; mtime: whole file when touched
+
+def source_id(kind: str, location: str, table: str | None = None) -> str:
+    return f"{kind.lower()}://{location}" + (f"::{table}" if table else "")
+
+def make_watermark(src_id: str, mode: str, value, column: str | None = None) -> dict:
+    return {"source_id": src_id, "mode": mode, "column": column, "value": value}
+
+def plain_value(v):
+    if v is None or (not isinstance(v, str) and pd.isna(v)): return None
+    if isinstance(v, pd.Timestamp): return v.isoformat()
+    return v.item() if hasattr(v, "item") else v
+
+# ---- persistence: next to the target so the watermark moves with the data it describes ----
+def ensure_watermark_table(con: sqlite3.Connection):
+    con.execute(f"CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (source_id TEXT PRIMARY KEY, mode TEXT, column_name TEXT, value TEXT, updated_at TEXT)")
+
+def upsert_watermark(con: sqlite3.Connection, wm: dict):
+    """Stage the watermark on an open connection; the caller commits it together with the target write."""
+    ensure_watermark_table(con)
+    con.execute(f"INSERT INTO {WATERMARK_TABLE} (source_id, mode, column_name, value, updated_at) VALUES (?,?,?,?,?) "
+                "ON CONFLICT(source_id) DO UPDATE SET mode=excluded.mode, column_name=excluded.column_name, value=excluded.value, updated_at=excluded.updated_at",
+                (wm["source_id"], wm["mode"], wm.get("column"), json.dumps(plain_value(wm["value"])), pd.Timestamp.utcnow().isoformat()))
+
+def get_watermark_sqlite(db_path: str, src_id: str) -> Optional[dict]:
+    if not os.path.exists(db_path): return None
+    con = sqlite3.connect(db_path)
+    try:
+        row = con.execute(f"SELECT mode, column_name, value FROM {WATERMARK_TABLE} WHERE source_id=?", (src_id,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        con.close()
+    return make_watermark(src_id, row[0], json.loads(row[2]), row[1]) if row else None
+
+def watermark_sidecar(target_path: str) -> str:
+    return f"{target_path}.watermarks.json"
+
+def get_watermark_file(target_path: str, src_id: str) -> Optional[dict]:
+    p = watermark_sidecar(target_path)
+    if not os.path.exists(p): return None
+    with open(p, "r", encoding="utf-8") as f:
+        return json.load(f).get(src_id)
+
+def save_watermark_file(target_path: str, wm: dict):
+    p = watermark_sidecar(target_path)
+    state = {}
+    if os.path.exists(p):
+        with open(p, "r", encoding="utf-8") as f: state = json.load(f)
+    state[wm["source_id"]] = {**wm, "value": plain_value(wm["value"])}
+    with open(p + ".tmp", "w", encoding="utf-8") as f: json.dump(state, f, indent=2)
+    os.replace(p + ".tmp", p)
+
+def get_watermark(target_kind: str, target_loc: str, src_id: str) -> Optional[dict]:
+    if target_kind == "SQLite": return get_watermark_sqlite(target_loc, src_id)
+    return get_watermark_file(target_loc, src_id)
+
+# ---- delta filters ----
+def newer_than(s: pd.Series, since) -> pd.Series:
+    """Boolean mask of values strictly after the watermark (numeric or timestamp)."""
+    if since is None: return pd.Series(True, index=s.index)
+    if isinstance(since, (int, float)):
+        return pd.to_numeric(s, errors="coerce") > since
+    return pd.to_datetime(s, errors="coerce", utc=True) > pd.to_datetime(since, utc=True)
+
+def max_value(s: pd.Series, since=None, raw: bool = False):
+    """New watermark for a column: the max seen, or the old one when the delta is empty.
+    raw keeps the source's own representation, for watermarks compared inside SQL."""
+    if s.dropna().empty: return since
+    if raw or pd.api.types.is_numeric_dtype(s): return plain_value(s.max())
+    ts = pd.to_datetime(s, errors="coerce", utc=True)
+    return ts.max().isoformat() if ts.notna().any() else plain_value(s.max())
+
+def read_csv_from_offset(path: str, offset: int | None) -> Tuple[pd.DataFrame, int]:
+    """Rows appended to an append-only CSV since byte offset; stops at the last complete line.
+    A file smaller than the offset was rotated/truncated and is read from the start."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = offset if offset and header and offset <= size else len(header)
+        f.seek(start); body = f.read()
+    end = body.rfind(b"\n") + 1
+    if end <= 0:
+        return pd.read_csv(io.BytesIO(header)), start
+    return pd.read_csv(io.BytesIO(header + body[:end])), start + end
@@ -1,7 +1,19 @@
+from __future__ import annotations
 import pandas as pd
-from typing import Optional, Dict, Any
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
+from typing import Optional, Dict, Any, TYPE_CHECKING
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+from etl.cdc import WATERMARK_TABLE, make_watermark, max_value, plain_value
+import json
+
+# sqlalchemy (and the dialect SDKs it pulls in) load on the first cloud call, not at app start
+def create_engine(url: str) -> Engine:
+    from sqlalchemy import create_engine as _create_engine
+    return _create_engine(url)
+
+def text(sql: str):
+    from sqlalchemy import text as _text
+    return _text(sql)
 
 def databricks_engine(conf: Dict[str, Any]) -> Engine:
     host = conf.get('server_hostname')
@@ -47,7 +59,31 @@ def read_sql_table(kind:str, conf: Dict[str, Any], table:str, query: Optional[st
             return pd.read_sql_query(text(query), conn)
         return pd.read_sql_table(table, conn)
 
-def write_sql_table(kind:str, conf: Dict[str, Any], table:str, df:pd.DataFrame, if_exists:str='replace', chunksize:int=10000):
+def read_sql_table_incremental(kind:str, conf: Dict[str, Any], table:str, column:str, since=None):
+    """Push the watermark predicate down to the warehouse so only the delta is transferred: (df, new value)."""
+    eng=_engine(kind, conf)
+    with eng.connect() as conn:
+        if since is None: df=pd.read_sql_query(text(f"SELECT * FROM {table}"), conn)
+        else: df=pd.read_sql_query(text(f"SELECT * FROM {table} WHERE {column} > :wm"), conn, params={"wm": since})
+    return df, max_value(df[column], since, raw=True)
+
+def get_watermark_sql(kind:str, conf: Dict[str, Any], src_id:str) -> Optional[dict]:
+    eng=_engine(kind, conf)
+    with eng.connect() as conn:
+        try:
+            row=conn.execute(text(f"SELECT mode, column_name, value FROM {WATERMARK_TABLE} WHERE source_id = :s"), {"s": src_id}).fetchone()
+        except Exception:
+            return None
+    return make_watermark(src_id, row[0], json.loads(row[2]), row[1]) if row else None
+
+def write_sql_table(kind:str, conf: Dict[str, Any], table:str, df:pd.DataFrame, if_exists:str='replace', chunksize:int=10000, watermark: Optional[dict]=None):
     eng=_engine(kind, conf)
     with eng.begin() as conn:
         df.to_sql(table, conn, if_exists=if_exists, index=False, chunksize=chunksize)
+        if watermark:
+            # same transaction as the data; note some warehouses auto-commit DDL, so keep the watermark table pre-created
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (source_id VARCHAR(512), mode VARCHAR(16), column_name VARCHAR(256), value VARCHAR(256), updated_at VARCHAR(64))"))
+            conn.execute(text(f"DELETE FROM {WATERMARK_TABLE} WHERE source_id = :s"), {"s": watermark["source_id"]})
+            conn.execute(text(f"INSERT INTO {WATERMARK_TABLE} VALUES (:s, :m, :c, :v, :u)"),
+                         {"s": watermark["source_id"], "m": watermark["mode"], "c": watermark.get("column"),
+                          "v": json.dumps(plain_value(watermark["value"])), "u": pd.Timestamp.utcnow().isoformat()})
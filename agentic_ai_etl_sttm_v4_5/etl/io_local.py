@@ -1,17 +1,63 @@
 import os, pandas as pd, sqlite3
+from etl.cdc import newer_than, max_value, read_csv_from_offset, upsert_watermark, save_watermark_file
 def read_source_csv(path:str)->pd.DataFrame:
     return pd.read_csv(path)
 def read_target_csv(path:str)->pd.DataFrame|None:
     return pd.read_csv(path) if os.path.exists(path) else None
-def write_target_csv(df:pd.DataFrame, path:str):
-    os.makedirs(os.path.dirname(path), exist_ok=True); df.to_csv(path, index=False)
+def write_target_csv(df:pd.DataFrame, path:str, watermark:dict|None=None):
+    # CSV + sidecar can't share a transaction: swap the file in first, so a crash re-pulls the last delta (at-least-once)
+    os.makedirs(os.path.dirname(path), exist_ok=True); df.to_csv(path+".tmp", index=False); os.replace(path+".tmp", path)
+    if watermark: save_watermark_file(path, watermark)
 def read_source_sqlite(db_path:str, table:str)->pd.DataFrame:
     con=sqlite3.connect(db_path); return pd.read_sql_query(f"SELECT * FROM {table}", con)
+def read_source_csv_incremental(path:str, mode:str='offset', column:str|None=None, since=None):
+    """Delta since the watermark and the new watermark value: (df, value)."""
+    if mode=='offset': return read_csv_from_offset(path, since)
+    if mode=='mtime':
+        mtime=os.path.getmtime(path)
+        if since is not None and mtime<=float(since): return pd.read_csv(path, nrows=0), since
+        return pd.read_csv(path), mtime
+    if not column: raise ValueError("CDC column mode needs a watermark column.")
+    parts=[c[newer_than(c[column], since)] for c in pd.read_csv(path, chunksize=100_000)]
+    df=pd.concat(parts, ignore_index=True) if parts else pd.read_csv(path, nrows=0)
+    return df, max_value(df[column], since)
+def read_source_sqlite_incremental(db_path:str, table:str, column:str, since=None):
+    """Only rows with column > watermark leave SQLite; index the column to make this O(delta)."""
+    con=sqlite3.connect(db_path)
+    try:
+        if since is None: df=pd.read_sql_query(f"SELECT * FROM {table} ORDER BY {column}", con)
+        else: df=pd.read_sql_query(f"SELECT * FROM {table} WHERE {column} > ? ORDER BY {column}", con, params=(since,))
+    finally: con.close()
+    return df, max_value(df[column], since, raw=True)
 def read_target_sqlite(db_path:str, table:str)->pd.DataFrame|None:
     if not os.path.exists(db_path): return None
     con=sqlite3.connect(db_path)
     try: return pd.read_sql_query(f"SELECT * FROM {table}", con)
     except Exception: return None
-def write_target_sqlite(df:pd.DataFrame, db_path:str, table:str, if_exists:str='replace'):
+def sqlite_ready(df:pd.DataFrame)->pd.DataFrame:
+    """Object columns holding Timestamps (eff_end, loaded_at, ...) can't be bound by sqlite3;
+    the Timestamps are written in the same text form to_sql uses."""
+    fix=[c for c in df.columns if df[c].dtype==object and pd.api.types.infer_dtype(df[c], skipna=True) in ('mixed','datetime')]
+    if not fix: return df
+    df=df.copy()
+    for c in fix: df[c]=df[c].map(lambda v: str(v) if isinstance(v, pd.Timestamp) else v)
+    return df
+def write_target_sqlite(df:pd.DataFrame, db_path:str, table:str, if_exists:str='replace', watermark:dict|None=None):
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    con=sqlite3.connect(db_path); df.to_sql(table, con, if_exists=if_exists, index=False)
+    df=sqlite_ready(df)
+    con=sqlite3.connect(db_path)
+    if not watermark: df.to_sql(table, con, if_exists=if_exists, index=False); return
+    try:
+        # to_sql commits on its own, so load a staging table and move it in together with the watermark
+        stage=f"{table}__stage"; df.to_sql(stage, con, if_exists='replace', index=False)
+        con.isolation_level=None; con.execute("BEGIN IMMEDIATE")
+        try:
+            exists=con.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()
+            if if_exists=='append' and exists:
+                con.execute(f"INSERT INTO {table} SELECT * FROM {stage}"); con.execute(f"DROP TABLE {stage}")
+            else:
+                con.execute(f"DROP TABLE IF EXISTS {table}"); con.execute(f"ALTER TABLE {stage} RENAME TO {table}")
+            upsert_watermark(con, watermark); con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK"); raise
+    finally: con.close()
@@ -1,38 +1,71 @@
+import os
+import numpy as np
 import pandas as pd
 from typing import List, Optional
+from etl.key_codes import KeyDictionary, encode_keys, shared_codes
 def deduplicate_source(src_out: pd.DataFrame, business_key: str, strategy: str = "fail", timestamp_col: str | None = None) -> pd.DataFrame:
     if business_key not in src_out.columns: raise KeyError(f"Business key '{business_key}' not present in transformed output.")
-    dup_mask = src_out.duplicated(subset=[business_key], keep=False)
+    codes = pd.Series(encode_keys(src_out, business_key)); dup_mask = codes.duplicated(keep=False).to_numpy()
     if not dup_mask.any(): return src_out
     if strategy == "fail":
-        dups = src_out[dup_mask].copy()
-        raise ValueError(f"Duplicate business keys found for '{business_key}'. Count={len(dups)}. Sample keys: {list(dups[business_key].dropna().unique()[:10])}")
-    if strategy == "keep_first": return src_out.drop_duplicates(subset=[business_key], keep="first").reset_index(drop=True)
-    if strategy == "keep_last": return src_out.drop_duplicates(subset=[business_key], keep="last").reset_index(drop=True)
+        sample = pd.Series(src_out[business_key].to_numpy()[dup_mask]).dropna().unique()[:10].tolist()
+        raise ValueError(f"Duplicate business keys found for '{business_key}'. Count={int(dup_mask.sum())}. Sample keys: {sample}")
+    if strategy == "keep_first": return src_out[~codes.duplicated(keep="first").to_numpy()].reset_index(drop=True)
+    if strategy == "keep_last": return src_out[~codes.duplicated(keep="last").to_numpy()].reset_index(drop=True)
     if strategy == "by_timestamp":
         if not timestamp_col or timestamp_col not in src_out.columns: raise ValueError("Timestamp column not found for 'by_timestamp' strategy.")
-        ts = pd.to_datetime(src_out[timestamp_col], errors="coerce")
-        ordered = src_out.assign(__ts=ts).sort_values(["__ts"])
-        deduped = ordered.drop_duplicates(subset=[business_key], keep="last").drop(columns=["__ts"])
-        return deduped.reset_index(drop=True)
+        keep = _latest_per_key(codes.to_numpy(), _ts_ns(src_out[timestamp_col]))
+        return src_out.iloc[keep].reset_index(drop=True)
     raise ValueError(f"Unknown deduplication strategy: {strategy}")
+def _ts_ns(s: pd.Series) -> np.ndarray:
+    # NaT maps to int64 min, so rows without a timestamp lose to any dated row
+    return pd.to_datetime(s, errors="coerce", utc=True).to_numpy(dtype="datetime64[ns]").view(np.int64)
+def _latest_per_key(codes: np.ndarray, ts: np.ndarray) -> np.ndarray:
+    """Row positions holding the max timestamp per key (ties: later row wins), in input order."""
+    if len(codes) == 0: return np.empty(0, dtype=np.int64)
+    order = np.lexsort((np.arange(len(codes)), ts, codes)); sc = codes[order]
+    return np.sort(order[np.r_[sc[1:] != sc[:-1], True]])
+def write_duplicate_audit(df: pd.DataFrame, business_key: str, path: str, chunksize: int = 50_000) -> int:
+    """Stream rows whose business key occurs more than once to CSV; returns rows written."""
+    dup_pos = np.flatnonzero(pd.Series(encode_keys(df, business_key)).duplicated(keep=False).to_numpy())
+    if len(dup_pos) == 0: return 0
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        for start in range(0, len(dup_pos), chunksize): df.iloc[dup_pos[start:start+chunksize]].to_csv(f, index=False, header=(start == 0))
+    return int(len(dup_pos))
 def _ensure_cols(df: pd.DataFrame, cols: List[str], default=None):
     for c in cols:
         if c not in df.columns: df[c] = default
     return df
-def scd_type_1(src_out: pd.DataFrame, tgt_existing: Optional[pd.DataFrame], audit_cols: Optional[dict] = None) -> pd.DataFrame:
+def scd_type_1(src_out: pd.DataFrame,
+               tgt_existing: Optional[pd.DataFrame],
+               audit_cols: Optional[dict] = None,
+               keys: Optional[List[str]] = None) -> pd.DataFrame:
+    """Overwrite. Without keys the batch replaces the target (a full image); with keys it is upserted:
+    target rows whose key is in the batch are replaced, the rest are kept (a CDC delta)."""
     df = src_out.copy()
     if audit_cols:
-        for k,v in (audit_cols or {}).items(): df[k] = v
-    return df
+        for k,v in (audit_cols or {}).items():
+            df[k] = v
+    if not keys or tgt_existing is None or tgt_existing.empty:
+        return df
+    tgt_codes, src_codes = shared_codes(tgt_existing, df, keys)
+    keep = ~np.isin(tgt_codes, src_codes[src_codes >= 0])
+    return pd.concat([tgt_existing[keep], df], ignore_index=True)
 def _infer_tracked_if_empty(tracked_cols: List[str], out_cols: List[str], business_key: str) -> List[str]:
     if tracked_cols: return tracked_cols
     tech = {business_key, 'effective_start','effective_end','is_current','version','batch_id','loaded_at'}
     return [c for c in out_cols if c not in tech]
+def _same(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Elementwise a == b on object arrays; null -> null is no change, value <-> null is (pd.NA never reaches ==)."""
+    na_a, na_b = pd.isna(a), pd.isna(b); same = na_a & na_b; both = ~(na_a | na_b)
+    same[both] = (a[both] == b[both]).astype(bool)
+    return same
 def scd_type_2(src_out: pd.DataFrame, tgt_existing: Optional[pd.DataFrame], business_key: str, tracked_cols: List[str] | None,
                eff_start: str='effective_start', eff_end: str='effective_end', current_flag: str='is_current', version_col: str='version',
                surrogate_key_col: Optional[str]=None, as_of: Optional[pd.Timestamp]=None, soft_delete: bool=True,
-               load_mode: str='Snapshot', audit_cols: Optional[dict]=None) -> pd.DataFrame:
+               load_mode: str='Snapshot', audit_cols: Optional[dict]=None,
+               key_dict: Optional[KeyDictionary]=None) -> pd.DataFrame:
     now = as_of or pd.Timestamp.utcnow(); src = src_out.copy()
     tracked_cols = _infer_tracked_if_empty(tracked_cols or [], list(src.columns), business_key)
     if tgt_existing is None or tgt_existing.empty:
@@ -44,46 +77,45 @@ def scd_type_2(src_out: pd.DataFrame, tgt_existing: Optional[pd.DataFrame], busi
     tgt = tgt_existing.copy()
     _ensure_cols(tgt, [eff_start, eff_end, current_flag, version_col], default=pd.NaT)
     tgt[current_flag] = tgt[current_flag].fillna(False).astype(bool)
+    for c in (eff_start, eff_end):  # text (or all-NaN floats) when read back from CSV/SQLite
+        if not pd.api.types.is_datetime64_any_dtype(tgt[c]):
+            tgt[c] = pd.to_datetime(tgt[c], errors="coerce", utc=now.tzinfo is not None, format="mixed").dt.as_unit("ns")
+        elif (tgt[c].dt.tz is None) != (now.tzinfo is None):  # e.g. an all-NaT eff_end from the initial load
+            tgt[c] = tgt[c].dt.tz_localize("UTC") if tgt[c].dt.tz is None else tgt[c].dt.tz_convert(None)
     if surrogate_key_col and surrogate_key_col not in tgt.columns: tgt[surrogate_key_col] = pd.NA
+    # Business keys are matched on int64 codes from one shared dictionary; each source row gets the position
+    # of the current target row for its key (the last one, if several), -1 if none
+    kd = key_dict or KeyDictionary(business_key); tgt_codes = kd.encode(tgt); src_codes = kd.encode(src)
+    cur_pos = np.flatnonzero((tgt[current_flag] == True).to_numpy() & (tgt_codes >= 0))
+    last = ~pd.Index(tgt_codes[cur_pos]).duplicated(keep="last"); at = pd.Index(tgt_codes[cur_pos][last]).get_indexer(src_codes)
+    tpos = np.where(at >= 0, cur_pos[last][np.maximum(at, 0)], -1); hit = tpos >= 0
+    changed = np.zeros(len(src), dtype=bool)
+    for c in tracked_cols:
+        if c not in src.columns or c not in tgt.columns: continue
+        changed[hit] |= ~_same(tgt[c].to_numpy(dtype=object)[tpos[hit]], src[c].to_numpy(dtype=object)[hit])
     result = tgt.copy()
-    current_df = result[result[current_flag] == True].copy()
-    current_map = { r[business_key]: (i, r) for i, r in current_df.iterrows() }
-    next_sk = 1
-    if surrogate_key_col and surrogate_key_col in result.columns:
-        try: next_sk = int(pd.to_numeric(result[surrogate_key_col], errors='coerce').max()) + 1
-        except Exception: next_sk = 1
-    src_keys = set(src[business_key].tolist())
-    for _, newr in src.iterrows():
-        bk = newr[business_key]
-        if bk not in current_map:
-            ins = newr.copy(); ins[eff_start] = now; ins[eff_end] = pd.NaT; ins[current_flag] = True; ins[version_col] = 1
-            if surrogate_key_col: ins[surrogate_key_col] = next_sk; next_sk += 1
-            if audit_cols:
-                for k,v in (audit_cols or {}).items(): ins[k] = v
-            result = pd.concat([result, pd.DataFrame([ins])], ignore_index=True)
-        else:
-            idx, cur = current_map[bk]; changed = False
-            for c in tracked_cols:
-                if c in newr.index and c in cur.index:
-                    if pd.isna(cur[c]) and pd.isna(newr[c]): continue
-                    if (cur[c] != newr[c]): changed = True; break
-            if changed:
-                result.loc[idx, current_flag] = False; result.loc[idx, eff_end] = now
-                new_ins = newr.copy()
-                prev_ver = int(result.loc[idx, version_col]) if pd.notna(result.loc[idx, version_col]) else 1
-                new_ins[version_col] = prev_ver + 1
-                new_ins[eff_start] = now; new_ins[eff_end] = pd.NaT; new_ins[current_flag] = True
-                if surrogate_key_col: new_ins[surrogate_key_col] = next_sk; next_sk += 1
-                if audit_cols:
-                    for k,v in (audit_cols or {}).items(): new_ins[k] = v
-                result = pd.concat([result, pd.DataFrame([new_ins])], ignore_index=True)
+    expire = result.index[tpos[changed]]
+    if len(expire): result.loc[expire, current_flag] = False; result.loc[expire, eff_end] = now
+    add = ~hit | changed
+    new = src[add].copy()
+    if len(new):
+        prev = pd.to_numeric(tgt[version_col], errors="coerce").to_numpy(dtype=float)[np.maximum(tpos[add], 0)]
+        new[eff_start] = now; new[eff_end] = pd.NaT; new[current_flag] = True
+        new[version_col] = np.where(changed[add], np.nan_to_num(prev, nan=1) + 1, 1).astype(np.int64)
+        if surrogate_key_col:
+            try: next_sk = int(pd.to_numeric(result[surrogate_key_col], errors='coerce').max()) + 1
+            except Exception: next_sk = 1
+            new[surrogate_key_col] = np.arange(next_sk, next_sk + len(new))
+        if audit_cols:
+            for k,v in (audit_cols or {}).items(): new[k] = v
     if load_mode == 'Snapshot' and soft_delete:
-        cur_rows = result[result[current_flag] == True]
-        to_expire_idx = cur_rows[~cur_rows[business_key].isin(src_keys)].index
-        if len(to_expire_idx) > 0:
-            result.loc[to_expire_idx, current_flag] = False
-            result.loc[to_expire_idx, eff_end] = now
-    return result
+        # Appended rows all come from src, so only the pre-existing rows can go missing
+        gone = result.index[(result[current_flag] == True).to_numpy() & ~np.isin(tgt_codes, src_codes)]
+        if len(gone): result.loc[gone, current_flag] = False; result.loc[gone, eff_end] = now
+    return pd.concat([result, new], ignore_index=True) if len(new) else result
+def _set(df: pd.DataFrame, rows, col: str, vals: np.ndarray):
+    try: df.loc[rows, col] = vals
+    except TypeError: df[col] = df[col].astype(object); df.loc[rows, col] = vals  # e.g. text into a float column
 def scd_type_3(src_out: pd.DataFrame, tgt_existing: Optional[pd.DataFrame], keys: List[str], tracked_cols: List[str],
                prev_prefix: str='prev_', audit_cols: Optional[dict]=None) -> pd.DataFrame:
     if tgt_existing is None or tgt_existing.empty:
@@ -94,28 +126,27 @@ def scd_type_3(src_out: pd.DataFrame, tgt_existing: Optional[pd.DataFrame], keys
         if audit_cols:
             for k,v in (audit_cols or {}).items(): df[k]=v
         return df
-    tgt = tgt_existing.copy()
-    if isinstance(keys, list):
-        idx_map = {tuple(tgt.loc[i, keys]): i for i in tgt.index}
-    else:
-        idx_map = {tgt.loc[i, keys]: i for i in tgt.index}
-    for _, r in src_out.iterrows():
-        k = tuple(r[keys]) if isinstance(keys, list) else r[keys]
-        if k in idx_map:
-            i = idx_map[k]
-            for c in tracked_cols:
-                prev = f"{prev_prefix}{c}"
-                cur_val = tgt.at[i, c] if c in tgt.columns else pd.NA
-                new_val = r.get(c, pd.NA)
-                if (pd.isna(cur_val) and pd.isna(new_val)) or (cur_val == new_val): continue
-                if prev not in tgt.columns: tgt[prev] = pd.NA
-                tgt.at[i, prev] = cur_val; tgt.at[i, c] = new_val
-        else:
-            newr = r.copy()
-            for c in tracked_cols:
-                prev = f"{prev_prefix}{c}"
-                if prev not in newr.index: newr[prev] = pd.NA
-            tgt = pd.concat([tgt, pd.DataFrame([newr])], ignore_index=True)
+    tgt = tgt_existing.copy(); src = src_out.reset_index(drop=True)
+    kd = KeyDictionary(keys); tgt_codes = kd.encode(tgt); src_codes = kd.encode(src)
+    last = np.flatnonzero(~pd.Index(tgt_codes).duplicated(keep="last") & (tgt_codes >= 0))
+    at = pd.Index(tgt_codes[last]).get_indexer(src_codes); tpos = np.where(at >= 0, last[np.maximum(at, 0)], -1)
+    upd = np.flatnonzero((tpos >= 0) & ~pd.Series(tpos).duplicated(keep="last").to_numpy())  # a key repeated in the batch: its last row wins
+    for c in tracked_cols:
+        prev = f"{prev_prefix}{c}"
+        cur_val = tgt[c].to_numpy(dtype=object)[tpos[upd]] if c in tgt.columns else np.full(len(upd), pd.NA, dtype=object)
+        new_val = src[c].to_numpy(dtype=object)[upd] if c in src.columns else np.full(len(upd), pd.NA, dtype=object)
+        ch = ~_same(cur_val, new_val)
+        if not ch.any(): continue
+        rows = tgt.index[tpos[upd][ch]]
+        if prev not in tgt.columns: tgt[prev] = pd.NA
+        if c not in tgt.columns: tgt[c] = pd.NA
+        _set(tgt, rows, prev, cur_val[ch]); _set(tgt, rows, c, new_val[ch])
+    new = src[tpos < 0].copy()
+    if len(new):
+        for c in tracked_cols:
+            prev = f"{prev_prefix}{c}"
+            if prev not in new.columns: new[prev] = pd.NA
+        tgt = pd.concat([tgt, new], ignore_index=True)
     if audit_cols:
         for k,v in (audit_cols or {}).items():
             tgt[k] = v
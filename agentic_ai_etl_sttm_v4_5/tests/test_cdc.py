@@ -0,0 +1,95 @@
+import os, sys, sqlite3
+import pandas as pd
+
+APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP)
+from etl.cdc import source_id, make_watermark, get_watermark
+from etl.io_local import (read_source_csv_incremental, read_source_sqlite_incremental, write_target_csv, read_target_csv,
+                          write_target_sqlite, read_target_sqlite)
+from etl.scd_handler import scd_type_1, scd_type_2, scd_type_3
+
+def _src(tmp_path):
+    path = tmp_path / "src.csv"
+    pd.DataFrame({"id": [1, 2, 3], "name": ["a", "b", "c"], "updated_at": ["2024-01-01", "2024-01-02", "2024-01-03"]}).to_csv(path, index=False)
+    return str(path)
+
+def _append(path, line):
+    with open(path, "a") as f: f.write(line + "\n")
+
+def test_watermark_round_trip_csv_and_sqlite(tmp_path):
+    sid = source_id("CSV", "src.csv"); df = pd.DataFrame({"id": [1]})
+    write_target_csv(df, str(tmp_path / "out" / "dim.csv"), watermark=make_watermark(sid, "column", pd.Timestamp("2024-01-03", tz="UTC"), "updated_at"))
+    assert get_watermark("CSV", str(tmp_path / "out" / "dim.csv"), sid) == make_watermark(sid, "column", "2024-01-03T00:00:00+00:00", "updated_at")
+    db = str(tmp_path / "out" / "t.db")
+    write_target_sqlite(df, db, "dim", watermark=make_watermark(sid, "offset", 42))
+    write_target_sqlite(df, db, "dim", watermark=make_watermark(sid, "offset", 84))  # upsert, not a second row
+    assert get_watermark("SQLite", db, sid) == make_watermark(sid, "offset", 84)
+    assert get_watermark("SQLite", db, source_id("CSV", "other.csv")) is None
+
+def test_column_mode_second_pull_is_empty(tmp_path):
+    path = _src(tmp_path)
+    df, wm = read_source_csv_incremental(path, "column", "updated_at", None)
+    assert len(df) == 3 and wm == "2024-01-03T00:00:00+00:00"
+    df, wm2 = read_source_csv_incremental(path, "column", "updated_at", wm)
+    assert df.empty and list(df.columns) == ["id", "name", "updated_at"] and wm2 == wm
+    _append(path, "4,d,2024-01-04")
+    df, _ = read_source_csv_incremental(path, "column", "updated_at", wm)
+    assert df["id"].tolist() == [4]
+
+def test_offset_mode_reads_appended_rows_only(tmp_path):
+    path = _src(tmp_path)
+    df, off = read_source_csv_incremental(path, "offset", None, None)
+    assert len(df) == 3 and off == os.path.getsize(path)
+    df, off2 = read_source_csv_incremental(path, "offset", None, off)
+    assert df.empty and off2 == off
+    _append(path, "4,d,2024-01-04")
+    with open(path, "a") as f: f.write("5,e,2024")  # half-written line waits for the next pull
+    df, off3 = read_source_csv_incremental(path, "offset", None, off)
+    assert df["id"].tolist() == [4] and off3 < os.path.getsize(path)
+
+def test_mtime_mode_rereads_only_when_touched(tmp_path):
+    path = _src(tmp_path)
+    df, mt = read_source_csv_incremental(path, "mtime", None, None)
+    assert len(df) == 3
+    df, mt2 = read_source_csv_incremental(path, "mtime", None, mt)
+    assert df.empty and mt2 == mt
+    os.utime(path, (mt + 10, mt + 10))
+    df, mt3 = read_source_csv_incremental(path, "mtime", None, mt)
+    assert len(df) == 3 and mt3 == mt + 10
+
+def test_sqlite_source_second_pull_is_empty(tmp_path):
+    db = str(tmp_path / "src.db")
+    with sqlite3.connect(db) as con: pd.read_csv(_src(tmp_path)).to_sql("customers", con, index=False)
+    df, wm = read_source_sqlite_incremental(db, "customers", "updated_at", None)
+    assert len(df) == 3 and wm == "2024-01-03"
+    df, wm2 = read_source_sqlite_incremental(db, "customers", "updated_at", wm)
+    assert df.empty and wm2 == wm
+
+def test_scd2_reloads_read_back_target(tmp_path):
+    src = pd.read_csv(os.path.join(APP, "data", "sample_initial.csv"))
+    delta = pd.read_csv(os.path.join(APP, "data", "sample_delta.csv"))
+    kw = dict(business_key="customer_id", tracked_cols=["email", "city"], load_mode="Incremental")
+    csv, db = str(tmp_path / "out" / "dim.csv"), str(tmp_path / "out" / "t.db")
+    write_target_csv(scd_type_2(src, None, **kw), csv)
+    write_target_sqlite(scd_type_2(src, None, **kw), db, "dim")
+    for read, write in ((lambda: read_target_csv(csv), lambda d: write_target_csv(d, csv)),
+                        (lambda: read_target_sqlite(db, "dim"), lambda d: write_target_sqlite(d, db, "dim"))):
+        once = scd_type_2(delta, read(), **kw); write(once)
+        twice = scd_type_2(delta, read(), **kw)  # the same delta again changes nothing
+        assert len(twice) == len(once) > len(src)
+        assert twice.groupby("customer_id")["is_current"].sum().eq(1).all()
+
+def test_scd1_delta_is_upserted_not_written_over(tmp_path):
+    csv = str(tmp_path / "out" / "dim.csv")
+    write_target_csv(scd_type_1(pd.read_csv(os.path.join(APP, "data", "sample_initial.csv")), None), csv)
+    before = read_target_csv(csv)
+    delta = pd.read_csv(os.path.join(APP, "data", "sample_delta.csv"))
+    after = scd_type_1(delta, before, keys=["customer_id"])
+    assert len(after) == len(set(before["customer_id"]) | set(delta["customer_id"]))
+    assert after.set_index("customer_id").loc[delta["customer_id"], "email"].tolist() == delta["email"].tolist()
+
+def test_scd3_keeps_previous_value_with_nullable_columns():
+    tgt = scd_type_3(pd.DataFrame({"id": [1, 2, 3], "tier": pd.array([1, pd.NA, 3], dtype="Int64")}), None, ["id"], ["tier"])
+    out = scd_type_3(pd.DataFrame({"id": [1, 2, 4], "tier": pd.array([5, pd.NA, pd.NA], dtype="Int64")}), tgt, ["id"], ["tier"])
+    assert out["id"].tolist() == [1, 2, 3, 4] and out["tier"].tolist()[:3] == [5, pd.NA, 3]
+    assert out["prev_tier"].tolist()[:3] == [1, pd.NA, pd.NA]
@@ -10,5 +10,5 @@ class DQAgent:
     def propose_rules(self, df: pd.DataFrame, primary_keys: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         return R.propose_rules(df, primary_keys)
 
-    def run_checks(self, df: pd.DataFrame, rules: List[Dict[str, Any]]) -> Dict[str, Any]:
-        return R.run_checks(df, rules)
+    def run_checks(self, df: pd.DataFrame, rules: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        return R.run_checks(df, rules, **kwargs)
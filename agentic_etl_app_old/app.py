@@ -1,16 +1,15 @@
 from __future__ import annotations
 import streamlit as st, pandas as pd, os, io, json, uuid, datetime as dt
+from functools import partial
 from utils.session_store import load_state, save_state
-from connectors.local_csv import write_df as write_local_df, read_local_csv
-from connectors.s3_connector import S3Connector
-from connectors.snowflake_connector import SnowflakeConnector
-from connectors.redshift_connector import RedshiftConnector
-from connectors.databricks_connector import DatabricksConnector
+from connectors.local_csv import write_df as write_local_df, write_chunks as write_local_chunks, read_local_csv
+from connectors.registry import connect
 from agents.dq_agent import DQAgent
+from utils.dq_rules import critical_failed
 from agents.transform_agent import TransformAgent
-from agents.report_agent import render_report_html, save_html_and_pdf
-from utils.emailer import send_email_smtp, send_email_ses
-from utils.sttm_parser import load_sttm_excel, build_integration_plan, project_columns, get_scd_for_target, get_keys_for_target, build_dwh_targets
+from agents.report_agent import render_report_html, save_html_and_pdf, pdf_result
+from utils.emailer import send_email_smtp, send_email_ses, DeliveryQueue
+from utils.sttm_parser import load_sttm_plan, project_columns
 
 st.set_page_config(page_title="Agentic AI ETL", layout="wide")
 st.title("🤖 Agentic AI ETL – Interactive POC")
@@ -19,6 +18,11 @@ state = load_state()
 if "run_id" not in state:
     state["run_id"] = uuid.uuid4().hex[:8]
 
+def landing_frame() -> pd.DataFrame:
+    # S3 loads stream to a landing file and keep only its path; uploads keep the CSV text
+    if state.get("landing_path"): return read_local_csv(state["landing_path"])
+    return pd.read_csv(io.StringIO(state["landing_df_csv"]))
+
 with st.sidebar:
     st.header("Navigate")
     step = st.radio("Go to step:", ["1) Configure", "2) Landing Load", "3) DQ Rules", "4) Integration", "5) DWH", "6) Reporting", "7) Batch Runner"], index=0, key="nav_step")
@@ -37,7 +41,7 @@ if step.startswith("1"):
                 state["dataset_name"] = os.path.splitext(up.name)[0]
                 state["uploaded_csv_bytes"] = up.read()
         else:
-            s3_path = st.text_input("S3 URI (s3://bucket/key.csv)", value=state.get("source_s3_uri",""), key="cfg_source_s3_uri")
+            s3_path = st.text_input("S3 URI (s3://bucket/key.csv, .csv.gz, .parquet)", value=state.get("source_s3_uri",""), key="cfg_source_s3_uri")
             state["source_s3_uri"] = s3_path
     with c2:
         st.markdown("**Targets**")
@@ -85,7 +89,7 @@ if step.startswith("1"):
 
     with st.expander("Email (SMTP/SES)", expanded=False):
         state["email_sender"] = st.text_input("Sender email", value=state.get("email_sender",""), key="cfg_email_sender")
-        state["email_to"] = st.text_input("Recipient emails (comma)", value=state.get("email_to",""), key="cfg_email_to")
+        state["email_to"] = st.text_input("Recipient emails (comma; separate groups with ;)", value=state.get("email_to",""), key="cfg_email_to")
         state["email_method"] = st.selectbox("Method", ["SMTP","SES"], index=["SMTP","SES"].index(state.get("email_method","SMTP")), key="cfg_email_method")
         state["smtp_host"] = st.text_input("SMTP host", value=state.get("smtp_host","smtp.gmail.com"), key="cfg_smtp_host")
         state["smtp_port"] = st.number_input("SMTP port", value=int(state.get("smtp_port",587)), key="cfg_smtp_port")
@@ -112,7 +116,7 @@ if step.startswith("1"):
             state["landing_target"] = tmap[intent["targets"]]; state["integration_target"] = tmap[intent["targets"]]; state["dwh_target"] = tmap[intent["targets"]]
             path = write_local_df(customers_df, "landing", "customers")
             state["landing_info"] = {"records": len(customers_df), "columns": list(customers_df.columns), "location": path}
-            state["landing_df_csv"] = customers_df.to_csv(index=False)
+            state["landing_df_csv"] = customers_df.to_csv(index=False); state.pop("landing_path", None)
             dq = DQAgent(); rules = dq.propose_rules(customers_df, ["customer_id"]); report = dq.run_checks(customers_df, rules)
             state["dq_rules"]=rules; state["dq_report"]=report; state["dq_override"]=True
             save_state(state); st.success("Prepped samples. Proceed to Integration and DWH using STTM, then Reporting.")
@@ -137,33 +141,38 @@ elif step.startswith("2"):
                     location = write_local_df(df, "landing", name)
                     rows_written = len(df)
                 elif target == "S3":
-                    s3 = S3Connector(region=state.get("s3_region","us-east-1"))
+                    s3 = connect("s3", region=state.get("s3_region","us-east-1"))
                     uri = f"s3://{state.get('s3_bucket')}/{state.get('s3_prefix','agentic-etl')}/landing/{name}.csv"
-                    s3.write_csv(df, uri); location = uri; rows_written = len(df)
+                    s3.write(df, uri); location = uri; rows_written = len(df)
                 else:
                     st.info("For DB landing, integration writes will create tables; landing as Local/S3 is sufficient for POC.")
                 state["landing_info"] = {"records": rows_written, "columns": list(df.columns), "location": location}
-                state["landing_df_csv"] = df.to_csv(index=False)
+                state["landing_df_csv"] = df.to_csv(index=False); state.pop("landing_path", None)
                 save_state(state)
                 st.success(f"Landing written: {rows_written} rows → {location}")
     else:
         s3_uri = state.get("source_s3_uri","")
         if st.button("Load from S3", key="land_load_s3"):
-            s3 = S3Connector(region=state.get("s3_region","us-east-1"))
-            df = s3.read_csv(s3_uri)
-            st.dataframe(df.head(20))
-            state["dataset_name"] = os.path.splitext(os.path.basename(s3_uri))[0]
-            state["landing_df_csv"] = df.to_csv(index=False)
-            state["landing_info"] = {"records": len(df), "columns": list(df.columns), "location": s3_uri}
-            save_state(state)
+            s3 = connect("s3", region=state.get("s3_region","us-east-1"))
+            name = os.path.splitext(os.path.basename(s3_uri))[0]
+            # .csv, .csv.gz, .csv.zst or .parquet, streamed chunk by chunk onto data/landing/<name>.csv
+            path, rows, head = write_local_chunks(s3.iter_chunks(s3_uri), "landing", name)
+            if head is None:
+                st.warning(f"No rows in {s3_uri}.")
+            else:
+                st.dataframe(head)
+                state["dataset_name"] = name
+                state["landing_path"] = path; state.pop("landing_df_csv", None)
+                state["landing_info"] = {"records": rows, "columns": list(head.columns), "location": s3_uri}
+                save_state(state)
 
 # ----------------------------- Step 3 -----------------------------
 elif step.startswith("3"):
     st.subheader("3) DQ Rules")
-    if "landing_df_csv" not in state:
+    if "landing_df_csv" not in state and not state.get("landing_path"):
         st.warning("Run Landing first.")
     else:
-        df = pd.read_csv(io.StringIO(state["landing_df_csv"]))
+        df = landing_frame()
         st.dataframe(df.head(20))
         default_pk = [c for c in df.columns if c.lower()=="id" or c.lower().endswith("_id")]
         pk_text = st.text_input("Primary keys (comma)", value=",".join(default_pk) if default_pk else "", key="dq_pk")
@@ -175,21 +184,27 @@ elif step.startswith("3"):
         rules = state.get("dq_rules", [])
         if rules:
             st.json(rules)
+            fail_fast = st.checkbox("Stop at the first CRITICAL failure (fail-fast)", value=state.get("dq_fail_fast", False), key="dq_fail_fast")
+            state["dq_fail_fast"] = bool(fail_fast)
             if st.button("Run DQ", key="dq_run"):
-                report = dq.run_checks(df, rules)
+                report = dq.run_checks(df, rules, fail_fast=fail_fast)
                 st.json(report["summary"])
+                if report["summary"]["aborted"]:
+                    st.error(f"CRITICAL rule failed; {report['summary']['skipped']} remaining rule(s) skipped.")
                 state["dq_report"] = report; save_state(state)
         if state.get("dq_report"):
-            crit_fail = any((r["severity"]=="CRITICAL" and not r["passed"]) for r in state["dq_report"]["results"])
+            with st.expander("Per-rule results and timing"):
+                st.dataframe(pd.DataFrame(state["dq_report"]["results"]).sort_values("elapsed_ms", ascending=False), use_container_width=True)
+            crit_fail = critical_failed(state["dq_report"])
             approve = st.checkbox("Approve to proceed despite CRITICAL failures", value=state.get("dq_override", not crit_fail), key="dq_approve")
             state["dq_override"] = bool(approve); save_state(state)
 
 # ----------------------------- Step 4 -----------------------------
 elif step.startswith("4"):
     st.subheader("4) Integration Layer")
-    if "landing_df_csv" not in state or not state.get("dq_override", False):
+    if ("landing_df_csv" not in state and not state.get("landing_path")) or not state.get("dq_override", False):
         st.warning("Need Landing data and DQ approval first."); st.stop()
-    landing_df = pd.read_csv(io.StringIO(state["landing_df_csv"]))
+    landing_df = landing_frame()
     st.write("Landing sample:"); st.dataframe(landing_df.head(20))
 
     use_sttm = st.checkbox("Use Excel STTM (sttm/STTM_template.xlsx) for integration", value=True, key="int_use_sttm")
@@ -197,10 +212,11 @@ elif step.startswith("4"):
     ref_df_map = {}
     if use_sttm:
         try:
-            sttm_df = load_sttm_excel(os.path.join("sttm","STTM_template.xlsx"))
-            integ_targets = sorted(sttm_df[sttm_df["Target Schema"].str.lower()=="integration"]["Target Table"].unique().tolist())
+            sttm_plan = load_sttm_plan(os.path.join("sttm","STTM_template.xlsx"))
+            integ_targets = sttm_plan.tables("integration")
             target_choice = st.selectbox("Pick Integration target (from STTM)", integ_targets, index=0, key="int_target_choice")
-            plan = build_integration_plan(sttm_df, target_choice)
+            tplan = sttm_plan.target("integration", target_choice)
+            plan = tplan.integration_plan()
             for r in plan["refs"]:
                 name = r["name"]
                 csv_path = os.path.join("data","samples", f"{name}.csv")
@@ -214,8 +230,8 @@ elif step.startswith("4"):
                 if name in ref_df_map:
                     df_map[("reference", name)] = ref_df_map[name]
             integrated = project_columns(df_map, plan["projection"])
-            scd_type = get_scd_for_target(sttm_df, "integration", target_choice, default_scd=state.get("scd_type","SCD1"))
-            keys = get_keys_for_target(sttm_df, "integration", target_choice)
+            scd_type = tplan.scd_or(state.get("scd_type","SCD1"))
+            keys = list(tplan.keys)
             # Editable defaults from STTM
             scd_type = st.selectbox("SCD type (from STTM, editable)", ["SCD1","SCD2","SCD3"], index=["SCD1","SCD2","SCD3"].index(scd_type if scd_type in ["SCD1","SCD2","SCD3"] else "SCD1"), key="integ_scd_select")
             keys_text = st.text_input("Business key columns (from STTM, editable)", ",".join(keys), key="integ_keys_input")
@@ -244,13 +260,13 @@ elif step.startswith("4"):
             merged = TransformAgent().scd_load(existing, integrated, scd_type, keys or [])
             location = write_local_df(merged, "integration", table_name); rows_written = len(merged)
         elif target == "S3":
-            s3 = S3Connector(region=state.get("s3_region","us-east-1"))
+            s3 = connect("s3", region=state.get("s3_region","us-east-1"))
             uri = f"s3://{state.get('s3_bucket')}/{state.get('s3_prefix','agentic-etl')}/integration/{table_name}.csv"
             s3.write_csv(integrated, uri); location = uri; rows_written = len(integrated)
         elif target == "Snowflake":
-            sf = SnowflakeConnector(state.get("sf_user",""), state.get("sf_password",""), state.get("sf_account",""), state.get("sf_warehouse",""), state.get("sf_database",""), state.get("sf_schema",""), state.get("sf_role") or None)
+            sf = connect("snowflake", state.get("sf_user",""), state.get("sf_password",""), state.get("sf_account",""), state.get("sf_warehouse",""), state.get("sf_database",""), state.get("sf_schema",""), state.get("sf_role") or None)
             if use_s3_copy:
-                from connectors.s3_connector import S3Connector as _S3; s3 = _S3(region=state.get("s3_region","us-east-1"))
+                s3 = connect("s3", region=state.get("s3_region","us-east-1"))
                 copy_uri = f"{copy_prefix.rstrip('/')}/{table_name}_{state['run_id']}.csv"; s3.write_csv(integrated, copy_uri)
                 cols = ", ".join([f'"{c}" VARCHAR' for c in integrated.columns]); sf.execute(f'create table if not exists {table_name} ({cols})')
                 sf.copy_from_s3(table_name, copy_uri, aws_key_id=state.get("aws_key"), aws_secret_key=state.get("aws_secret"))
@@ -264,9 +280,9 @@ elif step.startswith("4"):
             else:
                 rows_written = sf.write_df(integrated, table=table_name, overwrite=False); location = f"SNOWFLAKE::{state.get('sf_database','')}.{state.get('sf_schema','')}.{table_name}"
         elif target == "Redshift":
-            rs = RedshiftConnector(state.get("rs_host",""), int(state.get("rs_port","5439")), state.get("rs_db",""), state.get("rs_user",""), state.get("rs_password",""), ssl=True)
+            rs = connect("redshift", state.get("rs_host",""), int(state.get("rs_port","5439")), state.get("rs_db",""), state.get("rs_user",""), state.get("rs_password",""), ssl=True)
             if use_s3_copy:
-                from connectors.s3_connector import S3Connector as _S3; s3 = _S3(region=state.get("s3_region","us-east-1"))
+                s3 = connect("s3", region=state.get("s3_region","us-east-1"))
                 copy_uri = f"{copy_prefix.rstrip('/')}/{table_name}_{state['run_id']}.csv"; s3.write_csv(integrated, copy_uri)
                 cols = ", ".join([f'"{c}" varchar' for c in integrated.columns]); rs.execute(f'create table if not exists {table_name} ({cols});')
                 rs.copy_from_s3(table_name, copy_uri, iam_role=None, aws_key_id=state.get("aws_key"), aws_secret_key=state.get("aws_secret"), region=state.get("s3_region"))
@@ -283,10 +299,10 @@ elif step.startswith("4"):
             else:
                 rows_written = rs.write_df(integrated, table=table_name, overwrite=False); location = f"REDSHIFT::{state.get('rs_db','')}.public.{table_name}"
         elif target == "Databricks":
-            dbc = DatabricksConnector(state.get("db_host",""), state.get("db_http",""), state.get("db_token",""), state.get("db_catalog") or None, state.get("db_schema") or None)
+            dbc = connect("databricks", state.get("db_host",""), state.get("db_http",""), state.get("db_token",""), state.get("db_catalog") or None, state.get("db_schema") or None)
             if use_s3_copy:
                 cols = ", ".join([f"`{c}` string" for c in integrated.columns]); dbc.execute(f"create table if not exists {dbc.qualified(table_name)} ({cols}) using delta")
-                copy_uri = f"{copy_prefix.rstrip('/')}/{table_name}_{state['run_id']}.csv"; from connectors.s3_connector import S3Connector as _S3; _S3(state.get("s3_region","us-east-1")).write_csv(integrated, copy_uri)
+                copy_uri = f"{copy_prefix.rstrip('/')}/{table_name}_{state['run_id']}.csv"; connect("s3", state.get("s3_region","us-east-1")).write_csv(integrated, copy_uri)
                 dbc.copy_into_from_s3(table_name, copy_uri)
                 if use_merge and keys:
                     stg = f"{table_name}__copy_stg"; dbc.execute(f"drop table if exists {dbc.qualified(stg)}"); dbc.execute(f"create table {dbc.qualified(stg)} ({cols}) using delta")
@@ -314,11 +330,12 @@ elif step.startswith("5"):
     use_sttm_dwh = st.checkbox("Use Excel STTM (sttm/STTM_template.xlsx) for DWH build", value=True, key="dwh_use_sttm")
     if use_sttm_dwh:
         try:
-            sttm_df = load_sttm_excel(os.path.join("sttm","STTM_template.xlsx"))
-            dwh_targets = build_dwh_targets(sttm_df)
+            sttm_plan = load_sttm_plan(os.path.join("sttm","STTM_template.xlsx"))
+            dwh_targets = sttm_plan.tables("dwh")
             dwh_table = st.selectbox("Pick DWH target (from STTM)", dwh_targets, index=0, key="dwh_table_choice")
-            scd_type = get_scd_for_target(sttm_df, "dwh", dwh_table, default_scd="SCD1")
-            keys = get_keys_for_target(sttm_df, "dwh", dwh_table)
+            tplan = sttm_plan.target("dwh", dwh_table)
+            scd_type = tplan.scd_or("SCD1")
+            keys = list(tplan.keys)
             # Editable defaults from STTM
             scd_type = st.selectbox("SCD type (from STTM, editable)", ["SCD1","SCD2","SCD3"], index=["SCD1","SCD2","SCD3"].index(scd_type if scd_type in ["SCD1","SCD2","SCD3"] else "SCD1"), key="dwh_scd_select")
             keys_text = st.text_input("Business key columns (from STTM, editable)", ",".join(keys), key="dwh_keys_input")
@@ -344,12 +361,12 @@ elif step.startswith("5"):
             merged = TransformAgent().scd_load(existing, integ_df, scd_type, keys or [])
             location = write_local_df(merged, "dwh", table_name); rows_written = len(merged)
         elif target == "S3":
-            s3 = S3Connector(region=state.get("s3_region","us-east-1")); uri = f"s3://{state.get('s3_bucket')}/{state.get('s3_prefix','agentic-etl')}/dwh/{table_name}.csv"
+            s3 = connect("s3", region=state.get("s3_region","us-east-1")); uri = f"s3://{state.get('s3_bucket')}/{state.get('s3_prefix','agentic-etl')}/dwh/{table_name}.csv"
             s3.write_csv(integ_df, uri); location = uri; rows_written = len(integ_df)
         elif target == "Snowflake":
-            sf = SnowflakeConnector(state.get("sf_user",""), state.get("sf_password",""), state.get("sf_account",""), state.get("sf_warehouse",""), state.get("sf_database",""), state.get("sf_schema",""), state.get("sf_role") or None)
+            sf = connect("snowflake", state.get("sf_user",""), state.get("sf_password",""), state.get("sf_account",""), state.get("sf_warehouse",""), state.get("sf_database",""), state.get("sf_schema",""), state.get("sf_role") or None)
             if use_s3_copy:
-                from connectors.s3_connector import S3Connector as _S3; s3 = _S3(region=state.get("s3_region","us-east-1"))
+                s3 = connect("s3", region=state.get("s3_region","us-east-1"))
                 copy_uri = f"{copy_prefix.rstrip('/')}/{table_name}_{state['run_id']}.csv"; s3.write_csv(integ_df, copy_uri)
                 cols = ", ".join([f'"{c}" VARCHAR' for c in integ_df.columns]); sf.execute(f'create table if not exists {table_name} ({cols})')
                 sf.copy_from_s3(table_name, copy_uri, aws_key_id=state.get("aws_key"), aws_secret_key=state.get("aws_secret"))
@@ -363,9 +380,9 @@ elif step.startswith("5"):
             else:
                 rows_written = sf.write_df(integ_df, table=table_name, overwrite=True); location = f"SNOWFLAKE::{state.get('sf_database','')}.{state.get('sf_schema','')}.{table_name}"
         elif target == "Redshift":
-            rs = RedshiftConnector(state.get("rs_host",""), int(state.get("rs_port","5439")), state.get("rs_db",""), state.get("rs_user",""), state.get("rs_password",""), ssl=True)
+            rs = connect("redshift", state.get("rs_host",""), int(state.get("rs_port","5439")), state.get("rs_db",""), state.get("rs_user",""), state.get("rs_password",""), ssl=True)
             if use_s3_copy:
-                from connectors.s3_connector import S3Connector as _S3; s3 = _S3(region=state.get("s3_region","us-east-1"))
+                s3 = connect("s3", region=state.get("s3_region","us-east-1"))
                 copy_uri = f"{copy_prefix.rstrip('/')}/{table_name}_{state['run_id']}.csv"; s3.write_csv(integ_df, copy_uri)
                 cols = ", ".join([f'"{c}" varchar' for c in integ_df.columns]); rs.execute(f'create table if not exists {table_name} ({cols});')
                 rs.copy_from_s3(table_name, copy_uri, iam_role=None, aws_key_id=state.get("aws_key"), aws_secret_key=state.get("aws_secret"), region=state.get("s3_region"))
@@ -382,10 +399,10 @@ elif step.startswith("5"):
             else:
                 rows_written = rs.write_df(integ_df, table=table_name, overwrite=True); location = f"REDSHIFT::{state.get('rs_db','')}.public.{table_name}"
         elif target == "Databricks":
-            dbc = DatabricksConnector(state.get("db_host",""), state.get("db_http",""), state.get("db_token",""), state.get("db_catalog") or None, state.get("db_schema") or None)
+            dbc = connect("databricks", state.get("db_host",""), state.get("db_http",""), state.get("db_token",""), state.get("db_catalog") or None, state.get("db_schema") or None)
             if use_s3_copy:
                 cols = ", ".join([f"`{c}` string" for c in integ_df.columns]); dbc.execute(f"create table if not exists {dbc.qualified(table_name)} ({cols}) using delta")
-                copy_uri = f"{copy_prefix.rstrip('/')}/{table_name}_{state['run_id']}.csv"; from connectors.s3_connector import S3Connector as _S3; _S3(state.get("s3_region","us-east-1")).write_csv(integ_df, copy_uri)
+                copy_uri = f"{copy_prefix.rstrip('/')}/{table_name}_{state['run_id']}.csv"; connect("s3", state.get("s3_region","us-east-1")).write_csv(integ_df, copy_uri)
                 dbc.copy_into_from_s3(table_name, copy_uri)
                 if use_merge and keys:
                     stg = f"{table_name}__copy_stg"; dbc.execute(f"drop table if exists {dbc.qualified(stg)}"); dbc.execute(f"create table {dbc.qualified(stg)} ({cols}) using delta")
@@ -406,55 +423,75 @@ elif step.startswith("6"):
     st.subheader("6) Reporting")
     if not all(k in state for k in ["landing_info","dq_report","integration_info","dwh_info"]):
         st.warning("Run previous steps first."); st.stop()
-    context = {
-        "run_id": state["run_id"],
-        "when": dt.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC"),
-        "config": {
-            "source_type": state.get("source_type"),
-            "landing_target": state.get("landing_target"),
-            "integration_target": state.get("integration_target"),
-            "dwh_target": state.get("dwh_target"),
-        },
-        "landing": state.get("landing_info",{}),
-        "dq": state.get("dq_report",{}),
-        "integration": state.get("integration_info",{}),
-        "dwh": state.get("dwh_info",{}),
-    }
-    html = render_report_html("templates", context)
-    out_dir = os.path.join("data","reports", state["run_id"])
-    paths = save_html_and_pdf(html, out_dir, "run_report")
-    st.success(f"Report generated: {paths['html']} {'& ' + paths['pdf'] if paths['pdf'] else ''}")
-    st.markdown(f"[Open HTML]({paths['html']})", unsafe_allow_html=True)
-    if paths['pdf']:
-        st.markdown(f"[Open PDF]({paths['pdf']})", unsafe_allow_html=True)
-    if st.checkbox("Email the report now", key="rep_email_now"):
-        sender = state.get("email_sender"); recipients = [x.strip() for x in state.get("email_to","").split(",") if x.strip()]
-        subject = f"Agentic ETL Report {state['run_id']}"
-        if state.get("email_method","SMTP") == "SMTP":
-            send_email_smtp(state.get("smtp_host","smtp.gmail.com"), int(state.get("smtp_port",587)), state.get("smtp_user"), state.get("smtp_pass"), sender, recipients, subject, html, [p for p in paths.values() if p])
-        else:
-            send_email_ses(state.get("ses_region","us-east-1"), sender, recipients, subject, html, [p for p in paths.values() if p])
-        st.success("Email dispatched.")
+    rep = state.get("report") if (state.get("report") or {}).get("run_id") == state["run_id"] else None
+    if st.button("Regenerate report" if rep else "Generate report", key="rep_generate"):
+        context = {
+            "run_id": state["run_id"],
+            "when": dt.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC"),
+            "config": {
+                "source_type": state.get("source_type"),
+                "landing_target": state.get("landing_target"),
+                "integration_target": state.get("integration_target"),
+                "dwh_target": state.get("dwh_target"),
+            },
+            "landing": state.get("landing_info",{}),
+            "dq": state.get("dq_report",{}),
+            "integration": state.get("integration_info",{}),
+            "dwh": state.get("dwh_info",{}),
+        }
+        html = render_report_html("templates", context)
+        out_dir = os.path.join("data","reports", state["run_id"])
+        paths = save_html_and_pdf(html, out_dir, "run_report", wait=False)
+        rep = state["report"] = {"run_id": state["run_id"], "html": paths["html"], "pdf": ""}
+        state["report_pdf_pending"] = paths["pdf_pending"]; save_state(state)
+    if not rep:
+        st.info("The report is rendered once per run; generate it when the steps above are final.")
+    else:
+        st.success(f"Report generated: {rep['html']}")
+        st.markdown(f"[Open HTML]({rep['html']})", unsafe_allow_html=True)
+        if state.get("report_pdf_pending"):
+            pdf = pdf_result(state["report_pdf_pending"])
+            if pdf is None: st.caption("PDF is rendering in the background; rerun this step to pick it up.")
+            else:
+                rep["pdf"] = pdf; state.pop("report_pdf_pending"); save_state(state)
+        if rep["pdf"]:
+            st.markdown(f"[Open PDF]({rep['pdf']})", unsafe_allow_html=True)
+        if st.button("Email the report now", key="rep_email_now"):
+            if state.get("report_pdf_pending"):  # the attachment has to exist
+                rep["pdf"] = pdf_result(state.pop("report_pdf_pending"), timeout=None) or ""; save_state(state)
+            with open(rep["html"], "r", encoding="utf-8") as f: html = f.read()
+            sender = state.get("email_sender")
+            groups = [[x.strip() for x in g.split(",") if x.strip()] for g in state.get("email_to","").split(";")]
+            subject = f"Agentic ETL Report {state['run_id']}"
+            if state.get("email_method","SMTP") == "SMTP":
+                send = partial(send_email_smtp, state.get("smtp_host","smtp.gmail.com"), int(state.get("smtp_port",587)), state.get("smtp_user"), state.get("smtp_pass"), sender)
+            else:
+                send = partial(send_email_ses, state.get("ses_region","us-east-1"), sender)
+            with DeliveryQueue(send, workers=4, rate_per_sec=float(os.environ.get("EMAIL_RATE_PER_SEC", 5))) as q:
+                sent = q.deliver_all([{"recipients": g, "subject": subject, "html_body": html, "attachments": [p for p in (rep["html"], rep["pdf"]) if p]} for g in groups if g])
+            for r in sent:
+                if not r["ok"]: st.error(f"Email to {', '.join(r['recipients'])} failed: {r['error']}")
+            st.success(f"Email dispatched to {sum(r['ok'] for r in sent)}/{len(sent)} groups.")
 
 # ----------------------------- Step 7 -----------------------------
 else:
     st.subheader("7) Batch Runner (from STTM)")
     try:
-        sttm_df = load_sttm_excel(os.path.join("sttm","STTM_template.xlsx"))
-        integ_targets = sorted(sttm_df[sttm_df["Target Schema"].str.lower()=="integration"]["Target Table"].unique().tolist())
-        dwh_targets = sorted(sttm_df[sttm_df["Target Schema"].str.lower()=="dwh"]["Target Table"].unique().tolist())
+        sttm_plan = load_sttm_plan(os.path.join("sttm","STTM_template.xlsx"))
+        integ_targets = sttm_plan.tables("integration")
+        dwh_targets = sttm_plan.tables("dwh")
         st.write(f"Integration targets: {integ_targets}")
         st.write(f"DWH targets: {dwh_targets}")
         if st.button("Run all (local CSV only)", key="batch_run_all"):
             import pandas as _pd
             customers_df = _pd.read_csv("data/samples/customers.csv"); orders_df = _pd.read_csv("data/samples/orders.csv")
             write_local_df(customers_df, "landing", "customers"); write_local_df(orders_df, "landing", "orders")
-            plan = build_integration_plan(sttm_df, "customers_int")
+            plan = sttm_plan.target("integration", "customers_int").integration_plan()
             dim_country = _pd.read_csv("data/samples/dim_country.csv")
             left = customers_df.merge(dim_country, left_on=plan["left_on"][0], right_on=plan["refs"][0]["df_key"], how="left")
             df_map = {("landing","customers"): left, ("reference","dim_country"): dim_country}
             integ_c = project_columns(df_map, plan["projection"]); write_local_df(integ_c, "integration", "customers_int")
-            plan2 = build_integration_plan(sttm_df, "orders_int")
+            plan2 = sttm_plan.target("integration", "orders_int").integration_plan()
             dim_product = _pd.read_csv("data/samples/dim_product.csv")
             left2 = orders_df.merge(dim_product, left_on=plan2["left_on"][0], right_on=plan2["refs"][0]["df_key"], how="left")
             df_map2 = {("landing","orders"): left2, ("reference","dim_product"): dim_product}
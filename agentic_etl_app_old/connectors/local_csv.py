@@ -15,3 +15,14 @@ def write_df(df: pd.DataFrame, layer: str, name: str) -> str:
 
 def read_local_csv(path: str) -> pd.DataFrame:
     return pd.read_csv(path)
+
+def write_chunks(chunks, layer: str, name: str):
+    """Appends each DataFrame chunk to data/<layer>/<name>.csv; returns (path, rows, head of the first chunk)."""
+    _ensure_dirs(layer)
+    path = os.path.join(BASE_DIR, layer, f"{name}.csv")
+    rows, head = 0, None
+    with open(path, "w", newline="") as f:
+        for chunk in chunks:
+            chunk.to_csv(f, index=False, header=head is None); rows += len(chunk)
+            if head is None: head = chunk.head(20)
+    return path, rows, head
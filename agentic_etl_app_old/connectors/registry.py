@@ -0,0 +1,30 @@
+from __future__ import annotations
+import importlib
+from typing import Any, Dict, Tuple
+
+# name -> (module, class, pip package). Modules are imported on first use, so a local-CSV run
+# never loads boto3 / snowflake / redshift / databricks SDKs.
+CONNECTORS: Dict[str, Tuple[str, str, str]] = {
+    "s3": ("connectors.s3_connector", "S3Connector", "boto3"),
+    "snowflake": ("connectors.snowflake_connector", "SnowflakeConnector", "snowflake-connector-python[pandas]"),
+    "redshift": ("connectors.redshift_connector", "RedshiftConnector", "redshift-connector"),
+    "databricks": ("connectors.databricks_connector", "DatabricksConnector", "databricks-sql-connector"),
+}
+_loaded: Dict[str, Any] = {}
+
+def register(name: str, module: str, cls: str, package: str = "") -> None:
+    CONNECTORS[name] = (module, cls, package); _loaded.pop(name, None)
+
+def get_connector(name: str):
+    """Connector class for `name`, importing its module (and SDK) now."""
+    if name not in _loaded:
+        if name not in CONNECTORS: raise KeyError(f"Unknown connector '{name}'. Known: {sorted(CONNECTORS)}")
+        module, cls, package = CONNECTORS[name]
+        try:
+            _loaded[name] = getattr(importlib.import_module(module), cls)
+        except ImportError as e:
+            raise ImportError(f"{name} connector needs `pip install {package}` ({e})") from e
+    return _loaded[name]
+
+def connect(name: str, *args, **kwargs):
+    return get_connector(name)(*args, **kwargs)
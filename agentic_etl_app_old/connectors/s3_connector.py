@@ -1,13 +1,89 @@
 from __future__ import annotations
-import io
+import io, gzip, tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
 import boto3
+from boto3.s3.transfer import TransferConfig
 import pandas as pd
 from urllib.parse import urlparse
 
+MB = 2**20
+PART_SIZE = 16 * MB        # S3 needs >= 5 MB for every part but the last
+MAX_CONCURRENCY = 8
+CHUNK_ROWS = 100_000
+
+def _compression(key: str, compression: Optional[str]) -> Optional[str]:
+    if compression != 'infer': return compression
+    k = key.lower()
+    return 'gzip' if k.endswith('.gz') else 'zstd' if k.endswith('.zst') else None
+
+def _is_parquet(key: str) -> bool:
+    return key.lower().split('?')[0].endswith(('.parquet', '.parquet.gz', '.parquet.zst', '.pq'))
+
+class MultipartWriter(io.RawIOBase):
+    """Write-only stream to s3://bucket/key. Bytes are cut into part_size parts uploaded by a thread pool,
+    at most max_concurrency in flight, so memory stays around (max_concurrency + 1) * part_size whatever
+    the object size. Small objects go up with a single put_object; a failed upload is aborted."""
+    def __init__(self, s3, bucket: str, key: str, part_size: int = PART_SIZE, max_concurrency: int = MAX_CONCURRENCY, **extra):
+        self.s3, self.bucket, self.key, self.part_size, self.extra = s3, bucket, key, max(part_size, 5 * MB), extra
+        self.buf = bytearray(); self.parts: List = []; self.upload_id = None
+        self.pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3part")
+        self.max_concurrency = max_concurrency
+        self.bytes_written = 0
+
+    def writable(self): return True
+    def tell(self) -> int: return self.bytes_written
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None:  # don't publish a truncated object
+            try: self.abort()
+            finally: self.buf = bytearray(); self.pool.shutdown(wait=False); io.RawIOBase.close(self)
+        else: self.close()
+
+    def write(self, b) -> int:
+        self.buf += b; self.bytes_written += len(b)
+        while len(self.buf) >= self.part_size:
+            self._upload(bytes(self.buf[:self.part_size])); del self.buf[:self.part_size]
+        return len(b)
+
+    def _upload(self, data: bytes):
+        if self.upload_id is None:
+            self.upload_id = self.s3.create_multipart_upload(Bucket=self.bucket, Key=self.key, **self.extra)['UploadId']
+        n = len(self.parts) + 1
+        pending = [f for f in self.parts if not f.done()]
+        if len(pending) >= self.max_concurrency: pending[0].result()  # back-pressure
+        self.parts.append(self.pool.submit(self.s3.upload_part, Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                           PartNumber=n, Body=data))
+
+    def close(self):
+        if self.closed: return
+        try:
+            if self.upload_id is None:
+                self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self.buf), **self.extra)
+            else:
+                if self.buf: self._upload(bytes(self.buf))
+                etags = [{'ETag': f.result()['ETag'], 'PartNumber': i + 1} for i, f in enumerate(self.parts)]
+                self.s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                                  MultipartUpload={'Parts': etags})
+        except Exception:
+            self.abort(); raise
+        finally:
+            self.buf = bytearray(); self.pool.shutdown(wait=True); super().close()
+
+    def abort(self):
+        if self.upload_id is not None:
+            for f in self.parts: f.cancel()
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id); self.upload_id = None
+
 class S3Connector:
-    def __init__(self, region: str):
+    def __init__(self, region: str, endpoint_url: Optional[str] = None, part_size: int = PART_SIZE,
+                 max_concurrency: int = MAX_CONCURRENCY, client=None):
+        """endpoint_url points at an S3-compatible store (MinIO, moto server)."""
         self.region = region
-        self.s3 = boto3.client('s3', region_name=region)
+        self.s3 = client or boto3.client('s3', region_name=region, endpoint_url=endpoint_url)
+        self.part_size, self.max_concurrency = part_size, max_concurrency
+        self.transfer = TransferConfig(multipart_threshold=part_size, multipart_chunksize=part_size,
+                                       max_concurrency=max_concurrency, use_threads=True)
 
     def _parse(self, uri: str):
         p = urlparse(uri)
@@ -15,13 +91,106 @@ class S3Connector:
         key = p.path.lstrip('/')
         return bucket, key
 
-    def write_csv(self, df: pd.DataFrame, uri: str):
+    # ---- streams ----
+    def open_write(self, uri: str, compression: Optional[str] = 'infer'):
+        """Binary write stream; compressed on the fly for .gz/.zst keys (or compression='gzip'|'zstd')."""
+        bucket, key = self._parse(uri)
+        raw = MultipartWriter(self.s3, bucket, key, self.part_size, self.max_concurrency)
+        comp = _compression(key, compression)
+        if comp == 'gzip': return _Closing(gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6), raw)
+        if comp == 'zstd':
+            import zstandard  # optional: pip install zstandard
+            return _Closing(zstandard.ZstdCompressor(threads=-1).stream_writer(raw, closefd=False), raw)
+        return raw
+
+    def open_read(self, uri: str, compression: Optional[str] = 'infer', concurrent: bool = False):
+        """Binary read stream. By default the GET body is consumed as it arrives; concurrent=True
+        fetches ranged parts in parallel (TransferConfig) into a spooled temp file first, which also
+        makes the stream seekable."""
         bucket, key = self._parse(uri)
-        buf = io.StringIO()
-        df.to_csv(buf, index=False)
-        self.s3.put_object(Bucket=bucket, Key=key, Body=buf.getvalue().encode('utf-8'))
+        if concurrent:
+            body = tempfile.SpooledTemporaryFile(max_size=64 * MB)
+            self.s3.download_fileobj(bucket, key, body, Config=self.transfer); body.seek(0)
+        else:
+            body = self.s3.get_object(Bucket=bucket, Key=key)['Body']
+        comp = _compression(key, compression)
+        if comp == 'gzip': return gzip.GzipFile(fileobj=body, mode='rb')
+        if comp == 'zstd':
+            import zstandard
+            return zstandard.ZstdDecompressor().stream_reader(body, closefd=True)
+        return body
 
-    def read_csv(self, uri: str) -> pd.DataFrame:
+    # ---- CSV ----
+    def write_csv(self, df: pd.DataFrame, uri: str, compression: Optional[str] = 'infer', chunk_rows: int = CHUNK_ROWS):
+        """Rendered chunk_rows at a time straight into the upload stream (no full CSV string/bytes copy)."""
+        with self.open_write(uri, compression) as raw:
+            text = io.TextIOWrapper(raw, encoding='utf-8', newline='', write_through=True)
+            for start in range(0, max(len(df), 1), chunk_rows):
+                df.iloc[start:start + chunk_rows].to_csv(text, index=False, header=start == 0)
+            text.flush(); text.detach()
+
+    def iter_csv(self, uri: str, chunksize: int = CHUNK_ROWS, compression: Optional[str] = 'infer', **kwargs) -> Iterator[pd.DataFrame]:
+        """DataFrames of chunksize rows parsed from the streaming body, for chunked landing."""
+        with self.open_read(uri, compression) as body:
+            with pd.read_csv(body, chunksize=chunksize, **kwargs) as reader:
+                yield from reader
+
+    def read_csv(self, uri: str, compression: Optional[str] = 'infer', **kwargs) -> pd.DataFrame:
+        with self.open_read(uri, compression) as body:
+            return pd.read_csv(body, **kwargs)
+
+    # ---- Parquet (pyarrow) ----
+    def write_parquet(self, df: pd.DataFrame, uri: str, chunk_rows: int = 1_000_000, compression: str = 'zstd'):
+        """Row groups of chunk_rows streamed into a multipart upload; `compression` is the Parquet codec."""
+        import pyarrow as pa, pyarrow.parquet as pq  # optional: pip install pyarrow
+        with self.open_write(uri, compression=None) as raw:
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            with pq.ParquetWriter(raw, schema, compression=compression) as w:
+                for start in range(0, max(len(df), 1), chunk_rows):
+                    w.write_table(pa.Table.from_pandas(df.iloc[start:start + chunk_rows], schema=schema, preserve_index=False))
+
+    def iter_parquet(self, uri: str, chunksize: int = CHUNK_ROWS, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        import pyarrow.parquet as pq
+        with self.open_read(uri, compression=None, concurrent=True) as body:  # Parquet needs a seekable file
+            for batch in pq.ParquetFile(body).iter_batches(batch_size=chunksize, columns=columns):
+                yield batch.to_pandas()
+
+    def read_parquet(self, uri: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        with self.open_read(uri, compression=None, concurrent=True) as body:
+            return pd.read_parquet(body, columns=columns)
+
+    # ---- by extension ----
+    def write(self, df: pd.DataFrame, uri: str):
+        return self.write_parquet(df, uri) if _is_parquet(uri) else self.write_csv(df, uri)
+
+    def read(self, uri: str) -> pd.DataFrame:
+        return self.read_parquet(uri) if _is_parquet(uri) else self.read_csv(uri)
+
+    def iter_chunks(self, uri: str, chunksize: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        return self.iter_parquet(uri, chunksize) if _is_parquet(uri) else self.iter_csv(uri, chunksize)
+
+    def upload_file(self, path: str, uri: str):
+        """Concurrent multipart upload of a local file."""
         bucket, key = self._parse(uri)
-        obj = self.s3.get_object(Bucket=bucket, Key=key)
-        return pd.read_csv(io.BytesIO(obj['Body'].read()))
+        self.s3.upload_file(path, bucket, key, Config=self.transfer)
+
+    def download_file(self, uri: str, path: str):
+        bucket, key = self._parse(uri)
+        self.s3.download_file(bucket, key, path, Config=self.transfer)
+
+class _Closing(io.RawIOBase):
+    """Compressor stream whose close() also finishes the upload underneath."""
+    def __init__(self, stream, raw: MultipartWriter):
+        self.stream, self.raw = stream, raw
+    def writable(self): return True
+    def write(self, b) -> int:
+        self.stream.write(b); return len(b)
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None: self.raw.__exit__(exc_type); io.RawIOBase.close(self)
+        else: self.close()
+    def close(self):
+        if self.closed: return
+        try: self.stream.close()
+        except Exception:
+            self.raw.abort(); raise
+        self.raw.close(); super().close()
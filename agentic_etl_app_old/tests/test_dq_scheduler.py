@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+import pandas as pd
+from utils.dq_rules import run_checks, propose_rules, critical_failed
+
+def run():
+    df = pd.DataFrame({"customer_id": [1, 2, 2, 4], "email": ["a@x.com", "bad", None, "d@x.com"], "amount": [1.0, 2.0, None, 4.0]})
+    rules = propose_rules(df, ["customer_id"])
+    full = run_checks(df, rules)
+    assert [r["rule"] for r in full["results"]] == [r["rule"] for r in rules]  # report keeps rule order
+    assert full["summary"]["skipped"] == 0 and critical_failed(full)
+    assert all(r["elapsed_ms"] >= 0 for r in full["results"])
+    seq = run_checks(df, rules, parallel=False)
+    assert [r["passed"] for r in seq["results"]] == [r["passed"] for r in full["results"]]
+    fast = run_checks(df, rules, fail_fast=True)
+    assert fast["summary"]["aborted"] and fast["summary"]["skipped"] > 0
+    assert all(r.get("skipped") for r in fast["results"] if r["severity"] != "CRITICAL")  # nothing after the CRITICAL tier ran
+    ok = run_checks(df.drop_duplicates("customer_id"), propose_rules(df, ["customer_id"]), fail_fast=True)
+    assert not ok["summary"]["aborted"] and not critical_failed(ok)
+    print("dq scheduler:", full["summary"])
+
+if __name__ == "__main__":
+    run()
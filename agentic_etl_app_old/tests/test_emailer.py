@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+import os, socket, tempfile
+from functools import partial
+from utils.emailer import DeliveryQueue, send_email_smtp, smtp_pool, close_pools, load_attachment
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:  # pip install aiosmtpd
+    Controller = None
+
+class Inbox:
+    def __init__(self): self.messages = []
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope); return "250 OK"
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0)); return s.getsockname()[1]
+
+def run():
+    if Controller is None:
+        print("emailer: skipped (aiosmtpd not installed)"); return
+    inbox, port = Inbox(), free_port()
+    ctl = Controller(inbox, hostname="127.0.0.1", port=port); ctl.start()
+    try:
+        att = os.path.join(tempfile.mkdtemp(), "run_report.html")
+        with open(att, "w") as f: f.write("<h1>report</h1>")
+        send = partial(send_email_smtp, "127.0.0.1", port, None, None, "etl@example.com", use_tls=False)
+        groups = [[f"team{i}@example.com"] for i in range(12)]
+        with DeliveryQueue(send, workers=3, rate_per_sec=200, burst=5) as q:
+            res = q.deliver_all([{"recipients": g, "subject": "Report", "html_body": "<p>hi</p>", "attachments": [att]} for g in groups])
+        assert all(r["ok"] for r in res), res
+        assert sorted(m.rcpt_tos[0] for m in inbox.messages) == sorted(g[0] for g in groups)
+        assert b"run_report.html" in inbox.messages[0].content
+        pool = smtp_pool("127.0.0.1", port, None, None, False)
+        assert 1 <= pool.opened <= 3  # connections reused across the 12 sends
+        assert load_attachment(att) is load_attachment(att)  # bytes read once
+        bad = DeliveryQueue(partial(send_email_smtp, "127.0.0.1", free_port(), None, None, "etl@example.com", use_tls=False), retries=1)
+        r = bad.deliver_all([{"recipients": ["x@example.com"], "subject": "s", "html_body": "b"}])[0]
+        assert not r["ok"] and r["attempts"] == 2; bad.close()
+        print("emailer:", len(inbox.messages), "messages over", pool.opened, "connections")
+    finally:
+        close_pools(); ctl.stop()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+import numpy as np
+import pandas as pd
+from utils import regex_kernel as rk
+from utils.dq_rules import EMAIL_RE
+
+# (pattern, value, fullmatch) -- the Python fallback and the pyarrow/RE2 kernel must agree on every case
+CASES = [
+    (EMAIL_RE.pattern, "x@y.co", True),
+    (EMAIL_RE.pattern, "x@y.co\n", False),   # Python's '$' matches before a trailing newline, RE2's doesn't
+    (EMAIL_RE.pattern, "x y@z.co", False),
+    (r"\d{3}", "123", True),
+    (r"\d{3}", "١٢٣", False),                # Arabic-Indic digits: \d is ASCII-only in RE2
+    (r"\w+", "café", False),
+    (r"abc", "abcdef", False),               # whole value, not a prefix
+    (r"ab|abc", "abc", True),
+]
+
+def run():
+    for pat, value, want in CASES:
+        assert rk._eval(np.array([value], dtype=object), pat, 0)[0] == want, (pat, value)
+    if rk.pc is None:
+        print("regex kernel: python path checked; pyarrow not installed, RE2 path skipped"); return
+    for pat, value, want in CASES:
+        rx = rk._arrow_pattern(pat, 0)
+        assert rx is not None and rk._arrow_match(pd.Series([value]), rx, False, False)[0] == want, (pat, value)
+    print("regex kernel: python and RE2 paths agree on", len(CASES), "cases")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+import os
+import numpy as np, pandas as pd
+
+try:
+    import boto3
+    from moto import mock_aws
+except ImportError:  # pip install boto3 "moto[s3]"
+    mock_aws = None
+
+def frame(n):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"customer_id": np.arange(n), "email": [f"user{i}@example.com" for i in range(n)],
+                         "amount": rng.random(n).round(4), "city": rng.choice(["Pune", "Leeds", "Austin"], n)})
+
+def run():
+    if mock_aws is None:
+        print("s3 connector: skipped (boto3/moto not installed)"); return
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "test"); os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+    from connectors.s3_connector import S3Connector, MB
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="etl")
+        s3 = S3Connector("us-east-1", part_size=5 * MB, max_concurrency=4)
+        df = frame(300_000)  # ~14 MB of CSV -> 3 parts
+        s3.write_csv(df, "s3://etl/landing/customers.csv")
+        head = s3.s3.head_object(Bucket="etl", Key="landing/customers.csv")
+        assert "-" in head["ETag"], "expected a multipart upload"
+        pd.testing.assert_frame_equal(s3.read_csv("s3://etl/landing/customers.csv"), df)
+        chunks = list(s3.iter_csv("s3://etl/landing/customers.csv", chunksize=100_000))
+        assert [len(c) for c in chunks] == [100_000] * 3
+        for key in ("landing/customers.csv.gz", "landing/customers.csv.zst"):
+            try: s3.write(df.head(1000), f"s3://etl/{key}")
+            except ImportError: continue  # zstandard not installed
+            assert s3.s3.head_object(Bucket="etl", Key=key)["ContentLength"] < 20_000
+            pd.testing.assert_frame_equal(s3.read(f"s3://etl/{key}"), df.head(1000))
+        small = df.head(10)
+        s3.write(small, "s3://etl/landing/small.csv")
+        pd.testing.assert_frame_equal(s3.read("s3://etl/landing/small.csv"), small)
+        try:
+            with s3.open_write("s3://etl/landing/broken.csv") as out:
+                out.write(b"x" * (6 * MB)); raise RuntimeError("boom")
+        except RuntimeError: pass
+        assert s3.s3.list_objects_v2(Bucket="etl", Prefix="landing/broken")["KeyCount"] == 0
+        assert not s3.s3.list_multipart_uploads(Bucket="etl").get("Uploads")
+        try:
+            import pyarrow  # noqa: F401
+            s3.write(df, "s3://etl/landing/customers.parquet")
+            pd.testing.assert_frame_equal(s3.read("s3://etl/landing/customers.parquet"), df)
+            assert sum(len(c) for c in s3.iter_chunks("s3://etl/landing/customers.parquet", 50_000)) == len(df)
+        except ImportError:
+            print("s3 connector: parquet skipped (pyarrow not installed)")
+        print("s3 connector: ok")
+
+if __name__ == "__main__":
+    run()
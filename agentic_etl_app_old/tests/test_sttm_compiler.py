@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+import os, json
+from utils.sttm_parser import load_sttm_excel, load_sttm_plan, compile_sttm, STTMPlan, build_integration_plan, get_scd_for_target
+
+def run():
+    path = os.path.join("sttm","STTM_template.xlsx")
+    plan = load_sttm_plan(path)
+    assert plan is load_sttm_plan(path)  # compiled once per workbook version
+    assert plan.tables("integration") == ["customers_int", "orders_int"] and plan.tables("dwh") == ["dim_customer", "fact_orders"]
+    orders = plan.target("INTEGRATION", "orders_int")
+    assert orders.keys == ("order_id",) and orders.left_on == ["product_id"]
+    assert len(orders.refs) == 1  # product_name and category share the dim_product join
+    assert plan.target("dwh", "dim_customer").scd == "SCD2" and plan.target("dwh", "dim_customer").sources == [("integration", "customers_int")]
+    assert STTMPlan.from_dict(json.loads(plan.to_json())) == plan
+    df = load_sttm_excel(path)
+    assert compile_sttm(df) == plan and build_integration_plan(df, "customers_int") == plan.target("integration", "customers_int").integration_plan()
+    assert get_scd_for_target(df, "integration", "customers_int", default_scd="SCD3") == "SCD3"
+    print("sttm compiler:", [(t.schema, t.table, t.scd, t.keys) for t in plan.targets])
+
+if __name__ == "__main__":
+    run()
@@ -1,7 +1,9 @@
 from __future__ import annotations
 from typing import List, Dict, Any, Optional
 import pandas as pd
-import re
+import os, re, time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from utils.regex_kernel import regex_match
 
 EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
 
@@ -24,40 +26,104 @@ def propose_rules(df: pd.DataFrame, primary_keys: Optional[List[str]]=None) -> L
         rules.append({'rule': f'NULL_PCT:{c}:<=0.2', 'severity': 'MINOR'})
     return rules
 
-def run_checks(df: pd.DataFrame, rules: List[Dict[str, Any]]) -> Dict[str, Any]:
-    results = []
-    for r in rules:
-        name = r['rule']
-        sev = r.get('severity', 'MINOR')
-        passed = True
-        msg = ''
-        try:
-            if name.startswith('NOT_NULL:'):
-                col = name.split(':',1)[1]
-                passed = not df[col].isna().any()
-                msg = f'{col} has no nulls'
-            elif name.startswith('UNIQUE:'):
-                col = name.split(':',1)[1]
-                passed = df[col].is_unique
-                msg = f'{col} values are unique'
-            elif name.startswith('REGEX:'):
-                _, col, kind = name.split(':')
-                if kind == 'EMAIL':
-                    passed = df[col].fillna('').map(lambda x: bool(EMAIL_RE.match(str(x)))).all()
-                    msg = f'{col} matches EMAIL format'
-            elif name.startswith('TYPE_NUMERIC:'):
-                col = name.split(':',1)[1]
-                pd.to_numeric(df[col], errors='raise')
-                msg = f'{col} numeric check passed'
-            elif name.startswith('NULL_PCT:'):
-                _, col, thresh = name.split(':')
-                op, val = thresh[0:2], float(thresh.split('=')[-1]) if '=' in thresh else float(thresh[2:])
-                pct = float(df[col].isna().mean())
-                passed = pct <= val
-                msg = f'{col} null pct {pct:.2f} <= {val}'
-        except Exception as e:
-            passed = False
-            msg = f'Rule error ({name}): {e}'
-        results.append({'rule': name, 'severity': sev, 'passed': bool(passed), 'message': msg})
-    summary = {'total': len(results), 'passed': sum(1 for x in results if x['passed']), 'failed': sum(1 for x in results if not x['passed'])}
+SEVERITY_ORDER = {'CRITICAL': 0, 'MAJOR': 1, 'MINOR': 2}
+PROCESS_MIN_ROWS = 200_000  # below this, shipping a column to a worker process costs more than the regex
+
+def _email_ok(values: pd.Series) -> bool:
+    # module level so a worker process can run it on just the column
+    return bool(regex_match(values, EMAIL_RE, na=False).all())  # null -> '' -> no match, as before
+
+def is_regex_rule(name: str) -> bool:
+    return name.startswith('REGEX:')
+
+def check_rule(df: pd.DataFrame, r: Dict[str, Any], pool=None) -> Dict[str, Any]:
+    """Evaluate one rule. REGEX rules go to `pool` (a process pool) when given."""
+    name = r['rule']
+    sev = r.get('severity', 'MINOR')
+    passed = True
+    msg = ''
+    t0 = time.perf_counter()
+    try:
+        if name.startswith('NOT_NULL:'):
+            col = name.split(':',1)[1]
+            passed = not df[col].isna().any()
+            msg = f'{col} has no nulls'
+        elif name.startswith('UNIQUE:'):
+            col = name.split(':',1)[1]
+            passed = df[col].is_unique
+            msg = f'{col} values are unique'
+        elif name.startswith('REGEX:'):
+            _, col, kind = name.split(':')
+            if kind == 'EMAIL':
+                passed = pool.submit(_email_ok, df[col]).result() if pool is not None else _email_ok(df[col])
+                msg = f'{col} matches EMAIL format'
+        elif name.startswith('TYPE_NUMERIC:'):
+            col = name.split(':',1)[1]
+            pd.to_numeric(df[col], errors='raise')
+            msg = f'{col} numeric check passed'
+        elif name.startswith('NULL_PCT:'):
+            _, col, thresh = name.split(':')
+            op, val = thresh[0:2], float(thresh.split('=')[-1]) if '=' in thresh else float(thresh[2:])
+            pct = float(df[col].isna().mean())
+            passed = pct <= val
+            msg = f'{col} null pct {pct:.2f} <= {val}'
+    except Exception as e:
+        passed = False
+        msg = f'Rule error ({name}): {e}'
+    return {'rule': name, 'severity': sev, 'passed': bool(passed), 'message': msg,
+            'elapsed_ms': round((time.perf_counter() - t0) * 1000, 3)}
+
+def run_checks(df: pd.DataFrame, rules: List[Dict[str, Any]], parallel: bool = True, fail_fast: bool = False,
+               max_workers: Optional[int] = None, processes: Optional[bool] = None) -> Dict[str, Any]:
+    """Run rules by severity tier, CRITICAL first; rules within a tier run concurrently on a thread pool.
+    REGEX rules (GIL-bound string matching) go to a process pool when `processes` is True, or by default
+    for frames of PROCESS_MIN_ROWS rows and up. With fail_fast the run stops at the first CRITICAL
+    failure: rules not yet started come back with passed=None and skipped=True.
+    Results keep the order of `rules` and carry elapsed_ms."""
+    t0 = time.perf_counter()
+    results: List[Optional[Dict[str, Any]]] = [None] * len(rules)
+    tiers: Dict[int, List[int]] = {}
+    for i, r in enumerate(rules):
+        tiers.setdefault(SEVERITY_ORDER.get(str(r.get('severity', 'MINOR')).upper(), len(SEVERITY_ORDER)), []).append(i)
+    if processes is None:
+        processes = parallel and len(df) >= PROCESS_MIN_ROWS and (os.cpu_count() or 1) > 1 and any(is_regex_rule(r['rule']) for r in rules)
+    workers = max_workers or min(8, (os.cpu_count() or 1) + 2)
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dq') if parallel and len(rules) > 1 else None
+    procs = ProcessPoolExecutor(max_workers=min(workers, os.cpu_count() or 1)) if processes else None
+    aborted = False
+    try:
+        for tier in sorted(tiers):
+            idx = tiers[tier]
+            critical = tier == SEVERITY_ORDER['CRITICAL']
+            if aborted: break
+            if pool is None:
+                for i in idx:
+                    results[i] = check_rule(df, rules[i], procs)
+                    if fail_fast and critical and not results[i]['passed']: aborted = True; break
+                continue
+            futs = {pool.submit(check_rule, df, rules[i], procs): i for i in idx}
+            for f in as_completed(futs):
+                results[futs[f]] = f.result()
+                if fail_fast and critical and not results[futs[f]]['passed'] and not aborted:
+                    aborted = True
+                    for g in futs: g.cancel()  # rules already running still finish and are reported
+            if aborted:
+                for f, i in futs.items():
+                    if results[i] is None and not f.cancelled(): results[i] = f.result()
+    finally:
+        if pool is not None: pool.shutdown(wait=True, cancel_futures=True)
+        if procs is not None: procs.shutdown(wait=True, cancel_futures=True)
+    for i, r in enumerate(rules):
+        if results[i] is None:
+            results[i] = {'rule': r['rule'], 'severity': r.get('severity', 'MINOR'), 'passed': None, 'skipped': True,
+                          'message': 'skipped: CRITICAL failure (fail-fast)', 'elapsed_ms': 0.0}
+    done = [x for x in results if not x.get('skipped')]
+    summary = {'total': len(results), 'passed': sum(1 for x in done if x['passed']), 'failed': sum(1 for x in done if not x['passed']),
+               'skipped': len(results) - len(done), 'aborted': aborted,
+               'critical_failed': sum(1 for x in done if x['severity'] == 'CRITICAL' and not x['passed']),
+               'elapsed_ms': round((time.perf_counter() - t0) * 1000, 3)}
     return {'results': results, 'summary': summary}
+
+def critical_failed(report: Dict[str, Any]) -> bool:
+    """True when a CRITICAL rule failed or was skipped (not proven to pass)."""
+    return any(r['severity'] == 'CRITICAL' and not r['passed'] for r in report['results'])
@@ -1,9 +1,32 @@
 from __future__ import annotations
-from typing import List, Optional
-import smtplib, ssl, os, boto3
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import smtplib, ssl, os, time, queue, threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from email.message import EmailMessage
 
-def send_email_smtp(host: str, port: int, username: Optional[str], password: Optional[str], sender: str, recipients: List[str], subject: str, html_body: str, attachments: Optional[List[str]] = None, use_tls: bool=True):
+# Report fan-out sends the same attachments to many groups: SMTP connections (STARTTLS + login) are
+# pooled per server, attachment bytes are read once per file version, and DeliveryQueue sends
+# concurrently under a rate limit.
+
+@lru_cache(maxsize=64)
+def _read_attachment(path: str, size: int, mtime_ns: int) -> Tuple[bytes, str, str, str]:
+    with open(path, 'rb') as f:
+        data = f.read()
+    fname = os.path.basename(path)
+    maintype, subtype = ('application','octet-stream')
+    if fname.lower().endswith('.pdf'): maintype, subtype = ('application','pdf')
+    if fname.lower().endswith('.html'): maintype, subtype = ('text','html')
+    return data, maintype, subtype, fname
+
+def load_attachment(path: str) -> Optional[Tuple[bytes, str, str, str]]:
+    """(bytes, maintype, subtype, filename), cached until the file's size or mtime changes; None if missing."""
+    if not os.path.exists(path): return None
+    st = os.stat(path)
+    return _read_attachment(os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+def build_message(sender: str, recipients: List[str], subject: str, html_body: str, attachments: Optional[List[str]] = None) -> EmailMessage:
     msg = EmailMessage()
     msg['From'] = sender
     msg['To'] = ', '.join(recipients)
@@ -11,14 +34,96 @@ def send_email_smtp(host: str, port: int, username: Optional[str], password: Opt
     msg.set_content('This is an HTML report.')
     msg.add_alternative(html_body, subtype='html')
     for path in attachments or []:
-        if not os.path.exists(path): continue
-        with open(path, 'rb') as f:
-            data = f.read()
-        fname = os.path.basename(path)
-        maintype, subtype = ('application','octet-stream')
-        if fname.lower().endswith('.pdf'): maintype, subtype = ('application','pdf')
-        if fname.lower().endswith('.html'): maintype, subtype = ('text','html')
+        att = load_attachment(path)
+        if att is None: continue
+        data, maintype, subtype, fname = att
         msg.add_attachment(data, maintype=maintype, subtype=subtype, filename=fname)
+    return msg
+
+class SMTPPool:
+    """Up to `size` logged-in connections to one server. A connection idle for longer than
+    `check_after` seconds is NOOP-checked before reuse; dead ones are replaced."""
+    def __init__(self, host: str, port: int, username: Optional[str] = None, password: Optional[str] = None,
+                 use_tls: bool = True, size: int = 4, timeout: float = 30, check_after: float = 30):
+        self.host, self.port, self.username, self.password, self.use_tls = host, port, username, password, use_tls
+        self.size, self.timeout, self.check_after = size, timeout, check_after
+        self._idle: "queue.LifoQueue[Tuple[smtplib.SMTP, float]]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        s = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls: s.starttls(context=ssl.create_default_context())
+            if self.username and self.password:
+                s.login(self.username, self.password)
+        except Exception:
+            s.close(); raise
+        self.opened += 1
+        return s
+
+    @staticmethod
+    def _alive(s: smtplib.SMTP) -> bool:
+        try: return s.noop()[0] == 250
+        except smtplib.SMTPException: return False
+        except OSError: return False
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        s = None
+        try:
+            while s is None:
+                try: s, last = self._idle.get_nowait()
+                except queue.Empty: s = self._connect(); break
+                if time.monotonic() - last > self.check_after and not self._alive(s):
+                    self._discard(s); s = None
+            yield s
+        except (smtplib.SMTPServerDisconnected, OSError):
+            if s is not None: self._discard(s)
+            s = None; raise
+        finally:
+            if s is not None: self._idle.put((s, time.monotonic()))
+            self._slots.release()
+
+    def send(self, msg: EmailMessage):
+        """send_message on a pooled connection, retried once on a fresh one if the server dropped it."""
+        try:
+            with self.connection() as s: return s.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            with self.connection() as s: return s.send_message(msg)
+
+    @staticmethod
+    def _discard(s: smtplib.SMTP):
+        try: s.close()
+        except Exception: pass
+
+    def close(self):
+        while True:
+            try: s, _ = self._idle.get_nowait()
+            except queue.Empty: return
+            try: s.quit()
+            except Exception: self._discard(s)
+
+_pools: Dict[tuple, SMTPPool] = {}
+_pools_lock = threading.Lock()
+
+def smtp_pool(host: str, port: int, username: Optional[str] = None, password: Optional[str] = None, use_tls: bool = True, size: int = 4) -> SMTPPool:
+    """Process-wide pool per (host, port, user, tls), so Streamlit reruns reuse logged-in connections."""
+    key = (host, int(port), username, password, use_tls)
+    with _pools_lock:
+        if key not in _pools: _pools[key] = SMTPPool(host, int(port), username, password, use_tls, size)
+        return _pools[key]
+
+def close_pools():
+    with _pools_lock:
+        for p in _pools.values(): p.close()
+        _pools.clear()
+
+def send_email_smtp(host: str, port: int, username: Optional[str], password: Optional[str], sender: str, recipients: List[str], subject: str, html_body: str, attachments: Optional[List[str]] = None, use_tls: bool=True, pooled: bool=True):
+    msg = build_message(sender, recipients, subject, html_body, attachments)
+    if pooled:
+        return smtp_pool(host, port, username, password, use_tls).send(msg)
     ctx = ssl.create_default_context()
     with smtplib.SMTP(host, port) as s:
         if use_tls: s.starttls(context=ctx)
@@ -26,23 +131,68 @@ def send_email_smtp(host: str, port: int, username: Optional[str], password: Opt
             s.login(username, password)
         s.send_message(msg)
 
+@lru_cache(maxsize=8)
+def _ses_client(region: str):
+    import boto3  # only the SES path needs it
+    return boto3.client('ses', region_name=region)  # boto3 clients are thread-safe
+
 def send_email_ses(region: str, sender: str, recipients: List[str], subject: str, html_body: str, attachments: Optional[List[str]] = None):
-    ses = boto3.client('ses', region_name=region)
+    ses = _ses_client(region)
     if attachments:
-        em = EmailMessage()
-        em['From'] = sender; em['To'] = ', '.join(recipients); em['Subject'] = subject
-        em.set_content('This is an HTML report.')
-        em.add_alternative(html_body, subtype='html')
-        for path in attachments:
-            if not os.path.exists(path): continue
-            with open(path, 'rb') as f:
-                data = f.read()
-            fname = os.path.basename(path)
-            maintype, subtype = ('application','octet-stream')
-            if fname.lower().endswith('.pdf'): maintype, subtype = ('application','pdf')
-            if fname.lower().endswith('.html'): maintype, subtype = ('text','html')
-            em.add_attachment(data, maintype=maintype, subtype=subtype, filename=fname)
+        em = build_message(sender, recipients, subject, html_body, attachments)
         ses.send_raw_email(RawMessage={'Data': em.as_bytes()})
     else:
         ses.send_email(Source=sender, Destination={'ToAddresses': recipients},
                        Message={'Subject': {'Data': subject}, 'Body': {'Html': {'Data': html_body}}})
+
+class RateLimiter:
+    """Token bucket shared by the sending threads: `rate` sends per second, bursts up to `burst`."""
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate, self.burst = float(rate), max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1; return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class DeliveryQueue:
+    """Concurrent sends through `send(recipients=..., subject=..., html_body=..., attachments=...)`,
+    e.g. functools.partial(send_email_smtp, host, port, user, password, sender). Each delivery is
+    retried `retries` times on failure; results come back as dicts, failures included."""
+    def __init__(self, send: Callable[..., Any], workers: int = 4, rate_per_sec: Optional[float] = None, burst: int = 1, retries: int = 1):
+        self.send = send
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mail")
+        self.limiter = RateLimiter(rate_per_sec, burst) if rate_per_sec else None
+        self.retries = retries
+
+    def _deliver(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        t0 = time.perf_counter(); error = None
+        for attempt in range(self.retries + 1):
+            if self.limiter: self.limiter.acquire()
+            try:
+                self.send(**message); error = None; break
+            except Exception as e:  # SMTP, network, boto3 ClientError
+                error = f"{type(e).__name__}: {e}"
+        return {"recipients": message.get("recipients"), "ok": error is None, "error": error,
+                "attempts": attempt + 1, "elapsed_s": round(time.perf_counter() - t0, 3)}
+
+    def submit(self, **message) -> Future:
+        return self.pool.submit(self._deliver, message)
+
+    def deliver_all(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [f.result() for f in [self.submit(**m) for m in messages]]
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+import re
+from functools import lru_cache
+from typing import Optional, Union
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa, pyarrow.compute as pc  # optional: RE2 kernel over Arrow strings
+except ImportError:  # pragma: no cover
+    pa = pc = None
+
+Pattern = Union[str, "re.Pattern[str]"]
+
+@lru_cache(maxsize=256)
+def compiled(pattern: str, flags: int = 0) -> "re.Pattern[str]":
+    return re.compile(pattern, flags)
+
+def _parts(pattern: Pattern):
+    return (pattern.pattern, pattern.flags & ~re.UNICODE) if isinstance(pattern, re.Pattern) else (pattern, 0)
+
+@lru_cache(maxsize=256)
+def _arrow_pattern(pattern: str, flags: int):
+    """RE2 form of a Python pattern for match_substring_regex, anchored at both ends like re.fullmatch;
+    None if RE2 can't take it."""
+    if pc is None or flags & ~(re.IGNORECASE | re.ASCII): return None
+    rx = ("(?i)" if flags & re.IGNORECASE else "") + f"^(?:{pattern})$"
+    try:
+        pc.match_substring_regex(pa.array(["x"]), pattern=rx)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return None  # lookarounds, backreferences, ...
+    return rx
+
+def _eval(values: np.ndarray, pattern: str, flags: int) -> np.ndarray:
+    # fullmatch + ASCII is what the RE2 kernel does: '$' doesn't match before a trailing '\n', \d is [0-9]
+    m = compiled(pattern, flags | re.ASCII).fullmatch
+    return np.fromiter((m(v) is not None for v in values), dtype=bool, count=len(values))
+
+def _arrow_match(s: pd.Series, rx: str, na: bool, dedupe: bool) -> np.ndarray:
+    # pandas' Arrow-backed strings convert without a copy; object columns are converted once
+    arr = pa.array(s, from_pandas=True)
+    if not pa.types.is_string(arr.type) and not pa.types.is_large_string(arr.type):
+        arr = pc.cast(arr, pa.string()) if not pa.types.is_null(arr.type) else pa.nulls(len(s), pa.string())
+    if dedupe:
+        enc = pc.dictionary_encode(arr)
+        hits = pc.match_substring_regex(enc.dictionary, pattern=rx)
+        res = pc.take(hits, enc.indices)
+    else:
+        res = pc.match_substring_regex(arr, pattern=rx)
+    return res.fill_null(na).to_numpy(zero_copy_only=False).astype(bool)
+
+def _as_text(values) -> np.ndarray:
+    if pd.api.types.is_string_dtype(getattr(values, "dtype", None)) and getattr(values, "dtype", None) != object:
+        return np.asarray(values, dtype=object)
+    return np.array([v if isinstance(v, str) else str(v) for v in values], dtype=object)
+
+def regex_match(values: pd.Series, pattern: Pattern, na: bool = False, dedupe: Optional[bool] = None) -> np.ndarray:
+    """Boolean array of re.fullmatch(pattern, str(v), re.ASCII) per row; nulls give `na`.
+
+    Matching runs in pyarrow's RE2 kernel when pyarrow is installed and the pattern is RE2-compatible,
+    else with the cached compiled pattern. With dedupe, distinct values are matched once and broadcast
+    back through their codes, so repeated emails/domains cost a hash lookup. The default (None) dedupes
+    on the Python path only: RE2 over the Arrow buffer is cheaper than dictionary-encoding it first."""
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    pat, flags = _parts(pattern)
+    rx = _arrow_pattern(pat, flags)
+    if rx is not None:
+        return _arrow_match(s, rx, na, bool(dedupe))
+    if dedupe is None or dedupe:
+        codes, uniques = pd.factorize(s, use_na_sentinel=True)
+        hits = _eval(_as_text(uniques), pat, flags)
+        out = np.full(len(s), na, dtype=bool)
+        ok = codes >= 0
+        out[ok] = hits[codes[ok]]
+        return out
+    nulls = s.isna().to_numpy()
+    out = _eval(_as_text(s.where(~nulls, "")), pat, flags)
+    out[nulls] = na
+    return out
+
+def count_mismatches(values: pd.Series, pattern: Pattern, na: bool = False, dedupe: Optional[bool] = None) -> int:
+    return int((~regex_match(values, pattern, na=na, dedupe=dedupe)).sum())
@@ -1,16 +1,35 @@
-
 from __future__ import annotations
 import os
-from typing import Dict, Any
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+from typing import Dict, Any, Optional
+_pdf_pool: Optional[ThreadPoolExecutor] = None  # WeasyPrint off the request path; futures kept by PDF path
+_pending: Dict[str, Future] = {}
+@lru_cache(maxsize=8)
+def _env(template_dir: str):
+    from jinja2 import Environment, FileSystemLoader, select_autoescape  # reporting step only
+    return Environment(loader=FileSystemLoader(template_dir), autoescape=select_autoescape())  # compiled templates cached per env
 def render_report_html(template_dir: str, context: Dict[str, Any]) -> str:
-    env = Environment(loader=FileSystemLoader(template_dir), autoescape=select_autoescape())
-    return env.get_template("report.html").render(**context)
-def save_html_and_pdf(html_str: str, out_dir: str, base_name: str) -> Dict[str, str]:
+    return _env(os.path.abspath(template_dir)).get_template("report.html").render(**context)
+def _write_pdf(html_str: str, pdf_path: str) -> str:
+    try:
+        from weasyprint import HTML; HTML(string=html_str).write_pdf(pdf_path); return pdf_path
+    except Exception: return ""
+def save_html_and_pdf(html_str: str, out_dir: str, base_name: str, wait: bool = True) -> Dict[str, str]:
+    """wait=False renders the PDF in the background: "pdf" is empty and "pdf_pending" goes to pdf_result()."""
+    global _pdf_pool
     os.makedirs(out_dir, exist_ok=True); html_path = os.path.join(out_dir, f"{base_name}.html")
     with open(html_path, "w", encoding="utf-8") as f: f.write(html_str)
-    pdf_path = ""
-    try:
-        from weasyprint import HTML; pdf_path = os.path.join(out_dir, f"{base_name}.pdf"); HTML(string=html_str).write_pdf(pdf_path)
-    except Exception: pdf_path = ""
-    return {"html": html_path, "pdf": pdf_path}
+    pdf_path = os.path.join(out_dir, f"{base_name}.pdf")
+    if wait: return {"html": html_path, "pdf": _write_pdf(html_str, pdf_path)}
+    if _pdf_pool is None: _pdf_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf")
+    _pending[pdf_path] = _pdf_pool.submit(_write_pdf, html_str, pdf_path)
+    return {"html": html_path, "pdf": "", "pdf_pending": pdf_path}
+def pdf_result(pdf_path: str, timeout: Optional[float] = 0) -> Optional[str]:
+    """Finished PDF path ("" if rendering failed) or None while it's still rendering; timeout=None waits."""
+    fut = _pending.get(pdf_path)
+    if fut is None: return pdf_path if os.path.exists(pdf_path) else ""
+    if timeout == 0 and not fut.done(): return None
+    try: out = fut.result(timeout=timeout)
+    except FutureTimeout: return None
+    _pending.pop(pdf_path, None); return out
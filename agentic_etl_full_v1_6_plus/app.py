@@ -1,10 +1,10 @@
 from __future__ import annotations
 import streamlit as st, pandas as pd, os, io, uuid, datetime as dt, json
 from utils.session_store import load_state, save_state
-from utils.sttm_parser import load_sttm_excel, validate_sttm, build_integration_plan, project_columns, get_scd_for_target, get_keys_for_target, build_dwh_targets
+from utils.sttm_parser import load_sttm_excel, validate_sttm, load_sttm_plan, project_columns
 from agents.dq_agent import DQAgent
 from agents.transform_agent import TransformAgent
-from agents.report_agent import render_report_html, save_html_and_pdf
+from agents.report_agent import render_report_html, save_html_and_pdf, pdf_result
 from connectors.local_csv import write_df as write_local_df
 from utils.llm_gateway import infer_plan_from_prompt
 
@@ -125,8 +125,7 @@ if st.button("Generate Plan", key="btn_gen_plan"):
     if missing:
         st.error("Please provide " + " and ".join(missing) + " before generating a plan.")
     else:
-        sttm_df = load_sttm_excel(state["job"]["sttm"]); validate_sttm(sttm_df)
-        tables = sorted(sttm_df[(sttm_df["Target Schema"].str.lower()=="integration")]["Target Table"].unique().tolist())
+        tables = load_sttm_plan(state["job"]["sttm"]).tables("integration")
         state["job"]["plan"] = {"steps": steps, "integration_targets": tables}
         save_state(state)
         st.success("Plan generated. Review below and click **Run Selected Steps**.")
@@ -139,7 +138,7 @@ exec_id = uuid.uuid4().hex[:6]
 if st.button("Run Selected Steps", key=f"btn_run_{exec_id}"):
     if not state["job"].get("plan"):
         st.error("Please click **Generate Plan** first."); st.stop()
-    sttm_df = load_sttm_excel(state["job"]["sttm"]); validate_sttm(sttm_df)
+    sttm_plan = load_sttm_plan(state["job"]["sttm"])  # compiled once; every stage below reads from it
     for src in state["job"]["sources"]:
         name = src["name"]
         st.write(f"### Processing source: {name}")
@@ -162,17 +161,19 @@ if st.button("Run Selected Steps", key=f"btn_run_{exec_id}"):
                 dq = DQAgent(); rules_df = pd.DataFrame(dq.propose_rules(df, default_pk))
                 st.markdown(f"**Data Quality — {name}** (rules used in this run)")
                 st.data_editor(rules_df, key=f"dq_rules_{name}_{exec_id}", disabled=True)
-                report = dq.run_checks(df, rules_df.to_dict("records"))
+                report = dq.run_checks(df, rules_df.to_dict("records"), quarantine=os.path.join("data","quarantine","quarantine.db"), quarantine_table=name)
                 st.write("DQ Summary:", report["summary"])
                 failed = [r for r in report["results"] if not r["passed"]]
                 if failed:
                     st.warning(f"Failed rules for {name}: {len(failed)}")
-                    from utils.dq_rules import _failed_rows
+                    q = report.get("quarantine") or {}
+                    if q.get("rows"): st.info(f"{q['rows']} failing rows quarantined → {q['store']} ({q['clean_rows']} clean)")
                     for fr in failed:
-                        st.markdown(f"- **{fr['rule']}** ({fr['severity']}) — failed rows: {fr['failed_count']}")
-                        fail_df = _failed_rows(df, fr["rule"])
-                        with st.expander(f"View failing rows: {fr['rule']}", expanded=False):
-                            st.dataframe(fail_df.head(50))
+                        st.markdown(f"- **{fr['rule']}** ({fr['severity']}) — failed rows: {fr['failed_count']}"
+                                    + (f" — rule error: {fr['error']}" if fr.get("error") else ""))
+                        if fr.get("sample"):
+                            with st.expander(f"View failing rows: {fr['rule']}", expanded=False):
+                                st.dataframe(pd.DataFrame(fr["sample"]))
                 crit_fail = any((r["severity"]=="CRITICAL" and not r["passed"]) for r in report["results"])
                 approve_default = state["job"]["dq"].get("approve_on_critical", False) or not crit_fail
                 approve = st.checkbox(f"Approve to proceed despite CRITICAL failures for {name}", key=f"approve_{name}_{exec_id}", value=approve_default)
@@ -186,9 +187,9 @@ if st.button("Run Selected Steps", key=f"btn_run_{exec_id}"):
             else:
                 try:
                     df_land = pd.read_csv(io.StringIO(state["landing"][name]))
-                    integ_targets = sorted(sttm_df[(sttm_df["Target Schema"].str.lower()=="integration") & (sttm_df["Source Table"].str.lower()==name.lower())]["Target Table"].unique().tolist())
+                    integ_targets = sttm_plan.targets_from("integration", name)
                     for it in integ_targets:
-                        plan = build_integration_plan(sttm_df, it)
+                        tplan = sttm_plan.target("integration", it); plan = tplan.integration_plan()
                         ref_df_map = {}
                         for r in plan["refs"]:
                             csv_path = os.path.join("data","samples", f"{r['name']}.csv")
@@ -200,8 +201,8 @@ if st.button("Run Selected Steps", key=f"btn_run_{exec_id}"):
                             nm = r["name"]
                             if nm in ref_df_map: df_map[("reference", nm)] = ref_df_map[nm]
                         integrated = project_columns(df_map, plan["projection"])
-                        scd_type = get_scd_for_target(sttm_df, "integration", it, default_scd=state.get("job",{}).get("hints",{}).get("scd","SCD1"))
-                        keys = get_keys_for_target(sttm_df, "integration", it) or [c for c in integrated.columns if c.lower().endswith("_id")]
+                        scd_type = tplan.scd_or(state.get("job",{}).get("hints",{}).get("scd","SCD1"))
+                        keys = list(tplan.keys) or [c for c in integrated.columns if c.lower().endswith("_id")]
                         path_exist = os.path.join("data","integration",f"{it}.csv")
                         existing = pd.read_csv(path_exist) if os.path.exists(path_exist) else None
                         final = TransformAgent().scd_load(existing, integrated, scd_type, keys)
@@ -214,14 +215,15 @@ if st.button("Run Selected Steps", key=f"btn_run_{exec_id}"):
                     st.error(f"Integration failed for {name}: {e}")
         if "DWH" in state["job"]["plan"]["steps"]:
             try:
-                dwh_targets = build_dwh_targets(sttm_df)
+                dwh_targets = sttm_plan.tables("dwh")
                 for dtgt in dwh_targets:
-                    src_tables = sttm_df[(sttm_df["Target Schema"].str.lower()=="dwh") & (sttm_df["Target Table"].str.lower()==dtgt.lower())]["Source Table"].unique().tolist()
+                    tplan = sttm_plan.target("dwh", dtgt)
+                    src_tables = [t for _, t in tplan.sources]
                     integ_name = next((t for t in src_tables if t in (state.get("integration",{}).keys())), None)
                     if not integ_name: continue
                     integ_df = pd.read_csv(io.StringIO(state["integration"][integ_name]))
-                    scd_type = get_scd_for_target(sttm_df, "dwh", dtgt, default_scd=state.get("job",{}).get("hints",{}).get("scd","SCD1"))
-                    keys = get_keys_for_target(sttm_df, "dwh", dtgt) or [c for c in integ_df.columns if c.lower().endswith("_id")]
+                    scd_type = tplan.scd_or(state.get("job",{}).get("hints",{}).get("scd","SCD1"))
+                    keys = list(tplan.keys) or [c for c in integ_df.columns if c.lower().endswith("_id")]
                     path_exist = os.path.join("data","dwh",f"{dtgt}.csv")
                     existing = pd.read_csv(path_exist) if os.path.exists(path_exist) else None
                     final = TransformAgent().scd_load(existing, integ_df, scd_type, keys)
@@ -250,12 +252,21 @@ if st.button("Run Selected Steps", key=f"btn_run_{exec_id}"):
                 failed = sum(sum(1 for r in v["report"]["results"] if not r["passed"]) for v in state["dq_reports"].values())
                 passed = total - failed
                 context["dq"]["summary"] = {"total": total, "passed": passed, "failed": failed}
+                context["quarantine"] = [{"source": k, **v["report"]["quarantine"]} for k, v in state["dq_reports"].items() if v["report"].get("quarantine")]
             html = render_report_html("templates", context)
-            out_dir = os.path.join("data","reports", state["run_id"]); paths = save_html_and_pdf(html, out_dir, "run_report")
+            out_dir = os.path.join("data","reports", state["run_id"]); paths = save_html_and_pdf(html, out_dir, "run_report", wait=False)
             st.success(f"Report generated → {paths['html']}")
             st.markdown(f"[Open HTML]({paths['html']})")
+            state["report_pdf_pending"] = paths["pdf_pending"]; save_state(state)
         except Exception as e:
             st.error(f"Report failed: {e}")
 
+if state.get("report_pdf_pending"):
+    pdf = pdf_result(state["report_pdf_pending"])
+    if pdf is None: st.caption("Report PDF is rendering in the background…")
+    else:
+        if pdf: st.markdown(f"[Open PDF]({pdf})")
+        state.pop("report_pdf_pending"); save_state(state)
+
 st.markdown("---")
 st.caption("LLM-enabled guided build. If OPENAI_API_KEY is set, I parse the chat to suggest steps and add sample sources. Then: Generate Plan → Run Selected Steps.")
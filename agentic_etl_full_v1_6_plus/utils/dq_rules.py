@@ -1,8 +1,10 @@
-
 from __future__ import annotations
-from typing import List, Dict, Any, Optional
-import pandas as pd, re
+from typing import List, Dict, Any, Optional, Callable
+import numpy as np, pandas as pd, re
+from utils.regex_kernel import regex_match
+from utils.quarantine import ROW_COL, RULES_COL, open_sink, records
 EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+CHUNK_ROWS = 100_000; SAMPLE_ROWS = 50
 def infer_primary_keys(df: pd.DataFrame) -> List[str]:
     return [c for c in df.columns if c.lower()=='id' or c.lower().endswith('_id')]
 def propose_rules(df: pd.DataFrame, primary_keys: Optional[List[str]]=None) -> List[Dict[str, Any]]:
@@ -16,32 +18,71 @@ def propose_rules(df: pd.DataFrame, primary_keys: Optional[List[str]]=None) -> L
         if df[c].dtype.kind in 'iuf': rules.append({'rule': f'TYPE_NUMERIC:{c}', 'severity':'MAJOR'})
         rules.append({'rule': f'NULL_PCT:{c}:<=0.2', 'severity':'MINOR'})
     return rules
+def rule_masker(df: pd.DataFrame, rule: str) -> Callable[[int, int], np.ndarray]:
+    """f(start, stop) -> bool array of rows in df[start:stop] failing `rule`. Whole-column facts
+    (duplicates, null share) are computed once here, so the frame can be checked in chunks."""
+    none = lambda a, b: np.zeros(len(df.index[a:b]), dtype=bool)
+    if rule.startswith('NOT_NULL:'):
+        col=rule.split(':',1)[1]; s=df[col]; return lambda a, b: s.iloc[a:b].isna().to_numpy()
+    if rule.startswith('UNIQUE:'):
+        col=rule.split(':',1)[1]; dup=df[col].duplicated(keep=False).to_numpy(); return lambda a, b: dup[a:b]
+    if rule.startswith('REGEX:'):
+        _, col, kind = rule.split(':'); s=df[col]
+        if kind=='EMAIL': return lambda a, b: ~regex_match(s.iloc[a:b], EMAIL_RE, na=False)
+    if rule.startswith('TYPE_NUMERIC:'):
+        col=rule.split(':',1)[1]; s=df[col]
+        def bad(a, b):
+            x=s.iloc[a:b]; return (pd.to_numeric(x, errors='coerce').isna() & x.notna()).to_numpy()
+        return bad
+    if rule.startswith('NULL_PCT:'):
+        _, col, thresh = rule.split(':'); s=df[col]
+        val = float(thresh.split('=')[-1]) if '=' in thresh else float(thresh[2:])
+        return none if float(s.isna().mean()) <= val else (lambda a, b: s.iloc[a:b].isna().to_numpy())
+    return none
 def _failed_rows(df: pd.DataFrame, rule: str) -> pd.DataFrame:
+    try: return df[rule_masker(df, rule)(0, len(df))]
+    except Exception: return df.iloc[0:0]  # a broken rule is reported by run_checks, not as "every row failed"
+def run_checks(df: pd.DataFrame, rules: List[Dict[str, Any]], quarantine: Optional[str]=None, quarantine_table: str='quarantine',
+               on_clean: Optional[Callable[[pd.DataFrame], None]]=None, chunk_rows: int=CHUNK_ROWS, samples: int=SAMPLE_ROWS) -> Dict[str, Any]:
+    """Check all rules in one pass over df in chunks of chunk_rows. Only masks are kept: failing rows go to
+    the quarantine store (open_sink path) once each, tagged with every rule they fail, a few of them per
+    rule are kept as 'sample', and clean rows are handed to on_clean chunk by chunk."""
+    names=[r['rule'] for r in rules]; errors: Dict[int, str]={}; maskers: List[Optional[Callable]]=[]
+    for j, name in enumerate(names):
+        try: maskers.append(rule_masker(df, name))
+        except Exception as e: maskers.append(None); errors[j]=f'{type(e).__name__}: {e}'
+    counts=np.zeros(len(rules), dtype=np.int64); picked: Dict[int, List[pd.DataFrame]]={}; bad_rows=0
+    sink=open_sink(quarantine, quarantine_table) if quarantine else None
+    step=max(1, chunk_rows if (sink is not None or on_clean is not None) else len(df))
     try:
-        if rule.startswith('NOT_NULL:'):
-            col=rule.split(':',1)[1]; return df[df[col].isna()]
-        if rule.startswith('UNIQUE:'):
-            col=rule.split(':',1)[1]; return df[df[col].duplicated(keep=False)]
-        if rule.startswith('REGEX:'):
-            _, col, kind = rule.split(':'); 
-            if kind=='EMAIL': return df[~df[col].fillna('').str.match(EMAIL_RE)]
-        if rule.startswith('TYPE_NUMERIC:'):
-            col=rule.split(':',1)[1]; 
-            pd.to_numeric(df[col], errors='raise'); return df.iloc[0:0]
-        if rule.startswith('NULL_PCT:'):
-            _, col, thresh = rule.split(':'); 
-            val = float(thresh.split('=')[-1]) if '=' in thresh else float(thresh[2:])
-            pct = float(df[col].isna().mean())
-            return df.iloc[0:0] if pct <= val else df[df[col].isna()]
-    except Exception:
-        return df
-    return df.iloc[0:0]
-def run_checks(df: pd.DataFrame, rules: List[Dict[str, Any]]) -> Dict[str, Any]:
+        for a in range(0, len(df), step):
+            b=min(a+step, len(df)); chunk=df.iloc[a:b]; hit=np.zeros((b-a, len(rules)), dtype=bool)
+            for j, m in enumerate(maskers):
+                if m is None: continue
+                try: hit[:, j]=m(a, b)
+                except Exception as e: maskers[j]=None; errors[j]=f'{type(e).__name__}: {e}'
+            counts+=hit.sum(axis=0); bad=hit.any(axis=1); bad_rows+=int(bad.sum())
+            for j in np.flatnonzero(hit.any(axis=0)):
+                have=sum(len(x) for x in picked.get(j, []))
+                if have < samples: picked.setdefault(j, []).append(chunk[hit[:, j]].head(samples-have))
+            if sink is not None and bad.any():
+                q=chunk[bad].copy(); q.insert(0, ROW_COL, np.arange(a, b)[bad])
+                combos, inv=np.unique(hit[bad], axis=0, return_inverse=True)  # tag each distinct rule combination once
+                tags=np.array(['|'.join(names[j] for j in np.flatnonzero(c)) for c in combos], dtype=object)
+                q[RULES_COL]=tags[inv.ravel()]; sink.write(q)
+            if on_clean is not None and not bad.all(): on_clean(chunk[~bad])
+    finally:
+        if sink is not None: sink.close()
     results=[]
-    for r in rules:
-        name=r['rule']; sev=r.get('severity','MINOR')
-        fail_df=_failed_rows(df, name)
-        passed=fail_df.empty
-        results.append({'rule':name,'severity':sev,'passed':bool(passed),'failed_count':0 if passed else len(fail_df)})
-    summary={'total':len(results),'passed':sum(1 for x in results if x['passed']),'failed':sum(1 for x in results if not x['passed'])}
-    return {'results':results,'summary':summary}
+    for j, r in enumerate(rules):
+        res={'rule':names[j],'severity':r.get('severity','MINOR'),'passed':j not in errors and counts[j]==0,'failed_count':int(counts[j])}
+        if j in errors: res['error']=errors[j]
+        if j in picked: res['sample']=records(pd.concat(picked[j]))
+        results.append(res)
+    summary={'total':len(results),'passed':sum(1 for x in results if x['passed']),'failed':sum(1 for x in results if not x['passed']),
+             'rows_failed':bad_rows}
+    out={'results':results,'summary':summary}
+    if sink is not None:
+        out['quarantine']={'store':sink.location,'rows':sink.rows,'clean_rows':len(df)-bad_rows,
+                           'per_rule':{names[j]:int(counts[j]) for j in range(len(rules)) if counts[j]}}
+    return out
@@ -0,0 +1,46 @@
+from __future__ import annotations
+import os, json, sqlite3
+from typing import Any, Dict, List
+import pandas as pd
+# Error store for rows that fail DQ rules. run_checks streams failing rows here chunk by chunk, once per
+# row however many rules it fails, with _dq_row (position in the checked frame) and _dq_rules ("A|B").
+ROW_COL, RULES_COL = '_dq_row', '_dq_rules'
+class SQLiteSink:
+    def __init__(self, path: str, table: str = 'quarantine', replace: bool = True):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path, self.table, self.rows = path, table, 0
+        self.con = sqlite3.connect(path)
+        if replace: self.con.execute(f'DROP TABLE IF EXISTS "{table}"')
+    def write(self, df: pd.DataFrame) -> None:
+        df.to_sql(self.table, self.con, if_exists='append', index=False); self.rows += len(df)
+    def close(self) -> None:
+        self.con.commit(); self.con.close()
+    @property
+    def location(self) -> str: return f'{self.path}::{self.table}'
+class ParquetSink:
+    def __init__(self, path: str):
+        import pyarrow as pa, pyarrow.parquet as pq  # optional: pip install pyarrow
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.pa, self.pq, self.path, self.rows, self.writer = pa, pq, path, 0, None
+    def write(self, df: pd.DataFrame) -> None:
+        # text as string so a chunk of all-null objects doesn't fix the column type to null
+        df = df.astype({c: 'string' for c in df.columns if df[c].dtype == object})
+        t = self.pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None: self.writer = self.pq.ParquetWriter(self.path, t.schema)
+        self.writer.write_table(t.cast(self.writer.schema)); self.rows += len(df)
+    def close(self) -> None:
+        if self.writer is not None: self.writer.close()
+    @property
+    def location(self) -> str: return self.path
+def open_sink(path: str, table: str = 'quarantine'):
+    """.parquet -> ParquetSink, anything else (.db/.sqlite) -> SQLiteSink(path, table)."""
+    return ParquetSink(path) if path.lower().endswith('.parquet') else SQLiteSink(path, table)
+def read_quarantine(path: str, table: str = 'quarantine', rule: str | None = None, limit: int | None = None) -> pd.DataFrame:
+    if path.lower().endswith('.parquet'): df = pd.read_parquet(path)
+    else:
+        with sqlite3.connect(path) as con: df = pd.read_sql(f'SELECT * FROM "{table}"', con)
+    if rule: df = df[df[RULES_COL].str.split('|').apply(lambda rs: rule in rs)]
+    return df if limit is None else df.head(limit)
+def records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """JSON-safe rows for samples kept in the session state and the report."""
+    return json.loads(df.to_json(orient='records', date_format='iso'))
@@ -1,7 +1,9 @@
 
 from __future__ import annotations
-import pandas as pd, re
-from typing import Dict, Any, List
+import pandas as pd, re, os, json, hashlib, threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, List, Optional, Tuple
 RE_JOIN = re.compile(r"JOIN\s+([^.]+)\.([^.]+)\.([^\s]+)\s*=\s*([^.]+)\.([^.]+)\.([^\s]+)", re.IGNORECASE)
 RE_SCD = re.compile(r"SCD([123])", re.IGNORECASE)
 RE_PK = re.compile(r"primary\s*key", re.IGNORECASE)
@@ -15,37 +17,140 @@ def validate_sttm(df: pd.DataFrame):
     if miss: raise ValueError(f"STTM Excel missing columns: {miss}")
     for c in REQUIRED_COLS:
         if c in df.columns: df[c]=df[c].fillna("")
+# ---- STTM compiler: one pass over the workbook into an immutable, JSON-serialisable plan ----
+
+@dataclass(frozen=True)
+class Join:
+    left_schema: str
+    left_table: str
+    left_col: str
+    right_schema: str
+    right_table: str
+    right_col: str
+
+@dataclass(frozen=True)
+class ColumnMap:
+    src_schema: str
+    src_table: str
+    src_col: str
+    tgt_col: str
+    transformation: str = ""
+
+@dataclass(frozen=True)
+class TargetPlan:
+    schema: str
+    table: str
+    columns: Tuple[ColumnMap, ...]
+    keys: Tuple[str, ...]
+    scd: Optional[str]
+    joins: Tuple[Join, ...]
+
+    @property
+    def projection(self) -> List[Tuple[str,str,str,str]]:
+        return [(c.src_schema, c.src_table, c.src_col, c.tgt_col) for c in self.columns]
+
+    @property
+    def sources(self) -> List[Tuple[str,str]]:
+        return list(dict.fromkeys((c.src_schema, c.src_table) for c in self.columns))
+
+    @property
+    def left_on(self) -> List[str]:
+        return list(dict.fromkeys(j.left_col for j in self.joins if j.left_schema.lower()=="landing"))
+
+    @property
+    def refs(self) -> List[Dict[str, Any]]:
+        return [{"name": j.right_table, "df_key": j.right_col, "how": "left"} for j in self.joins if j.left_schema.lower()=="landing"]
+
+    def scd_or(self, default: str="SCD1") -> str:
+        return self.scd or default
+
+    def integration_plan(self) -> Dict[str, Any]:
+        return {"left_on": self.left_on, "refs": self.refs, "projection": self.projection}
+
+@dataclass(frozen=True)
+class STTMPlan:
+    targets: Tuple[TargetPlan, ...]
+
+    def find(self, target_schema: str, target_table: str) -> Optional[TargetPlan]:
+        s, t = target_schema.strip().lower(), target_table.strip().lower()
+        return next((p for p in self.targets if p.schema.lower()==s and p.table.lower()==t), None)
+
+    def target(self, target_schema: str, target_table: str) -> TargetPlan:
+        p = self.find(target_schema, target_table)
+        if p is None:
+            raise ValueError(f"No STTM rows for {target_schema} target {target_table}")
+        return p
+
+    def tables(self, target_schema: str) -> List[str]:
+        return sorted(p.table for p in self.targets if p.schema.lower()==target_schema.lower())
+
+    def targets_from(self, target_schema: str, source_table: str) -> List[str]:
+        """Targets of a layer fed by a given source table (e.g. the integration tables built from one landing dataset)."""
+        return sorted(p.table for p in self.targets if p.schema.lower()==target_schema.lower()
+                      and any(t.lower()==source_table.lower() for _, t in p.sources))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "STTMPlan":
+        return cls(tuple(TargetPlan(t["schema"], t["table"], tuple(ColumnMap(**c) for c in t["columns"]), tuple(t["keys"]),
+                                    t["scd"], tuple(Join(**j) for j in t["joins"])) for t in d["targets"]))
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+def _cell(v) -> str:
+    return "" if v is None or (isinstance(v, float) and v != v) else str(v).strip()
+
+def compile_sttm(df: pd.DataFrame) -> STTMPlan:
+    """Targets (in workbook order) with their column maps, keys, SCD type and joins, from a single pass over the rows."""
+    acc: Dict[Tuple[str,str], Dict[str, Any]] = {}
+    for src_schema, src_table, src_col, biz, expr, tgt_schema, tgt_table, tgt_col in zip(*(df[c] for c in REQUIRED_COLS)):
+        tgt_schema, tgt_table, src_col, biz = _cell(tgt_schema), _cell(tgt_table), _cell(src_col), _cell(biz)
+        t = acc.setdefault((tgt_schema.lower(), tgt_table.lower()),
+                           {"schema": tgt_schema, "table": tgt_table, "columns": [], "keys": [], "scd": None, "joins": []})
+        tgt_col = _cell(tgt_col) or src_col
+        t["columns"].append(ColumnMap(_cell(src_schema).lower(), _cell(src_table), src_col, tgt_col, _cell(expr)))
+        if RE_PK.search(biz) and tgt_col and tgt_col not in t["keys"]:
+            t["keys"].append(tgt_col)
+        m = RE_SCD.search(biz)
+        if m and t["scd"] is None:
+            t["scd"] = f"SCD{m.group(1)}"
+        m = RE_JOIN.search(biz)
+        if m and Join(*m.groups()) not in t["joins"]:  # one join per lookup, however many columns it feeds
+            t["joins"].append(Join(*m.groups()))
+    return STTMPlan(tuple(TargetPlan(t["schema"], t["table"], tuple(t["columns"]), tuple(t["keys"]), t["scd"], tuple(t["joins"]))
+                          for t in acc.values()))
+
+_PLANS: "OrderedDict[tuple, STTMPlan]" = OrderedDict(); _PLANS_MAX = 16; _PLANS_LOCK = threading.Lock()
+
+def _plan_for(key: tuple, src) -> STTMPlan:
+    """LRU of compiled plans keyed on (path, mtime, size) or the upload's sha1; src is read only on a miss."""
+    with _PLANS_LOCK:
+        plan = _PLANS.get(key)
+        if plan is not None: _PLANS.move_to_end(key); return plan
+    df=load_sttm_excel(src); validate_sttm(df); plan=compile_sttm(df)
+    with _PLANS_LOCK:
+        _PLANS[key] = plan
+        while len(_PLANS) > _PLANS_MAX: _PLANS.popitem(last=False)
+    return plan
+
+def load_sttm_plan(path_or_bytes) -> STTMPlan:
+    """Compiled plan for a workbook path (cached until the file changes) or uploaded bytes (cached by content)."""
+    if isinstance(path_or_bytes,(bytes,bytearray)):
+        data=bytes(path_or_bytes); return _plan_for(("bytes", hashlib.sha1(data).hexdigest()), data)
+    st_=os.stat(path_or_bytes)
+    return _plan_for((os.path.abspath(path_or_bytes), st_.st_mtime_ns, st_.st_size), path_or_bytes)
+
 def get_scd_for_target(df: pd.DataFrame, target_schema: str, target_table: str, default_scd: str="SCD1")->str:
-    rows=df[(df["Target Schema"].str.lower()==target_schema.lower()) & (df["Target Table"].str.lower()==target_table.lower())]
-    for _,r in rows.iterrows():
-        m=RE_SCD.search(str(r["Business Logic"]))
-        if m: return f"SCD{m.group(1)}"
-    return default_scd
+    p=compile_sttm(df).find(target_schema, target_table)
+    return p.scd_or(default_scd) if p else default_scd
 def get_keys_for_target(df: pd.DataFrame, target_schema:str, target_table:str)->list:
-    keys=[]; rows=df[(df["Target Schema"].str.lower()==target_schema.lower()) & (df["Target Table"].str.lower()==target_table.lower())]
-    for _,r in rows.iterrows():
-        if RE_PK.search(str(r["Business Logic"])):
-            col=str(r["Target Column"]).strip() or str(r["Source Column"]).strip()
-            if col and col not in keys: keys.append(col)
-    return keys
+    p=compile_sttm(df).find(target_schema, target_table)
+    return list(p.keys) if p else []
 def build_integration_plan(df: pd.DataFrame, target_table: str)->dict:
-    rows=df[(df["Target Schema"].str.lower()=="integration") & (df["Target Table"].str.lower()==target_table.lower())]
-    if rows.empty: raise ValueError(f"No STTM rows for integration target {target_table}")
-    left_on, refs, projection = [], [], []
-    for _,r in rows.iterrows():
-        src_schema=str(r["Source Schema"]).strip().lower()
-        src_table=str(r["Source Table"]).strip()
-        src_col=str(r["Source Column"]).strip()
-        tgt_col=str(r["Target Column"]).strip() or src_col
-        biz=str(r["Business Logic"])
-        projection.append((src_schema, src_table, src_col, tgt_col))
-        m=RE_JOIN.search(biz)
-        if m:
-            l_schema,l_table,l_col,r_schema,r_table,r_col = m.groups()
-            if l_schema.lower()=="landing":
-                if l_col not in left_on: left_on.append(l_col)
-                refs.append({"name": r_table, "df_key": r_col, "how":"left"})
-    return {"left_on": left_on, "refs": refs, "projection": projection}
+    return compile_sttm(df).target("integration", target_table).integration_plan()
 def project_columns(df_map: Dict[tuple, pd.DataFrame], projection):
     import pandas as pd
     base_key=None
@@ -62,4 +167,4 @@ def project_columns(df_map: Dict[tuple, pd.DataFrame], projection):
         out[tgt_col]=s[src_col]
     return out if not out.empty else base_df.copy()
 def build_dwh_targets(df: pd.DataFrame)->list:
-    return sorted(df[df["Target Schema"].str.lower()=="dwh"]["Target Table"].str.strip().unique().tolist())
+    return compile_sttm(df).tables("dwh")
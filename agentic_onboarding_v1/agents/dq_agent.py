@@ -1,7 +1,7 @@
 
 from typing import Dict, Any, List, Tuple
 import pandas as pd
-from ..tools import dq as dqtools
+from tools import dq as dqtools
 
 def generate_rules(df: pd.DataFrame) -> List[Dict[str, Any]]:
     return dqtools.propose_rules(df)
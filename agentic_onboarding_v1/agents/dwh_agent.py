@@ -1,7 +1,7 @@
 
 import pandas as pd
 from typing import Dict, Any
-from ..tools.transforms import apply_filters, scd_type1_merge, scd_type2_merge
+from tools.transforms import apply_filters, scd_type1_merge, scd_type2_merge
 
 def to_dwh(integration_df: pd.DataFrame, sttm: Dict[str, Any]) -> pd.DataFrame:
     df = integration_df.copy()
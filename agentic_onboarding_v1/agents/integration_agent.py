@@ -1,18 +1,19 @@
 
 import pandas as pd, yaml
 from typing import Dict, Any
-from ..tools.sttm import load_sttm, generate_sttm_from_brd
-from ..tools.transforms import scd_type1_merge, scd_type2_merge
-from ..tools.connectors import write_sqlite, read_local_csv
+from tools.sttm import load_sttm, generate_sttm_from_brd
+from tools.transforms import scd_type1_merge, scd_type2_merge, widen_numerics
+from tools.connectors import write_sqlite, read_local_csv
 
 def transform_to_integration(df: pd.DataFrame, sttm: Dict[str, Any]) -> pd.DataFrame:
     mappings = sttm.get("target_integration", {}).get("mappings", [])
     out = pd.DataFrame()
+    wide = widen_numerics(df) if any("expr" in m for m in mappings) else df
     for m in mappings:
         if "source" in m:
             out[m["target"]] = df[m["source"]]
         elif "expr" in m:
-            out[m["target"]] = df.eval(m["expr"])
+            out[m["target"]] = wide.eval(m["expr"])
     return out
 
 def load_integration(existing_df: pd.DataFrame, incoming_df: pd.DataFrame, sttm: Dict[str, Any]) -> pd.DataFrame:
@@ -1,9 +1,10 @@
 
 import pandas as pd, re
 from typing import Dict, Any, Tuple
-from ..tools import dq as dqtools
-from ..tools.connectors import read_local_csv, read_s3_csv, write_sqlite
-from ..tools.transforms import cast_types
+from tools import dq as dqtools
+from tools.connectors import read_local_csv, read_s3_csv, write_sqlite
+from tools.connectors import is_multi_uri, expand_uri, pending_files, read_many_csv, reconcile_schemas, append_with_ledger
+from tools.transforms import cast_types, propose_compact_types
 
 def detect_source(uri: str) -> str:
     if uri.startswith("s3://"): return "s3"
@@ -22,7 +23,7 @@ def read_source(uri: str) -> pd.DataFrame:
         raise RuntimeError(f"Unsupported source: {uri}")
 
 def propose_type_fixes(df: pd.DataFrame) -> Dict[str, str]:
-    proposals = {}
+    proposals = propose_compact_types(df)
     for col in df.columns:
         s = df[col]
         if re.search(r"date$", col, re.I):
@@ -33,8 +34,25 @@ def propose_type_fixes(df: pd.DataFrame) -> Dict[str, str]:
             proposals[col] = "int"
     return proposals
 
-def land(uri: str, integration_db: str, landing_table: str, log) -> Tuple[pd.DataFrame, Dict[str, Any]]:
-    df = read_source(uri)
-    prof = dqtools.profile(df)
-    proposals = propose_type_fixes(df)
-    return df, {"profile": prof, "proposals": proposals, "landing_table": landing_table}
+def land(uri: str, integration_db: str, landing_table: str, log, workers: int = 4) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    info: Dict[str, Any] = {"landing_table": landing_table}
+    if is_multi_uri(uri):
+        # glob/dir/manifest: only files missing from the ledger, read in parallel and unioned;
+        # pass info["files"] to commit_landing once the frame is accepted
+        paths = expand_uri(uri)
+        todo = pending_files(paths, integration_db, landing_table)
+        log(f"{len(paths)} files matched, {len(paths) - len(todo)} already landed")
+        frames = read_many_csv(todo, workers=workers)
+        df, schema = reconcile_schemas(frames, [p.split("/")[-1] for p in todo])
+        info.update({"files": [(p, len(f)) for p, f in zip(todo, frames)], "schema": schema})
+    else:
+        df = read_source(uri)
+    info["profile"] = dqtools.profile(df)
+    info["proposals"] = propose_type_fixes(df)
+    return df, info
+
+def commit_landing(df: pd.DataFrame, integration_db: str, info: Dict[str, Any]) -> None:
+    if info.get("files") is None:
+        write_sqlite(df, integration_db, info["landing_table"], if_exists="replace")
+    elif info["files"]:
+        append_with_ledger(df, integration_db, info["landing_table"], info["files"])
@@ -6,9 +6,10 @@ from pathlib import Path
 from agents.orchestrator import route_intent
 from agents import landing_agent, dq_agent, integration_agent, dwh_agent, reporting_agent
 from tools.utils import step_logger, run_id as new_run_id, load_yaml
+from tools.tracing import Tracer, set_tracer
 from tools.connectors import write_sqlite, read_sqlite, write_local_csv, read_local_csv
 from tools.sttm import load_sttm, generate_sttm_from_brd
-from tools.transforms import cast_types
+from tools.transforms import cast_types, propose_compact_types, memory_saved
 
 st.set_page_config(page_title="Agentic Data Onboarding Chatbot", page_icon="🧠", layout="wide")
 
@@ -40,6 +41,9 @@ if "chat" not in st.session_state:
     st.session_state.chat = []
 if "run_id" not in st.session_state:
     st.session_state.run_id = new_run_id()
+if "tracer" not in st.session_state:
+    st.session_state.tracer = Tracer("onboarding")
+set_tracer(st.session_state.tracer)
 if "state" not in st.session_state:
     st.session_state.state = {
         "landing": {}, "dq": {}, "integration": {}, "dwh": {}, "report": {}
@@ -58,17 +62,23 @@ def quickstart_pipeline():
     run_id = st.session_state.run_id
     int_db = st.session_state["integration_db"]
     dwh_db = st.session_state["warehouse_db"]
-    with step_logger(log_to_ui, "Landing: read & profile sample customers"):
+    with step_logger(log_to_ui, "Landing: read & profile sample customers") as sp:
         uri = "file://data/samples/customers.csv"
         df = read_local_csv("data/samples/customers.csv")
+        sp["rows"] = len(df)
         st.session_state.state["landing"] = {"source": uri, "rows": len(df)}
         think("profiling columns…")
         from tools import dq as dqtools
         prof = dqtools.profile(df)
         st.session_state.state["landing"]["profile"] = prof
-        props = {"birthdate": "date"}
+        props = {**propose_compact_types(df), "birthdate": "date"}
         think("proposing type fixes…")
+        raw = df.copy()
         df = cast_types(df, props)
+        mem = memory_saved(raw, df)
+        st.session_state.state["landing"]["memory"] = mem
+        log_to_ui(f"Compacted dtypes ({', '.join(f'{c}→{t}' for c, t in props.items())}): "
+                  f"{mem['before_bytes']/1024:,.1f} KB → {mem['after_bytes']/1024:,.1f} KB (−{mem['saved_pct']}%)")
         write_sqlite(df, int_db, "landing_customers", if_exists="replace")
         st.session_state.state["landing"]["landed_table"] = "landing_customers"
     with step_logger(log_to_ui, "DQ: generate & apply rules"):
@@ -80,7 +90,7 @@ def quickstart_pipeline():
         bad = [r for r in results if not r["passed"]]
         if bad:
             log_to_ui(f"⚠️ DQ issues detected: {len(bad)} rule(s) failed. You can refine rules in chat.")
-    with step_logger(log_to_ui, "Integration: STTM transform & SCD2 load"):
+    with step_logger(log_to_ui, "Integration: STTM transform & SCD2 load") as sp:
         sttm = load_yaml("sttm/customer_dim_sttm.yaml")
         out = integration_agent.transform_to_integration(df, sttm)
         # Read current stage if exists
@@ -91,6 +101,7 @@ def quickstart_pipeline():
         merged = integration_agent.load_integration(existing, out, sttm)
         write_sqlite(merged, int_db, "int_customer_dim_stage", if_exists="replace")
         st.session_state.state["integration"] = {"table":"int_customer_dim_stage","rows": len(merged)}
+        sp["rows"] = len(merged)
     with step_logger(log_to_ui, "DWH: filter US/CA and SCD2 merge"):
         from agents.dwh_agent import to_dwh, load_dwh
         dwh_in = to_dwh(merged, sttm)
@@ -133,12 +144,18 @@ if prompt:
             up = st.file_uploader("Upload CSV", type=["csv"], key=f"up_{len(st.session_state.chat)}")
             uri = st.text_input("…or enter URI (file:// or s3://)", value="file://data/samples/customers.csv", key=f"uri_{len(st.session_state.chat)}")
             if st.button("Run Landing", key=f"run_land_{len(st.session_state.chat)}"):
-                df = read_local_csv(uri.replace("file://","")) if uri.startswith("file://") else None
-                with st.spinner("profiling…"):
-                    from tools import dq as dqtools
-                    prof = dqtools.profile(df)
-                    st.write(prof)
-                st.session_state.state["landing"] = {"source": uri, "profile": prof, "rows": len(df)}
+                int_db = st.session_state["integration_db"]
+                with st.spinner("reading & profiling…"):
+                    if up is not None:
+                        from tools import dq as dqtools
+                        df = pd.read_csv(up); info = {"landing_table": "landing_customers", "profile": dqtools.profile(df)}
+                    else:
+                        # glob/dir/manifest URIs only read files missing from the ledger
+                        df, info = landing_agent.land(uri, int_db, "landing_customers", log_to_ui)
+                    landing_agent.commit_landing(df, int_db, info)
+                    st.write(info["profile"])
+                st.session_state.state["landing"] = {"source": up.name if up is not None else uri, "profile": info["profile"], "rows": len(df),
+                                                     "landed_table": "landing_customers", "files": info.get("files"), "schema": info.get("schema")}
 
     elif intent == "dq":
         with st.chat_message("assistant"):
@@ -203,3 +220,15 @@ if prompt:
 
     else:
         log_to_ui("I’ll begin with Landing. You can then ask me to run DQ, Integration, DWH, and Reporting.")
+
+# ---- Sidebar: Performance (rendered last so it includes this run's spans) ----
+with st.sidebar.expander("Performance", expanded=False):
+    tr = st.session_state.tracer
+    if tr.spans:
+        st.dataframe(tr.summary(), use_container_width=True, hide_index=True)
+        st.download_button("Download JSONL", tr.jsonl(), file_name=f"trace_{st.session_state.run_id}.jsonl")
+        st.download_button("Download Chrome trace", json.dumps(tr.chrome_trace(), default=str), file_name=f"trace_{st.session_state.run_id}.json")
+        if tr.dropped: st.caption(f"Only the newest {tr.spans.maxlen:,} spans are kept ({tr.dropped:,} dropped).")
+        if st.button("Clear trace"): tr.clear()
+    else:
+        st.caption("No spans yet — run a step to see timings.")
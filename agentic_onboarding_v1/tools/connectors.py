@@ -1,9 +1,13 @@
 
-import os, io, json
+import os, io, json, glob
 import pandas as pd
-from typing import Optional
+from typing import Optional, List, Tuple, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from .utils import ensure_dirs
 
+LEDGER_TABLE = "_landed_files"
+MANIFEST_EXT = (".manifest", ".lst", ".manifest.json")  # a plain .json is data, not a file list
+
 # Local CSV
 def read_local_csv(path: str) -> pd.DataFrame:
     return pd.read_csv(path)
@@ -12,12 +16,57 @@ def write_local_csv(df: pd.DataFrame, path: str) -> None:
     ensure_dirs(path)
     df.to_csv(path, index=False)
 
-# SQLite via SQLAlchemy
-from sqlalchemy import create_engine, text
+# Multi-file sources: glob pattern, directory, or manifest (.manifest/.lst one path per line, .manifest.json {"files": [...]})
+def _strip_file(uri: str) -> str:
+    return os.path.expanduser(uri.replace("file://", "", 1))
+
+def is_multi_uri(uri: str) -> bool:
+    if uri.startswith("s3://"): return False
+    path = _strip_file(uri)
+    return any(ch in path for ch in "*?[") or os.path.isdir(path) or path.lower().endswith(MANIFEST_EXT)
+
+def expand_uri(uri: str) -> List[str]:
+    path = _strip_file(uri)
+    if any(ch in path for ch in "*?["):
+        return sorted(p for p in glob.glob(path, recursive=True) if os.path.isfile(p))
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(".csv"))
+    if path.lower().endswith(MANIFEST_EXT):
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f).get("files", []) if path.lower().endswith(".json") else [ln.strip() for ln in f if ln.strip() and not ln.startswith("#")]
+        return [e if os.path.isabs(e) else os.path.join(os.path.dirname(path), e) for e in entries]
+    return [path]
+
+def read_many_csv(paths: List[str], workers: int = 4, use_processes: bool = False) -> List[pd.DataFrame]:
+    # results keep input order; threads are enough for CSV since the parser releases the GIL
+    if workers <= 1 or len(paths) <= 1: return [read_local_csv(p) for p in paths]
+    pool = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool(max_workers=min(workers, len(paths))) as ex:
+        return list(ex.map(read_local_csv, paths))
+
+def reconcile_schemas(frames: List[pd.DataFrame], names: List[str]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    # union by column name in first-seen order; missing columns become nulls
+    cols: List[str] = []; dtypes: Dict[str, set] = {}
+    for df in frames:
+        for c in df.columns:
+            if c not in dtypes: cols.append(c); dtypes[c] = set()
+            dtypes[c].add(str(df[c].dtype))
+    report = {"columns": cols,
+              "missing_by_file": {n: [c for c in cols if c not in df.columns] for n, df in zip(names, frames) if set(cols) - set(df.columns)},
+              "dtype_conflicts": {c: sorted(t) for c, t in dtypes.items() if len(t) > 1}}
+    if not frames: return pd.DataFrame(), report
+    return pd.concat([df.reindex(columns=cols) for df in frames], ignore_index=True), report
+
+# SQLite via SQLAlchemy (imported on first use to keep app start light)
 def sqlite_engine(path: str):
+    from sqlalchemy import create_engine
     ensure_dirs(path)
     return create_engine(f"sqlite:///{path}", future=True)
 
+def text(sql: str):
+    from sqlalchemy import text as _text
+    return _text(sql)
+
 def write_sqlite(df: pd.DataFrame, db_path: str, table: str, if_exists="replace"):
     eng = sqlite_engine(db_path)
     with eng.begin() as conn:
@@ -49,3 +98,33 @@ def not_configured(name: str):
 def write_snowflake(*args, **kwargs): not_configured("Snowflake")
 def write_redshift(*args, **kwargs): not_configured("Redshift")
 def write_databricks(*args, **kwargs): not_configured("Databricks")
+
+# Processed-file ledger kept next to the landing table: re-runs skip files already landed
+def _file_sig(path: str) -> Tuple[int, float]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime
+
+def pending_files(paths: List[str], db_path: str, table: str) -> List[str]:
+    done = {}
+    if os.path.exists(db_path):
+        try:
+            rows = read_sqlite(db_path, f"SELECT path, size, mtime FROM {LEDGER_TABLE} WHERE landing_table = '{table}'")
+            done = {r.path: (int(r.size), float(r.mtime)) for r in rows.itertuples()}
+        except Exception:
+            done = {}
+    return [p for p in paths if done.get(os.path.abspath(p)) != _file_sig(p)]
+
+def append_with_ledger(df: pd.DataFrame, db_path: str, table: str, files: List[Tuple[str, int]]):
+    # rows and ledger entries commit together; new columns are added so drifting files still union
+    eng = sqlite_engine(db_path)
+    with eng.begin() as conn:
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {LEDGER_TABLE} (landing_table TEXT, path TEXT, size INTEGER, mtime REAL, rows INTEGER, landed_at TEXT, PRIMARY KEY (landing_table, path))"))
+        have = [r[1] for r in conn.execute(text(f'PRAGMA table_info("{table}")')).fetchall()]
+        for c in (df.columns if have else []):
+            if c not in have: conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN "{c}"'))
+        df.to_sql(table, conn, if_exists="append", index=False)
+        now = pd.Timestamp.utcnow().isoformat()
+        for path, rows in files:
+            size, mtime = _file_sig(path)
+            conn.execute(text(f"INSERT OR REPLACE INTO {LEDGER_TABLE} VALUES (:t, :p, :s, :m, :r, :at)"),
+                         {"t": table, "p": os.path.abspath(path), "s": size, "m": mtime, "r": rows, "at": now})
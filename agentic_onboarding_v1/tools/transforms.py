@@ -3,6 +3,31 @@ import pandas as pd, numpy as np, hashlib, time
 from typing import Dict, Any, List
 from .connectors import write_sqlite, read_sqlite
 
+BOOL_WORDS = {"true": True, "false": False, "yes": True, "no": False, "y": True, "n": False}
+
+def propose_compact_types(df: pd.DataFrame, max_card_ratio: float = 0.5) -> Dict[str, str]:
+    """Value-based proposals that shrink a freshly read frame: yes/no text -> bool,
+    low-cardinality text -> category, wide ints/floats -> downcast."""
+    proposals = {}
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(s.dtype):
+            continue
+        if pd.api.types.is_numeric_dtype(s.dtype):
+            if s.dtype.itemsize > 1:
+                proposals[col] = "downcast"
+            continue
+        vals = s.dropna().astype(str).str.strip().str.lower()
+        if len(vals) and vals.isin(list(BOOL_WORDS)).all():
+            proposals[col] = "bool"
+        elif 0 < s.nunique() <= max_card_ratio * len(s):
+            proposals[col] = "category"
+    return proposals
+
+def memory_saved(before: pd.DataFrame, after: pd.DataFrame) -> Dict[str, Any]:
+    b = int(before.memory_usage(index=True, deep=True).sum()); a = int(after.memory_usage(index=True, deep=True).sum())
+    return {"before_bytes": b, "after_bytes": a, "saved_bytes": b - a, "saved_pct": round(100 * (b - a) / b, 1) if b else 0.0}
+
 def cast_types(df: pd.DataFrame, proposals: Dict[str, str]) -> pd.DataFrame:
     for col, typ in proposals.items():
         if typ == "date":
@@ -15,8 +40,30 @@ def cast_types(df: pd.DataFrame, proposals: Dict[str, str]) -> pd.DataFrame:
             df[col] = pd.to_numeric(df[col], errors="coerce")
         elif typ == "str":
             df[col] = df[col].astype(str)
+        elif typ == "category":
+            df[col] = df[col].astype("category")
+        elif typ == "bool":
+            df[col] = df[col].astype(str).str.strip().str.lower().map(BOOL_WORDS).where(df[col].notna()).astype("boolean")
+        elif typ == "downcast":
+            s = df[col]
+            if pd.api.types.is_integer_dtype(s.dtype):
+                df[col] = pd.to_numeric(s, downcast="integer")
+            elif s.dropna().eq(s.dropna().round()).all():
+                df[col] = pd.to_numeric(s.astype("Int64"), downcast="integer")
+            elif (s.astype(np.float32).astype(s.dtype) == s)[s.notna()].all():
+                df[col] = s.astype(np.float32)
     return df
 
+def widen_numerics(df: pd.DataFrame) -> pd.DataFrame:
+    """Undo "downcast" before evaluating STTM expressions: int8/int16 arithmetic wraps (100 + 100 = -56)."""
+    wide = {}
+    for col in df.columns:
+        t = df[col].dtype
+        if pd.api.types.is_bool_dtype(t) or not pd.api.types.is_numeric_dtype(t) or t.itemsize >= 8: continue
+        if pd.api.types.is_float_dtype(t): wide[col] = "float64"
+        else: wide[col] = "Int64" if isinstance(t, pd.api.extensions.ExtensionDtype) else "int64"
+    return df.astype(wide) if wide else df
+
 def scd_type1_merge(existing: pd.DataFrame, incoming: pd.DataFrame, bk: List[str]) -> pd.DataFrame:
     # Overwrite by business key
     if existing is None or len(existing)==0:
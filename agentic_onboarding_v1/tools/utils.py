@@ -1,6 +1,7 @@
 
 import os, time, uuid, yaml, re, json, contextlib, datetime as dt
 from typing import Dict, Any
+from .tracing import span
 
 def load_yaml(path: str) -> Dict[str, Any]:
     with open(path, "r") as f:
@@ -14,11 +15,13 @@ def run_id() -> str:
     return dt.datetime.utcnow().strftime("%Y%m%d%H%M%S") + "-" + uuid.uuid4().hex[:6]
 
 @contextlib.contextmanager
-def step_logger(log, label: str):
+def step_logger(log, label: str, cat: str = "stage", **attrs):
+    # also records a tracing span; the yielded dict takes rows/bytes, e.g. sp["rows"] = len(df)
     t0 = time.time()
     log(f"⏳ {label}…")
     try:
-        yield
+        with span(label, cat, **attrs) as sp:
+            yield sp
         dt_s = time.time() - t0
         log(f"✅ {label} done in {dt_s:.2f}s")
     except Exception as e:
@@ -1,27 +1,39 @@
 import pandas as pd
 from typing import Dict, Any, List
-from tools.sttm import load_sttm_excel, target_table_from_map
+from tools.sttm import compile_sttm
 from tools.transforms import scd_type1_merge, scd_type2_merge
+from tools.tracing import span
+from tools.dtypes import compact_dtypes, expand_categories, widen_numerics
+from tools.schema_registry import mapping_plan, SchemaDriftError
 
-def _apply_mapping(df: pd.DataFrame, sttm_map: pd.DataFrame) -> pd.DataFrame:
+def _apply_mapping(df: pd.DataFrame, sttm_map, strict: bool = False) -> pd.DataFrame:
     out = pd.DataFrame()
-    for _, r in sttm_map.iterrows():
-        tgt_col = r["Target Column"]; src_col = r.get("Source Column"); expr = r.get("Transformation")
-        if not tgt_col or pd.isna(tgt_col): continue
-        if isinstance(expr, str) and expr.strip():
-            local_df = df.copy()
-            try:
-                out[tgt_col] = eval(expr, {}, {"df": local_df, **{c: local_df[c] for c in local_df.columns}})
-            except Exception:
-                out[tgt_col] = pd.eval(expr, engine="python")
-        elif isinstance(src_col, str) and src_col in df.columns:
-            out[tgt_col] = df[src_col]
+    local_df = widen_numerics(expand_categories(df))  # strings can't concat/split categories; int8 sums wrap
+    plan = mapping_plan(sttm_map, df.columns)
+    missing = [s["source"] for s in plan if s["kind"] == "missing"]
+    if missing and strict: raise SchemaDriftError(f"STTM source columns not in the data: {missing}")
+    for s in plan:
+        tgt_col = s["target"]
+        if s["kind"] == "missing": continue
+        with span(f"sttm.{tgt_col}", cat="sttm", rows=len(df), transform=s["kind"] == "expr"):
+            if s["kind"] == "expr":
+                try:
+                    out[tgt_col] = eval(s["code"] or s["expr"], {}, {"df": local_df, **{c: local_df[c] for c in local_df.columns}})
+                except Exception:
+                    out[tgt_col] = pd.eval(s["expr"], engine="python")
+            else:
+                out[tgt_col] = df[s["source"]]
+    out.attrs["missing_sources"] = missing
     return out
 
-def to_dwh(integration_df: pd.DataFrame, sttm_excel_path: str) -> Dict[str, Any]:
-    sttm = load_sttm_excel(sttm_excel_path); dw_map = sttm["dw_map"]
-    out = _apply_mapping(integration_df, dw_map)
-    return {"data": out, "target_table": target_table_from_map(dw_map), "all": sttm["all"]}
+def to_dwh(integration_df: pd.DataFrame, sttm_excel_path: str, compact: bool = True, strict: bool = False) -> Dict[str, Any]:
+    plan = compile_sttm(sttm_excel_path).dwh
+    out = _apply_mapping(integration_df, plan.columns, strict); missing = out.attrs["missing_sources"]
+    if compact:
+        with span("dwh.compact", rows=len(out)): out, mem = compact_dtypes(out)
+    else: mem = None
+    return {"data": out, "target_table": plan.target_table, "memory": mem,
+            "missing_sources": missing}
 
 def load_dwh(existing_df: pd.DataFrame, incoming_df: pd.DataFrame, scd_type: int, business_keys: List[str]):
     if int(scd_type or 1)==1: return scd_type1_merge(existing_df, incoming_df, list(business_keys or []))
@@ -1,12 +1,84 @@
+import os
 from tools.connectors import read_uri, write_sqlite, write_layer_csv
+from tools.connectors import is_multi_uri, expand_uri, pending_files, read_many, reconcile_schemas, append_sqlite_with_ledger
 from tools import dq as dqtools
+from tools.dq_state import DQState, state_dir_for
+from tools.tracing import span, frame_bytes
+from tools.dtypes import compact_dtypes
+from tools.schema_registry import SchemaRegistry
 
-def land(uri:str, integration_db:str, landing_table:str, landing_dir:str, run_dq:bool=True):
-    df=read_uri(uri)
+def _compact(df):
+    with span("landing.compact", rows=len(df)) as sp:
+        df, mem = compact_dtypes(df); sp["bytes"]=mem["after_bytes"]; sp["saved_bytes"]=mem["saved_bytes"]
+    return df, mem
+
+def _admit(df, registry, landing_table, required):
+    """Schema check against the registered landing schema: raises SchemaDriftError on incompatible drift
+    (before anything is written), applies compatible renames and records the new version."""
+    if registry is None: return df, None
+    if isinstance(registry, str): registry=SchemaRegistry(registry)
+    with span("landing.schema", columns=len(df.columns)) as sp:
+        df, drift = registry.admit(landing_table, df, required); sp.update(status=drift["status"], version=drift["version"])
+    return df, {k: v for k, v in drift.items() if k != "columns"}
+
+def land(uri:str, integration_db:str, landing_table:str, landing_dir:str, run_dq:bool=True, workers:int=4, use_processes:bool=False, compact:bool=True, dq_mode:str="incremental",
+         registry=None, required=None):
+    """registry: SchemaRegistry (or its db path) to check each landing's schema against; required: source
+    columns downstream mappings read (default: every registered column)."""
+    if is_multi_uri(uri):
+        return land_many(uri, integration_db, landing_table, landing_dir, run_dq, workers, use_processes, compact, dq_mode, registry, required)
+    with span("landing.read", uri=uri) as sp:
+        df=read_uri(uri); sp["rows"]=len(df); sp["bytes"]=frame_bytes(df)
+    df, drift=_admit(df, registry, landing_table, required)
+    mem=None
+    if compact: df, mem = _compact(df)
     prof=None; dq_res=None
     if run_dq:
-        prof=dqtools.profile(df)
-        _, dq_res = dqtools.apply_rules(df, dqtools.propose_rules(df))
-    write_sqlite(df, integration_db, landing_table, if_exists="replace")
-    csv_path = write_layer_csv(df, landing_dir, landing_table)
+        with span("landing.profile", rows=len(df)): prof=dqtools.profile(df)
+        with span("landing.dq", rows=len(df)): _, dq_res = dqtools.apply_rules(df, dqtools.propose_rules(df))
+    with span("landing.write", rows=len(df), bytes=frame_bytes(df)):
+        write_sqlite(df, integration_db, landing_table, if_exists="replace")
+        DQState(state_dir_for(integration_db), landing_table).reset()  # running stats described the old table
+        csv_path = write_layer_csv(df, landing_dir, landing_table)
+    df.attrs["memory"]=mem; df.attrs["drift"]=drift
+    return df, prof, dq_res, csv_path
+
+def land_many(uri:str, integration_db:str, landing_table:str, landing_dir:str, run_dq:bool=True, workers:int=4, use_processes:bool=False, compact:bool=True, dq_mode:str="incremental",
+              registry=None, required=None):
+    """Glob/directory/manifest source: land only files not yet in the ledger, read in parallel,
+    unioned on column names and appended to the landing table. Stats go to df.attrs["landing"].
+    dq_mode="incremental" checks only the new files against the table's running DQ state (tools/dq_state),
+    so results cover the whole table and the cumulative profile is in df.attrs["dq_state"]; "batch" checks the
+    new files on their own."""
+    with span("landing.read", uri=uri, workers=workers) as sp:
+        paths=expand_uri(uri)
+        todo=pending_files(paths, integration_db, landing_table)
+        frames=read_many(todo, workers=workers, use_processes=use_processes)
+        df, schema=reconcile_schemas(frames, [os.path.basename(p) for p in todo])
+        sp.update(files=len(todo), rows=len(df), bytes=frame_bytes(df))
+    df, drift=_admit(df, registry, landing_table, required) if todo else (df, None)
+    mem=None
+    if compact and len(df): df, mem = _compact(df)
+    prof=None; dq_res=None; state=pending=None; recovered=None
+    if run_dq and dq_mode=="incremental":
+        state=DQState(state_dir_for(integration_db), landing_table)
+        recovered=state.recover(lambda files: not pending_files(files, integration_db, landing_table))
+    if run_dq and len(df):
+        with span("landing.profile", rows=len(df)): prof=dqtools.profile(df)
+        if dq_mode=="incremental":
+            with span("landing.dq", rows=len(df), mode="incremental", batches=state.data["batches"]): dq_res, pending = state.check(df)
+        else:
+            with span("landing.dq", rows=len(df)): _, dq_res = dqtools.apply_rules(df, dqtools.propose_rules(df))
+    csv_path=os.path.join(landing_dir, f"{landing_table}.csv")
+    if todo:
+        with span("landing.write", rows=len(df), bytes=frame_bytes(df)):
+            if pending is not None: state.stage(pending, todo)  # recover() finishes it if we crash before commit()
+            append_sqlite_with_ledger(df, integration_db, landing_table, [(p, len(f)) for p, f in zip(todo, frames)])
+            csv_path=write_layer_csv(df, landing_dir, landing_table, append=True)
+    if pending is not None:
+        state.commit(pending)  # only once the batch is in the table
+        df.attrs["dq_state"]=state.profile()
+    df.attrs["landing"]={"files_matched": len(paths), "files_landed": len(todo), "files_skipped": len(paths)-len(todo), "schema": schema,
+                         "dq_recovered": recovered}
+    df.attrs["memory"]=mem; df.attrs["drift"]=drift
     return df, prof, dq_res, csv_path
@@ -1,27 +1,43 @@
-import os
+import os, json, shutil, hashlib
 import pandas as pd
 
-# Optional plotting deps (graceful fallback if missing)
-try:
-    import matplotlib
-    matplotlib.use("Agg")
-    import matplotlib.pyplot as plt
-    HAS_MPL = True
-except Exception:
-    HAS_MPL = False
+# Reports are rendered off the pipeline: summarize() runs as a job in its own JobRegistry (see app.py),
+# so a stage returns once its data is committed. Charts are cached by the hash of what they plot.
+CHART_CACHE = ".chart_cache"
+
+# Optional plotting deps, imported on the first report (matplotlib alone is ~0.3s of cold start)
+def _figure():
+    try:
+        from matplotlib.figure import Figure  # OO API: no pyplot global state, safe off the main thread
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        return Figure, FigureCanvasAgg
+    except Exception:
+        return None
+
+def chart_key(chart_data) -> str:
+    """Hash of the bars the chart draws (step status and row count per record)."""
+    bars = [(r.get("status","step"), r.get("rows", 0) or 0) for r in chart_data]
+    return hashlib.sha1(json.dumps(bars, default=str).encode()).hexdigest()[:16]
 
 def _safe_png(chart_data, png_path):
-    if not HAS_MPL:
+    cached = os.path.join(os.path.dirname(png_path), CHART_CACHE, f"{chart_key(chart_data)}.png")
+    if os.path.exists(cached):
+        shutil.copyfile(cached, png_path); return png_path
+    mpl = _figure()
+    if mpl is None:
         return None
+    Figure, FigureCanvasAgg = mpl
     try:
         steps = [r.get("status","step") for r in chart_data]
         values = [r.get("rows", 0) or 0 for r in chart_data]
-        plt.figure(figsize=(8, 4.5))
-        plt.bar(steps, values)
-        plt.title("Onboarding Run Summary")
-        plt.xlabel("Step"); plt.ylabel("Row count")
-        plt.tight_layout()
-        plt.savefig(png_path, dpi=160); plt.close()
+        fig = Figure(figsize=(8, 4.5)); FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.bar(steps, values)
+        ax.set_title("Onboarding Run Summary")
+        ax.set_xlabel("Step"); ax.set_ylabel("Row count")
+        fig.tight_layout()
+        fig.savefig(png_path, dpi=160)
+        os.makedirs(os.path.dirname(cached), exist_ok=True); shutil.copyfile(png_path, cached)
         return png_path
     except Exception:
         return None
@@ -62,7 +78,7 @@ def _safe_pdf(chart_png, table_rows, pdf_path):
     except Exception:
         return None
 
-def summarize(run_records, reports_dir="reports"):
+def summarize(run_records, reports_dir="reports", job=None):
     os.makedirs(reports_dir, exist_ok=True)
     ts = pd.Timestamp.utcnow().strftime("%Y%m%d_%H%M%S")
     csv_path = os.path.join(reports_dir, f"run_summary_{ts}.csv")
@@ -72,7 +88,13 @@ def summarize(run_records, reports_dir="reports"):
     df = pd.DataFrame(run_records)
     df.to_csv(csv_path, index=False)
 
+    if job: job.progress("Drawing chart")
     png_done = _safe_png(run_records, png_path)
+    if job: job.progress("Writing PDF")
     pdf_done = _safe_pdf(png_done, run_records, pdf_path)
 
     return csv_path, pdf_done, png_done
+
+def report_job(job, run_records, reports_dir="reports"):
+    """JobRegistry body; run_records should be a snapshot (the session keeps appending to its list)."""
+    return summarize(run_records, reports_dir, job)
@@ -1,17 +1,21 @@
-import os, time, re
+import os, time, re, json
 import streamlit as st
 import pandas as pd
 import numpy as np
 
 from tools.sttm import (
-    list_sttm_files, load_sttm_excel, extract_bk_from_business_logic,
-    target_table_from_map, discover_datasets, normpath, suggest_sttm_for_dataset
+    list_sttm_files, load_sttm_excel, compile_sttm,
+    discover_datasets, normpath, suggest_sttm_for_dataset
 )
 from tools.llm import have_llm, infer_bk_from_profile, narrative, llm_route
 from tools.intent import (
     parse_bk, parse_scd, parse_action, parse_dataset_from_text, parse_source_uri
 )
-from tools.connectors import write_sqlite, write_layer_csv
+from tools.connectors import write_sqlite, write_layer_csv, read_layer_csv
+from tools.tracing import Tracer, set_tracer, traced
+from tools.jobs import JobRegistry
+from tools.cache import ReadCache, set_cache, cached
+from tools.dtypes import human_bytes
 from agents import landing_agent, integration_agent, dwh_agent, reporting_agent
 
 # ----------------------------- Page & Styles -----------------------------
@@ -69,7 +73,11 @@ def ensure_seed_samples_and_sttm():
         write_customer_sttm_xlsx("sttm/customer_dim_sttm.xlsx")
         write_sales_sttm_xlsx("sttm/sales_fact_sttm.xlsx")
 
-ensure_seed_samples_and_sttm()
+# once per session, not on every rerun
+if "read_cache" not in st.session_state:
+    st.session_state.read_cache=ReadCache(int(os.environ.get("READ_CACHE_MB", "512")) * 2**20)
+    ensure_seed_samples_and_sttm()
+set_cache(st.session_state.read_cache)
 
 # ----------------------------- Sidebar: Key -----------------------------
 st.sidebar.header("Session")
@@ -102,6 +110,10 @@ if "awaiting" not in st.session_state:
         "confirm_integration": False, "confirm_dwh": False
     }
 if "chat" not in st.session_state: st.session_state.chat=[]
+if "tracer" not in st.session_state: st.session_state.tracer=Tracer("onboarding")
+set_tracer(st.session_state.tracer)
+if "jobs" not in st.session_state: st.session_state.jobs=JobRegistry(max_workers=1)
+if "reports" not in st.session_state: st.session_state.reports=JobRegistry(max_workers=1)  # own queue: never blocks a pipeline run
 if "welcome_emitted" not in st.session_state: st.session_state["welcome_emitted"]=False
 
 LANDING_DIR="data/landing"; INTEGRATION_DIR="data/integration"; DWH_DIR="data/dwh"
@@ -112,17 +124,18 @@ def queue_user(msg): st.session_state.chat.append(("user", msg))
 def narrate_now(msg):
     txt = narrative(st.session_state.chat, msg) if have_llm() else msg
     st.chat_message("assistant").write(txt); queue_assistant(txt)
-def progress_steps(steps):
-    ph = st.chat_message("assistant").empty()
-    for s in steps:
-        ph.write(f"_{s}…_"); time.sleep(0.25)
-    return ph
 def greet_once():
     if st.session_state["welcome_emitted"]: return
     d = discover_datasets()
     options = ", ".join([k.capitalize() for k in d.keys()]) if d else "any CSV you provide"
     queue_assistant(f"Hi! I can help with data onboarding. I can see datasets like {options}. What would you like to onboard?")
     st.session_state["welcome_emitted"] = True
+def note_memory(table, mem) -> str:
+    """Keep the per-table dtype compaction report and return a narration suffix."""
+    if not mem: return ""
+    st.session_state.state.setdefault("memory", {})[table]=mem
+    return f" Dtypes compacted: {human_bytes(mem['before_bytes'])} → {human_bytes(mem['after_bytes'])} (−{mem['saved_pct']}%)."
+
 def record(status, detail, rows=None):
     st.session_state.state["run_records"].append({
         "ts": pd.Timestamp.utcnow().isoformat(), "status": status, "detail": detail, "rows": rows
@@ -152,8 +165,7 @@ def set_dataset_from_sttm_if_missing():
     S=st.session_state.state
     if S.get("dataset"): return
     try:
-        sttm = load_sttm_excel(S["sttm_path"])
-        cand = str(sttm["int_map"]["Source Table"].dropna().iloc[0]).strip()
+        cand = compile_sttm(S["sttm_path"]).integration.source_table
         if cand:
             S["dataset"] = cand.lower()
     except Exception:
@@ -177,9 +189,8 @@ def normalize_source_uri():
             if os.path.exists(cand2):
                 return "file://" + normpath(cand2)
         if S.get("sttm_path"):
-            sttm = load_sttm_excel(S["sttm_path"])
             try:
-                src_table = str(sttm["int_map"]["Source Table"].dropna().iloc[0]).strip()
+                src_table = compile_sttm(S["sttm_path"]).integration.source_table
                 cand3 = f"data/samples/{src_table}.csv"
                 if os.path.exists(cand3):
                     return "file://" + normpath(cand3)
@@ -192,73 +203,152 @@ def normalize_source_uri():
     return uri
 
 # -------------------------- Orchestrated runs --------------------------
-def do_landing():
+# Each stage is a plan (main thread: reads session state, may ask the user something),
+# a compute step (job thread: no st.* calls, Streamlit widgets only work on the script thread)
+# and a finish step (main thread: narration, session state, next prompt). One request's stages
+# share a job so e2e stays ordered; the chat stays live while it runs.
+def landing_plan():
     S=st.session_state.state
-    sttm=load_sttm_excel(S["sttm_path"])
-    landing_table=str(sttm["int_map"]["Source Table"].dropna().iloc[0]).strip()
+    plan=compile_sttm(S["sttm_path"]).integration
+    landing_table=plan.source_table
     S["landing_table"]=landing_table
 
     set_dataset_from_sttm_if_missing()
     src = normalize_source_uri()
     if not src:
         narrate_now("I don’t have a readable source file yet. Provide a source path (e.g., `file://data/samples/customers.csv`) or drop a CSV into `data/samples/` named after your dataset.")
-        return
-
-    steps=["Loading landing data"]
-    if not S.get("skip_dq"): steps += ["Profiling sample", "Generating DQ rule suggestions"]
-    progress_steps(steps)
-
-    df,prof,dq_res,csv_path=landing_agent.land(src, "data/integration.db", landing_table, "data/landing", run_dq=(not S.get("skip_dq")))
-    S["landing_loaded"]=True; S["profile"]=prof; S["dq_results"]=dq_res
-    narrate_now(f"🛬 Landing complete → **{normpath(csv_path)}** ({len(df)} rows). {'Profiling & DQ ready (ask to view).' if not S.get('skip_dq') else 'DQ skipped as requested.'}")
-    record("landing_complete", f"{csv_path}", rows=len(df))
+        return None
+    return {"stage": "landing", "src": src, "landing_table": landing_table, "run_dq": not S.get("skip_dq"),
+            "required": list(plan.required)}
+
+@traced("landing")
+def landing_compute(job, p):
+    job.progress("Loading landing data" + (", profiling & DQ" if p["run_dq"] else ""))
+    df,prof,dq_res,csv_path=landing_agent.land(p["src"], "data/integration.db", p["landing_table"], "data/landing", run_dq=p["run_dq"],
+                                                   registry="data/schema_registry.db", required=p["required"])
+    return {**p, "rows": len(df), "profile": prof, "dq_results": dq_res, "csv_path": csv_path,
+            "files": df.attrs.get("landing"), "memory": df.attrs.get("memory"), "drift": df.attrs.get("drift")}
+
+def landing_finish(r):
+    S=st.session_state.state
+    S["landing_loaded"]=True; S["profile"]=r["profile"]; S["dq_results"]=r["dq_results"]
+    files=r["files"]
+    if files:
+        S["landing_files"]=files
+        narrate_now(f"📂 Matched **{files['files_matched']}** files: landed {files['files_landed']}, skipped {files['files_skipped']} already in the ledger."
+                    + (f" Schema drift reconciled: {list(files['schema']['missing_by_file'])[:5]}" if files['schema']['missing_by_file'] else ""))
+    drift=r.get("drift")
+    if drift and drift["status"]=="compatible":
+        changes=[f"renamed {a}→{b}" for a,b in drift["renamed"].items()] + [f"+{c}" for c in drift["added"]] + [f"-{c}" for c in drift["removed"]] \
+                + [f"{x['column']} {x['from']}→{x['to']}" for x in drift["retyped"]]
+        narrate_now(f"🧬 Source schema changed since v{drift['previous']} (compatible, now v{drift['version']}): {', '.join(changes[:8])}")
+    narrate_now(f"🛬 Landing complete → **{normpath(r['csv_path'])}** ({r['rows']} rows). {'Profiling & DQ ready (ask to view).' if r['run_dq'] else 'DQ skipped as requested.'}"
+                + note_memory(r["landing_table"], r["memory"]))
+    record("landing_complete", f"{r['csv_path']}", rows=r["rows"])
     narrate_now("Shall I run **Integration** next? (yes/no)")
     st.session_state.awaiting.update({"confirm_integration": True, "confirm_dwh": False})
 
-def do_integration():
+def integration_plan(after_landing=False):
     S=st.session_state.state
-    sttm=load_sttm_excel(S["sttm_path"])
-    landing_table=str(sttm["int_map"]["Source Table"].dropna().iloc[0]).strip()
-    landing_csv=os.path.join("data/landing", f"{landing_table}.csv")
-    if not os.path.exists(landing_csv):
+    landing_csv=os.path.join("data/landing", f"{compile_sttm(S['sttm_path']).integration.source_table}.csv")
+    if not after_landing and not os.path.exists(landing_csv):
         narrate_now("I don’t see a Landing output yet. Should I load Landing first? (yes/no)")
-        st.session_state.awaiting["load_landing_confirmation"]=True; return
-
-    df_landing=pd.read_csv(landing_csv)
-    progress_steps(["Interpreting STTM for Integration","Deriving business rules","Applying transformations"])
-    res_i=integration_agent.transform_to_integration(df_landing, S["sttm_path"])
+        st.session_state.awaiting["load_landing_confirmation"]=True; return None
+    return {"stage": "integration", "landing_csv": landing_csv, "sttm_path": S["sttm_path"],
+            "scd": S.get("scd_integration") or 1, "bk": S.get("bk_integration") or []}
+
+def scd2_layout(p):
+    return {"bk": list(p["bk"])} if int(p["scd"] or 1) == 2 and p["bk"] else None
+
+@traced("integration")
+def integration_compute(job, p):
+    job.progress("Interpreting STTM for Integration")
+    df_landing=cached("layer_csv", read_layer_csv, p["landing_csv"], paths=[p["landing_csv"]])
+    job.progress("Applying transformations")
+    res_i=integration_agent.transform_to_integration(df_landing, p["sttm_path"])
     out=res_i["data"]; tgt_int=res_i["target_table"]
-    merged=integration_agent.load_integration(None, out, S.get("scd_integration") or 1, S.get("bk_integration") or [])
-    write_sqlite(merged, "data/integration.db", tgt_int, if_exists="replace")
+    merged=integration_agent.load_integration(None, out, p["scd"], p["bk"])
+    job.progress(f"Writing {tgt_int}")
+    write_sqlite(merged, "data/integration.db", tgt_int, if_exists="replace", scd2=scd2_layout(p))
     csv_out = write_layer_csv(merged, "data/integration", tgt_int)
-    narrate_now(f"📦 Integration loaded → `{tgt_int}` with **{len(merged)}** rows at **{normpath(csv_out)}**.")
-    record("integration_complete", f"{csv_out}", rows=len(merged))
+    return {"table": tgt_int, "rows": len(merged), "csv_path": csv_out, "memory": res_i.get("memory"), "missing": res_i["missing_sources"]}
+
+def integration_finish(r):
+    narrate_now(f"📦 Integration loaded → `{r['table']}` with **{r['rows']}** rows at **{normpath(r['csv_path'])}**." + note_memory(r["table"], r["memory"])
+                + (f" ⚠️ STTM source columns not in the data: {r['missing']}" if r["missing"] else ""))
+    record("integration_complete", f"{r['csv_path']}", rows=r["rows"])
     narrate_now("Proceed with **Data Warehouse**? (yes/no)")
     st.session_state.awaiting.update({"confirm_integration": False, "confirm_dwh": True})
 
-def do_dwh():
+def dwh_plan(after_integration=False):
     S=st.session_state.state
-    sttm=load_sttm_excel(S["sttm_path"])
-    int_tgt = target_table_from_map(sttm["int_map"])
-    integ_csv=os.path.join("data/integration", f"{int_tgt}.csv")
-    if not os.path.exists(integ_csv):
-        dw_sources=set(sttm["dw_map"]["Source Schema"].str.lower().dropna().unique().tolist())
-        if "landing" in dw_sources and "int" not in dw_sources:
-            integ_df=pd.read_csv(os.path.join("data/landing", f"{sttm['int_map']['Source Table'].dropna().iloc[0]}.csv"))
-        else:
-            narrate_now(f"I can’t find Integration CSV `{normpath(integ_csv)}`. Please run Integration first."); return
-    else:
-        integ_df=pd.read_csv(integ_csv)
-
-    progress_steps(["Reading DWH mappings","Applying DWH transformations"])
-    res_d=dwh_agent.to_dwh(integ_df, S["sttm_path"]); dwh_in=res_d["data"]; tgt_dw=res_d["target_table"]
-    merged_dw=dwh_agent.load_dwh(None, dwh_in, S.get("scd_dwh") or 1, S.get("bk_dwh") or [])
-    write_sqlite(merged_dw, "data/warehouse.db", tgt_dw, if_exists="replace")
+    plan=compile_sttm(S["sttm_path"])
+    integ_csv=os.path.join("data/integration", f"{plan.integration.target_table}.csv")
+    dw_sources=set(plan.dwh.source_schemas)
+    landing_csv=os.path.join("data/landing", f"{plan.integration.source_table}.csv")
+    fallback = landing_csv if "landing" in dw_sources and "int" not in dw_sources else None
+    if not after_integration and not os.path.exists(integ_csv) and not fallback:
+        narrate_now(f"I can’t find Integration CSV `{normpath(integ_csv)}`. Please run Integration first."); return None
+    return {"stage": "dwh", "integ_csv": integ_csv, "fallback_csv": fallback, "sttm_path": S["sttm_path"],
+            "scd": S.get("scd_dwh") or 1, "bk": S.get("bk_dwh") or []}
+
+@traced("dwh")
+def dwh_compute(job, p):
+    job.progress("Reading DWH mappings")
+    src = p["integ_csv"] if os.path.exists(p["integ_csv"]) else p["fallback_csv"]
+    if not src: raise FileNotFoundError(f"Integration CSV {normpath(p['integ_csv'])} not found")
+    integ_df=cached("layer_csv", read_layer_csv, src, paths=[src])
+    job.progress("Applying DWH transformations")
+    res_d=dwh_agent.to_dwh(integ_df, p["sttm_path"]); dwh_in=res_d["data"]; tgt_dw=res_d["target_table"]
+    merged_dw=dwh_agent.load_dwh(None, dwh_in, p["scd"], p["bk"])
+    job.progress(f"Writing {tgt_dw}")
+    write_sqlite(merged_dw, "data/warehouse.db", tgt_dw, if_exists="replace", scd2=scd2_layout(p))
     csv_dw = write_layer_csv(merged_dw, "data/dwh", tgt_dw)
-    narrate_now(f"✅ DWH loaded → `{tgt_dw}` with **{len(merged_dw)}** rows at **{normpath(csv_dw)}**.")
-    record("dwh_complete", f"{csv_dw}", rows=len(merged_dw))
+    return {"table": tgt_dw, "rows": len(merged_dw), "csv_path": csv_dw, "memory": res_d.get("memory"), "missing": res_d["missing_sources"]}
+
+def dwh_finish(r):
+    S=st.session_state.state
+    narrate_now(f"✅ DWH loaded → `{r['table']}` with **{r['rows']}** rows at **{normpath(r['csv_path'])}**." + note_memory(r["table"], r["memory"])
+                + (f" ⚠️ STTM source columns not in the data: {r['missing']}" if r["missing"] else ""))
+    record("dwh_complete", f"{r['csv_path']}", rows=r["rows"])
+
+    st.session_state.reports.submit("Report", reporting_agent.report_job, [dict(x) for x in S["run_records"]], "reports", steps=2)
+    narrate_now("📝 Rendering the run report in the background.")
+    narrate_now(f"End-to-end load for **{S.get('dataset','your')}** data is complete. Would you like to onboard another dataset? (yes/no)")
+    st.session_state.awaiting.update({"another_dataset": True, "confirm_integration": False, "confirm_dwh": False})
 
-    rpt_csv, rpt_pdf, rpt_png = reporting_agent.summarize(st.session_state.state["run_records"], reports_dir="reports")
+STAGES = {"landing": (landing_compute, landing_finish, 1),
+          "integration": (integration_compute, integration_finish, 3),
+          "dwh": (dwh_compute, dwh_finish, 3)}
+
+def run_pipeline(job, plans):
+    """Job body: run the planned stages in order. job.result fills as stages finish, so a failed
+    or cancelled e2e still reports the stages that completed."""
+    job.result = done = []
+    for p in plans:
+        done.append((p["stage"], STAGES[p["stage"]][0](job, p)))
+    return done
+
+def run_stages(plans):
+    plans=[p for p in plans if p]
+    if not plans: return
+    jobs=st.session_state.jobs
+    if jobs.active():
+        narrate_now(f"⏳ **{jobs.active()[0].name}** is still running — I’ll start this once it’s done or cancelled."); return
+    name=" → ".join(p["stage"].capitalize() for p in plans)
+    jobs.submit(name, run_pipeline, plans, steps=sum(STAGES[p["stage"]][2] for p in plans))
+    narrate_now(f"⏳ Started **{name}** in the background. Keep chatting — I’ll report back when it finishes.")
+    job_monitor()
+
+def do_landing(): run_stages([landing_plan()])
+def do_integration(): run_stages([integration_plan()])
+def do_dwh(): run_stages([dwh_plan()])
+
+def report_finish(job):
+    if job.status!="done":
+        if job.status=="failed": narrate_now(f"⚠️ Report rendering failed: {job.error}")
+        return
+    rpt_csv, rpt_pdf, rpt_png = job.result
     with st.chat_message("assistant"):
         if rpt_png and os.path.exists(rpt_png): st.image(rpt_png, caption="Onboarding Run Summary")
         if rpt_csv or rpt_pdf:
@@ -266,8 +356,35 @@ def do_dwh():
             if rpt_csv: msg += f" {normpath(rpt_csv)} (CSV)"
             if rpt_pdf: msg += f", {normpath(rpt_pdf)} (PDF)"
             st.success(msg)
-    narrate_now(f"End-to-end load for **{S.get('dataset','your')}** data is complete. Would you like to onboard another dataset? (yes/no)")
-    st.session_state.awaiting.update({"another_dataset": True, "confirm_integration": False, "confirm_dwh": False})
+
+def collect_jobs():
+    """Finish steps for jobs that ended since the last script run."""
+    for job in st.session_state.reports.finished(): report_finish(job)
+    st.session_state.reports.prune()
+    jobs=st.session_state.jobs
+    for job in jobs.finished():
+        for stage, res in job.result or []: STAGES[stage][1](res)
+        if job.status=="cancelled":
+            narrate_now(f"🛑 Cancelled **{job.name}** after {job.elapsed:.0f}s (last step: {job.last_event}).")
+            record("cancelled", job.name)
+        elif job.status=="failed":
+            narrate_now(f"❌ **{job.name}** failed after {job.elapsed:.0f}s: {job.error}")
+            record("failed", f"{job.name}: {job.error}")
+    jobs.prune()
+
+def job_monitor():
+    regs=(st.session_state.jobs, st.session_state.reports)
+    for job in [j for r in regs for j in r.active()]:
+        with st.chat_message("assistant"):
+            st.progress(job.fraction, text=f"⏳ {job.name} — {job.last_event} ({job.elapsed:.0f}s)")
+            if st.button("Cancel", key=f"cancel_{job.id}"): job.cancel()
+    if any(not r.active() and any(not j.collected for j in r.jobs.values()) for r in regs):
+        st.rerun()  # whole script, so collect_jobs() narrates into the chat
+    if not hasattr(st, "fragment") and any(r.active() for r in regs):
+        st.button("Refresh status", key="refresh_jobs")
+
+if hasattr(st, "fragment"):
+    job_monitor = st.fragment(run_every=1.0)(job_monitor)
 
 def ensure_prereqs_and_run(scope):
     S=st.session_state.state
@@ -283,21 +400,18 @@ def ensure_prereqs_and_run(scope):
             narrate_now("Please upload an STTM Excel below to proceed."); return
 
     if scope in ("integration","dwh","e2e"):
-        sttm=load_sttm_excel(S["sttm_path"])
-        landing_table=str(sttm["int_map"]["Source Table"].dropna().iloc[0]).strip()
-        landing_csv=os.path.join("data/landing", f"{landing_table}.csv")
+        landing_csv=os.path.join("data/landing", f"{compile_sttm(S['sttm_path']).integration.source_table}.csv")
         if not os.path.exists(landing_csv):
             narrate_now("Landing isn’t present yet. Should I load Landing first? (yes/no)")
             st.session_state.awaiting["load_landing_confirmation"]=True; return
 
     if scope in ("integration","e2e"):
         if not S.get("bk_integration"):
-            sttm_all=load_sttm_excel(S["sttm_path"])["all"]
-            bk_hint=extract_bk_from_business_logic(sttm_all)
+            bk_hint=compile_sttm(S["sttm_path"]).business_keys
             if bk_hint: narrate_now(f"I can use `{', '.join(bk_hint)}` as the business key. Confirm or provide another (e.g., `BK is customer_id`).")
             else:
                 src = os.path.join("data/landing", f"{S.get('landing_table','')}.csv") if S.get("landing_table") else None
-                df = pd.read_csv(src) if src and os.path.exists(src) else None
+                df = cached("layer_csv", read_layer_csv, src, paths=[src]) if src and os.path.exists(src) else None
                 if df is not None:
                     inferred=infer_bk_from_profile(df)
                     if inferred: narrate_now(f"Based on profiling, `{', '.join(inferred)}` looks like a good business key. Confirm or provide another.")
@@ -305,7 +419,8 @@ def ensure_prereqs_and_run(scope):
                     narrate_now("Please provide a business key for Integration (e.g., `BK is customer_id`).")
             st.session_state.awaiting["bk_integration"]=True; return
         if not S.get("scd_integration"):
-            narrate_now("Which SCD type for Integration — **1** or **2**?")
+            scd_hint=compile_sttm(S["sttm_path"]).integration.scd
+            narrate_now("Which SCD type for Integration — **1** or **2**?" + (f" (the STTM says SCD{scd_hint})" if scd_hint else ""))
             st.session_state.awaiting["scd_integration"]=True; return
 
     if scope in ("dwh","e2e"):
@@ -315,14 +430,16 @@ def ensure_prereqs_and_run(scope):
         if S.get("bk_dwh")==["same as integration"] or (S.get("bk_dwh") and S["bk_dwh"][0].lower()=="same as integration"):
             S["bk_dwh"]=S["bk_integration"]; narrate_now(f"Using Integration BK: {', '.join(S['bk_dwh'])}")
         if not S.get("scd_dwh"):
-            narrate_now("Which SCD type for DWH — **1** or **2**?"); st.session_state.awaiting["scd_dwh"]=True; return
+            scd_hint=compile_sttm(S["sttm_path"]).dwh.scd
+            narrate_now("Which SCD type for DWH — **1** or **2**?" + (f" (the STTM says SCD{scd_hint})" if scd_hint else "")); st.session_state.awaiting["scd_dwh"]=True; return
 
     if scope=="landing": do_landing()
     elif scope=="integration": do_integration()
     elif scope=="dwh": do_dwh()
     elif scope=="e2e":
-        if not S.get("landing_loaded"): do_landing()
-        do_integration(); do_dwh()
+        plans=[] if S.get("landing_loaded") else [landing_plan()]
+        if plans and plans[0] is None: return
+        run_stages(plans + [integration_plan(after_landing=True), dwh_plan(after_integration=True)])
 
 # ------------------------ Inline uploader -----------------------
 def render_inline_uploader():
@@ -346,6 +463,29 @@ def render_inline_uploader():
             else:
                 st.warning("Please upload a file first.")
 
+def performance_panel():
+    """Sidebar timings and memory; drawn after collect_jobs() so it includes the stages that just finished."""
+    with st.sidebar.expander("Performance", expanded=False):
+        tr=st.session_state.tracer
+        if tr.spans:
+            st.dataframe(tr.summary(), use_container_width=True, hide_index=True)
+            c1, c2 = st.columns(2)
+            c1.download_button("JSONL", tr.jsonl(), file_name="trace.jsonl")
+            c2.download_button("Chrome trace", json.dumps(tr.chrome_trace(), default=str), file_name="trace.json")
+            st.caption("Open the Chrome trace in chrome://tracing or ui.perfetto.dev.")
+            if tr.dropped: st.caption(f"Only the newest {tr.spans.maxlen:,} spans are kept ({tr.dropped:,} dropped).")
+            if st.button("Clear trace"): tr.clear()
+        else:
+            st.caption("No spans yet — run a stage to see timings.")
+        mem=st.session_state.state.get("memory") or {}
+        if mem:
+            st.caption("Memory after dtype compaction")
+            st.dataframe(pd.DataFrame([{"table": t, "before": human_bytes(m["before_bytes"]), "after": human_bytes(m["after_bytes"]),
+                                        "saved %": m["saved_pct"]} for t, m in mem.items()]), use_container_width=True, hide_index=True)
+        cs=st.session_state.read_cache.stats()
+        st.caption(f"Read cache: {cs['entries']} entries, {human_bytes(cs['bytes'])} of {human_bytes(cs['max_bytes'])}, {cs['hits']} hits / {cs['misses']} misses")
+        if st.button("Clear read cache"): st.session_state.read_cache.clear()
+
 # ------------------------------ Chat render ------------------------------
 def replay():
     for role, txt in st.session_state.chat:
@@ -358,6 +498,9 @@ def start():
     if st.session_state.awaiting.get("awaiting_upload"):
         render_inline_uploader()
 start()
+collect_jobs()
+performance_panel()
+if st.session_state.jobs.active() or st.session_state.reports.active(): job_monitor()
 
 # ------------------------------- Chat loop -------------------------------
 user_text = st.chat_input("How can I help with data onboarding?")
@@ -449,8 +592,7 @@ if user_text:
                 # infer dataset from STTM if missing
                 if not S.get("dataset"):
                     try:
-                        sttm = load_sttm_excel(S["sttm_path"])
-                        S["dataset"] = str(sttm["int_map"]["Source Table"].dropna().iloc[0]).strip().lower()
+                        S["dataset"] = compile_sttm(S["sttm_path"]).integration.source_table.lower()
                     except Exception:
                         pass
                 A["ask_use_suggested_sttm"]=False
@@ -4,4 +4,63 @@ assert suggest_sttm_for_dataset('customers') and 'customer_dim_sttm' in suggest_
 assert parse_bk('BK is customer_id')==['customer_id']
 assert parse_scd('consider SCD2')==2
 assert parse_action('landing only with DQ')['action']=='landing'
+import os, tempfile, pandas as pd
+from tools.dq_state import DQState
+for mode in ('exact','bloom'):
+    st=DQState(tempfile.mkdtemp(),'t',uniqueness=mode,bloom_capacity=10_000)
+    res,pend=st.check(pd.DataFrame({'id':range(100)})); assert all(r['passed'] for r in res); st.commit(pend)
+    res,pend=st.check(pd.DataFrame({'id':[98,99,100,None]}))
+    assert {r['rule']['type']:r['total_failed'] for r in res}=={'not_null':1,'unique':2}; st.commit(pend)
+    assert DQState(os.path.dirname(st.dir),'t').profile()['columns']['id']['unique']==101
+    res,pend=st.check(pd.DataFrame({'id':[7,200]})); st.stage(pend,['f.csv'])  # crash before commit
+    assert DQState(os.path.dirname(st.dir),'t').recover(lambda fs: False)=='dropped'
+    res,pend=st.check(pd.DataFrame({'id':[7,200]})); st.stage(pend,['f.csv'])
+    st2=DQState(os.path.dirname(st.dir),'t'); assert st2.recover(lambda fs: fs==['f.csv'])=='committed' and st2.data['batches']==3
+    assert st2.profile()['columns']['id']['unique']==102
+from tools.dq_state import value_hashes, HashRuns
+import numpy as np
+assert len(set(value_hashes(pd.Series([1234567890123456789,1234567890123456788])))) == 2
+assert (value_hashes(pd.Series([5,7],dtype='int8')) == value_hashes(pd.Series([5.0,7.0]))).all()
+hr=HashRuns(tempfile.mkdtemp())
+for i in range(40): hr.add(np.arange(i*10,i*10+10,dtype='uint64'))
+assert len(hr)==400 and len(hr.runs())<=6 and hr.contains(np.array([0,399,400],dtype='uint64')).tolist()==[True,True,False]
+from tools.connectors import write_sqlite, read_current, as_of
+d0,d1=pd.Timestamp('2024-01-01',tz='UTC'),pd.Timestamp('2024-02-01',tz='UTC')
+db=os.path.join(tempfile.mkdtemp(),'w.db')
+dim=pd.DataFrame({'id':[1,2,1],'v':['a','b','A'],'effective_from':[d0,d0,d1],'effective_to':[d1,pd.NaT,pd.NaT],'is_current':[False,True,True]})
+write_sqlite(dim,db,'dim',scd2={'bk':['id']})
+assert sorted(read_current(db,'dim')['v'])==['A','b'] and read_current(db,'dim',where={'id':1})['v'].tolist()==['A']
+assert as_of(db,'dim','2024-01-15 00:00:00+00:00',where={'id':1})['v'].tolist()==['a'] and as_of(db,'dim',d1)['v'].tolist()==['b','A']
+from tools.schema_registry import SchemaRegistry, SchemaDriftError, mapping_plan
+reg=SchemaRegistry(os.path.join(tempfile.mkdtemp(),'s.db'))
+b1=pd.DataFrame({'id':[1,2],'Email':['a@x','b@y'],'amt':[1,2]})
+assert reg.admit('t',b1)[1]['status']=='new' and reg.admit('t',b1[['amt','id','Email']])[1]['status']=='same'
+df,d=reg.admit('t',pd.DataFrame({'id':[1],'email ':['c@z'],'amt':[1.5],'extra':['e']}),required=['id','Email','amt'])
+assert d['status']=='compatible' and d['version']==2 and 'Email' in df.columns and d['added']==['extra']
+try: reg.admit('t',pd.DataFrame({'id':['x'],'amt':[1.0],'extra':['e']}),required=['id','Email']); raise AssertionError('drift not caught')
+except SchemaDriftError as e: assert 'Email' in str(e) and "'id' changed type" in str(e)
+m=pd.DataFrame({'Target Column':['id','mail','dom'],'Source Column':['id','EMAIL','x'],'Transformation':[None,None,"email.str.split('@').str[-1]"]})
+p=mapping_plan(m,df.columns); assert [s['kind'] for s in p]==['copy','copy','expr'] and p[1]['source']=='Email' and p[2]['missing']==['email']
+assert mapping_plan(m,list(df.columns)) is p
+import json
+from tools.sttm import compile_sttm, STTMPlan
+sp=compile_sttm('sttm/customer_dim_sttm.xlsx')
+assert sp.integration.source_table=='landing_customers' and sp.integration.target_table=='int_customer_dim_stage' and sp.dwh.source_schemas==('int',)
+assert sp.business_keys==['customer_id'] and {'first_name','last_name','email'}<=set(sp.integration.required)
+assert STTMPlan.from_dict(json.loads(json.dumps(sp.to_dict())))==sp and [s['kind'] for s in mapping_plan(sp.integration.columns,b1.columns)][:2]==['missing','copy']
+from tools.dtypes import compact_dtypes, widen_numerics
+from agents.integration_agent import _apply_mapping
+c,_=compact_dtypes(pd.DataFrame({'qty':[100,120],'price':[0.5,1.25]})); assert str(c['qty'].dtype)=='int8'
+m=pd.DataFrame({'Target Column':['total'],'Source Column':[None],'Transformation':['qty + qty']})
+assert _apply_mapping(c,m)['total'].tolist()==[200,240] and str(widen_numerics(c)['qty'].dtype)=='int64'
+from tools.connectors import write_layer_csv, read_layer_csv
+from agents import integration_agent, dwh_agent
+ld=tempfile.mkdtemp(); ri=integration_agent.transform_to_integration(compact_dtypes(pd.read_csv('data/samples/orders.csv'))[0],'sttm/sales_fact_sttm.xlsx')
+ip=write_layer_csv(ri['data'],ld,'int_sales_fact_stage'); assert pd.api.types.is_datetime64_any_dtype(read_layer_csv(ip)['order_ts'])
+assert dwh_agent.to_dwh(read_layer_csv(ip),'sttm/sales_fact_sttm.xlsx')['data']['order_year'].notna().all()  # .dt on the re-read layer
+from tools.tracing import Tracer
+tr=Tracer('t',max_spans=3)
+for i in range(5):
+    with tr.span(f's{i}'): pass
+assert [sp['name'] for sp in tr.snapshot()]==['s2','s3','s4'] and tr.dropped==2 and len(tr.summary())==3
 print('Smoke tests passed.')
@@ -0,0 +1,104 @@
+import os, sys, hashlib, threading, collections, contextvars
+import pandas as pd
+from typing import Any, Callable, Iterable, Optional
+
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+def _sha1_file(path: str, block: int = 2**20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""): h.update(chunk)
+    return h.hexdigest()
+
+def file_signature(path: str, content_hash: bool = False) -> tuple:
+    """(path, size, mtime_ns), or a sha1 of the bytes when mtime can't be trusted (copies that keep mtime, network mounts).
+    A directory's mtime moves when files are added or removed, which is enough for listings."""
+    st = os.stat(path)
+    if content_hash and not os.path.isdir(path): return (os.path.abspath(path), st.st_size, _sha1_file(path))
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+def bytes_key(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+def frame_key(df: pd.DataFrame) -> str:
+    """Content hash of an in-memory frame (for results derived from session frames, e.g. a transform preview)."""
+    h = hashlib.sha1(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    h.update(repr(list(df.columns)).encode())
+    return h.hexdigest()
+
+def sizeof(obj: Any) -> int:
+    if isinstance(obj, (pd.DataFrame, pd.Series)): return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, dict): return sys.getsizeof(obj) + sum(sizeof(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)): return sys.getsizeof(obj) + sum(sizeof(v) for v in obj)
+    return sys.getsizeof(obj)
+
+def _share(v: Any) -> Any:
+    # shallow copies: callers can add/replace columns without touching the cached frame (copy-on-write keeps values safe too)
+    if isinstance(v, (pd.DataFrame, pd.Series)): return v.copy(deep=False)
+    if isinstance(v, dict): return {k: _share(x) for k, x in v.items()}
+    if isinstance(v, tuple): return tuple(_share(x) for x in v)
+    return v
+
+class ReadCache:
+    """Byte-bounded LRU for read results. Keys carry the source's file signature (or the upload's
+    content hash), so a changed file is simply a miss; the stale entry for the same call is dropped."""
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._data: "collections.OrderedDict[tuple, tuple]" = collections.OrderedDict()
+        self._latest: dict = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.evictions = 0
+
+    def _drop(self, key):
+        _, size = self._data.pop(key); self._bytes -= size
+
+    def get_or_load(self, call: tuple, version: tuple, loader: Callable[[], Any]) -> Any:
+        key = call + (version,)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key); self.hits += 1
+                return _share(self._data[key][0])
+        value = loader()
+        size = sizeof(value)
+        with self._lock:
+            self.misses += 1
+            old = self._latest.get(call)
+            if old is not None and old != key and old in self._data: self._drop(old)
+            if size <= self.max_bytes:
+                if key in self._data: self._drop(key)
+                self._data[key] = (value, size); self._bytes += size; self._latest[call] = key
+                while self._bytes > self.max_bytes:
+                    self._drop(next(iter(self._data))); self.evictions += 1
+        return _share(value)
+
+    def read(self, name: str, fn: Callable[..., Any], *args, paths: Iterable[str] = (), content: Optional[bytes] = None,
+             content_hash: bool = False, key: Any = None, **kwargs) -> Any:
+        """Cached fn(*args, **kwargs). `paths` are the files the result depends on; `content` the raw bytes of
+        an upload. `key` replaces the repr of the arguments when they aren't stable (file-like objects)."""
+        call = (name, key if key is not None else repr((args, sorted(kwargs.items()))))
+        version = tuple(file_signature(p, content_hash) for p in paths) + ((bytes_key(content),) if content is not None else ())
+        return self.get_or_load(call, version, lambda: fn(*args, **kwargs))
+
+    def derive(self, name: str, fn: Callable[..., Any], *frames: pd.DataFrame, **kwargs) -> Any:
+        """Cached fn(*frames, **kwargs) keyed by the frames' content."""
+        return self.get_or_load((name, repr(sorted(kwargs.items()))), tuple(frame_key(f) for f in frames), lambda: fn(*frames, **kwargs))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear(); self._latest.clear(); self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._data), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+_current: contextvars.ContextVar[Optional[ReadCache]] = contextvars.ContextVar("read_cache", default=None)
+
+def get_cache() -> Optional[ReadCache]: return _current.get()
+def set_cache(cache: Optional[ReadCache]): _current.set(cache)
+
+def cached(name: str, fn: Callable[..., Any], *args, paths: Iterable[str] = (), **kwargs) -> Any:
+    """fn(*args, **kwargs) through the current session's cache (set like the tracer); plain call when none is set."""
+    c = _current.get()
+    return c.read(name, fn, *args, paths=paths, **kwargs) if c is not None else fn(*args, **kwargs)
@@ -1,6 +1,14 @@
-import os, re
+import os, re, glob, json
 import pandas as pd
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Tuple, Dict, Any
+from tools.cache import cached
+from tools.dtypes import compact_dtypes
+
+LEDGER_TABLE = "_landed_files"
+READABLE_EXT = (".csv", ".xlsx", ".xls", ".parquet")
+MANIFEST_EXT = (".manifest", ".lst", ".manifest.json")  # a plain .json is data, not a file list
 
 def normpath(p: str) -> str:
     return os.path.normpath(p).replace("\\", "/")
@@ -20,8 +28,10 @@ def read_uri(uri: str) -> pd.DataFrame:
         raise NotImplementedError(f"Source URI scheme not implemented yet: {scheme}")
 
     path = os.path.expanduser(path)
-    ext = os.path.splitext(path)[1].lower()
+    return cached("read_uri", _read_path, path, paths=[path])
 
+def _read_path(path: str) -> pd.DataFrame:
+    ext = os.path.splitext(path)[1].lower()
     if ext == ".csv":
         return pd.read_csv(path)
     if ext in (".xlsx", ".xls"):
@@ -31,13 +41,153 @@ def read_uri(uri: str) -> pd.DataFrame:
 
     raise ValueError(f"Unsupported file extension for source: {ext}")
 
-def write_sqlite(df: pd.DataFrame, sqlite_path: str, table: str, if_exists="replace"):
+# --- Multi-file sources: glob, directory or manifest URIs ---
+def _local_path(uri: str) -> str:
+    if uri.startswith("file://"): return os.path.expanduser(uri[len("file://"):])
+    if "://" in uri: raise NotImplementedError(f"Source URI scheme not implemented yet: {uri.split('://', 1)[0]}")
+    return os.path.expanduser(uri)
+
+def is_multi_uri(uri: str) -> bool:
+    path = _local_path(uri)
+    return any(ch in path for ch in "*?[") or os.path.isdir(path) or path.lower().endswith(MANIFEST_EXT)
+
+def expand_uri(uri: str) -> List[str]:
+    """Glob pattern, directory (all readable files) or manifest (.manifest/.lst one path per line,
+    .manifest.json {"files": [...]}) -> sorted list of file paths. A plain file expands to itself."""
+    path = _local_path(uri)
+    if any(ch in path for ch in "*?["):
+        return sorted(p for p in glob.glob(path, recursive=True) if os.path.isfile(p))
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(READABLE_EXT))
+    if path.lower().endswith(MANIFEST_EXT):
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f).get("files", []) if path.lower().endswith(".json") else [ln.strip() for ln in f if ln.strip() and not ln.startswith("#")]
+        base = os.path.dirname(path)
+        return [e if os.path.isabs(e) else os.path.join(base, e) for e in entries]
+    return [path]
+
+def read_many(paths: List[str], workers: int = 4, use_processes: bool = False) -> List[pd.DataFrame]:
+    """Read files concurrently, results in input order. Threads suit CSV parsing (pandas drops the GIL);
+    processes help when parsing is Python-bound (Excel)."""
+    if workers <= 1 or len(paths) <= 1: return [read_uri(p) for p in paths]
+    pool = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool(max_workers=min(workers, len(paths))) as ex:
+        return list(ex.map(read_uri, paths))
+
+def reconcile_schemas(frames: List[pd.DataFrame], names: List[str]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Union frames by column name (first-seen order). Files missing a column get nulls; columns whose
+    dtype differs between files are reported and left to pandas' common-type promotion."""
+    cols: List[str] = []; dtypes: Dict[str, set] = {}
+    for df in frames:
+        for c in df.columns:
+            if c not in dtypes: cols.append(c); dtypes[c] = set()
+            dtypes[c].add(str(df[c].dtype))
+    missing = {n: [c for c in cols if c not in df.columns] for n, df in zip(names, frames)}
+    report = {"columns": cols,
+              "missing_by_file": {n: m for n, m in missing.items() if m},
+              "dtype_conflicts": {c: sorted(t) for c, t in dtypes.items() if len(t) > 1}}
+    if not frames: return pd.DataFrame(), report
+    return pd.concat([df.reindex(columns=cols) for df in frames], ignore_index=True), report
+
+# --- Processed-file ledger: re-runs skip files already landed into a table ---
+def _file_sig(path: str) -> Tuple[int, float]:
+    st = os.stat(path); return st.st_size, st.st_mtime
+
+def landed_files(sqlite_path: str, table: str) -> Dict[str, Tuple[int, float]]:
+    if not os.path.exists(sqlite_path): return {}
+    with sqlite3.connect(sqlite_path) as conn:
+        try:
+            rows = conn.execute(f"SELECT path, size, mtime FROM {LEDGER_TABLE} WHERE landing_table=?", (table,)).fetchall()
+        except sqlite3.OperationalError:
+            return {}
+    return {p: (s, m) for p, s, m in rows}
+
+def pending_files(paths: List[str], sqlite_path: str, table: str) -> List[str]:
+    """Files not in the ledger, or changed (size/mtime) since they were landed."""
+    done = landed_files(sqlite_path, table)
+    return [p for p in paths if done.get(normpath(os.path.abspath(p))) != _file_sig(p)]
+
+def _sql_rows(df: pd.DataFrame):
+    """Row tuples sqlite3 can bind: missing -> None, datetimes as ISO text (what to_sql stores)."""
+    obj = df.astype(object)
+    for c in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[c].dtype):
+            obj[c] = df[c].map(lambda v: v.isoformat(sep=" ") if pd.notna(v) else None)
+    return obj.where(df.notna(), None).itertuples(index=False, name=None)
+
+def append_sqlite_with_ledger(df: pd.DataFrame, sqlite_path: str, table: str, files: List[Tuple[str, int]]):
+    """Append rows and record the files they came from in one transaction. Columns the table
+    doesn't have yet are added first, so drifting part files still union into landing."""
+    os.makedirs(os.path.dirname(sqlite_path) or ".", exist_ok=True)
+    with sqlite3.connect(sqlite_path) as conn:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {LEDGER_TABLE} (landing_table TEXT, path TEXT, size INTEGER, mtime REAL, rows INTEGER, landed_at TEXT, PRIMARY KEY (landing_table, path))")
+        have = [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")').fetchall()]
+        if not have:
+            df.head(0).to_sql(table, conn, index=False); have = list(df.columns)
+        for c in df.columns:
+            if c not in have: conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{c}"')
+        if len(df):
+            cols = ", ".join(f'"{c}"' for c in df.columns); marks = ", ".join("?" * len(df.columns))
+            conn.executemany(f'INSERT INTO "{table}" ({cols}) VALUES ({marks})', _sql_rows(df))
+        now = pd.Timestamp.utcnow().isoformat()
+        for path, rows in files:
+            size, mtime = _file_sig(path)
+            conn.execute(f"INSERT OR REPLACE INTO {LEDGER_TABLE} VALUES (?,?,?,?,?,?)", (table, normpath(os.path.abspath(path)), size, mtime, rows, now))
+
+def _q(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+def write_sqlite(df: pd.DataFrame, sqlite_path: str, table: str, if_exists="replace",
+                 scd2: Dict[str, Any] = None):
+    """scd2={"bk": [...], "eff_from": ..., "eff_to": ..., "current_flag": ...} indexes an SCD2 table for
+    lookups: (bk, eff_from) and (eff_from, eff_to) for history / as-of queries, a partial index on bk over
+    current rows only, and a <table>_current view, so current-state reads don't scan the history."""
     os.makedirs(os.path.dirname(sqlite_path), exist_ok=True)
     with sqlite3.connect(sqlite_path) as conn:
         df.to_sql(table, conn, if_exists=if_exists, index=False)
+        if scd2: _index_scd2(conn, table, **scd2)
+
+def _index_scd2(conn, table: str, bk: List[str], eff_from="effective_from", eff_to="effective_to", current_flag="is_current"):
+    keys = ", ".join(_q(c) for c in bk)
+    t, f = _q(table), _q(current_flag)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {_q(f'ix_{table}_bk')} ON {t} ({keys}, {_q(eff_from)})")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {_q(f'ix_{table}_eff')} ON {t} ({_q(eff_from)}, {_q(eff_to)})")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {_q(f'ix_{table}_current')} ON {t} ({keys}) WHERE {f} = 1")
+    conn.execute(f"DROP VIEW IF EXISTS {_q(f'{table}_current')}")
+    conn.execute(f"CREATE VIEW {_q(f'{table}_current')} AS SELECT * FROM {t} WHERE {f} = 1")
 
-def write_layer_csv(df: pd.DataFrame, layer_dir: str, table: str) -> str:
+def read_current(sqlite_path: str, table: str, current_flag="is_current", where: Dict[str, Any] = None) -> pd.DataFrame:
+    """Current rows of an SCD2 table, optionally for one business key ({"customer_id": 42}); served by
+    the partial index write_sqlite(scd2=...) creates."""
+    cond = "".join(f" AND {_q(c)} = ?" for c in (where or {}))
+    with sqlite3.connect(sqlite_path) as conn:
+        return pd.read_sql_query(f"SELECT * FROM {_q(table)} WHERE {_q(current_flag)} = 1{cond}", conn,
+                                 params=list((where or {}).values()))
+
+def as_of(sqlite_path: str, table: str, ts, eff_from="effective_from", eff_to="effective_to", where: Dict[str, Any] = None) -> pd.DataFrame:
+    """Rows in effect at ts (eff_from <= ts < eff_to, or still open). Dates are compared in the text form
+    to_sql stores them in, which sorts chronologically for one time zone."""
+    ts = pd.Timestamp(ts)
+    at = str(ts.tz_convert("UTC") if ts.tzinfo is not None else ts)
+    cond = "".join(f" AND {_q(c)} = ?" for c in (where or {}))
+    with sqlite3.connect(sqlite_path) as conn:
+        return pd.read_sql_query(f"SELECT * FROM {_q(table)} WHERE {_q(eff_from)} <= ? AND ({_q(eff_to)} IS NULL OR {_q(eff_to)} > ?){cond}",
+                                 conn, params=[at, at] + list((where or {}).values()))
+
+def write_layer_csv(df: pd.DataFrame, layer_dir: str, table: str, append: bool = False) -> str:
     os.makedirs(layer_dir, exist_ok=True)
     out = os.path.join(layer_dir, f"{table}.csv")
+    if append and os.path.exists(out):
+        header = list(pd.read_csv(out, nrows=0).columns)
+        if set(df.columns) <= set(header):
+            df.reindex(columns=header).to_csv(out, mode="a", index=False, header=False)
+            return out
+        # new columns arrived: rewrite with the widened header
+        df = pd.concat([pd.read_csv(out), df], ignore_index=True)
     df.to_csv(out, index=False)
     return out
+
+def read_layer_csv(path: str) -> pd.DataFrame:
+    """A stage CSV with compaction re-applied (ISO text -> datetime, yes/no -> boolean, low-cardinality text
+    -> category, narrow numerics), so the next layer sees the dtypes the previous one wrote, not object."""
+    return compact_dtypes(pd.read_csv(path))[0]
@@ -1,4 +1,6 @@
 import re, pandas as pd
+from tools.tracing import span
+from tools.regex_kernel import count_mismatches
 
 def profile(df):
     return {
@@ -24,7 +26,8 @@ def apply_rules(df, rules):
     res=[]
     for r in rules:
         c=r["column"]; t=r["type"]
-        if t=="not_null": bad=int(df[c].isna().sum()); res.append({"rule":r,"passed":bad==0,"detail":f"{bad} nulls"})
-        elif t=="unique": bad=len(df)-df[c].nunique(); res.append({"rule":r,"passed":bad==0,"detail":f"{bad} dups"})
-        elif t=="regex":  bad=int((~df[c].astype(str).str.match(r["pattern"])).sum()); res.append({"rule":r,"passed":bad==0,"detail":f"{bad} mismatches"})
+        with span(f"dq.{t}", cat="dq", column=c, rows=len(df)):
+            if t=="not_null": bad=int(df[c].isna().sum()); res.append({"rule":r,"passed":bad==0,"detail":f"{bad} nulls"})
+            elif t=="unique": bad=len(df)-df[c].nunique(); res.append({"rule":r,"passed":bad==0,"detail":f"{bad} dups"})
+            elif t=="regex":  bad=count_mismatches(df[c],r["pattern"]); res.append({"rule":r,"passed":bad==0,"detail":f"{bad} mismatches"})
     return df,res
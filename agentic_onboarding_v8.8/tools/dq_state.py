@@ -0,0 +1,280 @@
+import os, json, glob, time, math, shutil
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Tuple
+from tools import dq as dqtools
+from tools.regex_kernel import count_mismatches
+from tools.tracing import span
+
+# Incremental DQ: rules are checked on the new batch only, against state kept from earlier batches
+# (key hashes for uniqueness, running null counts, min/max), so a daily check costs O(delta) instead
+# of re-reading the history. State lives in <state_dir>/<table>/ and is saved after the batch lands; the
+# state change is staged there first, so a crash between the table write and commit() is finished (or
+# dropped, if the batch never landed) by recover() on the next run.
+
+FANOUT = 4  # runs of one level merged into a single run of the next level
+
+def value_hashes(s: pd.Series) -> np.ndarray:
+    """uint64 per non-null value, stable across batches whatever dtype compaction picked
+    (int8 5, int64 5 and float 5.0 hash alike; categories hash as their values). Integers hash as int64,
+    so IDs above 2**53 stay distinct; only non-integral floats hash as float64."""
+    s = s.dropna()
+    if isinstance(s.dtype, pd.CategoricalDtype): s = s.astype(s.cat.categories.dtype)
+    if pd.api.types.is_bool_dtype(s.dtype): s = s.astype("int64")
+    if pd.api.types.is_datetime64_any_dtype(s.dtype):
+        if s.dt.tz is not None: s = s.dt.tz_convert("UTC").dt.tz_localize(None)
+        return pd.util.hash_array(s.astype("datetime64[ns]").to_numpy().view("int64"), categorize=False)
+    if pd.api.types.is_integer_dtype(s.dtype):
+        return pd.util.hash_array(s.to_numpy(dtype="int64"), categorize=False)
+    if pd.api.types.is_numeric_dtype(s.dtype):
+        vals = s.to_numpy(dtype="float64")
+        out = pd.util.hash_array(vals, categorize=False)
+        whole = (vals == np.floor(vals)) & (np.abs(vals) < 2.0 ** 63)  # what an int column would have held
+        out[whole] = pd.util.hash_array(vals[whole].astype("int64"), categorize=False)
+        return out
+    return pd.util.hash_array(s.astype(str).to_numpy(dtype=object), categorize=False)
+
+class HashRuns:
+    """Exact set of 64-bit hashes as sorted .npy runs (memory-mapped for lookups). A batch adds a level-0
+    run; FANOUT runs of one level are merged into one run of the next, so a hash is rewritten once per
+    level (O(delta log n) amortised) and there are at most FANOUT runs per level."""
+    def __init__(self, path: str):
+        self.path = path
+
+    def runs(self, level: int | None = None) -> List[str]:
+        runs = sorted(glob.glob(os.path.join(self.path, "run_*.npy")))
+        return runs if level is None else [p for p in runs if self._level(p) == level]
+
+    @staticmethod
+    def _level(p: str) -> int:
+        name = os.path.basename(p)  # run_L<level>_<ns>.npy; older run_<ns>.npy files count as level 0
+        return int(name[5:name.index("_", 5)]) if name.startswith("run_L") else 0
+
+    def _save(self, level: int, h: np.ndarray):
+        p = os.path.join(self.path, f"run_L{level:02d}_{time.time_ns():020d}.npy")
+        np.save(p + ".tmp.npy", h); os.replace(p + ".tmp.npy", p)
+
+    def contains(self, h: np.ndarray) -> np.ndarray:
+        hit = np.zeros(len(h), dtype=bool)
+        for p in self.runs():
+            run = np.load(p, mmap_mode="r")
+            if len(run) == 0: continue
+            i = np.searchsorted(run, h).clip(max=len(run) - 1)
+            hit |= np.asarray(run[i]) == h
+        return hit
+
+    def add(self, h: np.ndarray):
+        if len(h) == 0: return
+        os.makedirs(self.path, exist_ok=True)
+        self._save(0, np.unique(h))
+        level = 0
+        while len(runs := self.runs(level)) >= FANOUT:
+            self._save(level + 1, np.unique(np.concatenate([np.load(p) for p in runs])))
+            for p in runs: os.remove(p)
+            level += 1
+
+    def __len__(self):
+        """Exact, but reads every run; DQState keeps a running count in state.json instead."""
+        runs = self.runs()
+        if len(runs) == 1: return int(np.load(runs[0], mmap_mode="r").shape[0])
+        return int(np.unique(np.concatenate([np.load(p) for p in runs])).size) if runs else 0
+
+class BloomFilter:
+    """Fixed-size Bloom filter over the same hashes, for key sets too big to keep exactly. A hit means
+    'possibly seen', so uniqueness failures from it are reported as possible duplicates."""
+    def __init__(self, path: str, capacity: int = 100_000_000, fp_rate: float = 0.001):
+        self.path = path
+        meta = self._meta()
+        self.m = meta.get("m") or int(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+        self.k = meta.get("k") or max(1, round(self.m / capacity * math.log(2)))
+        self.n = meta.get("n", 0)
+        self.bits = None
+
+    def _meta(self) -> dict:
+        p = os.path.join(self.path, "bloom.json")
+        if not os.path.exists(p): return {}
+        with open(p, "r", encoding="utf-8") as f: return json.load(f)
+
+    def _load(self, write: bool = False):
+        """bloom.npy memory-mapped, so lookups and adds only touch the pages holding the probed bits."""
+        p = os.path.join(self.path, "bloom.npy")
+        if self.bits is None or (write and self.bits.mode != "r+"):
+            if os.path.exists(p): self.bits = np.load(p, mmap_mode="r+" if write else "r")
+            elif write:
+                os.makedirs(self.path, exist_ok=True)
+                self.bits = np.lib.format.open_memmap(p, mode="w+", dtype=np.uint8, shape=((self.m + 7) // 8,))  # sparse file
+            else: return None
+        return self.bits
+
+    def _positions(self, h: np.ndarray) -> np.ndarray:
+        h1, h2 = h & np.uint64(0xFFFFFFFF), (h >> np.uint64(32)) | np.uint64(1)  # double hashing
+        return np.stack([(h1 + np.uint64(i) * h2) % np.uint64(self.m) for i in range(self.k)], axis=1)
+
+    def contains(self, h: np.ndarray) -> np.ndarray:
+        bits = self._load()
+        if bits is None: return np.zeros(len(h), dtype=bool)
+        pos = self._positions(h)
+        return ((bits[pos >> np.uint64(3)] >> (pos & np.uint64(7)).astype(np.uint8)) & 1).all(axis=1)
+
+    def add(self, h: np.ndarray):
+        h = np.unique(h); h = h[~self.contains(h)]  # so n approximates distinct keys
+        bits, pos = self._load(write=True), self._positions(h).ravel()
+        np.bitwise_or.at(bits, pos >> np.uint64(3), (np.uint8(1) << (pos & np.uint64(7)).astype(np.uint8)))
+        bits.flush()  # writes back the dirty pages only
+        self.n += len(h)
+        p = os.path.join(self.path, "bloom.json")
+        with open(p + ".tmp", "w", encoding="utf-8") as f: json.dump({"m": self.m, "k": self.k, "n": self.n}, f)
+        os.replace(p + ".tmp", p)
+
+    @property
+    def fp_rate(self) -> float:
+        return (1 - math.exp(-self.k * self.n / self.m)) ** self.k
+
+    def __len__(self): return self.n
+
+def _plain(v):
+    if v is None or (not isinstance(v, str) and pd.isna(v)): return None
+    if isinstance(v, pd.Timestamp): return v.isoformat()
+    return v.item() if hasattr(v, "item") else v
+
+def _min_max(s: pd.Series):
+    s = s.dropna()
+    if s.empty: return None, None
+    if isinstance(s.dtype, pd.CategoricalDtype): s = s.astype(s.cat.categories.dtype)
+    try: return _plain(s.min()), _plain(s.max())
+    except TypeError: return None, None  # mixed types
+
+def _widen(old, new, pick):
+    if old is None: return new
+    if new is None: return old
+    try: return pick(old, new)
+    except TypeError: return old
+
+class DQState:
+    """Per-table incremental DQ state: the rule set, running column stats and key sets."""
+    def __init__(self, state_dir: str, table: str, uniqueness: str = "exact", bloom_capacity: int = 100_000_000):
+        self.dir = os.path.join(state_dir, table)
+        self.table = table
+        self.uniqueness = uniqueness  # exact | bloom
+        self.bloom_capacity = bloom_capacity
+        p = os.path.join(self.dir, "state.json")
+        self.data: Dict[str, Any] = {"rules": [], "rows": 0, "batches": 0, "columns": {}}
+        if os.path.exists(p):
+            with open(p, "r", encoding="utf-8") as f: self.data = json.load(f)
+            self.uniqueness = self.data.get("uniqueness", uniqueness)
+
+    @property
+    def empty(self) -> bool: return self.data["batches"] == 0
+
+    def keyset(self, column: str):
+        path = os.path.join(self.dir, "keys", column)
+        return BloomFilter(path, self.bloom_capacity) if self.uniqueness == "bloom" else HashRuns(path)
+
+    def rules_for(self, batch: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Rules fixed on the first batch (so later batches are judged the same way); columns that show
+        up later get rules proposed from their first batch."""
+        rules = list(self.data["rules"])
+        known = {r["column"] for r in rules} | set(self.data["columns"])
+        new_cols = [c for c in batch.columns if c not in known]
+        if new_cols: rules += dqtools.propose_rules(batch[new_cols])
+        return rules
+
+    def check(self, batch: pd.DataFrame) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Validate a batch against the state. Returns (results, pending); pass pending to commit()
+        once the batch has landed."""
+        rules = self.rules_for(batch)
+        res, pending = [], {"rules": rules, "keys": {}, "columns": {}}
+        total = self.data["rows"] + len(batch)
+        for c in batch.columns:
+            prev = self.data["columns"].get(c, {"rows": 0, "nulls": 0, "min": None, "max": None, "mismatches": 0, "duplicates": 0})
+            lo, hi = _min_max(batch[c])
+            pending["columns"][c] = {**prev, "rows": prev["rows"] + len(batch), "nulls": prev["nulls"] + int(batch[c].isna().sum()),
+                                     "min": _widen(prev["min"], lo, min), "max": _widen(prev["max"], hi, max)}
+        for r in rules:
+            c, t = r["column"], r["type"]
+            if c not in batch.columns:
+                res.append({"rule": r, "passed": True, "detail": "column not in batch", "batch_rows": len(batch)}); continue
+            col = pending["columns"][c]
+            with span(f"dq.incremental.{t}", cat="dq", column=c, rows=len(batch)):
+                if t == "not_null":
+                    bad = int(batch[c].isna().sum())
+                    res.append({"rule": r, "passed": col["nulls"] == 0, "detail": f"{bad} nulls in batch, {col['nulls']} of {total} overall",
+                                "batch_failed": bad, "total_failed": col["nulls"]})
+                elif t == "unique":
+                    h = value_hashes(batch[c])
+                    in_batch = int(pd.Series(h).duplicated().sum())
+                    ks = self.keyset(c)
+                    seen = int(ks.contains(np.unique(h)).sum()) if len(h) and not self.empty else 0
+                    bad = in_batch + seen
+                    col["duplicates"] = col.get("duplicates", 0) + bad
+                    col["distinct"] = self._distinct(c, ks) + len(h) - bad  # keys new to the table
+                    pending["keys"][c] = h
+                    probable = f" (bloom filter: possible duplicates, fp≈{ks.fp_rate:.1e})" if seen and self.uniqueness == "bloom" else ""
+                    res.append({"rule": r, "passed": col["duplicates"] == 0,
+                                "detail": f"{in_batch} dups in batch, {seen} keys seen in earlier batches{probable}",
+                                "batch_failed": bad, "total_failed": col["duplicates"]})
+                elif t == "regex":
+                    bad = count_mismatches(batch[c], r["pattern"])
+                    col["mismatches"] = col.get("mismatches", 0) + bad
+                    res.append({"rule": r, "passed": col["mismatches"] == 0, "detail": f"{bad} mismatches in batch, {col['mismatches']} overall",
+                                "batch_failed": bad, "total_failed": col["mismatches"]})
+        pending["rows"] = total
+        return res, pending
+
+    def commit(self, pending: Dict[str, Any]):
+        for c, h in pending["keys"].items(): self.keyset(c).add(h)
+        self.data.update(rules=pending["rules"], rows=pending["rows"], batches=self.data["batches"] + 1,
+                         columns={**self.data["columns"], **pending["columns"]}, uniqueness=self.uniqueness,
+                         updated_at=pd.Timestamp.now(tz="UTC").isoformat())
+        os.makedirs(self.dir, exist_ok=True)
+        p = os.path.join(self.dir, "state.json")
+        with open(p + ".tmp", "w", encoding="utf-8") as f: json.dump(self.data, f, indent=2, default=str)
+        os.replace(p + ".tmp", p)
+        shutil.rmtree(os.path.join(self.dir, "pending"), ignore_errors=True)
+
+    def stage(self, pending: Dict[str, Any], files: List[str]):
+        """Save pending (and the files it came from) before the batch is written to the table."""
+        d = os.path.join(self.dir, "pending")
+        shutil.rmtree(d, ignore_errors=True); os.makedirs(d)
+        keys = list(pending["keys"])
+        for i, c in enumerate(keys): np.save(os.path.join(d, f"keys_{i}.npy"), pending["keys"][c])
+        meta = {**{k: v for k, v in pending.items() if k != "keys"}, "keys": keys, "files": list(files), "batch": self.data["batches"] + 1}
+        with open(os.path.join(d, "meta.json.tmp"), "w", encoding="utf-8") as f: json.dump(meta, f, default=str)
+        os.replace(os.path.join(d, "meta.json.tmp"), os.path.join(d, "meta.json"))  # written last: marks the stage complete
+
+    def recover(self, landed) -> str | None:
+        """Finish a batch staged by a run that crashed before commit(): committed when landed(files) says its
+        files are in the table's ledger, dropped otherwise (they'll be landed and checked again)."""
+        d = os.path.join(self.dir, "pending"); p = os.path.join(d, "meta.json")
+        if not os.path.exists(p):
+            shutil.rmtree(d, ignore_errors=True); return None
+        with open(p, "r", encoding="utf-8") as f: meta = json.load(f)
+        if meta["batch"] <= self.data["batches"]: outcome = "already committed"  # crashed after state.json
+        elif landed(meta["files"]):
+            keys = {c: np.load(os.path.join(d, f"keys_{i}.npy")) for i, c in enumerate(meta["keys"])}
+            self.commit({**meta, "keys": keys}); outcome = "committed"
+        else: outcome = "dropped"
+        shutil.rmtree(d, ignore_errors=True)
+        return outcome
+
+    def reset(self):
+        """Forget everything, e.g. when the table is replaced by a full load."""
+        shutil.rmtree(self.dir, ignore_errors=True)
+        self.data = {"rules": [], "rows": 0, "batches": 0, "columns": {}}
+
+    def _distinct(self, column: str, ks) -> int:
+        st = self.data["columns"].get(column, {})
+        if "distinct" in st: return st["distinct"]
+        return len(ks) if os.path.isdir(ks.path) else 0  # state.json from before the running count
+
+    def profile(self) -> Dict[str, Any]:
+        """Same shape as tools.dq.profile, from the running stats (unique = keys tracked, when tracked)."""
+        cols = {}
+        for c, st in self.data["columns"].items():
+            tracked = "distinct" in st or os.path.isdir(os.path.join(self.dir, "keys", c))
+            cols[c] = {"nulls": st["nulls"], "min": st["min"], "max": st["max"],
+                       **({"unique": self._distinct(c, self.keyset(c))} if tracked else {})}
+        return {"rows": self.data["rows"], "batches": self.data["batches"], "columns": cols}
+
+def state_dir_for(sqlite_path: str) -> str:
+    return os.path.join(os.path.dirname(sqlite_path) or ".", "dq_state")
@@ -0,0 +1,103 @@
+import re
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+try:
+    import pyarrow as pa  # optional: dictionary-encoded Arrow strings instead of pandas category
+except ImportError:  # pragma: no cover
+    pa = None
+
+BOOL_WORDS = {"true": True, "false": False, "yes": True, "no": False, "y": True, "n": False, "t": True, "f": False}
+ISO_TS = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?(Z|[+-]\d{2}:?\d{2})?$")
+
+def _is_text(s: pd.Series) -> bool:
+    return not isinstance(s.dtype, pd.CategoricalDtype) and (s.dtype == object or pd.api.types.is_string_dtype(s.dtype))
+
+def _as_bool(s: pd.Series) -> Optional[pd.Series]:
+    vals = s.dropna()
+    if vals.empty: return None
+    if vals.map(lambda v: isinstance(v, (bool, np.bool_))).all(): return s.astype("boolean")
+    words = vals.astype(str).str.strip().str.lower()
+    if not words.isin(list(BOOL_WORDS)).all(): return None
+    return words.map(BOOL_WORDS).reindex(s.index).astype("boolean")
+
+def _as_datetime(s: pd.Series) -> Optional[pd.Series]:
+    vals = s.dropna()
+    if vals.empty or not vals.head(1000).astype(str).str.match(ISO_TS).all(): return None
+    try: out = pd.to_datetime(s, errors="coerce", format="ISO8601")
+    except (ValueError, TypeError): return None  # e.g. mixed offsets
+    return out if int(out.isna().sum()) == int(s.isna().sum()) else None
+
+def _as_category(s: pd.Series, max_card_ratio: float, arrow: bool) -> Optional[pd.Series]:
+    n = s.nunique(dropna=True)
+    if n == 0 or n > max_card_ratio * len(s): return None
+    if arrow and pa is not None:
+        return pd.Series(pd.arrays.ArrowExtensionArray(pa.array(s.astype(object), type=pa.string()).dictionary_encode()),
+                         index=s.index, name=s.name)
+    return s.astype("category")
+
+def _downcast(s: pd.Series) -> Optional[pd.Series]:
+    if pd.api.types.is_bool_dtype(s.dtype): return None
+    if pd.api.types.is_integer_dtype(s.dtype):
+        out = pd.to_numeric(s, downcast="integer")
+        return out if out.dtype != s.dtype else None
+    if pd.api.types.is_float_dtype(s.dtype):
+        vals = s.dropna()
+        if len(vals) and np.isfinite(vals).all() and (vals == vals.round()).all():
+            return pd.to_numeric(s.astype("Int64"), downcast="integer")  # integral floats, NaN -> <NA>
+        f32 = s.astype(np.float32)
+        if (f32.astype(s.dtype) == s)[s.notna()].all(): return f32  # only when lossless
+    return None
+
+def compact_dtypes(df: pd.DataFrame, max_card_ratio: float = 0.5, parse_dates: bool = True,
+                   arrow: bool = False, exclude: Iterable[str] = ()) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Shrink a frame read with default inference: yes/no text -> nullable boolean, ISO text -> datetime64
+    (parsed once, here), low-cardinality text -> category (or Arrow dictionary strings with arrow=True and
+    pyarrow installed), numerics downcast losslessly. Returns (frame, memory report)."""
+    before = df.memory_usage(index=True, deep=True)
+    out = df.copy(deep=False)
+    changed: Dict[str, Dict[str, str]] = {}
+    skip = set(exclude)
+    for c in df.columns:
+        if c in skip: continue
+        s = df[c]; new = None
+        if _is_text(s) or s.dtype == object:
+            new = _as_bool(s)
+            if new is None and parse_dates: new = _as_datetime(s)
+            if new is None and _is_text(s): new = _as_category(s, max_card_ratio, arrow)
+        elif pd.api.types.is_numeric_dtype(s.dtype):
+            new = _downcast(s)
+        if new is not None:
+            out[c] = new; changed[c] = {"from": str(s.dtype), "to": str(new.dtype)}
+    return out, memory_report(before, out.memory_usage(index=True, deep=True), changed)
+
+def memory_report(before: pd.Series, after: pd.Series, changed: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    b, a = int(before.sum()), int(after.sum())
+    cols = {c: {**(changed or {}).get(c, {}), "before_bytes": int(before.get(c, 0)), "after_bytes": int(after.get(c, 0))}
+            for c in after.index if c != "Index"}
+    return {"before_bytes": b, "after_bytes": a, "saved_bytes": b - a,
+            "saved_pct": round(100 * (b - a) / b, 1) if b else 0.0, "columns": cols}
+
+def expand_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """Categories back to plain values, for string expressions like `first_name + ' ' + last_name`."""
+    cats = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    if not cats: return df
+    out = df.copy(deep=False)
+    for c in cats: out[c] = df[c].astype(df[c].cat.categories.dtype)
+    return out
+
+def widen_numerics(df: pd.DataFrame) -> pd.DataFrame:
+    """Compacted numerics back to 64-bit, so STTM arithmetic doesn't wrap (int8 100 + 100 = -56) or lose float precision."""
+    wide = {}
+    for c in df.columns:
+        t = df[c].dtype
+        if pd.api.types.is_bool_dtype(t) or not pd.api.types.is_numeric_dtype(t) or t.itemsize >= 8: continue
+        if pd.api.types.is_float_dtype(t): wide[c] = "float64"
+        else: wide[c] = "Int64" if isinstance(t, pd.api.extensions.ExtensionDtype) else "int64"
+    return df.astype(wide) if wide else df
+
+def human_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB": return f"{n:,.1f} {unit}" if unit != "B" else f"{int(n)} B"
+        n /= 1024
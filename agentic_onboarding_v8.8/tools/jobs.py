@@ -0,0 +1,107 @@
+import time, uuid, threading, contextvars, collections
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from tools.tracing import set_span_hook, reset_span_hook
+
+class JobCancelled(BaseException):
+    """BaseException (like asyncio.CancelledError) so `except Exception` in stage code can't swallow it."""
+
+class Job:
+    """One background run. The worker reports through progress(); every tracing span opened
+    inside the job is also an event and a cancellation point."""
+    def __init__(self, name: str, steps: int = 0):
+        self.id = uuid.uuid4().hex[:8]
+        self.name = name
+        self.steps = steps
+        self.done_steps = 0
+        self.status = "queued"  # queued | running | done | failed | cancelled
+        self.events = collections.deque(maxlen=200)
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created = time.time(); self.started = None; self.finished = None
+        self.collected = False
+        self._cancel = threading.Event()
+        self.future = None
+
+    def progress(self, msg: str, step: bool = True):
+        self.check()
+        if step: self.done_steps += 1
+        self.events.append({"t": time.time(), "msg": msg})
+
+    def check(self):
+        if self._cancel.is_set(): raise JobCancelled(f"{self.name} cancelled")
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():  # never started
+            self.status = "cancelled"; self.finished = time.time()
+
+    @property
+    def active(self) -> bool: return self.status in ("queued", "running")
+
+    @property
+    def fraction(self) -> float:
+        if self.status == "done": return 1.0
+        return min(self.done_steps / self.steps, 0.99) if self.steps else 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.time()) - (self.started or self.created)
+
+    @property
+    def last_event(self) -> str:
+        return self.events[-1]["msg"] if self.events else self.status
+
+    def _span_event(self, sp: Dict[str, Any]):
+        self.check()
+        self.events.append({"t": time.time(), "msg": sp["name"], "span": True})
+
+class JobRegistry:
+    """Thread-pool job runner. Threads rather than processes: jobs stream events and watch a
+    cancel flag in shared memory, and pandas/sqlite release the GIL for the heavy parts."""
+    def __init__(self, max_workers: int = 1):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name: str, fn: Callable[..., Any], *args, steps: int = 0, **kwargs) -> Job:
+        """Run fn(job, *args, **kwargs) in the pool. Context vars (the active tracer) carry over."""
+        job = Job(name, steps)
+        ctx = contextvars.copy_context()
+        def run():
+            if job._cancel.is_set():
+                job.status = "cancelled"; job.finished = time.time(); return
+            job.status = "running"; job.started = time.time()
+            token = set_span_hook(job._span_event)
+            try:
+                job.result = fn(job, *args, **kwargs); job.status = "done"
+            except JobCancelled:
+                job.status = "cancelled"
+            except Exception as e:
+                job.status = "failed"; job.error = f"{type(e).__name__}: {e}"
+            finally:
+                reset_span_hook(token); job.finished = time.time()
+        with self._lock:
+            self.jobs[job.id] = job
+            job.future = self.pool.submit(ctx.run, run)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]: return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if job: job.cancel()
+
+    def active(self) -> List[Job]: return [j for j in self.jobs.values() if j.active]
+
+    def finished(self) -> List[Job]:
+        """Jobs that ended and haven't been collected yet, oldest first; marks them collected."""
+        with self._lock:
+            out = sorted([j for j in self.jobs.values() if not j.active and not j.collected], key=lambda j: j.created)
+            for j in out: j.collected = True
+        return out
+
+    def prune(self, keep: int = 20):
+        with self._lock:
+            old = sorted([j for j in self.jobs.values() if j.collected], key=lambda j: j.created)
+            for j in old[:max(len(old) - keep, 0)]: self.jobs.pop(j.id, None)
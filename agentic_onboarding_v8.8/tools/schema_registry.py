@@ -0,0 +1,160 @@
+import re, ast, json, sqlite3, hashlib, builtins, functools
+from datetime import datetime, timezone
+import pandas as pd
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Schema registry for landed datasets. Each landing's columns are reduced to (name, type family) and
+# fingerprinted; versions live in SQLite next to the layer databases. A new batch is checked against the
+# latest version from its dtypes alone (O(columns)); the only data touched is a column whose type changed,
+# to see whether it is just all-null. Compatible drift is applied (renames) and registered as a new version,
+# incompatible drift raises before anything is written.
+
+class SchemaDriftError(ValueError):
+    pass
+
+# type changes that need no action: numbers widen/narrow between batches (NaNs turn ints into floats)
+COMPATIBLE = {("int", "float"), ("float", "int"), ("bool", "int"), ("int", "bool"), ("bool", "float")}
+
+def type_family(dtype) -> str:
+    """Coarse type of a column; the fine dtype moves with compaction (int8/int64, category/str) and doesn't count."""
+    if isinstance(dtype, pd.CategoricalDtype): return "string"
+    if pd.api.types.is_bool_dtype(dtype): return "bool"
+    if pd.api.types.is_integer_dtype(dtype): return "int"
+    if pd.api.types.is_float_dtype(dtype): return "float"
+    if pd.api.types.is_datetime64_any_dtype(dtype): return "datetime"
+    if pd.api.types.is_string_dtype(dtype) or pd.api.types.is_object_dtype(dtype): return "string"
+    return str(dtype)
+
+def schema_of(df: pd.DataFrame) -> List[Tuple[str, str]]:
+    return [(str(c), type_family(t)) for c, t in df.dtypes.items()]
+
+def fingerprint(columns: Iterable[Tuple[str, str]]) -> str:
+    """Order-insensitive: a reordered file is the same schema."""
+    return hashlib.sha1(json.dumps(sorted(map(list, columns))).encode()).hexdigest()
+
+def norm_name(name: str) -> str:
+    return re.sub(r"[\s_\-]+", "_", str(name).strip().lower())
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+def diff(old: List[Tuple[str, str]], new: List[Tuple[str, str]], required: Optional[Iterable[str]] = None,
+         df: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+    """Changes from `old` to `new` schema. `required` are the columns downstream needs (default: all of `old`);
+    losing one, or a required column changing type incompatibly, makes the drift incompatible."""
+    o, n = dict(old), dict(new)
+    req = set(o) if required is None else set(required)
+    added = [c for c in n if c not in o]
+    removed = [c for c in o if c not in n]
+    by_norm = {norm_name(c): c for c in added}
+    renamed = {by_norm[norm_name(c)]: c for c in removed if norm_name(c) in by_norm}  # new name -> registered name
+    added = [c for c in added if c not in renamed]
+    removed = [c for c in removed if c not in renamed.values()]
+    retyped, errors = [], []
+    for new_c, old_c in [(c, c) for c in n if c in o] + list(renamed.items()):
+        a, b = o[old_c], n[new_c]
+        if a == b: continue
+        ok = (a, b) in COMPATIBLE or old_c not in req or (df is not None and df[new_c].isna().all())
+        retyped.append({"column": old_c, "from": a, "to": b, "compatible": ok})
+        if not ok: errors.append(f"column '{old_c}' changed type {a} -> {b}")
+    errors += [f"required column '{c}' is missing" for c in removed if c in req]
+    status = "incompatible" if errors else ("same" if not (added or removed or renamed or retyped) else "compatible")
+    return {"status": status, "added": added, "removed": removed, "renamed": renamed, "retyped": retyped, "errors": errors}
+
+class SchemaRegistry:
+    """Versioned (column, type family) lists per dataset in a SQLite file."""
+    def __init__(self, path: str):
+        self.path = path
+        with self._con() as con:
+            con.execute("""CREATE TABLE IF NOT EXISTS schema_versions (dataset TEXT NOT NULL, version INTEGER NOT NULL,
+                           fingerprint TEXT NOT NULL, columns TEXT NOT NULL, status TEXT, changes TEXT, registered_at TEXT,
+                           PRIMARY KEY (dataset, version))""")
+
+    def _con(self):
+        return sqlite3.connect(self.path)
+
+    def latest(self, dataset: str) -> Optional[Dict[str, Any]]:
+        with self._con() as con:
+            r = con.execute("SELECT version, fingerprint, columns FROM schema_versions WHERE dataset=? ORDER BY version DESC LIMIT 1",
+                            (dataset,)).fetchone()
+        return {"version": r[0], "fingerprint": r[1], "columns": [tuple(c) for c in json.loads(r[2])]} if r else None
+
+    def versions(self, dataset: str) -> pd.DataFrame:
+        with self._con() as con:
+            return pd.read_sql_query("SELECT * FROM schema_versions WHERE dataset=? ORDER BY version", con, params=(dataset,))
+
+    def check(self, dataset: str, df: pd.DataFrame, required: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        cols = schema_of(df); fp = fingerprint(cols)
+        prev = self.latest(dataset)
+        if prev is None:
+            res = {"status": "new", "added": [c for c, _ in cols], "removed": [], "renamed": {}, "retyped": [], "errors": []}
+        elif prev["fingerprint"] == fp:
+            res = {"status": "same", "added": [], "removed": [], "renamed": {}, "retyped": [], "errors": []}
+        else:
+            res = diff(prev["columns"], cols, required, df)
+        return {**res, "dataset": dataset, "fingerprint": fp, "columns": cols, "previous": prev and prev["version"]}
+
+    def register(self, drift: Dict[str, Any]) -> int:
+        """Store the checked schema as the dataset's next version (no-op when unchanged); returns its version."""
+        if drift["status"] == "same": return drift["previous"]
+        cols = [(drift["renamed"].get(c, c), t) for c, t in drift["columns"]]
+        changes = {k: drift[k] for k in ("added", "removed", "renamed", "retyped")}
+        with self._con() as con:
+            last = con.execute("SELECT version, fingerprint FROM schema_versions WHERE dataset=? ORDER BY version DESC LIMIT 1",
+                               (drift["dataset"],)).fetchone()
+            if last and last[1] == fingerprint(cols): return last[0]  # only renamed back to the registered names
+            v = con.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM schema_versions WHERE dataset=?", (drift["dataset"],)).fetchone()[0]
+            con.execute("INSERT INTO schema_versions VALUES (?,?,?,?,?,?,?)", (drift["dataset"], v, fingerprint(cols), json.dumps(cols),
+                        drift["status"], json.dumps(changes), _now()))
+        return v
+
+    def admit(self, dataset: str, df: pd.DataFrame, required: Optional[Iterable[str]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """check + fail fast + apply renames + register; returns the (renamed) frame and the drift report with its "version"."""
+        drift = self.check(dataset, df, required)
+        if drift["status"] == "incompatible":
+            raise SchemaDriftError(f"Incompatible schema change for {dataset} (registered v{drift['previous']}): " + "; ".join(drift["errors"]))
+        if drift["renamed"]: df = df.rename(columns=drift["renamed"])
+        drift["version"] = self.register(drift)
+        return df, drift
+
+# ---- STTM -> source column resolution, computed once per (STTM, source column set) ----
+
+def _names(expr: str) -> List[str]:
+    try: tree = ast.parse(expr, mode="eval")
+    except SyntaxError: return []
+    return sorted({n.id for n in ast.walk(tree) if isinstance(n, ast.Name)} - {"df"} - set(dir(builtins)))
+
+def _rows(sttm_map) -> tuple:
+    """(target, source, transformation) per STTM row; a compiled plan's columns are already in this form."""
+    if isinstance(sttm_map, tuple): return sttm_map
+    def s(v): return v.strip() if isinstance(v, str) and v.strip() else None
+    return tuple((r.get("Target Column"), s(r.get("Source Column")), s(r.get("Transformation"))) for _, r in sttm_map.iterrows())
+
+def sttm_sources(sttm_map) -> List[str]:
+    """Source columns an STTM reads: mapped columns plus names used in transformation expressions."""
+    out = set()
+    for _, src, expr in _rows(sttm_map):
+        if expr: out.update(_names(expr))
+        elif src: out.add(src)
+    return sorted(out)
+
+@functools.lru_cache(maxsize=64)
+def _plan(rows: tuple, columns: frozenset) -> tuple:
+    by_norm = {norm_name(c): c for c in columns}
+    steps = []
+    for tgt, src, expr in rows:
+        if not tgt or pd.isna(tgt): continue
+        if expr:
+            try: code = compile(expr, f"<sttm {tgt}>", "eval")
+            except SyntaxError: code = None
+            steps.append({"target": tgt, "kind": "expr", "expr": expr, "code": code,
+                          "missing": [n for n in _names(expr) if n not in columns]})
+        elif src:
+            col = src if src in columns else by_norm.get(norm_name(src))
+            steps.append({"target": tgt, "kind": "copy" if col else "missing", "source": col or src})
+    return tuple(steps)
+
+def mapping_plan(sttm_map, columns: Iterable[str]) -> tuple:
+    """Per target column: copy (source resolved exactly or by normalised name), expr (compiled once) or missing.
+    Cached on the STTM rows and the source column names, so it is built once per schema version."""
+    return _plan(_rows(sttm_map), frozenset(map(str, columns)))
@@ -1,5 +1,8 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, asdict
 import pandas as pd, os, glob, re
+from tools.cache import cached
+from tools.schema_registry import sttm_sources
 
 EXPECTED_COLS=[
     "Source Schema","Source Table","Source Column","Business Logic",
@@ -17,12 +20,17 @@ def _resolve_dir(default_dir:str)->str:
 
 def list_sttm_files(dir_path: Optional[str]=None):
     d=_resolve_dir(dir_path or "sttm")
-    files=sorted(glob.glob(os.path.join(d, "*.xlsx")))
-    return files
+    return cached("list_sttm", _glob_sorted, os.path.join(d, "*.xlsx"), paths=[d])
+
+def _glob_sorted(pattern:str)->List[str]:
+    return sorted(glob.glob(pattern))
+
+def _read_sttm_sheet(path:str)->pd.DataFrame:
+    return cached("sttm_sheet", pd.read_excel, path, sheet_name="STTM", paths=[path])
 
 def load_sttm_excel(path:str)->Dict[str,Any]:
     if not path: raise ValueError("STTM path is empty. Choose an STTM first.")
-    df=pd.read_excel(path, sheet_name="STTM")
+    df=_read_sttm_sheet(path)
     for c in EXPECTED_COLS:
         if c not in df.columns: raise ValueError(f"Missing column: {c}")
     return {
@@ -35,6 +43,72 @@ def target_table_from_map(df:pd.DataFrame)->str:
     vals=df["Target Table"].dropna().unique()
     return vals[0] if len(vals)>0 else "unknown_table"
 
+# ---- STTM compiler: the workbook as an immutable plan, built in one pass and cached per file version ----
+LAYERS={"int": "integration", "dw": "dwh"}
+RE_SCD=re.compile(r"SCD\s*([12])", re.IGNORECASE)
+
+@dataclass(frozen=True)
+class LayerPlan:
+    target_table: str
+    source_schemas: Tuple[str, ...]
+    source_tables: Tuple[str, ...]
+    columns: Tuple[Tuple[str, Optional[str], Optional[str]], ...]  # (target, source, transformation) per mapped column
+    keys: Tuple[str, ...]       # columns whose Business Logic says "business key"
+    scd: Optional[int]          # "SCD1"/"SCD2" in Business Logic, if any
+    required: Tuple[str, ...]   # source columns the mappings read
+
+    @property
+    def source_table(self) -> str:
+        return self.source_tables[0] if self.source_tables else ""
+
+@dataclass(frozen=True)
+class STTMPlan:
+    integration: LayerPlan
+    dwh: LayerPlan
+
+    @property
+    def business_keys(self) -> List[str]:
+        return list(dict.fromkeys(self.integration.keys + self.dwh.keys))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "STTMPlan":
+        def layer(x): return LayerPlan(x["target_table"], tuple(x["source_schemas"]), tuple(x["source_tables"]),
+                                       tuple(tuple(c) for c in x["columns"]), tuple(x["keys"]), x["scd"], tuple(x["required"]))
+        return cls(layer(d["integration"]), layer(d["dwh"]))
+
+def _cell(v) -> Optional[str]:
+    return v.strip() if isinstance(v, str) and v.strip() else (None if v is None or pd.isna(v) else str(v))
+
+def compile_sttm_frame(df: pd.DataFrame) -> STTMPlan:
+    acc={k: {"target_table": None, "source_schemas": [], "source_tables": [], "columns": [], "keys": [], "scd": None} for k in LAYERS}
+    cols=[df[c] for c in ("Source Schema","Source Table","Source Column","Business Logic","Transformation","Target Schema","Target Table","Target Column")]
+    for s_schema, s_table, s_col, logic, expr, t_schema, t_table, t_col in zip(*cols):
+        a=acc.get((_cell(t_schema) or "").lower())
+        if a is None: continue
+        s_schema, s_table, s_col, logic, t_table, t_col = map(_cell, (s_schema, s_table, s_col, logic, t_table, t_col))
+        if a["target_table"] is None and t_table: a["target_table"]=t_table
+        if s_schema and s_schema.lower() not in a["source_schemas"]: a["source_schemas"].append(s_schema.lower())
+        if s_table and s_table not in a["source_tables"]: a["source_tables"].append(s_table)
+        if t_col: a["columns"].append((t_col, s_col, _cell(expr)))
+        if logic and "business key" in logic.lower() and (t_col or s_col) not in a["keys"]: a["keys"].append(t_col or s_col)
+        m=RE_SCD.search(logic or "")
+        if m and a["scd"] is None: a["scd"]=int(m.group(1))
+    def layer(a): return LayerPlan(a["target_table"] or "unknown_table", tuple(a["source_schemas"]), tuple(a["source_tables"]),
+                                   tuple(a["columns"]), tuple(k for k in a["keys"] if k), a["scd"], tuple(sttm_sources(tuple(a["columns"]))))
+    return STTMPlan(**{name: layer(acc[k]) for k, name in LAYERS.items()})
+
+def _compile_sttm(path:str) -> STTMPlan:
+    return compile_sttm_frame(load_sttm_excel(path)["all"])
+
+def compile_sttm(path:str) -> STTMPlan:
+    """Targets, source tables, column mappings, keys, SCD hints and required source columns per layer.
+    Integration and DWH stages (and the app's prompts) read this instead of re-filtering the sheet."""
+    if not path: raise ValueError("STTM path is empty. Choose an STTM first.")
+    return cached("sttm_plan", _compile_sttm, path, paths=[path])
+
 def extract_bk_from_business_logic(sttm_df: pd.DataFrame) -> List[str]:
     mask = sttm_df["Business Logic"].astype(str).str.contains("business key", case=False, na=False)
     bks=set()
@@ -48,9 +122,9 @@ def discover_datasets(samples_dir="data/samples", sttm_dir="sttm"):
     data = {}
     samples_dir = _resolve_dir(samples_dir)
     sttm_dir = _resolve_dir(sttm_dir)
-    for csv in sorted(glob.glob(os.path.join(samples_dir, "*.csv"))):
+    cands = cached("list_sttm", _glob_sorted, os.path.join(sttm_dir, "*.xlsx"), paths=[sttm_dir])
+    for csv in cached("list_samples", _glob_sorted, os.path.join(samples_dir, "*.csv"), paths=[samples_dir]):
         base = os.path.splitext(os.path.basename(csv))[0]
-        cands = [p for p in sorted(glob.glob(os.path.join(sttm_dir, "*.xlsx")))]
         data[base] = {"csv": csv, "sttm": cands}
     return data
 
@@ -74,7 +148,7 @@ def suggest_sttm_for_dataset(dataset:str, sttm_dir:str="sttm")->Optional[str]:
             if stem and stem in b: sc+=3
             if stem and stem.rstrip("s") in b: sc+=2
         try:
-            df=pd.read_excel(path, sheet_name="STTM")
+            df=_read_sttm_sheet(path)
             tts = " ".join(df["Target Table"].astype(str).tolist()).lower()
             for stem in stems:
                 if stem and stem in tts: sc+=2
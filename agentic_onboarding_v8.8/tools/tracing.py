@@ -0,0 +1,135 @@
+import os, json, time, threading, contextlib, contextvars, functools, collections
+import pandas as pd
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import resource  # POSIX only
+except ImportError:  # pragma: no cover
+    resource = None
+
+def _rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except Exception:
+        return None
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if os.uname().sysname == "Darwin" else peak / 2**10
+
+def frame_bytes(df) -> int:
+    """Shallow in-memory size of a DataFrame (deep=True is too slow to run inside every span)."""
+    try: return int(df.memory_usage(index=True, deep=False).sum())
+    except Exception: return 0
+
+MAX_SPANS = int(os.environ.get("TRACE_MAX_SPANS", 20_000))  # a long session keeps only the newest spans
+
+class Tracer:
+    """Collects nested timing spans: wall/CPU time, rows, bytes, RSS. Thread-safe; nesting is per thread.
+    At most max_spans are kept (oldest dropped first), so a tracer living in session state stays bounded."""
+    def __init__(self, name: str = "run", max_spans: int = MAX_SPANS):
+        self.name = name
+        self.spans: collections.deque = collections.deque(maxlen=max_spans)
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._t0 = time.perf_counter_ns()
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, "stack"): self._local.stack = []
+        return self._local.stack
+
+    @contextlib.contextmanager
+    def span(self, name: str, cat: str = "stage", **attrs):
+        """Time a block. The yielded dict takes extra fields, e.g. sp["rows"] = len(df)."""
+        stack = self._stack()
+        hook = _span_hook.get()
+        sp: Dict[str, Any] = {"name": name, "cat": cat, "parent": stack[-1]["name"] if stack else None,
+                              "depth": len(stack), "tid": threading.get_ident(), **attrs}
+        if hook: hook(sp)  # may raise (job cancellation) before the span is entered
+        rss0 = _rss_mb(); cpu0 = time.thread_time_ns(); t0 = time.perf_counter_ns()
+        stack.append(sp)
+        try:
+            yield sp
+            sp.setdefault("status", "ok")
+        except BaseException as e:
+            sp["status"] = "error"; sp["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            stack.pop()
+            sp["start_us"] = (t0 - self._t0) / 1e3
+            sp["wall_ms"] = (time.perf_counter_ns() - t0) / 1e6
+            sp["cpu_ms"] = (time.thread_time_ns() - cpu0) / 1e6
+            rss1 = _rss_mb()
+            sp["rss_mb"] = round(rss1, 1) if rss1 is not None else None
+            sp["rss_delta_mb"] = round(rss1 - rss0, 1) if rss0 is not None and rss1 is not None else None
+            sp["peak_rss_mb"] = _peak_rss_mb()
+            with self._lock:
+                if len(self.spans) == self.spans.maxlen: self.dropped += 1
+                self.spans.append(sp)
+
+    def clear(self):
+        with self._lock: self.spans.clear(); self.dropped = 0
+        self._t0 = time.perf_counter_ns()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """The spans as a list; workers may append while the UI reads, and a deque can't be iterated then."""
+        with self._lock: return list(self.spans)
+
+    def summary(self) -> pd.DataFrame:
+        """One row per span name, slowest first."""
+        spans = self.snapshot()
+        if not spans: return pd.DataFrame(columns=["name", "cat", "calls", "wall_ms", "cpu_ms", "rows", "peak_rss_mb"])
+        df = pd.DataFrame(spans)
+        for c in ("rows", "bytes"):
+            if c not in df.columns: df[c] = None
+        g = df.groupby(["name", "cat"], sort=False).agg(calls=("wall_ms", "size"), wall_ms=("wall_ms", "sum"), cpu_ms=("cpu_ms", "sum"),
+                                                        rows=("rows", "max"), bytes=("bytes", "max"), peak_rss_mb=("peak_rss_mb", "max"))
+        return g.reset_index().sort_values("wall_ms", ascending=False).round(2)
+
+    def jsonl(self) -> str:
+        return "".join(json.dumps({"trace": self.name, **sp}, default=str) + "\n" for sp in self.snapshot())
+
+    def to_jsonl(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f: f.write(self.jsonl())
+        return path
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """chrome://tracing / Perfetto 'complete' events."""
+        skip = {"name", "cat", "start_us", "wall_ms", "tid", "parent", "depth"}
+        events = [{"name": sp["name"], "cat": sp["cat"], "ph": "X", "ts": sp["start_us"], "dur": sp["wall_ms"] * 1e3,
+                   "pid": os.getpid(), "tid": sp["tid"], "args": {k: v for k, v in sp.items() if k not in skip}}
+                  for sp in self.snapshot()]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"trace": self.name, "dropped_spans": self.dropped}}
+
+    def to_chrome_trace(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f: json.dump(self.chrome_trace(), f, default=str)
+        return path
+
+_span_hook: contextvars.ContextVar[Optional[Callable[[Dict[str, Any]], None]]] = contextvars.ContextVar("span_hook", default=None)
+
+def set_span_hook(fn): return _span_hook.set(fn)
+def reset_span_hook(token): _span_hook.reset(token)
+
+_default = Tracer()
+_current: contextvars.ContextVar[Tracer] = contextvars.ContextVar("tracer", default=_default)
+
+def get_tracer() -> Tracer: return _current.get()
+def set_tracer(tracer: Tracer): _current.set(tracer)
+
+def span(name: str, cat: str = "stage", **attrs):
+    """Span on the current tracer: `with span("dq.rule", cat="dq", column=c) as sp: ...`"""
+    return get_tracer().span(name, cat, **attrs)
+
+def traced(name: str, cat: str = "stage"):
+    """Decorator form of span() for whole pipeline stages."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with span(name, cat): return fn(*args, **kwargs)
+        return run
+    return deco
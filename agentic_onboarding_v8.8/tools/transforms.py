@@ -1,10 +1,13 @@
-import pandas as pd, hashlib
+import pandas as pd, numpy as np, hashlib
+from tools.key_codes import shared_codes
+from tools.tracing import span
 
 def scd_type1_merge(existing, incoming, bk):
     if existing is None or len(existing)==0: return incoming.copy()
     if not bk: raise ValueError("SCD1 merge requires business keys.")
-    e=existing.set_index(bk); i=incoming.set_index(bk)
-    e.update(i); return e.reset_index()
+    with span("scd1.merge", cat="scd", rows=len(incoming)):
+        e=existing.set_index(bk); i=incoming.set_index(bk)
+        e.update(i); return e.reset_index()
 
 def scd_type2_merge(existing, incoming, bk, eff_from="effective_from", eff_to="effective_to", current_flag="is_current"):
     if not bk: raise ValueError("SCD2 merge requires business keys.")
@@ -13,22 +16,34 @@ def scd_type2_merge(existing, incoming, bk, eff_from="effective_from", eff_to="e
         df=incoming.copy(); df[eff_from]=ts; df[eff_to]=pd.NaT; df[current_flag]=True; return df
     non_keys=[c for c in incoming.columns if c not in bk]
     def h(sr): return hashlib.md5("|".join([str(sr[c]) for c in non_keys]).encode()).hexdigest()
-    inc=incoming.copy(); inc["_h"]=inc.apply(h,axis=1)
-    ex=existing.copy(); ex["_h"]=ex[non_keys].apply(h,axis=1) if non_keys else ""
-    merged=[]; ex_cur=ex[ex[current_flag]==True] if current_flag in ex.columns else ex.assign(**{current_flag:True})
-    keys=set(ex_cur[bk].apply(tuple,axis=1).tolist()) if len(ex_cur)>0 else set()
-    for _,r in inc.iterrows():
-        key=tuple(r[bk].tolist()) if isinstance(bk,list) else (r[bk],)
-        if key in keys:
-            cur=ex_cur[ex_cur[bk].apply(tuple,axis=1)==key].iloc[0]
-            if cur.get("_h","")!=r["_h"]:
-                ex.loc[(ex[bk].apply(tuple,axis=1)==key)&(ex.get(current_flag,True)==True), current_flag]=False
-                if eff_to in ex.columns:
-                    ex.loc[(ex[bk].apply(tuple,axis=1)==key)&(ex[current_flag]==False)&(ex[eff_to].isna()), eff_to]=ts
+    with span("scd2.hash", cat="scd", rows=len(incoming)+len(existing)):
+        inc=incoming.copy(); inc["_h"]=inc.apply(h,axis=1)
+        ex=existing.copy(); ex["_h"]=ex[non_keys].apply(h,axis=1) if non_keys else ""
+    with span("scd2.match", cat="scd", rows=len(inc)) as sp:
+        # keys compared as int64 codes; first current row per code holds the hash to compare against
+        ex_codes,inc_codes=shared_codes(ex,inc,bk)
+        is_cur=(ex[current_flag]==True).to_numpy() if current_flag in ex.columns else np.ones(len(ex),dtype=bool)
+        cur_hash={}
+        for c,hv in zip(ex_codes[is_cur].tolist(), ex["_h"].to_numpy()[is_cur].tolist()):
+            if c>=0: cur_hash.setdefault(c,hv)
+        merged=[]; changed=set()
+        for pos,(_,r) in enumerate(inc.iterrows()):
+            code=int(inc_codes[pos])
+            if code in cur_hash:
+                if cur_hash[code]!=r["_h"]:
+                    changed.add(code)
+                    nr=r.drop(labels=["_h"]).to_dict(); nr[eff_from]=ts; nr[eff_to]=pd.NaT; nr[current_flag]=True; merged.append(nr)
+            else:
                 nr=r.drop(labels=["_h"]).to_dict(); nr[eff_from]=ts; nr[eff_to]=pd.NaT; nr[current_flag]=True; merged.append(nr)
+        sp["changed"]=len(changed); sp["inserted"]=len(merged)-len(changed)
+    with span("scd2.expire", cat="scd", rows=len(changed)):
+        if changed:
+            hit=np.isin(ex_codes,list(changed))
+            ex.loc[hit&is_cur, current_flag]=False
+            if eff_to in ex.columns:
+                ex.loc[hit&(ex[current_flag]==False).to_numpy()&ex[eff_to].isna().to_numpy(), eff_to]=ts
+    with span("scd2.append", cat="scd", rows=len(merged)):
+        if merged: ex=pd.concat([ex.drop(columns=[c for c in ["_h"] if c in ex.columns]), pd.DataFrame(merged)], ignore_index=True, sort=False)
         else:
-            nr=r.drop(labels=["_h"]).to_dict(); nr[eff_from]=ts; nr[eff_to]=pd.NaT; nr[current_flag]=True; merged.append(nr)
-    if merged: ex=pd.concat([ex.drop(columns=[c for c in ["_h"] if c in ex.columns]), pd.DataFrame(merged)], ignore_index=True, sort=False)
-    else:
-        if "_h" in ex.columns: ex=ex.drop(columns=["_h"])
+            if "_h" in ex.columns: ex=ex.drop(columns=["_h"])
     return ex
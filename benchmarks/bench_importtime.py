@@ -0,0 +1,96 @@
+"""Cold-start import cost of each app's entry point, measured with `python -X importtime`.
+
+    python benchmarks/bench_importtime.py                       # all apps, default budget
+    python benchmarks/bench_importtime.py --apps old,v8_8 --budget-ms 600 --top 15
+
+The top-level imports of <app>/app.py are replayed in a fresh interpreter (cwd = app dir); the
+Streamlit UI code itself isn't run. Exits 1 when an app exceeds --budget-ms or when a lazily
+loaded SDK (cloud connectors, sqlalchemy, plotting, PDF) shows up at startup. Third-party
+packages that aren't installed here are skipped and listed, so the total is a lower bound on such machines;
+any other import error (including a missing module of the app itself) fails the app.
+"""
+import os, sys, ast, json, argparse, subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+from suites import APPS  # noqa: E402
+
+APPS = {**APPS, "v1": "agentic_onboarding_v1"}
+LAZY = ["boto3", "botocore", "snowflake", "databricks", "redshift_connector", "sqlalchemy",
+        "matplotlib", "weasyprint", "reportlab", "jinja2", "requests", "openai"]
+
+PROBE = r"""
+import sys, json
+missing = []
+for stmt in STMTS:
+    try: exec(stmt, {})
+    except ModuleNotFoundError as e:  # a third-party package not installed here; the app's own modules must import
+        if (e.name or "").split(".")[0] in LOCAL: raise
+        missing.append(f"{stmt.strip()} ({e})")
+print(json.dumps({"missing": missing, "loaded": sorted({m.split('.')[0] for m in sys.modules})}))
+"""
+
+def app_imports(app_dir: str) -> list:
+    """Top-level import statements of app.py, in order."""
+    with open(os.path.join(app_dir, "app.py"), "r", encoding="utf-8") as f:
+        src = f.read()
+    out = []
+    for node in ast.parse(src).body:
+        if isinstance(node, ast.ImportFrom) and node.module == "__future__": continue
+        if isinstance(node, ast.Import):  # one statement per module, so a missing one doesn't hide the rest
+            out += [f"import {a.name}" + (f" as {a.asname}" if a.asname else "") for a in node.names]
+        elif isinstance(node, ast.ImportFrom): out.append(ast.get_source_segment(src, node))
+    return out
+
+def parse_importtime(stderr: str) -> list:
+    """[(module, self_us, cumulative_us, depth)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line: continue
+        parts = line[len("import time:"):].split("|")
+        self_us, cum_us, raw = int(parts[0]), int(parts[1]), parts[2]
+        depth = (len(raw) - len(raw.lstrip(" ")) - 1) // 2
+        rows.append((raw.strip(), self_us, cum_us, depth))
+    return rows
+
+def measure(app: str) -> dict:
+    app_dir = os.path.join(ROOT, APPS[app])
+    stmts = app_imports(app_dir)
+    local = sorted(os.path.splitext(f)[0] for f in os.listdir(app_dir) if f.endswith(".py") or os.path.isdir(os.path.join(app_dir, f)))
+    code = f"STMTS = {stmts!r}\nLOCAL = {local!r}\n" + PROBE
+    env = {**os.environ, "PYTHONPATH": app_dir, "PYTHONDONTWRITEBYTECODE": "1"}
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=app_dir, env=env, capture_output=True, text=True)
+    if p.returncode != 0:
+        return {"app": app, "error": p.stderr.strip().splitlines()[-1] if p.stderr.strip() else f"exit {p.returncode}"}
+    info = json.loads(p.stdout.strip().splitlines()[-1])
+    rows = parse_importtime(p.stderr)
+    total_us = sum(cum for _, _, cum, depth in rows if depth == 0)
+    return {"app": app, "total_ms": round(total_us / 1000, 1), "modules": len(rows),
+            "top": sorted(((m, round(c / 1000, 1)) for m, _, c, d in rows if d == 0), key=lambda r: -r[1]),
+            "lazy_loaded": [m for m in LAZY if m in info["loaded"]], "missing": info["missing"]}
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--apps", default=",".join(APPS))
+    ap.add_argument("--budget-ms", type=float, default=1200.0, help="per app, sum of top-level cumulative import time (streamlit is ~0.5s of it)")
+    ap.add_argument("--top", type=int, default=8)
+    ap.add_argument("--json", default=None, help="also write results to this path")
+    a = ap.parse_args()
+    failed, results = False, []
+    for app in [x.strip() for x in a.apps.split(",") if x.strip()]:
+        r = measure(app); results.append(r)
+        if "error" in r:
+            print(f"{app:8} ERROR {r['error']}"); failed = True; continue
+        over = r["total_ms"] > a.budget_ms
+        failed |= over or bool(r["lazy_loaded"])
+        print(f"{app:8} {r['total_ms']:8.1f} ms  {r['modules']:4} modules  budget {a.budget_ms:.0f} ms {'OVER' if over else 'ok'}")
+        for m, ms in r["top"][:a.top]: print(f"{'':10}{ms:8.1f} ms  {m}")
+        if r["lazy_loaded"]: print(f"{'':10}loaded at startup (should be lazy): {', '.join(r['lazy_loaded'])}")
+        for m in r["missing"]: print(f"{'':10}skipped, not installed: {m}")
+    if a.json:
+        with open(a.json, "w", encoding="utf-8") as f: json.dump({"budget_ms": a.budget_ms, "results": results}, f, indent=2)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
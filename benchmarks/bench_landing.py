@@ -0,0 +1,52 @@
+"""Throughput of multi-file landing reads (v8.8 tools.connectors.read_many) across worker counts.
+
+    python benchmarks/bench_landing.py --files 200 --rows 20000 --workers 1 2 4 8
+"""
+import os, sys, time, argparse, tempfile, shutil
+import numpy as np
+import pandas as pd
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agentic_onboarding_v8.8")
+sys.path.insert(0, os.path.abspath(APP))
+from tools.connectors import expand_uri, read_many, reconcile_schemas  # noqa: E402
+
+def make_parts(root: str, files: int, rows: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    for i in range(files):
+        pd.DataFrame({"order_id": np.arange(i * rows, (i + 1) * rows),
+                      "customer_id": rng.integers(0, 100_000, rows),
+                      "amount": rng.normal(100, 30, rows).round(2),
+                      "status": rng.choice(["NEW", "PAID", "SHIPPED", "CANCELLED"], rows),
+                      "order_ts": pd.Timestamp("2026-10-01") + pd.to_timedelta(rng.integers(0, 86_400, rows), unit="s"),
+                      }).to_csv(os.path.join(root, f"orders_2026-10-{i:04d}.csv"), index=False)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=100)
+    ap.add_argument("--rows", type=int, default=20_000)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--processes", action="store_true", help="use a process pool instead of threads")
+    ap.add_argument("--repeat", type=int, default=3)
+    a = ap.parse_args()
+    root = tempfile.mkdtemp(prefix="bench_landing_")
+    try:
+        make_parts(root, a.files, a.rows)
+        paths = expand_uri(os.path.join(root, "orders_*.csv"))
+        mb = sum(os.path.getsize(p) for p in paths) / 1e6
+        print(f"{len(paths)} files, {a.files * a.rows:,} rows, {mb:.1f} MB ({'processes' if a.processes else 'threads'})")
+        print(f"{'workers':>7} {'best_s':>8} {'rows/s':>12} {'MB/s':>8} {'speedup':>8}")
+        base = None
+        for w in a.workers:
+            best = float("inf")
+            for _ in range(a.repeat):
+                t0 = time.perf_counter()
+                frames = read_many(paths, workers=w, use_processes=a.processes)
+                df, _ = reconcile_schemas(frames, paths)
+                best = min(best, time.perf_counter() - t0)
+            base = base or best
+            print(f"{w:>7} {best:>8.3f} {len(df) / best:>12,.0f} {mb / best:>8.1f} {base / best:>7.2f}x")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
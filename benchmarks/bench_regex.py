@@ -0,0 +1,77 @@
+"""Email/regex validation: per-row lambda vs pandas str.match vs utils/regex_kernel (dedupe + Arrow RE2).
+
+    python benchmarks/bench_regex.py                           # 10M rows, 20% distinct emails
+    python benchmarks/bench_regex.py --rows 1m --distinct 0.9 --null-rate 0.01 --repeat 3
+
+The kernel is loaded from agentic_etl_app_old/utils/regex_kernel.py (v1_6 and v8.8 carry the same file).
+The per-row lambda is what dq_rules.run_checks used; it is skipped above --lambda-max rows.
+"""
+import os, sys, time, json, argparse, importlib.util
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from generators import parse_size  # noqa: E402
+
+EMAIL = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+DOMAINS = ["example.com", "company.co.uk", "mail.net", "corp.org", "invalid", "x.io", "sub.domain.com", "bad@@host.com"]
+
+def load_kernel():
+    path = os.path.join(os.path.dirname(HERE), "agentic_etl_app_old", "utils", "regex_kernel.py")
+    spec = importlib.util.spec_from_file_location("regex_kernel", path)
+    mod = importlib.util.module_from_spec(spec); spec.loader.exec_module(mod)
+    return mod
+
+def emails(n: int, distinct: float, null_rate: float, seed: int) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    k = max(1, int(n * distinct))
+    pool = np.array([f"user{i}@{DOMAINS[i % len(DOMAINS)]}" for i in range(k)], dtype=object)
+    s = pd.Series(pool[rng.integers(0, k, n)])
+    if null_rate: s[rng.random(n) < null_rate] = None
+    return s
+
+def timed(fn, repeat):
+    best, out = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter(); out = fn(); dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, out
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", default="10m")
+    ap.add_argument("--distinct", type=float, default=0.2, help="share of distinct values")
+    ap.add_argument("--null-rate", type=float, default=0.01)
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--lambda-max", default="2m", help="skip the per-row lambda above this many rows")
+    ap.add_argument("--json", default=None)
+    a = ap.parse_args()
+    n = parse_size(a.rows)
+    k = load_kernel()
+    rx = k.compiled(EMAIL)
+    s = emails(n, a.distinct, a.null_rate, a.seed)
+    print(f"{n:,} rows, {a.distinct:.0%} distinct, {a.null_rate:.1%} null, pyarrow={'yes' if k.pa is not None else 'no'}")
+    cases = {
+        "lambda (old run_checks)": lambda: s.fillna('').map(lambda x: bool(rx.match(str(x)))).to_numpy(),
+        "pandas str.match": lambda: s.fillna('').astype(str).str.match(rx).to_numpy(dtype=bool),
+        "kernel dedupe": lambda: k.regex_match(s, rx, dedupe=True),
+        "kernel no dedupe": lambda: k.regex_match(s, rx, dedupe=False),
+        "kernel default": lambda: k.regex_match(s, rx),
+    }
+    results, ref = [], None
+    for name, fn in cases.items():
+        if name.startswith("lambda") and n > parse_size(a.lambda_max):
+            print(f"{name:26} {'skipped':>10}"); continue
+        best, out = timed(fn, a.repeat)
+        ref = out if ref is None else ref
+        same = bool(np.array_equal(np.asarray(out, dtype=bool), np.asarray(ref, dtype=bool)))
+        results.append({"case": name, "rows": n, "best_s": round(best, 4), "rows_per_s": round(n / best), "same_as_first": same})
+        print(f"{name:26} {best * 1000:10.1f} ms  {n / best / 1e6:7.2f} M rows/s  {'' if same else 'MISMATCH'}")
+    if a.json:
+        with open(a.json, "w", encoding="utf-8") as f: json.dump(results, f, indent=2)
+    return 0 if all(r["same_as_first"] for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Point-in-time reads over deep SCD2 history: fullscd etl.time_travel.SCD2Index and the SQLite
+current/history layout (etl.scd_store) against filtering every version in pandas.
+
+    python benchmarks/bench_time_travel.py --keys 20000 --versions 10 50 --queries 50
+"""
+import os, sys, time, argparse, tempfile, shutil
+import numpy as np
+import pandas as pd
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agentic_ai_etl_sttm_local_fullscd")
+sys.path.insert(0, os.path.abspath(APP))
+from etl.time_travel import SCD2Index  # noqa: E402
+from etl.scd_store import SCD2Store  # noqa: E402
+
+T0 = pd.Timestamp("2020-01-01", tz="UTC")
+
+def make_history(keys: int, versions: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    minutes = np.sort(rng.integers(0, 5 * 525_600, (keys, versions)), axis=1).ravel()
+    df = pd.DataFrame({"customer_key": np.repeat(np.arange(keys), versions),
+                       "segment": rng.choice(["Consumer", "Corporate", "SMB"], keys * versions),
+                       "balance": rng.normal(100, 30, keys * versions).round(2),
+                       "effective_start": T0 + pd.to_timedelta(minutes, unit="min")})
+    df["effective_end"] = df.groupby("customer_key")["effective_start"].shift(-1)
+    df["is_current"] = df["effective_end"].isna()
+    return df
+
+def best(fn, queries, repeat):
+    t = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for q in queries: fn(q)
+        t = min(t, time.perf_counter() - t0)
+    return t / len(queries)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--keys", type=int, default=20_000)
+    ap.add_argument("--versions", type=int, nargs="+", default=[5, 20, 50])
+    ap.add_argument("--queries", type=int, default=20)
+    ap.add_argument("--lookup-keys", type=int, default=100, help="keys per as_of(keys=...) lookup")
+    ap.add_argument("--repeat", type=int, default=3)
+    a = ap.parse_args()
+    rng = np.random.default_rng(1)
+    print(f"{'versions':>8} {'rows':>11} {'build_s':>8} | {'as_of all (ms)':>26} | {'as_of keys (ms)':>26} | {'between 30d (ms)':>17}")
+    print(f"{'':>8} {'':>11} {'':>8} | {'scan':>8} {'index':>8} {'sqlite':>8} | {'scan':>8} {'index':>8} {'sqlite':>8} | {'scan':>8} {'index':>8}")
+    for v in a.versions:
+        df = make_history(a.keys, v)
+        s, e = df["effective_start"], df["effective_end"]
+        t0 = time.perf_counter(); ix = SCD2Index(df, "customer_key"); build = time.perf_counter() - t0
+        root = tempfile.mkdtemp(prefix="bench_tt_")
+        try:
+            store = SCD2Store(os.path.join(root, "t.db"), "dim", "customer_key")
+            store.load(df, replace=True)
+            ts = [T0 + pd.Timedelta(minutes=int(m)) for m in rng.integers(0, 5 * 525_600, a.queries)]
+            ks = [rng.choice(a.keys, a.lookup_keys, replace=False).tolist() for _ in ts]
+            qk = list(zip(ts, ks))
+            r = [best(lambda t: df[(s <= t) & (e.isna() | (e > t))], ts, a.repeat),
+                 best(lambda t: ix.as_of(t), ts, a.repeat),
+                 best(lambda t: store.as_of(t), ts, 1),
+                 best(lambda q: df[df["customer_key"].isin(q[1]) & (s <= q[0]) & (e.isna() | (e > q[0]))], qk, a.repeat),
+                 best(lambda q: ix.as_of(q[0], keys=q[1]), qk, a.repeat),
+                 best(lambda q: store.as_of(q[0], keys=q[1]), qk, a.repeat),
+                 best(lambda t: df[(s < t + pd.Timedelta(days=30)) & (e.isna() | (e > t))], ts, a.repeat),
+                 best(lambda t: ix.between(t, t + pd.Timedelta(days=30)), ts, a.repeat)]
+            assert len(ix.as_of(ts[0])) == len(df[(s <= ts[0]) & (e.isna() | (e > ts[0]))])
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+        ms = [x * 1000 for x in r]
+        print(f"{v:>8} {len(df):>11,} {build:>8.3f} | {ms[0]:>8.2f} {ms[1]:>8.2f} {ms[2]:>8.2f} | {ms[3]:>8.2f} {ms[4]:>8.2f} {ms[5]:>8.2f} | {ms[6]:>8.2f} {ms[7]:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Synthetic, seeded data for the benchmarks: customers, orders, change batches and an STTM.
+
+Shapes follow the bundled samples (fullscd data/sample_initial.csv, v8.8 seed customers/orders),
+so the same frames can be fed to every app's SCD, DQ and STTM code.
+"""
+import numpy as np
+import pandas as pd
+
+FIRST = np.array(["Ava", "Ben", "Cory", "Diya", "Eli", "Faye", "Gus", "Hana", "Ivan", "Jia", "Kai", "Lia"])
+LAST = np.array(["Green", "Young", "Reed", "Patel", "Kim", "Stone", "Lopez", "Hall", "Cook", "Ward"])
+DOMAINS = np.array(["example.com", "company.co.uk", "mail.org", "corp.net"])
+COUNTRIES = np.array(["us", "ca", "uk", "de", "in"])
+SEGMENTS = np.array(["consumer", "corporate", "home office"])
+CITIES = np.array(["NYC", "London", "Toronto", "Berlin", "Pune", "Austin", "Oslo"])
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+def parse_size(s: str) -> int:
+    s = str(s).strip().lower()
+    if s in SIZES: return SIZES[s]
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1:], 1)
+    return int(float(s[:-1] if mult > 1 else s) * mult)
+
+def customers(n: int, seed: int = 42, start_id: int = 1, bad_email_rate: float = 0.01) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ids = np.arange(start_id, start_id + n)
+    fn = FIRST[rng.integers(0, len(FIRST), n)]; ln = LAST[rng.integers(0, len(LAST), n)]
+    email = pd.Series(np.char.add(np.char.add(np.char.lower(fn), ids.astype(str)), "@")).str.cat(DOMAINS[rng.integers(0, len(DOMAINS), n)])
+    bad = rng.random(n) < bad_email_rate
+    email[bad] = email[bad].str.replace("@", "@@", regex=False)
+    return pd.DataFrame({
+        "customer_id": ids,
+        "first_name": fn, "last_name": ln, "email": email.to_numpy(),
+        "country": COUNTRIES[rng.integers(0, len(COUNTRIES), n)],
+        "segment": SEGMENTS[rng.integers(0, len(SEGMENTS), n)],
+        "city": CITIES[rng.integers(0, len(CITIES), n)],
+        "order_date": (pd.Timestamp("2023-06-01") + pd.to_timedelta(rng.integers(0, 540, n), unit="D")).strftime("%Y-%m-%d"),
+        "total_amount": rng.gamma(2.0, 80.0, n).round(2),
+        "last_updated": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 86_400 * 30, n), unit="s"),
+    })
+
+def orders(n: int, n_customers: int, seed: int = 43) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "order_id": np.arange(1, n + 1),
+        "customer_id": rng.integers(1, n_customers + 1, n),
+        "order_ts": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 86_400 * 365, n), unit="s"),
+        "amount": rng.uniform(10, 500, n).round(2),
+        "currency": rng.choice(["USD", "CAD", "GBP"], n, p=[0.7, 0.2, 0.1]),
+        "status": rng.choice(["NEW", "PAID", "CANCELLED", "REFUNDED"], n, p=[0.5, 0.35, 0.1, 0.05]),
+    })
+
+def change_batch(base: pd.DataFrame, change_rate: float = 0.05, new_rate: float = 0.01,
+                 dup_rate: float = 0.0, seed: int = 44, key: str = "customer_id") -> pd.DataFrame:
+    """Next-day snapshot of `base`: change_rate of rows get a new city/email, new_rate new keys appear,
+    and dup_rate extra rows repeat a key with a later last_updated (for dedup paths)."""
+    rng = np.random.default_rng(seed)
+    n = len(base)
+    out = base.copy()
+    chg = rng.random(n) < change_rate
+    out.loc[chg, "city"] = CITIES[rng.integers(0, len(CITIES), int(chg.sum()))]
+    out.loc[chg, "email"] = "moved." + out.loc[chg, "email"].astype(str)
+    if "last_updated" in out.columns:
+        out.loc[chg, "last_updated"] = out.loc[chg, "last_updated"] + pd.Timedelta(days=31)
+    n_new = int(n * new_rate)
+    if n_new:
+        out = pd.concat([out, customers(n_new, seed=seed + 1, start_id=int(base[key].max()) + 1)], ignore_index=True)
+    n_dup = int(n * dup_rate)
+    if n_dup:
+        dups = out.sample(n=n_dup, random_state=seed, replace=n_dup > len(out)).copy()
+        dups["city"] = "Dup City"
+        if "last_updated" in dups.columns: dups["last_updated"] = dups["last_updated"] + pd.Timedelta(hours=1)
+        out = pd.concat([out, dups], ignore_index=True)
+    return out
+
+def sttm_rules() -> pd.DataFrame:
+    """Same mapping as fullscd docs/STTM_sample.xlsx (the DSL understood by etl.transformer)."""
+    rows = [
+        ("customer_id", "Business key", None, "customer_key"),
+        ("first_name,last_name", "full name", "concat(first_name, ' ', last_name)", "full_name"),
+        ("email", "pass-through", None, "email"),
+        ("email", "domain extraction", "lower(split(email, '@')[1])", "email_domain"),
+        ("country", "Uppercase ISO", "upper(country)", "country_code"),
+        ("segment", "Normalize", "title(segment)", "segment"),
+        ("total_amount", "Add 10% tax", "mul(total_amount, 1.10)", "total_with_tax"),
+        ("order_date", "Only 2024", "filter_year(order_date, 2024)", "order_date_2024"),
+        ("last_updated", "pass-through", None, "last_updated"),
+    ]
+    return pd.DataFrame([{"Source Schema": "sales", "Source Table": "source_customers", "Source Column": s,
+                          "Business Logic": b, "Transformation": t, "Target Schema": "sales_clean",
+                          "Target Table": "dim_customer", "Target Column": tc} for s, b, t, tc in rows])
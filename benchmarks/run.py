@@ -0,0 +1,159 @@
+"""Benchmark runner: times the SCD, dedup, DQ, STTM and layer I/O paths on synthetic data.
+
+    python benchmarks/run.py                                  # all suites at 10k rows
+    python benchmarks/run.py --sizes 10k,1m --suites fullscd,v8_8 --change-rate 0.05 --dup-rate 0.01
+    python benchmarks/run.py --update-baseline                # store results as the new baseline
+    python benchmarks/run.py --baseline benchmarks/baseline.json --tolerance 0.25   # exit 1 on regression
+
+Results go to benchmarks/results/bench_<utc>.json. Each case runs once to warm up, then --repeat times;
+the median and interquartile range (IQR) of those runs are recorded. A case regresses when its median exceeds
+the baseline median by more than --tolerance (relative) and by more than both --min-delta-ms and
+--iqr-factor times the smaller IQR of the two runs (absolute, so timer noise on a busy box doesn't count),
+or when a case that is ok in the baseline errors, is skipped or is missing (its suite crashed). Suites with
+a slow case are re-run (--confirm times) in a fresh process and the faster median is kept, so a one-off
+stall of the whole process (disk, another tenant) isn't reported as a regression.
+"""
+import os, sys, json, time, argparse, platform, subprocess, shutil, statistics
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from generators import parse_size  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+def _peak_rss_mb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except Exception:
+        return None
+
+def run_suite(suite: str, rows: int, repeat: int, change_rate: float, dup_rate: float, seed: int, caps: bool) -> list:
+    """Worker side: runs inside the app directory, prints nothing, returns case results."""
+    from suites import SUITES, make_data
+    data = make_data(rows, change_rate, dup_rate, seed)
+    out = []
+    try:
+        for name, setup, fn, max_rows in SUITES[suite]():
+            rec = {"suite": suite, "case": name, "rows": rows}
+            if caps and max_rows and rows > max_rows:
+                out.append({**rec, "status": "skipped", "reason": f"row-at-a-time path, capped at {max_rows:,} rows"}); continue
+            try:
+                args = setup(data)
+                fn(args)  # warm-up: imports, caches, first-touch allocations
+                times = []
+                for _ in range(repeat):
+                    t0 = time.perf_counter(); fn(args); times.append(time.perf_counter() - t0)
+                best, med = min(times), statistics.median(times)
+                q1, _, q3 = statistics.quantiles(times, n=4) if len(times) > 1 else (med, med, med)
+                out.append({**rec, "status": "ok", "best_s": round(best, 6), "median_s": round(med, 6), "iqr_s": round(q3 - q1, 6),
+                            "mean_s": round(sum(times) / len(times), 6),
+                            "rows_per_s": round(rows / med, 1) if med > 0 else None, "peak_rss_mb": _peak_rss_mb()})
+            except Exception as e:
+                out.append({**rec, "status": "error", "error": f"{type(e).__name__}: {e}"})
+    finally:
+        shutil.rmtree(data["tmp"], ignore_errors=True)
+    return out
+
+def spawn(suite: str, rows: int, a) -> list:
+    from suites import APPS
+    app_dir = os.path.join(os.path.dirname(HERE), APPS[suite])
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([app_dir, HERE, os.environ.get("PYTHONPATH", "")])}
+    cmd = [sys.executable, os.path.abspath(__file__), "--_worker", suite, "--_rows", str(rows), "--repeat", str(a.repeat),
+           "--change-rate", str(a.change_rate), "--dup-rate", str(a.dup_rate), "--seed", str(a.seed)] + (["--no-caps"] if a.no_caps else [])
+    p = subprocess.run(cmd, cwd=app_dir, env=env, capture_output=True, text=True)
+    if p.returncode != 0:
+        return [{"suite": suite, "case": "<suite>", "rows": rows, "status": "error", "error": (p.stderr or p.stdout).strip()[-2000:]}]
+    return json.loads(p.stdout.strip().splitlines()[-1])
+
+def compare(results: list, baseline: dict, tolerance: float, min_delta_ms: float, scope=None, iqr_factor: float = 3.0) -> list:
+    """Cases slower than the baseline, plus baseline cases that failed or are missing from `results`
+    (a crashed suite). `scope` is the set of (suite, rows) that were run; other baseline cases are ignored.
+    Medians are compared (best_s for results recorded before medians were); the absolute margin is the
+    larger of min_delta_ms and iqr_factor x the smaller of the two IQRs (a run can't widen its own margin
+    by being noisy; transient stalls are left to the confirmation re-runs)."""
+    base = {(r["suite"], r["case"], r["rows"]): r for r in baseline.get("results", []) if r.get("status") == "ok"}
+    regressions = []
+    for r in results:
+        b = base.pop((r["suite"], r["case"], r["rows"]), None)
+        if not b: continue
+        if r.get("status") != "ok":
+            regressions.append(r); continue
+        cur, ref = r.get("median_s", r["best_s"]), b.get("median_s", b["best_s"])
+        margin = max(min_delta_ms / 1000, iqr_factor * min(r.get("iqr_s", 0), b.get("iqr_s", 0)))
+        r["baseline_s"] = ref; r["ratio"] = round(cur / ref, 3) if ref else None
+        if cur > ref * (1 + tolerance) and cur - ref > margin:
+            regressions.append(r)
+    scope = {(r["suite"], r["rows"]) for r in results} if scope is None else scope
+    regressions += [{"suite": s, "case": c, "rows": n, "status": "missing"} for (s, c, n) in base if (s, n) in scope]
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--suites", default="fullscd,v4_5,v8_8,old,v1_6")
+    ap.add_argument("--sizes", default="10k", help="comma list: 10k,100k,1m,10m or plain integers")
+    ap.add_argument("--repeat", type=int, default=7)
+    ap.add_argument("--change-rate", type=float, default=0.05)
+    ap.add_argument("--dup-rate", type=float, default=0.01)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--no-caps", action="store_true", help="also run row-at-a-time cases above their cap")
+    ap.add_argument("--out", default=None, help="results JSON path (default benchmarks/results/bench_<utc>.json)")
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    ap.add_argument("--min-delta-ms", type=float, default=10.0)
+    ap.add_argument("--iqr-factor", type=float, default=3.0, help="noise margin: multiples of the measured IQR")
+    ap.add_argument("--confirm", type=int, default=2, help="re-runs of suites with a slow case before it counts")
+    ap.add_argument("--_worker", help=argparse.SUPPRESS)
+    ap.add_argument("--_rows", type=int, help=argparse.SUPPRESS)
+    a = ap.parse_args()
+
+    if a._worker:
+        print(json.dumps(run_suite(a._worker, a._rows, a.repeat, a.change_rate, a.dup_rate, a.seed, not a.no_caps)))
+        return 0
+
+    results = []
+    sizes = [parse_size(s) for s in a.sizes.split(",") if s.strip()]
+    suites = [s.strip() for s in a.suites.split(",") if s.strip()]
+    for size in sizes:
+        for suite in suites:
+            for r in spawn(suite, size, a):
+                results.append(r)
+                t = f"{r['median_s'] * 1000:10.1f} ms" if r.get("status") == "ok" else f"{r['status']:>13}"
+                print(f"{suite:8} {r['case']:34} {size:>10,} {t}  {r.get('reason') or r.get('error') or ''}"[:200])
+
+    regressions = []
+    if not a.update_baseline and os.path.exists(a.baseline):
+        with open(a.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        scope = {(s, n) for s in suites for n in sizes}
+        regressions = compare(results, baseline, a.tolerance, a.min_delta_ms, scope, a.iqr_factor)
+        for _ in range(a.confirm):
+            slow = sorted({(r["suite"], r["rows"]) for r in regressions if r.get("status") == "ok"})
+            if not slow: break
+            print(f"confirming {len(slow)} suite(s) with slow cases: {', '.join(s for s, _ in slow)}")
+            time.sleep(2)  # let a transient stall pass
+            again = {(r["suite"], r["case"], r["rows"]): r for s, n in slow for r in spawn(s, n, a)}
+            for r in results:
+                b = again.get((r["suite"], r["case"], r["rows"]))
+                if r.get("status") == "ok" and b and b.get("status") == "ok" and b["median_s"] < r["median_s"]: r.update(b)
+            regressions = compare(results, baseline, a.tolerance, a.min_delta_ms, scope, a.iqr_factor)
+    doc = {"created_utc": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "python": platform.python_version(),
+           "machine": platform.machine(), "cpus": os.cpu_count(),
+           "params": {"change_rate": a.change_rate, "dup_rate": a.dup_rate, "seed": a.seed, "repeat": a.repeat},
+           "results": results, "regressions": [f"{r['suite']}/{r['case']}/{r['rows']}" for r in regressions]}
+    out = a.out or os.path.join(HERE, "results", f"bench_{time.strftime('%Y%m%d_%H%M%S', time.gmtime())}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f: json.dump(doc, f, indent=2)
+    print(f"results -> {out}")
+    if a.update_baseline:
+        with open(a.baseline, "w", encoding="utf-8") as f: json.dump(doc, f, indent=2)
+        print(f"baseline updated -> {a.baseline}")
+    for r in regressions:
+        if r.get("status") != "ok":
+            print(f"FAILED {r['suite']}/{r['case']}/{r['rows']}: {r['status']} (ok in baseline) {r.get('error') or r.get('reason') or ''}"[:300]); continue
+        print(f"REGRESSION {r['suite']}/{r['case']}/{r['rows']}: median {r.get('median_s', r['best_s']):.4f}s vs baseline {r['baseline_s']:.4f}s (x{r['ratio']})")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Benchmark cases per app. Each suite runs in its own process with the app directory on sys.path
+(the apps ship same-named packages - etl, tools, utils - so they cannot share an interpreter).
+
+A case is (name, setup, fn, max_rows): setup(data) builds inputs outside the timer, fn(inputs) is timed.
+max_rows caps row-at-a-time implementations that would take hours at 10M; --no-caps lifts it.
+"""
+import os, tempfile
+import pandas as pd
+
+from generators import customers, orders, change_batch, sttm_rules
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APPS = {
+    "fullscd": "agentic_ai_etl_sttm_local_fullscd",
+    "v4_5": "agentic_ai_etl_sttm_v4_5",
+    "v8_8": "agentic_onboarding_v8.8",
+    "old": "agentic_etl_app_old",
+    "v1_6": "agentic_etl_full_v1_6_plus",
+}
+AS_OF = pd.Timestamp("2024-02-01")
+
+def make_data(n: int, change_rate: float, dup_rate: float, seed: int) -> dict:
+    base = customers(n, seed=seed)
+    return {"base": base, "delta": change_batch(base, change_rate=change_rate, new_rate=change_rate / 5, dup_rate=dup_rate, seed=seed + 1),
+            "rules": sttm_rules(), "tmp": tempfile.mkdtemp(prefix="bench_")}
+
+# ---- fullscd / v4_5: etl.transformer, etl.scd_handler, etl.io_local ----
+def _sttm_app_cases():
+    from etl.transformer import apply_rules
+    from etl.scd_handler import deduplicate_source, scd_type_1, scd_type_2, scd_type_3
+    from etl.io_local import write_target_csv, read_target_csv, write_target_sqlite, read_target_sqlite
+
+    def transformed(d):
+        out = apply_rules(d["delta"], d["rules"])
+        return deduplicate_source(out, "customer_key", "keep_last")
+
+    def scd2_target(d):
+        return scd_type_2(apply_rules(d["base"], d["rules"]), None, "customer_key", None, as_of=AS_OF)
+
+    try:  # fullscd only: etl.backends with whatever engines are installed
+        from etl import backends
+        engines = [b for b in backends.available() if b != "pandas"]
+    except ImportError:
+        engines = []
+    engine_cases = [(f"scd_type_2.merge[{b}]", lambda d: (transformed(d), scd2_target(d)),
+                     lambda a, b=b: backends.scd_type_2(a[0], a[1], "customer_key", None, as_of=AS_OF + pd.Timedelta(days=1), backend=b), None)
+                    for b in engines]
+
+    return engine_cases + [
+        ("transformer.apply_rules", lambda d: (d["delta"], d["rules"]), lambda a: apply_rules(*a), None),
+        ("deduplicate_source.keep_last", lambda d: apply_rules(d["delta"], d["rules"]),
+         lambda o: deduplicate_source(o, "customer_key", "keep_last"), None),
+        ("deduplicate_source.by_timestamp", lambda d: apply_rules(d["delta"], d["rules"]),
+         lambda o: deduplicate_source(o, "customer_key", "by_timestamp", "last_updated"), None),
+        ("scd_type_1", transformed, lambda o: scd_type_1(o, None, audit_cols={"batch_id": "bench"}), None),
+        ("scd_type_2.initial", lambda d: apply_rules(d["base"], d["rules"]),
+         lambda o: scd_type_2(o, None, "customer_key", None, as_of=AS_OF), None),
+        ("scd_type_2.merge", lambda d: (transformed(d), scd2_target(d)),
+         lambda a: scd_type_2(a[0], a[1], "customer_key", None, as_of=AS_OF + pd.Timedelta(days=1)), 100_000),
+        ("scd_type_3.merge", lambda d: (transformed(d), apply_rules(d["base"], d["rules"])),
+         lambda a: scd_type_3(a[0], a[1], ["customer_key"], ["email", "city"]), 100_000),
+        ("io.csv_roundtrip", lambda d: (transformed(d), os.path.join(d["tmp"], "out", "dim.csv")),
+         lambda a: (write_target_csv(a[0], a[1]), read_target_csv(a[1])), None),
+        ("io.sqlite_roundtrip", lambda d: (transformed(d), os.path.join(d["tmp"], "db", "t.db")),
+         lambda a: (write_target_sqlite(a[0], a[1], "dim"), read_target_sqlite(a[1], "dim")), None),
+    ]
+
+# ---- v8.8: tools.dq, tools.transforms, tools.connectors ----
+def _v88_cases():
+    from tools import dq
+    from tools.transforms import scd_type1_merge, scd_type2_merge
+    from tools.connectors import write_sqlite, write_layer_csv, read_uri
+
+    def scd2_target(d):
+        t = d["base"].copy(); t["effective_from"] = AS_OF; t["effective_to"] = pd.Series([None] * len(t), dtype=object); t["is_current"] = True
+        return t
+    return [
+        ("dq.profile", lambda d: d["base"], dq.profile, None),
+        ("dq.apply_rules", lambda d: (d["base"], dq.propose_rules(d["base"])), lambda a: dq.apply_rules(*a), None),
+        ("scd_type1_merge", lambda d: (d["base"], d["delta"].drop_duplicates("customer_id", keep="last")),
+         lambda a: scd_type1_merge(a[0], a[1], ["customer_id"]), None),
+        ("scd_type2_merge", lambda d: (scd2_target(d), d["delta"].drop_duplicates("customer_id", keep="last")),
+         lambda a: scd_type2_merge(a[0], a[1], ["customer_id"]), 50_000),
+        ("io.write_sqlite", lambda d: (d["base"], os.path.join(d["tmp"], "int.db")),
+         lambda a: write_sqlite(a[0], a[1], "landing_customers"), None),
+        ("io.layer_csv_roundtrip", lambda d: (d["base"], os.path.join(d["tmp"], "landing")),
+         lambda a: read_uri(write_layer_csv(a[0], a[1], "landing_customers")), None),
+    ]
+
+# ---- old / v1_6: utils.dq_rules.run_checks ----
+def _dq_rules_cases():
+    from utils.dq_rules import propose_rules, run_checks
+
+    def with_rules(df):
+        return df, propose_rules(df)
+    return [
+        ("run_checks.customers", lambda d: with_rules(d["base"]), lambda a: run_checks(*a), None),
+        ("run_checks.orders", lambda d: with_rules(orders(len(d["base"]), len(d["base"]))), lambda a: run_checks(*a), None),
+    ]
+
+SUITES = {"fullscd": _sttm_app_cases, "v4_5": _sttm_app_cases, "v8_8": _v88_cases, "old": _dq_rules_cases, "v1_6": _dq_rules_cases}